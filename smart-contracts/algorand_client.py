@@ -0,0 +1,538 @@
+"""
+Shared Algorand client layer for the deploy, test and keeper scripts.
+
+    client = get_algod_client()
+    app_id = create_app(client, private_key, approval, clear, global_schema, local_schema)
+    call_app(client, private_key, app_id, [b"withdraw", project_id.to_bytes(8, "big")])
+
+PooledAlgodClient is a drop-in AlgodClient that
+- sends every request over one requests.Session, so the TLS connection to the
+  node is kept alive instead of being rebuilt per call
+- caches suggested params for a few seconds and refreshes them as soon as a
+  newer round is seen (status / status_after_block responses)
+- serves application_info / account_info from a RoundCache: each response
+  is fetched once per round, and concurrent identical reads share one request
+- counts its HTTP round trips per endpoint, which bench_http.py reports
+
+ConfirmationTracker waits for many transactions at once: one thread follows
+the chain with a single status_after_block call per round, reads each new
+block's txids once and resolves every outstanding transaction found in it.
+"""
+
+import base64
+import copy
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from urllib import parse
+
+import requests
+from algosdk import account, constants, error, transaction
+from algosdk.v2client import algod
+
+import teal_assembler
+
+# Algorand Testnet configuration
+algod_address = "https://testnet-api.algonode.cloud"
+indexer_address = "https://testnet-idx.algonode.cloud"
+algod_token = ""
+
+SUGGESTED_PARAMS_TTL = 5.0  # seconds
+CONFIRMATION_ROUNDS = 10    # rounds to wait before giving up on a transaction
+POOL_SIZE = 16              # keep-alive connections kept per host
+CACHE_SIZE = 1024           # application_info / account_info responses kept per client
+ROUND_CHECK_INTERVAL = 1.0  # seconds a seen round is trusted before a cached read asks status again
+
+
+class RoundCache:
+    """
+    LRU of read responses keyed by (endpoint, id, round).
+
+    Entries of earlier rounds are dropped as soon as a newer round is seen
+    (advance), so a read never outlives the round it was made in. A read that
+    is already in flight is not repeated: claim hands later callers the first
+    caller's future. Responses are shared between callers and must not be
+    modified.
+    """
+
+    HIT, WAIT, FETCH = range(3)
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.round = 0
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0     # reads that waited for an identical one in flight
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def advance(self, round_num):
+        with self._lock:
+            if round_num <= self.round:
+                return
+            self.round = round_num
+            for key in [key for key in self._entries if key[2] < round_num]:
+                del self._entries[key]
+
+    def claim(self, key, new_future):
+        """(HIT, response), (WAIT, future of the read in flight) or (FETCH, future the caller must complete)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self.HIT, self._entries[key]
+            if key in self._inflight:
+                self.joined += 1
+                return self.WAIT, self._inflight[key]
+            self.misses += 1
+            future = self._inflight[key] = new_future()
+            return self.FETCH, future
+
+    def complete(self, key, response=None, exc=None):
+        """Finish a FETCH claim: store the response and wake every caller waiting on it"""
+        with self._lock:
+            future = self._inflight.pop(key)
+            if exc is None and key[2] >= self.round and self.maxsize:
+                self._entries[key] = response
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        if exc is None:
+            future.set_result(response)
+        else:
+            future.set_exception(exc)
+
+    def abandon(self, key):
+        """Give up a FETCH claim (the reader was interrupted); callers waiting on it are cancelled"""
+        with self._lock:
+            future = self._inflight.pop(key)
+        future.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "joined": self.joined,
+                    "size": len(self._entries), "round": self.round}
+
+
+class PooledAlgodClient(algod.AlgodClient):
+    def __init__(self, algod_token, algod_address, headers=None, session=None, params_ttl=SUGGESTED_PARAMS_TTL,
+                 cache_size=CACHE_SIZE, round_check=ROUND_CHECK_INTERVAL):
+        super().__init__(algod_token, algod_address, headers)
+        self.session = session or new_session()
+        self.params_ttl = params_ttl
+        self.requests = Counter()
+        self.last_round = 0
+        self._params = None
+        self._params_time = 0.0
+        self._params_round = 0
+        self.cache = RoundCache(cache_size)
+        self.round_check = round_check
+        self._round_seen = 0.0
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json", timeout=30):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        path = requrl
+        if requrl not in constants.unversioned_paths:
+            requrl = algod.api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        self.requests[f"{method} {endpoint(path)}"] += 1
+        resp = self.session.request(method, self.algod_address + requrl, headers=header, data=data, timeout=timeout)
+
+        if resp.status_code >= 400:
+            message, body = resp.text, {}
+            try:
+                body = resp.json()
+                message = body["message"]
+            except (ValueError, KeyError):
+                pass
+            raise error.AlgodHTTPError(message, resp.status_code, body.get("data"))
+
+        if response_format != "json":
+            return resp.content
+        if not resp.content:
+            # Some algod responses return 200 OK with an empty body
+            return {}
+        try:
+            return resp.json()
+        except json.JSONDecodeError as e:
+            raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+
+    def suggested_params(self, **kwargs):
+        """Suggested params, served from cache until the TTL expires or a new round is seen"""
+        fresh = time.monotonic() - self._params_time < self.params_ttl
+        if kwargs or not fresh or self._params is None or self.last_round > self._params_round:
+            self._params = super().suggested_params(**kwargs)
+            self._params_time = time.monotonic()
+            self.last_round = self._params_round = max(self.last_round, self._params.first)
+        # Callers adjust fee fields in place, so each gets its own copy
+        return copy.copy(self._params)
+
+    def send_raw_group(self, raw):
+        """Broadcast already-encoded signed transactions (e.g. from bulk_signer); returns the first transaction id"""
+        resp = self.algod_request("POST", "/transactions", data=raw, headers={"Content-Type": "application/x-binary"})
+        return resp["txId"]
+
+    def status(self, **kwargs):
+        return self._observe(super().status(**kwargs))
+
+    def status_after_block(self, block_num, **kwargs):
+        return self._observe(super().status_after_block(block_num, **kwargs))
+
+    def _observe(self, status):
+        if isinstance(status, dict):
+            self.last_round = max(self.last_round, status.get("last-round", 0))
+            self._round_seen = time.monotonic()
+            self.cache.advance(self.last_round)
+        return status
+
+    def application_info(self, application_id, **kwargs):
+        if kwargs:
+            return super().application_info(application_id, **kwargs)
+        return self.application_info_at(application_id)[1]
+
+    def application_info_at(self, application_id):
+        """(round, application_info): the round is that of the cache entry the response came from"""
+        return self._cached_read("application_info", application_id,
+                                 lambda: super(PooledAlgodClient, self).application_info(application_id))
+
+    def account_info(self, address, exclude=None, **kwargs):
+        if kwargs:
+            return super().account_info(address, exclude, **kwargs)
+        return self.account_info_at(address, exclude)[1]
+
+    def account_info_at(self, address, exclude=None):
+        """(round, account_info): the round is that of the cache entry the response came from"""
+        return self._cached_read("account_info", (address, exclude),
+                                 lambda: super(PooledAlgodClient, self).account_info(address, exclude))
+
+    def _cached_read(self, endpoint_name, key, fetch):
+        """(round, fetch()), fetched once per round per key; concurrent callers of the same key share one request"""
+        if time.monotonic() - self._round_seen >= self.round_check:
+            self.status()
+        round_num = self.last_round
+        key = (endpoint_name, key, round_num)
+        state, found = self.cache.claim(key, Future)
+        if state == RoundCache.HIT:
+            return round_num, found
+        if state == RoundCache.WAIT:
+            return round_num, found.result()
+        try:
+            response = fetch()
+        except Exception as e:
+            self.cache.complete(key, exc=e)
+            raise
+        except BaseException:
+            self.cache.abandon(key)
+            raise
+        self.cache.complete(key, response)
+        return round_num, response
+
+
+def new_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def endpoint(path):
+    """Collapse ids and txids out of a request path: /v2/applications/123 -> /applications/{}"""
+    return "/".join("{}" if part.isdigit() or len(part) >= 52 else part for part in path.split("?")[0].split("/"))
+
+
+_clients = {}
+
+
+def get_algod_client(address=None, token=None):
+    """Shared pooled client per node, reused by every helper in a process"""
+    key = (address or algod_address, algod_token if token is None else token)
+    if key not in _clients:
+        _clients[key] = PooledAlgodClient(key[1], key[0])
+    return _clients[key]
+
+
+def get_indexer_client(address=None, token=None):
+    from algosdk.v2client import indexer
+    return indexer.IndexerClient(algod_token if token is None else token, address or indexer_address)
+
+
+def compile_program(client, source_code):
+    """Program bytes for TEAL source, assembled locally; algod only compiles versions the assembler lacks"""
+    try:
+        return teal_assembler.compile_cached(source_code)
+    except teal_assembler.UnsupportedVersionError:
+        compile_response = client.compile(source_code)
+        return base64.b64decode(compile_response["result"])
+
+
+class ConfirmationTracker:
+    """
+    Resolve transaction confirmations for many txids from one block follower.
+
+        future = tracker.track(txid)              # concurrent.futures.Future
+        tracker.track(txid, callback=on_confirmed) # called with the future
+        infos = tracker.wait(txids)
+
+    A future resolves to {"txid", "confirmed-round"}, or to the full pending
+    transaction info when tracked with details=True (one extra request, made
+    only once the txid shows up in a block). A txid not seen within timeout
+    rounds fails with ConfirmationTimeoutError, or with the node's pool error
+    if it was rejected.
+    """
+
+    def __init__(self, client, timeout=CONFIRMATION_ROUNDS):
+        self.client = client
+        self.timeout = timeout
+        self.last_round = 0
+        self._pending = {}
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, txid, timeout=None, callback=None, details=False, first_round=None):
+        """Start waiting for txid; first_round is the earliest round it can confirm in"""
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        if first_round is None:
+            # Where to start looking, when the client knows a round; it may be
+            # stale, so the timeout is counted from a round the tracker sees
+            first_round = getattr(self.client, "last_round", 0) or self.last_round or None
+        item = _Tracked(txid, future, timeout or self.timeout, details, first_round)
+
+        with self._lock:
+            self._pending.setdefault(txid, []).append(item)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="confirmation-tracker", daemon=True)
+                self._thread.start()
+        return future
+
+    def wait(self, txids, timeout=None, details=False):
+        """Block until every txid is confirmed; returns their infos in order"""
+        futures = [self.track(txid, timeout, details=details) for txid in txids]
+        return [future.result() for future in futures]
+
+    def _run(self):
+        try:
+            while self._follow():
+                pass
+        except Exception as e:
+            self._fail_all(e)
+
+    def _follow(self):
+        """Process the next round; returns False once nothing is left to track"""
+        with self._lock:
+            if not self._pending:
+                self._thread = None
+                return False
+
+        if self.last_round:
+            status = self.client.status_after_block(self.last_round)
+        else:
+            status = self.client.status()
+        current = status["last-round"]
+
+        with self._lock:
+            items = [item for tracked in self._pending.values() for item in tracked]
+        for item in items:
+            if item.next_round is None:
+                # Include the previous round: the transaction may have been
+                # confirmed between submission and tracking
+                item.next_round = max(1, current - 1)
+            if item.expires is None:
+                # A stale first_round widens the scan by at most timeout rounds and never shortens the wait
+                item.next_round = max(item.next_round, current - item.timeout)
+                item.expires = current + item.timeout
+
+        oldest = min(item.next_round for item in items)
+        for round_num in range(oldest, current + 1):
+            if round_num not in self._blocks:
+                response = self.client.get_block_txids(round_num)
+                self._blocks[round_num] = set(response.get("blockTxids") or [])
+
+        for item in items:
+            confirmed = next(
+                (r for r in range(item.next_round, current + 1) if item.txid in self._blocks[r]), None
+            )
+            if confirmed is not None:
+                self._resolve(item, confirmed)
+            elif current >= item.expires:
+                self._expire(item)
+            else:
+                item.next_round = current + 1
+
+        with self._lock:
+            oldest = min((item.next_round for tracked in self._pending.values() for item in tracked),
+                         default=current + 1)
+        for round_num in [r for r in self._blocks if r < oldest]:
+            del self._blocks[round_num]
+        self.last_round = current
+        return True
+
+    def _resolve(self, item, confirmed_round):
+        info = {"txid": item.txid, "confirmed-round": confirmed_round}
+        try:
+            if item.details:
+                info = self.client.pending_transaction_info(item.txid)
+        except Exception as e:
+            self._finish(item, exc=e)
+        else:
+            self._finish(item, result=info)
+
+    def _expire(self, item):
+        """Ask the node once why the txid never showed up"""
+        try:
+            info = self.client.pending_transaction_info(item.txid)
+        except error.AlgodHTTPError:
+            info = {}
+        if info.get("confirmed-round", 0) > 0:
+            self._finish(item, result=info if item.details else
+                         {"txid": item.txid, "confirmed-round": info["confirmed-round"]})
+        elif info.get("pool-error"):
+            self._finish(item, exc=error.AlgodResponseError(f"Transaction {item.txid} rejected: {info['pool-error']}"))
+        else:
+            self._finish(item, exc=error.ConfirmationTimeoutError(
+                f"Transaction {item.txid} not confirmed after {item.timeout} rounds"))
+
+    def _finish(self, item, result=None, exc=None):
+        with self._lock:
+            tracked = self._pending.get(item.txid, [])
+            if item in tracked:
+                tracked.remove(item)
+            if not tracked:
+                self._pending.pop(item.txid, None)
+        if exc is not None:
+            item.future.set_exception(exc)
+        else:
+            item.future.set_result(result)
+
+    def _fail_all(self, e):
+        with self._lock:
+            items = [item for tracked in self._pending.values() for item in tracked]
+            self._pending.clear()
+            self._thread = None
+        for item in items:
+            item.future.set_exception(e)
+
+
+class _Tracked:
+    __slots__ = ("txid", "future", "timeout", "details", "next_round", "expires")
+
+    def __init__(self, txid, future, timeout, details, first_round):
+        self.txid = txid
+        self.future = future
+        self.timeout = timeout
+        self.details = details
+        self.next_round = first_round
+        self.expires = None  # set on the first round the tracker sees
+
+
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(client):
+    """Shared confirmation tracker per client, kept on the client so both are released together"""
+    with _trackers_lock:
+        tracker = getattr(client, "_confirmation_tracker", None)
+        if tracker is None:
+            tracker = client._confirmation_tracker = ConfirmationTracker(client)
+        return tracker
+
+
+def wait_for_confirmation(client, txid, timeout=CONFIRMATION_ROUNDS):
+    """Wait until txid is confirmed; raises if it is rejected or not confirmed within timeout rounds"""
+    txinfo = get_tracker(client).track(txid, timeout, details=True).result()
+    print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round')}")
+    return txinfo
+
+
+def wait_for_all(client, txids, timeout=CONFIRMATION_ROUNDS):
+    """Wait for many transactions together; returns {"txid", "confirmed-round"} per txid"""
+    return get_tracker(client).wait(txids, timeout)
+
+
+def send(client, private_key, txn):
+    """Sign, send and wait for a single transaction; returns its pending info"""
+    tx_id = client.send_transaction(txn.sign(private_key))
+    return wait_for_confirmation(client, tx_id)
+
+
+def send_group(client, private_key, txns):
+    """Group, sign, send and wait for transactions from one sender"""
+    transaction.assign_group_id(txns)
+    tx_id = client.send_transactions([txn.sign(private_key) for txn in txns])
+    wait_for_confirmation(client, tx_id)
+    return tx_id
+
+
+def create_app(client, private_key, approval_program, clear_program, global_schema, local_schema, app_args=None):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationCreateTxn(
+        sender=sender,
+        sp=client.suggested_params(),
+        on_complete=transaction.OnComplete.NoOpOC.real,
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=global_schema,
+        local_schema=local_schema,
+        app_args=app_args or []
+    )
+    # The confirmed transaction already carries the new app id
+    app_id = send(client, private_key, txn)["application-index"]
+    print(f"Created app with id: {app_id}")
+    return app_id
+
+
+def call_app(client, private_key, app_id, app_args, **kwargs):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationNoOpTxn(
+        sender=sender,
+        sp=client.suggested_params(),
+        index=app_id,
+        app_args=app_args,
+        **kwargs
+    )
+    txinfo = send(client, private_key, txn)
+    print(f"App call confirmed in tx: {txn.get_txid()}")
+    return txinfo
+
+
+def opt_in_app(client, private_key, app_id):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationOptInTxn(sender=sender, sp=client.suggested_params(), index=app_id)
+    send(client, private_key, txn)
+    print(f"Opted in to app: {txn.get_txid()}")
+    return txn.get_txid()
+
+
+def send_payment(client, private_key, receiver, amount):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.PaymentTxn(sender=sender, sp=client.suggested_params(), receiver=receiver, amt=amount)
+    send(client, private_key, txn)
+    print(f"Payment sent: {txn.get_txid()}")
+    return txn.get_txid()
+
+
+def check_balance(client, address):
+    """Account balance in microAlgos, or 0 if it cannot be read"""
+    try:
+        return client.account_info(address, exclude="all").get("amount", 0)
+    except error.AlgodHTTPError as e:
+        print(f"Error checking balance: {e}")
+        return 0
@@ -0,0 +1,307 @@
+"""
+HTTP API over one app's projects, contributions and reward NFTs, for the
+frontend's list and detail views.
+
+    python api_server.py <app_id> --port 8080
+
+    GET /projects?limit=50&cursor=...         projects in id order, a page at a time
+    GET /projects/{id}
+    GET /accounts/{address}/contributions     what the account put into each project
+    GET /accounts/{address}/nfts              its reward NFTs
+    POST /nfts/lookup  ["<address>", ...]     reward NFTs of many accounts, streamed (nft_holdings.py)
+
+Everything is read from algod in the contract's own state layout (see
+project_state.py): projects from the app's global state, contributions from
+the account's local state, NFTs from its local state and holdings plus the
+reward assets the app account created. One task follows the chain with
+wait-for-block-after, so the current round is known without a status request
+per call. Reads go through the client's round cache and every response body is
+kept for the round it was built at; concurrent requests for the same URL share
+one build. However many users ask, a block costs one application_info, one
+account_info of the app account and one account_info per account asked about.
+
+Responses carry an ETag naming the round their data was read at: the round
+of the cache entries that served the reads (the oldest one, when a response
+combines several). A client that sends it back in If-None-Match gets 304 Not
+Modified until the next block. Lists are paged by
+project id: each page ends with "next", the cursor for the following page
+(null on the last one).
+
+A bulk lookup streams one JSON line per address, as each account is read,
+instead of a single cached body. Its account reads share the client's round
+cache with the other routes.
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import math
+import sys
+import traceback
+
+import aiohttp
+from aiohttp import web
+from algosdk import encoding, error
+from algosdk.logic import get_application_address
+
+from algorand_client import RoundCache
+from async_client import AsyncAlgodClient
+from nft_holdings import LOOKUP_CACHE_SIZE, lookup_reward_nfts
+from project_state import ProjectState, account_contributions, local_state, reward_assets, reward_nfts
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RESPONSE_CACHE_SIZE = 4096   # response bodies kept for the current round
+RETRY_DELAY = 1.0            # seconds before following the chain again after an algod error
+MAX_LOOKUP_ADDRESSES = 10000  # addresses one bulk NFT lookup may ask for
+
+
+def json_error(cls, message):
+    return cls(text=json.dumps({"message": message}), content_type="application/json")
+
+
+def encode_cursor(project_id):
+    return base64.urlsafe_b64encode(str(project_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise json_error(web.HTTPBadRequest, f"invalid cursor {cursor!r}") from None
+
+
+def page(items, query, id_key):
+    """(items of one page, cursor of the next or None) for dicts sorted by item[id_key]"""
+    try:
+        limit = int(query.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise json_error(web.HTTPBadRequest, "limit must be an integer") from None
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise json_error(web.HTTPBadRequest, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    start = 0
+    if "cursor" in query:
+        after = decode_cursor(query["cursor"])
+        start = next((i for i, item in enumerate(items) if item[id_key] > after), len(items))
+    chunk = items[start:start + limit]
+    more = start + limit < len(items)
+    return chunk, encode_cursor(chunk[-1][id_key]) if more else None
+
+
+def matches_etag(header, etag):
+    """Whether an If-None-Match header names etag (weak comparison, as RFC 9110 asks for)"""
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+class CrowdfundingApi:
+    """Handlers for one app; responses are cached per round in self.responses"""
+
+    def __init__(self, client, app_id, cache_size=RESPONSE_CACHE_SIZE):
+        self.client = client
+        self.app_id = app_id
+        self.app_address = get_application_address(app_id)
+        self.responses = RoundCache(cache_size)
+        self._state = None
+        self._follower = None
+
+    def application(self):
+        app = web.Application()
+        app.add_routes([
+            web.get("/projects", self.projects),
+            web.get(r"/projects/{project_id:\d+}", self.project),
+            web.get("/accounts/{address}/contributions", self.contributions),
+            web.get("/accounts/{address}/nfts", self.nfts),
+            web.post("/nfts/lookup", self.lookup_nfts),
+        ])
+        app.on_startup.append(self._start)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    async def _start(self, app):
+        self._follower = asyncio.ensure_future(self.follow())
+
+    async def _stop(self, app):
+        self._follower.cancel()
+        await self.client.close()
+
+    async def follow(self):
+        """Keep client.last_round current: one wait-for-block-after request per block"""
+        while True:
+            try:
+                if self.client.last_round:
+                    status = await self.client.status_after_block(self.client.last_round)
+                else:
+                    status = await self.client.status()
+            except (error.AlgodHTTPError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                print(f"Following the chain failed, retrying: {str(e) or type(e).__name__}", file=sys.stderr)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            except Exception:
+                # Anything else would end the task silently and leave last_round, and every ETag, stuck
+                print("Following the chain failed unexpectedly, restarting:", file=sys.stderr)
+                traceback.print_exc()
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            self.responses.advance(status["last-round"])
+
+    async def current_round(self):
+        if not self.client.last_round:
+            await self.client.status()
+        return self.client.last_round
+
+    # Cached responses
+
+    def etag(self, round_num):
+        return f'"{self.app_id}-{round_num}"'
+
+    async def respond(self, request, build):
+        """
+        The body of (round, body) = await build() as JSON, built once per URL per
+        round; 304 if the client has it. The ETag names the round build() read
+        its data at, which can be later than the round the request came in at.
+        """
+        round_num = await self.current_round()
+        if matches_etag(request.headers.get("If-None-Match", ""), self.etag(round_num)):
+            return web.Response(status=304, headers={"ETag": self.etag(round_num), "Cache-Control": "no-cache"})
+
+        key = ("response", request.path + "?" + "&".join(sorted(request.query_string.split("&"))), round_num)
+        state, found = self.responses.claim(key, asyncio.get_running_loop().create_future)
+        if state == RoundCache.HIT:
+            data_round, body = found
+        elif state == RoundCache.WAIT:
+            try:
+                data_round, body = await asyncio.shield(found)
+            except web.HTTPException as e:
+                # An error response can only be sent once, so every waiter gets its own
+                raise type(e)(text=e.text, content_type=e.content_type) from None
+        else:
+            try:
+                data_round, payload = await build()
+                body = json.dumps(payload).encode()
+            except Exception as e:
+                self.responses.complete(key, exc=e)
+                found.exception()  # retrieved here, so a build nobody joined is not reported as unhandled
+                raise
+            except BaseException:
+                self.responses.abandon(key)
+                raise
+            self.responses.complete(key, (data_round, body))
+        headers = {"ETag": self.etag(data_round), "Cache-Control": "no-cache"}
+        if data_round != round_num and matches_etag(request.headers.get("If-None-Match", ""), headers["ETag"]):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def project_state(self):
+        """ProjectState of the app, decoded once per round; its round is the one application_info was read at"""
+        round_num, info = await self._read(self.client.application_info_at(self.app_id))
+        if self._state is None or self._state.round != round_num:
+            self._state = ProjectState.from_global_state(info["params"].get("global-state", []), round_num)
+        return self._state
+
+    async def account(self, address):
+        """(round, account_info) of an address, the round being the one it was read at"""
+        if not encoding.is_valid_address(address):
+            raise json_error(web.HTTPBadRequest, f"invalid address {address!r}")
+        return await self._read(self.client.account_info_at(address))
+
+    @staticmethod
+    async def _read(coro):
+        try:
+            return await coro
+        except error.AlgodHTTPError as e:
+            raise json_error(web.HTTPBadGateway, f"algod: {e}") from None
+
+    # Routes
+
+    async def projects(self, request):
+        async def build():
+            state = await self.project_state()
+            projects, cursor = page([project._asdict() for project in state.projects().values()], request.query, "id")
+            return state.round, {"round": state.round, "projects": projects, "next": cursor}
+        return await self.respond(request, build)
+
+    async def project(self, request):
+        project_id = int(request.match_info["project_id"])
+
+        async def build():
+            state = await self.project_state()
+            try:
+                project = state.project(project_id)
+            except KeyError:
+                raise json_error(web.HTTPNotFound, f"project {project_id} does not exist") from None
+            return state.round, {"round": state.round, "project": project._asdict()}
+        return await self.respond(request, build)
+
+    async def contributions(self, request):
+        address = request.match_info["address"]
+
+        async def build():
+            (account_round, account), state = await asyncio.gather(self.account(address), self.project_state())
+            # A block between the two reads can split them: the older round keeps a 304 from covering newer data
+            round_num = min(account_round, state.round)
+            projects = state.projects()
+            contributions = [
+                {"project_id": project_id, "amount": amount,
+                 "project": projects[project_id]._asdict() if project_id in projects else None}
+                for project_id, amount in account_contributions(local_state(account, self.app_id)).items()
+            ]
+            contributions, cursor = page(contributions, request.query, "project_id")
+            return round_num, {"round": round_num, "address": address, "contributions": contributions, "next": cursor}
+        return await self.respond(request, build)
+
+    async def nfts(self, request):
+        address = request.match_info["address"]
+
+        async def build():
+            (account_round, account), (app_round, app_account) = await asyncio.gather(
+                self.account(address), self.account(self.app_address))
+            round_num = min(account_round, app_round)
+            nfts = reward_nfts(account, self.app_id, reward_assets(app_account.get("created-assets", [])))
+            nfts, cursor = page(nfts, request.query, "asset_id")
+            return round_num, {"round": round_num, "address": address, "nfts": nfts, "next": cursor}
+        return await self.respond(request, build)
+
+    async def lookup_nfts(self, request):
+        try:
+            addresses = await request.json()
+        except ValueError:
+            raise json_error(web.HTTPBadRequest, "body must be a JSON list of addresses") from None
+        if not isinstance(addresses, list) or not all(isinstance(address, str) for address in addresses):
+            raise json_error(web.HTTPBadRequest, "body must be a JSON list of addresses")
+        if len(addresses) > MAX_LOOKUP_ADDRESSES:
+            raise json_error(web.HTTPRequestEntityTooLarge, f"at most {MAX_LOOKUP_ADDRESSES} addresses per lookup")
+
+        await self.current_round()
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson", "Cache-Control": "no-store"})
+        await response.prepare(request)
+        try:
+            async for holding in lookup_reward_nfts(self.client, self.app_id, addresses):
+                await response.write(json.dumps(holding._asdict()).encode() + b"\n")
+        except error.AlgodHTTPError as e:
+            # The status line is gone already; the last line tells the client the stream is incomplete
+            await response.write(json.dumps({"error": f"algod: {e}"}).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one app's projects, contributions and NFTs over HTTP")
+    parser.add_argument("app_id", type=int)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--algod", help="algod address (default: the shared testnet node)")
+    parser.add_argument("--token", help="algod API token")
+    args = parser.parse_args(argv)
+
+    # The follower keeps the round current, so cached reads never need a status request of their own
+    client = AsyncAlgodClient(args.token, args.algod, cache_size=LOOKUP_CACHE_SIZE, round_check=math.inf)
+    web.run_app(CrowdfundingApi(client, args.app_id).application(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
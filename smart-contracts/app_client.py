@@ -0,0 +1,221 @@
+"""
+ARC-4 application client used by the generated contract clients.
+
+Method calls go through an AtomicTransactionComposer: arguments are encoded
+from the contract's ABI spec, transaction arguments given as an amount become
+payments to the app account, and the box references and fee pooling each
+method needs come from the hints published next to the spec. Methods hinted
+as read-only are run through algod's simulate endpoint: nothing is signed or
+sent and no fee is paid, so a client built with only a sender address (no
+private key) can call them.
+"""
+
+import base64
+
+from algosdk import account, encoding, transaction
+from algosdk.atomic_transaction_composer import (
+    AccountTransactionSigner,
+    AtomicTransactionComposer,
+    EmptySigner,
+    TransactionWithSigner,
+)
+from algosdk.logic import get_application_address
+from algosdk.v2client.models import SimulateRequest
+
+from project_layout import decode_project, project_box_name
+
+# Extra opcode budget requested when simulating read-only calls
+SIMULATE_EXTRA_BUDGET = 20000
+PROGRAM_PAGE_SIZE = 2048
+
+
+class ApplicationClient:
+    # Set by generated subclasses
+    contract = None
+    hints = {}
+
+    def __init__(self, client, private_key=None, app_id=0, sender=None):
+        self.client = client
+        self.private_key = private_key
+        if private_key is not None:
+            self.sender = account.address_from_private_key(private_key)
+            self.signer = AccountTransactionSigner(private_key)
+        else:
+            # Read-only client: simulate accepts unsigned transactions
+            self.sender = sender
+            self.signer = EmptySigner()
+        self.app_id = app_id
+        self._projects = {}
+
+    @property
+    def app_address(self):
+        return get_application_address(self.app_id)
+
+    def suggested_params(self):
+        return self.client.suggested_params()
+
+    def create(self, approval_program, clear_program, global_schema, local_schema, extra_pages=None):
+        """Create the application with a bare call and remember its id"""
+        if extra_pages is None:
+            # One page holds 2 KB of approval plus clear program
+            extra_pages = (len(approval_program) + len(clear_program) - 1) // PROGRAM_PAGE_SIZE
+        txn = transaction.ApplicationCreateTxn(
+            sender=self.sender,
+            sp=self.suggested_params(),
+            on_complete=transaction.OnComplete.NoOpOC,
+            approval_program=approval_program,
+            clear_program=clear_program,
+            global_schema=global_schema,
+            local_schema=local_schema,
+            extra_pages=extra_pages,
+        )
+        result = self._execute_bare(txn)
+        self.app_id = self.client.pending_transaction_info(result.tx_ids[0])["application-index"]
+        return self.app_id
+
+    def update(self, approval_program, clear_program):
+        txn = transaction.ApplicationUpdateTxn(
+            sender=self.sender,
+            sp=self.suggested_params(),
+            index=self.app_id,
+            approval_program=approval_program,
+            clear_program=clear_program,
+        )
+        return self._execute_bare(txn).tx_ids[0]
+
+    def opt_in(self):
+        txn = transaction.ApplicationOptInTxn(sender=self.sender, sp=self.suggested_params(), index=self.app_id)
+        return self._execute_bare(txn).tx_ids[0]
+
+    def close_out(self):
+        txn = transaction.ApplicationCloseOutTxn(sender=self.sender, sp=self.suggested_params(), index=self.app_id)
+        return self._execute_bare(txn).tx_ids[0]
+
+    def fund(self, amount):
+        """Send ALGO to the app account (e.g. to cover its minimum balance)"""
+        txn = transaction.PaymentTxn(sender=self.sender, sp=self.suggested_params(), receiver=self.app_address, amt=amount)
+        return self._execute_bare(txn).tx_ids[0]
+
+    def global_state(self):
+        """Global state as {key bytes: int or bytes}"""
+        state = {}
+        for kv in self.client.application_info(self.app_id)["params"].get("global-state", []):
+            value = kv["value"]
+            state[base64.b64decode(kv["key"])] = value["uint"] if value["type"] == 2 else base64.b64decode(value["bytes"])
+        return state
+
+    def project(self, project_id):
+        """Decoded project box; cached, as only the immutable fields are read through it"""
+        if project_id not in self._projects:
+            box = self.client.application_box_by_name(self.app_id, project_box_name(project_id))
+            self._projects[project_id] = decode_project(base64.b64decode(box["value"]))
+        return self._projects[project_id]
+
+    def call(self, method_name, *args, atc=None, boxes=None, accounts=None, foreign_assets=None, foreign_apps=None,
+             note=None, inner_txns=None):
+        """
+        Call an ABI method and return its decoded return value.
+
+        Pass an AtomicTransactionComposer as atc to only add the call to it;
+        the composer is returned and the caller executes the group.
+        inner_txns overrides the hinted number of inner transactions the
+        call's fee has to cover.
+        """
+        method = self.contract.get_method_by_name(method_name)
+        hints = self.hints.get(method_name, {})
+        arg_names = [arg.name for arg in method.args]
+
+        sp = self.suggested_params()
+        inner_txns = hints.get("inner_txns", 0) if inner_txns is None else inner_txns
+        if inner_txns:
+            # Fee pooling: this call pays for the inner transactions it issues
+            sp.flat_fee = True
+            sp.fee = max(sp.min_fee, 1000) * (1 + inner_txns)
+
+        method_args = [self._method_arg(spec, value) for spec, value in zip(method.args, args)]
+        box_refs = list(boxes or []) + self._hinted_boxes(hints, dict(zip(arg_names, args)))
+
+        composer = atc or AtomicTransactionComposer()
+        composer.add_method_call(
+            app_id=self.app_id,
+            method=method,
+            sender=self.sender,
+            sp=sp,
+            signer=self.signer,
+            method_args=method_args,
+            accounts=accounts,
+            foreign_assets=foreign_assets,
+            foreign_apps=foreign_apps,
+            note=note,
+            boxes=box_refs,
+        )
+        if atc is not None:
+            return composer
+
+        if hints.get("readonly"):
+            return self.simulate(composer).abi_results[-1].return_value
+        result = composer.execute(self.client, 4)
+        return result.abi_results[-1].return_value
+
+    def simulate(self, composer):
+        """Run a composed group through simulate without signing or sending it"""
+        request = SimulateRequest(
+            txn_groups=[],
+            allow_empty_signatures=True,
+            extra_opcode_budget=SIMULATE_EXTRA_BUDGET,
+        )
+        result = composer.simulate(self.client, request)
+        if result.failure_message:
+            raise RuntimeError(f"simulate failed: {result.failure_message}")
+        return result
+
+    def _method_arg(self, spec, value):
+        if not isinstance(spec.type, str) or spec.type not in transaction_types:
+            return value
+        if isinstance(value, TransactionWithSigner):
+            return value
+        if isinstance(value, transaction.Transaction):
+            return TransactionWithSigner(value, self.signer)
+        # An integer for a pay argument is the amount to send to the app
+        txn = transaction.PaymentTxn(sender=self.sender, sp=self.suggested_params(), receiver=self.app_address, amt=value)
+        return TransactionWithSigner(txn, self.signer)
+
+    def _hinted_boxes(self, hints, args):
+        refs = []
+        for box in hints.get("boxes", []):
+            prefix = box["prefix"].encode()
+            if "global" in box:
+                prefix += self.global_state()[box["global"].encode()].to_bytes(8, "big")
+            # Array arguments reference one box per distinct element
+            values = self._distinct(args.get(box["arg"]) if "arg" in box else None)
+            if "count_arg" in box:
+                # A range of consecutive ids starting at the arg
+                values = list(range(values[0], values[0] + args[box["count_arg"]]))
+            if "record_field" in box:
+                # Keyed by a field of the project the arg names (e.g. its category)
+                fields = self._distinct([self.project(value)[box["record_field"]] for value in values])
+                refs.extend((0, prefix + field.encode()) for field in fields)
+                continue
+            if "str_arg" in box:
+                refs.append((0, prefix + args[box["str_arg"]].encode()))
+                continue
+            addresses = self._distinct(args.get(box["address_arg"]) if "address_arg" in box else None)
+            if box.get("sender"):
+                addresses = [self.sender]
+            for value in values:
+                name = prefix if value is None else prefix + int(value).to_bytes(8, "big")
+                for address in addresses:
+                    refs.append((0, name if address is None else name + encoding.decode_address(address)))
+        return refs
+
+    @staticmethod
+    def _distinct(value):
+        return list(dict.fromkeys(value if isinstance(value, (list, tuple)) else [value]))
+
+    def _execute_bare(self, txn):
+        composer = AtomicTransactionComposer()
+        composer.add_transaction(TransactionWithSigner(txn, self.signer))
+        return composer.execute(self.client, 4)
+
+
+transaction_types = {"txn", "pay", "keyreg", "acfg", "axfer", "afrz", "appl"}
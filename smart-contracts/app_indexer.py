@@ -0,0 +1,397 @@
+"""
+Block-following indexer: keeps a local SQLite read model of one app.
+
+    python app_indexer.py <app_id>                      # catch up, then follow new blocks
+    python app_indexer.py <app_id> --from-round 41000000 --once   # replay history up to now and stop
+
+Readers (the frontend's getProjects / getUserNFTs, the ops scripts) re-read
+and re-parse the app's whole global state from algod on every request. The
+indexer reads every block once instead (GET /v2/blocks/{round}, msgpack)
+and applies what the app's calls did:
+- the global state deltas of its calls update the projects table. Both key
+  layouts are understood: project_<itob(id)> (the packed record of
+  crowdfunding.py) with project_<itob(id)>_<field>, and p_<itob(id)>_<field>
+  of the simple variants;
+- "contribute" calls add a contribution: the payment right before the call.
+  "contribute_many" calls add one per payment i of the group, to project
+  project_ids[i]. A payment that also creates the backer's ledger box (ABI
+  contract) is recorded without the box deposit. The call raises
+  total_backers exactly when it does that, and the indexer's own
+  contributions and refunds tell which payments of a batch it did it for;
+- the inner payments of "withdraw" and of "refund" / "settle_refunds" /
+  "move_contribution" are withdrawals and refunds;
+- assets the app creates are reward NFTs, owned by whoever last received
+  them, whether the app sent them or an owner passed them on.
+
+Every batch of blocks is written in one SQLite transaction together with the
+checkpoint (the last round applied), so a restart resumes from the
+checkpoint and never applies a block twice. A new database starts at
+--from-round, which needs a node that still has that block (an archival
+node for old rounds). Without it, the projects are seeded from the app's
+current global state and only blocks after that are followed.
+
+Box-backed variants (crowdfunding_boxes.py, crowdfunding_abi.py) keep their
+projects in boxes, whose changes blocks do not carry: for those the events
+are indexed (ARC-4 calls are recognised by method selector) and the
+platform totals, but not the projects.
+"""
+
+import argparse
+import base64
+import hashlib
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.logic import get_application_address
+
+from algorand_client import get_algod_client
+from crowdfunding_abi_client import CONTRACT
+from project_layout import LEDGER_BOX_MBR
+from project_state import parse_project_key, project_fields
+
+DEFAULT_DB = "crowdfunding.db"
+BATCH_ROUNDS = 64   # blocks fetched ahead and written per SQLite transaction while catching up
+FETCH_WORKERS = 8   # concurrent block requests
+
+# State field suffix -> projects column
+PROJECT_COLUMNS = {
+    "name": "name", "desc": "description", "category": "category", "creator": "creator",
+    "target": "target", "deadline": "deadline", "collected": "collected", "threshold": "threshold",
+    "active": "active", "backers": "backers",
+}
+
+REFUND_METHODS = {b"refund", b"settle_refunds", b"move_contribution"}
+WITHDRAW_METHODS = {b"withdraw"}
+CONTRIBUTE_METHODS = {b"contribute", b"contribute_many"}
+# The ARC-4 contract names its methods by selector
+ABI_METHODS = {method.get_selector(): method.name.encode() for method in CONTRACT.methods}
+PROJECT_IDS_TYPE = CONTRACT.get_method_by_name("contribute_many").args[0].type
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+
+CREATE TABLE IF NOT EXISTS projects (
+    project_id INTEGER PRIMARY KEY,
+    name TEXT, description TEXT, category TEXT, creator TEXT,
+    target INTEGER, deadline INTEGER, collected INTEGER, threshold INTEGER, active INTEGER, backers INTEGER,
+    created_round INTEGER NOT NULL, updated_round INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_creator ON projects (creator);
+CREATE INDEX IF NOT EXISTS projects_category ON projects (category);
+
+-- Global keys outside the project layout (project_count, platform totals, ...)
+CREATE TABLE IF NOT EXISTS app_state (key BLOB PRIMARY KEY, value);
+
+-- One row per payment; position is the payment's place in its group
+CREATE TABLE IF NOT EXISTS contributions (
+    txid TEXT NOT NULL, position INTEGER NOT NULL, round INTEGER NOT NULL, project_id INTEGER NOT NULL,
+    backer TEXT NOT NULL, amount INTEGER NOT NULL, PRIMARY KEY (txid, position)
+);
+CREATE INDEX IF NOT EXISTS contributions_project ON contributions (project_id, round);
+CREATE INDEX IF NOT EXISTS contributions_backer ON contributions (backer, round);
+
+-- Inner payments share their app call's txid; position tells them apart
+CREATE TABLE IF NOT EXISTS refunds (
+    txid TEXT NOT NULL, position INTEGER NOT NULL, round INTEGER NOT NULL, project_id INTEGER NOT NULL,
+    backer TEXT NOT NULL, amount INTEGER NOT NULL, PRIMARY KEY (txid, position)
+);
+CREATE INDEX IF NOT EXISTS refunds_project ON refunds (project_id, round);
+CREATE INDEX IF NOT EXISTS refunds_backer ON refunds (backer, round);
+
+CREATE TABLE IF NOT EXISTS withdrawals (
+    txid TEXT NOT NULL, position INTEGER NOT NULL, round INTEGER NOT NULL, project_id INTEGER NOT NULL,
+    creator TEXT NOT NULL, amount INTEGER NOT NULL, PRIMARY KEY (txid, position)
+);
+CREATE INDEX IF NOT EXISTS withdrawals_project ON withdrawals (project_id, round);
+
+CREATE TABLE IF NOT EXISTS nfts (
+    asset_id INTEGER PRIMARY KEY, round INTEGER NOT NULL, txid TEXT NOT NULL, project_id INTEGER,
+    owner TEXT, name TEXT, url TEXT
+);
+CREATE INDEX IF NOT EXISTS nfts_owner ON nfts (owner);
+CREATE INDEX IF NOT EXISTS nfts_project ON nfts (project_id);
+"""
+
+
+def connect(path=DEFAULT_DB):
+    """The read model database, created if needed; readers may share it while the indexer writes"""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def project_columns(field, value):
+    """projects columns set by one state value; empty for fields the table does not keep"""
+    return {PROJECT_COLUMNS[name]: typed for name, typed in project_fields(field, value).items()
+            if name in PROJECT_COLUMNS}
+
+
+def _bytes(value):
+    # Go writes state keys as msgpack strings that need not be UTF-8
+    return value if isinstance(value, bytes) else value.encode("utf-8", "surrogateescape")
+
+
+def state_value(delta):
+    """The value a msgpack ValueDelta sets; None when it deletes the key"""
+    action = delta.get("at")
+    if action == 1:
+        return _bytes(delta.get("bs", b""))
+    if action == 2:
+        return delta.get("ui", 0)
+    return None
+
+
+def block_txid(txn, header, entry):
+    """Transaction id of a block transaction, with the genesis id / hash the block left out put back"""
+    txn = dict(txn)
+    if entry.get("hgi"):
+        txn["gen"] = header["gen"]
+    if entry.get("hgh"):
+        txn["gh"] = header["gh"]
+    raw = msgpack.packb(dict(sorted(txn.items())), use_bin_type=True)
+    digest = hashlib.new("sha512_256", constants.txid_prefix + raw).digest()
+    return base64.b32encode(digest).decode().strip("=")
+
+
+class AppIndexer:
+    """Follows the chain and keeps the read model of app_id in a SQLite database"""
+
+    def __init__(self, client, app_id, db=None, batch_rounds=BATCH_ROUNDS):
+        self.client = client
+        self.app_id = app_id
+        self.app_address = encoding.decode_address(get_application_address(app_id))
+        self.db = db if db is not None else connect()
+        self.batch_rounds = batch_rounds
+        stored = self._meta("app_id")
+        if stored is None:
+            with self.db:
+                self._set_meta("app_id", app_id)
+        elif stored != app_id:
+            raise ValueError(f"database indexes app {stored}, not {app_id}")
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, value))
+
+    @property
+    def checkpoint(self):
+        """Last round applied; None before the first sync"""
+        return self._meta("round")
+
+    def start_at(self, round_num):
+        """Begin a new database at round_num instead of at the app's current state"""
+        if self.checkpoint is not None:
+            raise ValueError(f"database already indexed up to round {self.checkpoint}")
+        with self.db:
+            self._set_meta("round", round_num - 1)
+
+    def bootstrap(self):
+        """Seed the projects from the app's current global state and continue from the current round"""
+        # Status first: blocks after it are applied again, which state deltas
+        # make harmless, while none can be missed
+        current = self.client.status()["last-round"]
+        state = self.client.application_info(self.app_id)["params"].get("global-state", [])
+        with self.db:
+            self._apply_state(current, {
+                base64.b64decode(kv["key"]): base64.b64decode(kv["value"]["bytes"]) if kv["value"]["type"] == 1
+                else kv["value"]["uint"] for kv in state})
+            self._set_meta("round", current)
+
+    # Following
+
+    def sync(self, until=None):
+        """Apply every block after the checkpoint up to until (default: the node's last round); returns it"""
+        if self.checkpoint is None:
+            self.bootstrap()
+        until = until if until is not None else self.client.status()["last-round"]
+        with ThreadPoolExecutor(FETCH_WORKERS) as pool:
+            while self.checkpoint < until:
+                rounds = range(self.checkpoint + 1, min(self.checkpoint + self.batch_rounds, until) + 1)
+                blocks = pool.map(self.fetch_block, rounds)
+                with self.db:
+                    for block in blocks:
+                        self.apply_block(block)
+                    self._set_meta("round", rounds[-1])
+        return self.checkpoint
+
+    def follow(self, on_sync=None):
+        """Sync, then wait for each new block and apply it; runs until interrupted"""
+        while True:
+            before = self.checkpoint
+            reached = self.sync()
+            if on_sync and reached != before:
+                on_sync(before, reached)
+            self.client.status_after_block(reached)
+
+    def fetch_block(self, round_num):
+        raw = self.client.block_info(round_num=round_num, response_format="msgpack")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False, unicode_errors="surrogateescape")["block"]
+
+    # Projection
+
+    def apply_block(self, block):
+        round_num = block["rnd"]
+        group, group_id = [], None
+        for entry in block.get("txns", []):
+            txn = entry["txn"]
+            if txn.get("grp") is None or txn.get("grp") != group_id:
+                group, group_id = [], txn.get("grp")
+            group.append(txn)
+            if txn.get("type") == "axfer":
+                self._transfer(txn)
+                continue
+            if txn.get("type") != "appl":
+                continue
+            txid = block_txid(txn, block, entry)
+            self._apply_call(round_num, txid, txn, entry, group)
+
+    def _apply_call(self, round_num, txid, txn, applied, group):
+        """Apply one app call (top-level or inner) and, recursively, the calls it made"""
+        delta = applied.get("dt", {})
+        inner = delta.get("itx", [])
+        if txn.get("apid", 0) == self.app_id or applied.get("apid") == self.app_id:
+            state = {_bytes(key): state_value(value) for key, value in delta.get("gd", {}).items()}
+            new_backers = self._raised_by(state, b"total_backers")
+            self._apply_state(round_num, state)
+            self._apply_events(round_num, txid, txn, inner, group, new_backers)
+        for itxn in inner:
+            if itxn["txn"].get("type") == "appl":
+                self._apply_call(round_num, txid, itxn["txn"], itxn, [])
+            elif itxn["txn"].get("type") == "axfer":
+                self._transfer(itxn["txn"])
+
+    def _apply_state(self, round_num, state):
+        projects, other = {}, []
+        for key, value in state.items():
+            parsed = parse_project_key(key)
+            if parsed is None:
+                other.append((key, value))
+                continue
+            project_id, field = parsed
+            projects.setdefault(project_id, {}).update(project_columns(field, value))
+        for project_id, columns in projects.items():
+            names = list(columns)
+            assignments = "".join(f", {name} = excluded.{name}" for name in names)
+            self.db.execute(
+                f"INSERT INTO projects (project_id, created_round, updated_round{''.join(', ' + n for n in names)}) "
+                f"VALUES (?, ?, ?{', ?' * len(names)}) "
+                f"ON CONFLICT (project_id) DO UPDATE SET updated_round = excluded.updated_round{assignments}",
+                (project_id, round_num, round_num, *columns.values()))
+        self.db.executemany("INSERT INTO app_state (key, value) VALUES (?, ?) "
+                            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                            [(key, value) for key, value in other if value is not None])
+        self.db.executemany("DELETE FROM app_state WHERE key = ?", [(key,) for key, value in other if value is None])
+
+    def _raised_by(self, state, key):
+        """How much a global state delta raises a uint key: 0 if it leaves the key alone, None if unknown"""
+        if key not in state:
+            return 0
+        row = self.db.execute("SELECT value FROM app_state WHERE key = ?", (key,)).fetchone()
+        if row is None or not isinstance(state[key], int) or state[key] <= row[0]:
+            # Never seen, or a block applied again after bootstrap
+            return None
+        return state[key] - row[0]
+
+    def _has_ledger(self, project_id, backer):
+        """Whether the indexed history leaves backer with a contribution to project_id"""
+        contributed, refunded = self.db.execute(
+            "SELECT (SELECT MAX(round) FROM contributions WHERE project_id = ?1 AND backer = ?2), "
+            "(SELECT MAX(round) FROM refunds WHERE project_id = ?1 AND backer = ?2)", (project_id, backer)).fetchone()
+        return contributed is not None and (refunded is None or contributed > refunded)
+
+    def _contributions(self, method, args, group, sender, new_backers):
+        """(group position, project id, amount credited) of every payment a contribute call takes"""
+        if method == b"contribute_many":
+            # project_ids[i] tags payment i; the call comes right after them
+            payments = list(zip(range(len(group) - 1), PROJECT_IDS_TYPE.decode(args[1])))
+        elif len(args) > 1 and len(args[1]) == 8 and len(group) > 1:
+            payments = [(len(group) - 2, int.from_bytes(args[1], "big"))]
+        else:
+            return []
+        credited = {position: group[position].get("amt", 0) for position, _ in payments}
+
+        if args[0] in ABI_METHODS and new_backers != 0:
+            # Only the first payment to a project can create the backer's ledger box
+            first = {}
+            for position, project_id in payments:
+                first.setdefault(project_id, position)
+            if new_backers is None:
+                created = [item for item in first.items() if not self._has_ledger(item[0], sender)]
+            else:
+                # Projects the history shows no contribution to come first
+                created = sorted(first.items(), key=lambda item: self._has_ledger(item[0], sender))[:new_backers]
+            for _, position in created:
+                credited[position] -= LEDGER_BOX_MBR
+        return [(position, project_id, credited[position]) for position, project_id in payments]
+
+    def _apply_events(self, round_num, txid, txn, inner, group, new_backers=0):
+        args = txn.get("apaa", [])
+        method = ABI_METHODS.get(args[0], args[0]) if args else b""
+        project_id = int.from_bytes(args[1], "big") if len(args) > 1 and len(args[1]) == 8 else None
+        sender = encoding.encode_address(txn["snd"])
+
+        if method in CONTRIBUTE_METHODS:
+            self.db.executemany("INSERT OR REPLACE INTO contributions VALUES (?, ?, ?, ?, ?, ?)", [
+                (txid, position, round_num, project, sender, amount)
+                for position, project, amount in self._contributions(method, args, group, sender, new_backers)])
+
+        for position, itxn in enumerate(inner):
+            fields = itxn["txn"]
+            kind = fields.get("type")
+            if kind == "pay" and fields.get("amt"):
+                receiver = encoding.encode_address(fields["rcv"])
+                if method in REFUND_METHODS:
+                    self.db.execute("INSERT OR REPLACE INTO refunds VALUES (?, ?, ?, ?, ?, ?)",
+                                    (txid, position, round_num, project_id, receiver, fields["amt"]))
+                elif method in WITHDRAW_METHODS:
+                    self.db.execute("INSERT OR REPLACE INTO withdrawals VALUES (?, ?, ?, ?, ?, ?)",
+                                    (txid, position, round_num, project_id, receiver, fields["amt"]))
+            elif kind == "acfg" and itxn.get("caid"):
+                params = fields.get("apar", {})
+                self.db.execute("INSERT OR REPLACE INTO nfts VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                    itxn["caid"], round_num, txid, project_id, None,
+                    _bytes(params.get("an", b"")).decode(errors="replace"),
+                    _bytes(params.get("au", b"")).decode(errors="replace")))
+
+    def _transfer(self, txn):
+        """Move a reward NFT to its receiver; other asset transfers match no row"""
+        if txn.get("aamt") and txn.get("arcv"):
+            self.db.execute("UPDATE nfts SET owner = ? WHERE asset_id = ?",
+                            (encoding.encode_address(txn["arcv"]), txn.get("xaid", 0)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index one app's projects and history into SQLite")
+    parser.add_argument("app_id", type=int)
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"SQLite database (default {DEFAULT_DB})")
+    parser.add_argument("--from-round", type=int, help="start a new database at this round instead of "
+                                                       "at the app's current state")
+    parser.add_argument("--once", action="store_true", help="catch up to the current round and exit")
+    parser.add_argument("--algod", help="algod address (default: the shared testnet node)")
+    parser.add_argument("--token", help="algod API token")
+    args = parser.parse_args(argv)
+
+    indexer = AppIndexer(get_algod_client(args.algod, args.token), args.app_id, connect(args.db))
+    if args.from_round is not None and indexer.checkpoint is None:
+        indexer.start_at(args.from_round)
+    if args.once:
+        print(f"App {args.app_id} indexed up to round {indexer.sync()}")
+        return 0
+    try:
+        indexer.follow(lambda before, reached: print(f"Applied rounds {(before or reached - 1) + 1}..{reached}"))
+    except KeyboardInterrupt:
+        print(f"\nStopped at round {indexer.checkpoint}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+"""
+asyncio variant of the shared client layer (algorand_client.py).
+
+Every operation is a coroutine over one aiohttp session, so independent work
+runs concurrently instead of one confirmation after another:
+
+    async with AsyncAlgodClient() as client:
+        approval, clear = await asyncio.gather(
+            compile_program(client, approval_teal), compile_program(client, clear_teal)
+        )
+        app_id = await create_app(client, private_key, approval, clear, global_schema, local_schema)
+        await asyncio.gather(*(opt_in_app(client, key, app_id) for key in contributor_keys))
+
+Confirmations are resolved by one AsyncConfirmationTracker per client, which
+follows new rounds like ConfirmationTracker does, so a hundred concurrent
+waits still cost one status call per block.
+"""
+
+import asyncio
+import base64
+import copy
+import time
+
+import aiohttp
+from algosdk import account, constants, encoding, error, transaction
+from algosdk.atomic_transaction_composer import AccountTransactionSigner
+from algosdk.logic import get_application_address
+from algosdk.v2client import algod
+
+import algorand_client
+import teal_assembler
+from algorand_client import (CACHE_SIZE, CONFIRMATION_ROUNDS, POOL_SIZE, ROUND_CHECK_INTERVAL, SUGGESTED_PARAMS_TTL,
+                              RoundCache)
+
+
+class AsyncAlgodClient:
+    """The subset of AlgodClient the scripts use, as coroutines"""
+
+    def __init__(self, algod_token=None, algod_address=None, headers=None, session=None,
+                 params_ttl=SUGGESTED_PARAMS_TTL, cache_size=CACHE_SIZE, round_check=ROUND_CHECK_INTERVAL):
+        self.algod_token = algorand_client.algod_token if algod_token is None else algod_token
+        self.algod_address = algod_address or algorand_client.algod_address
+        self.headers = headers
+        self.params_ttl = params_ttl
+        self.last_round = 0
+        self._session = session
+        self._owns_session = session is None
+        self._params = None
+        self._params_time = 0.0
+        self._params_round = 0
+        self._params_lock = asyncio.Lock()
+        self._tracker = None
+        self.cache = RoundCache(cache_size)
+        self.round_check = round_check
+        self._round_seen = 0.0
+        self._status_check = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._tracker is not None:
+            self._tracker.cancel()
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=POOL_SIZE))
+        return self._session
+
+    @property
+    def tracker(self):
+        if self._tracker is None:
+            self._tracker = AsyncConfirmationTracker(self)
+        return self._tracker
+
+    async def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+        if requrl not in constants.unversioned_paths:
+            requrl = algod.api_version_path_prefix + requrl
+        if params:
+            params = {key: str(value).lower() if isinstance(value, bool) else str(value) for key, value in params.items()}
+
+        async with self.session.request(method, self.algod_address + requrl, params=params, data=data,
+                                        headers=header) as resp:
+            body = await resp.read()
+            if resp.status >= 400:
+                message, data = body.decode(errors="replace"), None
+                try:
+                    payload = await resp.json(content_type=None)
+                    message, data = payload["message"], payload.get("data")
+                except (ValueError, KeyError, TypeError):
+                    pass
+                raise error.AlgodHTTPError(message, resp.status, data)
+            if response_format != "json":
+                return body
+            if not body:
+                return {}
+            return await resp.json(content_type=None)
+
+    async def suggested_params(self):
+        """Suggested params, served from cache until the TTL expires or a new round is seen"""
+        # Concurrent callers share one refresh instead of each fetching
+        async with self._params_lock:
+            fresh = time.monotonic() - self._params_time < self.params_ttl
+            if not fresh or self._params is None or self.last_round > self._params_round:
+                res = await self.algod_request("GET", "/transactions/params")
+                self._params = transaction.SuggestedParams(
+                    res["fee"], res["last-round"], res["last-round"] + 1000, res["genesis-hash"], res["genesis-id"],
+                    False, res["consensus-version"], res["min-fee"],
+                )
+                self._params_time = time.monotonic()
+                self.last_round = self._params_round = max(self.last_round, res["last-round"])
+        # Callers adjust fee fields in place, so each gets its own copy
+        return copy.copy(self._params)
+
+    async def status(self):
+        return self._observe(await self.algod_request("GET", "/status"))
+
+    async def status_after_block(self, block_num):
+        return self._observe(await self.algod_request("GET", f"/status/wait-for-block-after/{block_num}"))
+
+    def _observe(self, status):
+        self.last_round = max(self.last_round, status.get("last-round", 0))
+        self._round_seen = time.monotonic()
+        self.cache.advance(self.last_round)
+        return status
+
+    async def compile(self, source, source_map=False):
+        return await self.algod_request("POST", "/teal/compile", params={"sourcemap": source_map},
+                                        data=source.encode(), headers={"Content-Type": "application/x-binary"})
+
+    async def send_transactions(self, txns):
+        """Broadcast signed transactions; returns the first transaction id"""
+        return await self.send_raw_group(b"".join(base64.b64decode(encoding.msgpack_encode(txn)) for txn in txns))
+
+    async def send_raw_group(self, raw):
+        """Broadcast already-encoded signed transactions (e.g. from bulk_signer); returns the first transaction id"""
+        resp = await self.algod_request("POST", "/transactions", data=raw,
+                                        headers={"Content-Type": "application/x-binary"})
+        return resp["txId"]
+
+    async def send_transaction(self, txn):
+        return await self.send_transactions([txn])
+
+    async def pending_transaction_info(self, txid):
+        return await self.algod_request("GET", f"/transactions/pending/{txid}", params={"format": "json"})
+
+    async def get_block_txids(self, round_num):
+        return await self.algod_request("GET", f"/blocks/{round_num}/txids")
+
+    async def account_info(self, address, exclude=None):
+        return (await self.account_info_at(address, exclude))[1]
+
+    async def account_info_at(self, address, exclude=None):
+        """(round, account_info): the round is that of the cache entry the response came from"""
+        return await self._cached_read("account_info", (address, exclude), lambda: self.algod_request(
+            "GET", f"/accounts/{address}", params={"exclude": exclude} if exclude else None))
+
+    async def application_info(self, app_id):
+        return (await self.application_info_at(app_id))[1]
+
+    async def application_info_at(self, app_id):
+        """(round, application_info): the round is that of the cache entry the response came from"""
+        return await self._cached_read("application_info", app_id,
+                                       lambda: self.algod_request("GET", f"/applications/{app_id}"))
+
+    async def _cached_read(self, endpoint_name, key, fetch):
+        """(round, await fetch()), fetched once per round per key; concurrent callers of a key share one request"""
+        if time.monotonic() - self._round_seen >= self.round_check:
+            # Readers arriving together share one status request too
+            if self._status_check is None or self._status_check.done():
+                self._status_check = asyncio.ensure_future(self.status())
+            await asyncio.shield(self._status_check)
+        round_num = self.last_round
+        key = (endpoint_name, key, round_num)
+        state, found = self.cache.claim(key, asyncio.get_running_loop().create_future)
+        if state == RoundCache.HIT:
+            return round_num, found
+        if state == RoundCache.WAIT:
+            return round_num, await asyncio.shield(found)
+        try:
+            response = await fetch()
+        except Exception as e:
+            self.cache.complete(key, exc=e)
+            found.exception()  # retrieved here, so a read nobody joined is not reported as unhandled
+            raise
+        except BaseException:
+            self.cache.abandon(key)
+            raise
+        self.cache.complete(key, response)
+        return round_num, response
+
+
+class AsyncConfirmationTracker:
+    """
+    asyncio counterpart of ConfirmationTracker: one task follows the chain and
+    resolves the futures of every txid found in each new block.
+    """
+
+    def __init__(self, client, timeout=CONFIRMATION_ROUNDS):
+        self.client = client
+        self.timeout = timeout
+        self.last_round = 0
+        self._pending = {}
+        self._blocks = {}
+        self._task = None
+
+    def track(self, txid, timeout=None, details=False, first_round=None):
+        future = asyncio.get_running_loop().create_future()
+        timeout = timeout or self.timeout
+        # Where to start looking; the client's round may be stale, so the
+        # timeout is counted from a round the tracker sees (the last item)
+        first_round = first_round or self.client.last_round or self.last_round or None
+        self._pending.setdefault(txid, []).append([future, timeout, details, first_round, None])
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return future
+
+    async def wait(self, txids, timeout=None, details=False):
+        return await asyncio.gather(*(self.track(txid, timeout, details) for txid in txids))
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        try:
+            while self._pending:
+                await self._follow()
+        except Exception as e:
+            pending, self._pending = self._pending, {}
+            for items in pending.values():
+                for future, *_ in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _follow(self):
+        if self.last_round:
+            status = await self.client.status_after_block(self.last_round)
+        else:
+            status = await self.client.status()
+        current = status["last-round"]
+
+        for items in self._pending.values():
+            for item in items:
+                if item[3] is None:
+                    # The transaction may have been confirmed before tracking began
+                    item[3] = max(1, current - 1)
+                if item[4] is None:
+                    # A stale first_round widens the scan by at most timeout rounds and never shortens the wait
+                    item[3] = max(item[3], current - item[1])
+                    item[4] = current + item[1]
+        oldest = min(item[3] for items in self._pending.values() for item in items)
+        missing = [r for r in range(oldest, current + 1) if r not in self._blocks]
+        blocks = await asyncio.gather(*(self.client.get_block_txids(r) for r in missing))
+        for round_num, response in zip(missing, blocks):
+            self._blocks[round_num] = set(response.get("blockTxids") or [])
+
+        settled = []
+        for txid, items in list(self._pending.items()):
+            # Txids tracked while this round's blocks were being read wait for the next round
+            ready = [item for item in items if item[4] is not None]
+            if not ready:
+                continue
+            confirmed = next((r for r in range(min(item[3] for item in ready), current + 1)
+                              if txid in self._blocks[r]), None)
+            for item in ready:
+                future, timeout, details, first_round, expires = item
+                if confirmed is not None and confirmed >= first_round:
+                    settled.append(self._resolve(future, txid, confirmed, details))
+                elif current >= expires:
+                    settled.append(self._expire(future, txid, timeout, details))
+                else:
+                    continue
+                items.remove(item)
+            if not items:
+                del self._pending[txid]
+        await asyncio.gather(*settled)
+
+        oldest = min((item[3] for items in self._pending.values() for item in items if item[3] is not None),
+                     default=current + 1)
+        for round_num in [r for r in self._blocks if r < oldest]:
+            del self._blocks[round_num]
+        self.last_round = current
+
+    async def _resolve(self, future, txid, confirmed_round, details):
+        try:
+            info = await self.client.pending_transaction_info(txid) if details else \
+                {"txid": txid, "confirmed-round": confirmed_round}
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(info)
+
+    async def _expire(self, future, txid, timeout, details):
+        try:
+            info = await self.client.pending_transaction_info(txid)
+        except error.AlgodHTTPError:
+            info = {}
+        if info.get("confirmed-round", 0) > 0:
+            future.set_result(info if details else {"txid": txid, "confirmed-round": info["confirmed-round"]})
+        elif info.get("pool-error"):
+            future.set_exception(error.AlgodResponseError(f"Transaction {txid} rejected: {info['pool-error']}"))
+        else:
+            future.set_exception(error.ConfirmationTimeoutError(f"Transaction {txid} not confirmed after {timeout} rounds"))
+
+
+async def compile_program(client, source_code):
+    """Program bytes for TEAL source, assembled locally; algod only compiles versions the assembler lacks"""
+    try:
+        return teal_assembler.compile_cached(source_code)
+    except teal_assembler.UnsupportedVersionError:
+        compile_response = await client.compile(source_code)
+        return base64.b64decode(compile_response["result"])
+
+
+async def wait_for_confirmation(client, txid, timeout=CONFIRMATION_ROUNDS):
+    """Wait until txid is confirmed; raises if it is rejected or not confirmed within timeout rounds"""
+    txinfo = await client.tracker.track(txid, timeout, details=True)
+    print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round')}")
+    return txinfo
+
+
+async def wait_for_all(client, txids, timeout=CONFIRMATION_ROUNDS):
+    """Wait for many transactions together; returns {"txid", "confirmed-round"} per txid"""
+    return await client.tracker.wait(txids, timeout)
+
+
+async def send(client, private_key, txn):
+    """Sign, send and wait for a single transaction; returns its pending info"""
+    tx_id = await client.send_transactions(AccountTransactionSigner(private_key).sign_transactions([txn], [0]))
+    return await wait_for_confirmation(client, tx_id)
+
+
+async def send_group(client, private_key, txns):
+    """Group, sign, send and wait for transactions from one sender"""
+    transaction.assign_group_id(txns)
+    # Signed without the deprecated txn.sign, which warns on every call
+    tx_id = await client.send_transactions(AccountTransactionSigner(private_key).sign_transactions(txns, range(len(txns))))
+    await wait_for_confirmation(client, tx_id)
+    return tx_id
+
+
+async def create_app(client, private_key, approval_program, clear_program, global_schema, local_schema, app_args=None):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationCreateTxn(
+        sender=sender,
+        sp=await client.suggested_params(),
+        on_complete=transaction.OnComplete.NoOpOC.real,
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=global_schema,
+        local_schema=local_schema,
+        app_args=app_args or []
+    )
+    app_id = (await send(client, private_key, txn))["application-index"]
+    print(f"Created app with id: {app_id}")
+    return app_id
+
+
+async def call_app(client, private_key, app_id, app_args, **kwargs):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationNoOpTxn(
+        sender=sender,
+        sp=await client.suggested_params(),
+        index=app_id,
+        app_args=app_args,
+        **kwargs
+    )
+    txinfo = await send(client, private_key, txn)
+    print(f"App call confirmed in tx: {txn.get_txid()}")
+    return txinfo
+
+
+async def opt_in_app(client, private_key, app_id):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationOptInTxn(sender=sender, sp=await client.suggested_params(), index=app_id)
+    await send(client, private_key, txn)
+    print(f"Opted in to app: {txn.get_txid()}")
+    return txn.get_txid()
+
+
+async def send_payment(client, private_key, receiver, amount):
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.PaymentTxn(sender=sender, sp=await client.suggested_params(), receiver=receiver, amt=amount)
+    await send(client, private_key, txn)
+    print(f"Payment sent: {txn.get_txid()}")
+    return txn.get_txid()
+
+
+async def check_balance(client, address):
+    """Account balance in microAlgos, or 0 if it cannot be read"""
+    try:
+        return (await client.account_info(address, exclude="all")).get("amount", 0)
+    except error.AlgodHTTPError as e:
+        print(f"Error checking balance: {e}")
+        return 0
+
+
+def project_arg(project_id):
+    """Project ids go on the wire as 8-byte big-endian ints; bytes are passed through"""
+    return project_id if isinstance(project_id, bytes) else project_id.to_bytes(8, "big")
+
+
+async def contribute(client, private_key, app_id, project_id, amount):
+    """Payment to the app plus the "contribute" call, in one group"""
+    sender = account.address_from_private_key(private_key)
+    sp = await client.suggested_params()
+    pay_txn = transaction.PaymentTxn(sender=sender, sp=sp, receiver=get_application_address(app_id), amt=amount)
+    app_txn = transaction.ApplicationNoOpTxn(
+        sender=sender, sp=sp, index=app_id, app_args=[b"contribute", project_arg(project_id)]
+    )
+    tx_id = await send_group(client, private_key, [pay_txn, app_txn])
+    print(f"Contribution confirmed: {tx_id}")
+    return tx_id
+
+
+async def withdraw(client, private_key, app_id, project_id):
+    """Creator withdrawal; the app account pays its inner payment's fee"""
+    sp = await client.suggested_params()
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationNoOpTxn(sender=sender, sp=sp, index=app_id, app_args=[b"withdraw", project_arg(project_id)])
+    return await send(client, private_key, txn)
+
+
+async def mint_nft(client, private_key, app_id, project_id):
+    """Mint the caller's reward NFT; the app account pays its inner transactions' fees"""
+    sp = await client.suggested_params()
+    sender = account.address_from_private_key(private_key)
+    txn = transaction.ApplicationNoOpTxn(sender=sender, sp=sp, index=app_id, app_args=[b"mint_nft", project_arg(project_id)])
+    return await send(client, private_key, txn)
@@ -0,0 +1,2005 @@
+"""
+In-memory ledger and AVM evaluator behind the fake algod (fake_algod.py).
+
+Ledger holds accounts, applications, assets and boxes as plain dicts and
+applies transaction groups atomically: payments, asset configs and
+transfers, and application calls, whose approval and clear programs run on
+Evaluator against the same bytecode teal_assembler produces for the chain.
+
+    ledger = Ledger()
+    ledger.fund(address, 10_000_000)
+    records = ledger.apply_group([txn_fields(stxn.transaction) for stxn in signed])
+
+The rules our contracts depend on are enforced the way algod enforces them:
+minimum balances (accounts, asset holdings, opt-ins, created apps, boxes),
+fee pooling across a group and its inner transactions, the pooled 700 opcode
+budget per app call (op-up calls add to it), state schemas and key sizes,
+the v8 reference rules for accounts, assets, apps and boxes (including the
+box read quota), asset opt-ins, and up to 256 inner transactions per group.
+A rejected group raises TransactionRejected and leaves the ledger untouched.
+
+Not modelled: rewards, keyreg / asset freeze transactions, logic
+signatures, leases and the signature-verification opcodes.
+"""
+
+import base64
+import copy
+import hashlib
+
+from Cryptodome.Hash import SHA512, keccak
+from algosdk import encoding
+from algosdk.logic import get_application_address
+
+import teal_assembler
+from teal_cost import opcode_cost
+
+MIN_TXN_FEE = 1000
+MIN_BALANCE = 100000        # per account, and per asset holding
+APP_PAGE_MBR = 100000       # per created app, per program page
+APP_OPTIN_MBR = 100000
+SCHEMA_UINT_MBR = 28500
+SCHEMA_BYTES_MBR = 50000
+BOX_FLAT_MBR = 2500
+BOX_BYTE_MBR = 400
+MAX_TXN_LIFE = 1000
+MAX_GROUP_SIZE = 16
+APP_CALL_BUDGET = 700
+MAX_INNER_TXNS = 256
+MAX_INNER_DEPTH = 8
+MAX_STACK = 1000
+MAX_BYTES = 4096
+MAX_KEY_SIZE = 64
+MAX_KEY_VALUE_SIZE = 128
+MAX_BOX_SIZE = 32768
+BOX_REF_QUOTA = 1024        # box bytes readable per box reference in the group
+MAX_LOGS = 32
+MAX_LOG_SIZE = 1024
+MAX_APP_ARGS = 16
+MAX_APP_ARGS_SIZE = 2048
+MAX_FOREIGN_ACCOUNTS = 4
+MAX_REFERENCES = 8
+PROGRAM_PAGE_SIZE = 2048
+MAX_VERSION = 8
+
+ZERO_ADDRESS = bytes(32)
+UINT64 = 2 ** 64
+
+TYPE_ENUMS = {b"pay": 1, b"keyreg": 2, b"acfg": 3, b"axfer": 4, b"afrz": 5, b"appl": 6}
+TYPE_NAMES = {value: name for name, value in TYPE_ENUMS.items()}
+NOOP, OPT_IN, CLOSE_OUT, CLEAR_STATE, UPDATE, DELETE = range(6)
+
+# Transaction fields as msgpack keys -> TEAL field names (asset params sit under "apar")
+MSGPACK_FIELDS = {
+    "snd": "Sender", "fee": "Fee", "fv": "FirstValid", "lv": "LastValid", "note": "Note", "lx": "Lease",
+    "rekey": "RekeyTo", "type": "Type",
+    "rcv": "Receiver", "amt": "Amount", "close": "CloseRemainderTo",
+    "xaid": "XferAsset", "aamt": "AssetAmount", "asnd": "AssetSender", "arcv": "AssetReceiver",
+    "aclose": "AssetCloseTo",
+    "caid": "ConfigAsset",
+    "apid": "ApplicationID", "apan": "OnCompletion", "apaa": "ApplicationArgs", "apat": "Accounts",
+    "apas": "Assets", "apfa": "Applications", "apap": "ApprovalProgram", "apsu": "ClearStateProgram",
+    "apep": "ExtraProgramPages",
+}
+ASSET_PARAM_FIELDS = {
+    "t": "ConfigAssetTotal", "dc": "ConfigAssetDecimals", "df": "ConfigAssetDefaultFrozen",
+    "un": "ConfigAssetUnitName", "an": "ConfigAssetName", "au": "ConfigAssetURL",
+    "am": "ConfigAssetMetadataHash", "m": "ConfigAssetManager", "r": "ConfigAssetReserve",
+    "f": "ConfigAssetFreeze", "c": "ConfigAssetClawback",
+}
+SCHEMA_FIELDS = {"apgs": ("GlobalNumUint", "GlobalNumByteSlice"), "apls": ("LocalNumUint", "LocalNumByteSlice")}
+
+ADDRESS_FIELDS = {
+    "Sender", "Receiver", "CloseRemainderTo", "AssetSender", "AssetReceiver", "AssetCloseTo", "RekeyTo",
+    "ConfigAssetManager", "ConfigAssetReserve", "ConfigAssetFreeze", "ConfigAssetClawback", "FreezeAssetAccount",
+}
+BYTES_FIELDS = ADDRESS_FIELDS | {
+    "Note", "Lease", "VotePK", "SelectionPK", "Type", "TxID", "ApprovalProgram", "ClearStateProgram",
+    "ConfigAssetUnitName", "ConfigAssetName", "ConfigAssetURL", "ConfigAssetMetadataHash", "LastLog",
+    "StateProofPK",
+}
+ARRAY_FIELDS = {"ApplicationArgs", "Accounts", "Assets", "Applications", "Logs"}
+# Fields an app may set on an inner transaction
+INNER_FIELDS = (set(MSGPACK_FIELDS.values()) | set(ASSET_PARAM_FIELDS.values()) | {"TypeEnum"} |
+                {"GlobalNumUint", "GlobalNumByteSlice", "LocalNumUint", "LocalNumByteSlice"}) - {
+    "FirstValid", "LastValid", "Lease"}
+
+
+class TransactionRejected(Exception):
+    """A transaction (and with it its whole group) failed validation or evaluation"""
+
+
+class LogicEvalError(TransactionRejected):
+    def __init__(self, message, app_id, pc):
+        super().__init__(f"logic eval error: {message}. Details: app={app_id}, pc={pc}")
+        self.app_id = app_id
+        self.pc = pc
+
+
+def address(raw):
+    return encoding.encode_address(raw)
+
+
+_app_addresses = {}
+
+
+def app_address(app_id):
+    """Raw address of an app account"""
+    if app_id not in _app_addresses:
+        _app_addresses[app_id] = encoding.decode_address(get_application_address(app_id))
+    return _app_addresses[app_id]
+
+
+def txn_fields(txn):
+    """TEAL-named fields of an algosdk Transaction, the form the ledger applies"""
+    fields = {}
+    for key, value in txn.dictify().items():
+        if key == "apar":
+            for param, param_value in value.items():
+                fields[ASSET_PARAM_FIELDS[param]] = param_value
+        elif key in SCHEMA_FIELDS:
+            uints, byte_slices = SCHEMA_FIELDS[key]
+            fields[uints], fields[byte_slices] = value.get("nui", 0), value.get("nbs", 0)
+        elif key == "apbx":
+            fields["Boxes"] = [(box.get("i", 0), box.get("n", b"")) for box in value]
+        elif key == "grp":
+            fields["Group"] = value
+        elif key in MSGPACK_FIELDS:
+            fields[MSGPACK_FIELDS[key]] = value
+    for name, value in list(fields.items()):
+        if isinstance(value, str):
+            fields[name] = value.encode()
+    fields["TxID"] = base64.b32decode(txn.get_txid() + "====")
+    return fields
+
+
+def field_default(name):
+    if name in ADDRESS_FIELDS or name == "Lease":
+        return ZERO_ADDRESS
+    return b"" if name in BYTES_FIELDS else 0
+
+
+def new_account():
+    return {"amount": 0, "assets": {}, "local": {}, "apps": set(), "created_assets": set(),
+            "boxes": 0, "box_bytes": 0, "auth": None}
+
+
+_MISSING = object()
+
+
+def state_delta(before, after):
+    """Keys whose value changed between two states: key -> new value, or None when deleted"""
+    delta = {key: value for key, value in after.items() if before.get(key, _MISSING) != value}
+    delta.update((key, None) for key in before.keys() - after.keys())
+    return delta
+
+
+class GroupContext:
+    """State shared by every evaluation of one top-level group"""
+
+    def __init__(self, group, extra_budget=0):
+        self.group = group
+        app_calls = sum(1 for txn in group if txn.get("Type") == b"appl")
+        self.budget = APP_CALL_BUDGET * app_calls + extra_budget
+        self.fee_credit = sum(txn.get("Fee", 0) for txn in group) - MIN_TXN_FEE * len(group)
+        self.inner_count = 0
+        self.box_refs = set()
+        self.box_quota = 0
+        self.box_reads = {}
+        self.created_assets = set()
+        self.created_apps = set()
+        self.scratch = {}
+        for txn in group:
+            for index, name in txn.get("Boxes", []):
+                app_id = txn.get("ApplicationID", 0) if index == 0 else txn.get("Applications", [])[index - 1]
+                self.box_refs.add((app_id, name))
+                self.box_quota += BOX_REF_QUOTA
+
+
+class Ledger:
+    def __init__(self, round_num=0, timestamp=0):
+        self.accounts = {}    # address -> account dict (see new_account)
+        self.apps = {}        # app id -> params and global state
+        self.assets = {}      # asset id -> params
+        self.boxes = {}       # (app id, name) -> bytearray
+        self.round = round_num
+        self.timestamp = timestamp  # of the latest block, what LatestTimestamp returns
+        self.next_id = 1000
+        self.fee_sink = 0
+        self._undo = None
+
+    # Atomicity: the first write to an entry in a group saves its old value
+
+    def _touch(self, table, key):
+        if self._undo is not None and (id(table), key) not in self._undo:
+            value = table.get(key, _MISSING)
+            # (a deep copy of the sentinel would be a different object)
+            self._undo[(id(table), key)] = (table, key, value if value is _MISSING else copy.deepcopy(value))
+
+    def _begin(self):
+        self._undo = {}
+        self._saved = (self.next_id, self.fee_sink)
+
+    def _rollback(self):
+        for table, key, value in self._undo.values():
+            if value is _MISSING:
+                table.pop(key, None)
+            else:
+                table[key] = value
+        self.next_id, self.fee_sink = self._saved
+        self._undo = None
+
+    def _commit(self):
+        self._undo = None
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    # Accounts
+
+    def account(self, addr):
+        """Account dict for reading; unknown accounts read as empty"""
+        return self.accounts.get(addr) or new_account()
+
+    def _write(self, addr, touched=None):
+        self._touch(self.accounts, addr)
+        if touched is not None:
+            touched.add(addr)
+        return self.accounts.setdefault(addr, new_account())
+
+    def fund(self, addr, amount):
+        """Mint amount microAlgos into addr (outside of any transaction)"""
+        self._write(addr)["amount"] += amount
+
+    def min_balance(self, addr):
+        acct = self.account(addr)
+        total = MIN_BALANCE * (1 + len(acct["assets"]))
+        for app_id in acct["apps"]:
+            app = self.apps[app_id]
+            uints, byte_slices = app["global_schema"]
+            total += APP_PAGE_MBR * (1 + app["extra_pages"]) + SCHEMA_UINT_MBR * uints + SCHEMA_BYTES_MBR * byte_slices
+        for app_id in acct["local"]:
+            uints, byte_slices = self.apps[app_id]["local_schema"]
+            total += APP_OPTIN_MBR + SCHEMA_UINT_MBR * uints + SCHEMA_BYTES_MBR * byte_slices
+        return total + BOX_FLAT_MBR * acct["boxes"] + BOX_BYTE_MBR * acct["box_bytes"]
+
+    def _check_min_balances(self, touched):
+        for addr in touched:
+            acct = self.accounts.get(addr)
+            if acct is None:
+                continue
+            required = self.min_balance(addr)
+            # An account emptied of everything may sit at zero
+            if acct["amount"] < required and (acct["amount"] or required > MIN_BALANCE):
+                raise TransactionRejected(
+                    f"account {addr} balance {acct['amount']} below min {required} ({len(acct['assets'])} assets)")
+
+    def _debit(self, addr, amount, touched):
+        acct = self._write(addr, touched)
+        if acct["amount"] < amount:
+            raise TransactionRejected(
+                f"overspend (account {addr}, data {{amount: {acct['amount']}}}, tried to spend {amount})")
+        acct["amount"] -= amount
+
+    def _credit(self, addr, amount, touched):
+        self._write(addr, touched)["amount"] += amount
+
+    # Groups
+
+    def apply_group(self, group, extra_budget=0, rollback=False):
+        """
+        Apply a group of transactions (dicts from txn_fields) all or nothing.
+
+        Returns one record per transaction: its fields plus what happened
+        ("logs", "inner" records, created ids, "budget" consumed). With
+        rollback=True the group is evaluated and then undone, as simulate does.
+        """
+        if not 0 < len(group) <= MAX_GROUP_SIZE:
+            raise TransactionRejected(f"group size {len(group)} is not between 1 and {MAX_GROUP_SIZE}")
+        ctx = GroupContext(group, extra_budget)
+        if ctx.fee_credit < 0:
+            paid = sum(txn.get("Fee", 0) for txn in group)
+            raise TransactionRejected(f"txgroup had {paid} in fees, which is less than the minimum "
+                                      f"{len(group)} * {MIN_TXN_FEE}")
+        self._begin()
+        try:
+            records = []
+            for index, txn in enumerate(group):
+                txn["GroupIndex"] = index
+                self._check_valid(txn)
+                records.append(self._apply(ctx, group, index))
+        except Exception as e:
+            self._rollback()
+            # Which transaction of the group failed
+            e.group_index = len(records)
+            raise
+        if rollback:
+            self._rollback()
+        else:
+            self._commit()
+        return records
+
+    def _check_valid(self, txn):
+        round_num = self.round + 1
+        if not txn.get("FirstValid", 0) <= round_num <= txn.get("LastValid", 0):
+            raise TransactionRejected(f"txn dead: round {round_num} outside of "
+                                      f"{txn.get('FirstValid', 0)}--{txn.get('LastValid', 0)}")
+        if txn.get("Type") != b"appl":
+            return
+        args = txn.get("ApplicationArgs", [])
+        if len(args) > MAX_APP_ARGS or sum(map(len, args)) > MAX_APP_ARGS_SIZE:
+            raise TransactionRejected(f"tx.ApplicationArgs too long: at most {MAX_APP_ARGS} arguments "
+                                      f"of {MAX_APP_ARGS_SIZE} bytes in total")
+        if len(txn.get("Accounts", [])) > MAX_FOREIGN_ACCOUNTS:
+            raise TransactionRejected(f"tx.Accounts too long, max number of accounts is {MAX_FOREIGN_ACCOUNTS}")
+        references = sum(len(txn.get(name, [])) for name in ("Accounts", "Assets", "Applications", "Boxes"))
+        if references > MAX_REFERENCES:
+            raise TransactionRejected(f"tx references exceed MaxAppTotalTxnReferences = {MAX_REFERENCES}")
+
+    def _apply(self, ctx, group, index, caller_app=0, depth=0):
+        txn = group[index]
+        sender = address(txn["Sender"])
+        touched = set()
+        record = {"fields": txn, "logs": [], "inner": [], "asset-index": 0, "application-index": 0, "budget": 0,
+                  "global-delta": {}, "local-delta": {}}
+
+        rekey = txn.get("RekeyTo", ZERO_ADDRESS)
+        fee = txn.get("Fee", 0)
+        self._debit(sender, fee, touched)
+        self.fee_sink += fee
+
+        kind = txn.get("Type")
+        if kind == b"pay":
+            self._pay(txn, sender, touched)
+        elif kind == b"axfer":
+            self._asset_transfer(txn, sender, touched)
+        elif kind == b"acfg":
+            self._asset_config(ctx, txn, sender, record, touched)
+        elif kind == b"appl":
+            self._app_call(ctx, group, index, sender, record, touched, caller_app, depth)
+        else:
+            raise TransactionRejected(f"transaction type {kind!r} is not supported by the fake ledger")
+        if rekey != ZERO_ADDRESS:
+            self._write(sender, touched)["auth"] = None if rekey == txn["Sender"] else address(rekey)
+
+        self._check_min_balances(touched)
+        return record
+
+    def _pay(self, txn, sender, touched):
+        amount = txn.get("Amount", 0)
+        self._debit(sender, amount, touched)
+        self._credit(address(txn.get("Receiver", ZERO_ADDRESS)), amount, touched)
+        close_to = txn.get("CloseRemainderTo", ZERO_ADDRESS)
+        if close_to != ZERO_ADDRESS:
+            acct = self._write(sender, touched)
+            if acct["assets"] or acct["local"] or acct["apps"]:
+                raise TransactionRejected(f"cannot close account {sender}: it still holds assets or apps")
+            self._credit(address(close_to), acct["amount"], touched)
+            acct["amount"] = 0
+
+    def _asset_transfer(self, txn, sender, touched):
+        asset_id = txn.get("XferAsset", 0)
+        params = self.assets.get(asset_id)
+        if params is None:
+            raise TransactionRejected(f"asset {asset_id} does not exist or has been deleted")
+        receiver = address(txn.get("AssetReceiver", ZERO_ADDRESS))
+        amount = txn.get("AssetAmount", 0)
+        source = sender
+        if txn.get("AssetSender", ZERO_ADDRESS) != ZERO_ADDRESS:
+            if encoding.decode_address(sender) != params["clawback"]:
+                raise TransactionRejected(f"clawback not allowed: sender {sender} is not the clawback of {asset_id}")
+            source = address(txn["AssetSender"])
+
+        # A zero transfer to oneself is an opt-in
+        if source == receiver == sender and amount == 0 and asset_id not in self.account(sender)["assets"]:
+            self._write(sender, touched)["assets"][asset_id] = [0, params["default_frozen"]]
+            return
+
+        holding = self._holding(source, asset_id, touched)
+        if holding[0] < amount:
+            raise TransactionRejected(f"underflow on subtracting {amount} from sender amount {holding[0]} "
+                                      f"of asset {asset_id}")
+        holding[0] -= amount
+        self._holding(receiver, asset_id, touched, role="receiver")[0] += amount
+
+        close_to = txn.get("AssetCloseTo", ZERO_ADDRESS)
+        if close_to != ZERO_ADDRESS:
+            if source == address(params["creator"]):
+                raise TransactionRejected(f"cannot close asset {asset_id} out of its creator account")
+            self._holding(address(close_to), asset_id, touched, role="close-to")[0] += holding[0]
+            del self._write(source, touched)["assets"][asset_id]
+
+    def _holding(self, addr, asset_id, touched, role="sender"):
+        holding = self._write(addr, touched)["assets"].get(asset_id)
+        if holding is None:
+            raise TransactionRejected(f"{role} error: must optin, asset {asset_id} missing from {addr}")
+        return holding
+
+    def _asset_config(self, ctx, txn, sender, record, touched):
+        asset_id = txn.get("ConfigAsset", 0)
+        raw = txn["Sender"]
+        if asset_id == 0:
+            asset_id = self._new_id()
+            self._touch(self.assets, asset_id)
+            self.assets[asset_id] = {
+                "creator": raw,
+                "total": txn.get("ConfigAssetTotal", 0),
+                "decimals": txn.get("ConfigAssetDecimals", 0),
+                "default_frozen": int(bool(txn.get("ConfigAssetDefaultFrozen", 0))),
+                "unit_name": txn.get("ConfigAssetUnitName", b""),
+                "name": txn.get("ConfigAssetName", b""),
+                "url": txn.get("ConfigAssetURL", b""),
+                "metadata_hash": txn.get("ConfigAssetMetadataHash", b""),
+                "manager": txn.get("ConfigAssetManager", ZERO_ADDRESS),
+                "reserve": txn.get("ConfigAssetReserve", ZERO_ADDRESS),
+                "freeze": txn.get("ConfigAssetFreeze", ZERO_ADDRESS),
+                "clawback": txn.get("ConfigAssetClawback", ZERO_ADDRESS),
+            }
+            acct = self._write(sender, touched)
+            acct["created_assets"].add(asset_id)
+            acct["assets"][asset_id] = [txn.get("ConfigAssetTotal", 0), 0]
+            ctx.created_assets.add(asset_id)
+            record["asset-index"] = asset_id
+            txn["CreatedAssetID"] = asset_id
+            return
+
+        params = self.assets.get(asset_id)
+        if params is None:
+            raise TransactionRejected(f"asset {asset_id} does not exist or has been deleted")
+        if raw != params["manager"]:
+            raise TransactionRejected(f"this transaction should be issued by the manager. It is issued by {sender}")
+        self._touch(self.assets, asset_id)
+        creator = address(params["creator"])
+        if not any(name in txn for name in ("ConfigAssetManager", "ConfigAssetReserve", "ConfigAssetFreeze",
+                                            "ConfigAssetClawback")):
+            # No addresses at all destroys the asset, once the creator holds every unit
+            holding = self.account(creator)["assets"].get(asset_id, [0, 0])
+            if holding[0] != params["total"]:
+                raise TransactionRejected(f"cannot destroy asset {asset_id}: creator is holding only "
+                                          f"{holding[0]}/{params['total']}")
+            acct = self._write(creator, touched)
+            del acct["assets"][asset_id]
+            acct["created_assets"].discard(asset_id)
+            del self.assets[asset_id]
+            return
+        for name, key in (("ConfigAssetManager", "manager"), ("ConfigAssetReserve", "reserve"),
+                          ("ConfigAssetFreeze", "freeze"), ("ConfigAssetClawback", "clawback")):
+            params[key] = txn.get(name, ZERO_ADDRESS)
+
+    # Applications
+
+    def _app_call(self, ctx, group, index, sender, record, touched, caller_app, depth):
+        txn = group[index]
+        app_id = txn.get("ApplicationID", 0)
+        on_completion = txn.get("OnCompletion", NOOP)
+        if app_id == 0:
+            app_id = self._new_id()
+            extra_pages = txn.get("ExtraProgramPages", 0)
+            approval, clear = txn.get("ApprovalProgram", b""), txn.get("ClearStateProgram", b"")
+            if len(approval) + len(clear) > PROGRAM_PAGE_SIZE * (1 + extra_pages):
+                raise TransactionRejected(f"app programs too long. max total len {PROGRAM_PAGE_SIZE * (1 + extra_pages)} bytes")
+            self._touch(self.apps, app_id)
+            self.apps[app_id] = {
+                "creator": sender,
+                "approval": approval,
+                "clear": clear,
+                "global": {},
+                "global_schema": (txn.get("GlobalNumUint", 0), txn.get("GlobalNumByteSlice", 0)),
+                "local_schema": (txn.get("LocalNumUint", 0), txn.get("LocalNumByteSlice", 0)),
+                "extra_pages": extra_pages,
+            }
+            self._write(sender, touched)["apps"].add(app_id)
+            ctx.created_apps.add(app_id)
+            record["application-index"] = app_id
+            txn["CreatedApplicationID"] = app_id
+        app = self.apps.get(app_id)
+        if app is None:
+            raise TransactionRejected(f"application {app_id} does not exist")
+        if caller_app and app_id == caller_app:
+            raise TransactionRejected(f"attempt to re-enter {app_id}")
+        opted_in = app_id in self.account(sender)["local"]
+
+        if on_completion == CLEAR_STATE:
+            if not opted_in:
+                raise TransactionRejected(f"{sender} is not currently opted in to app {app_id}")
+            # The clear program cannot block leaving; its failures are discarded
+            saved_budget = ctx.budget
+            ctx.budget = APP_CALL_BUDGET
+            self._begin_nested()
+            try:
+                Evaluator(self, ctx, group, index, app_id, app["clear"], record, caller_app, depth).run()
+                self._end_nested(keep=True)
+            except TransactionRejected:
+                self._end_nested(keep=False)
+            ctx.budget = saved_budget
+            del self._write(sender, touched)["local"][app_id]
+            return
+
+        if on_completion == OPT_IN:
+            if opted_in:
+                raise TransactionRejected(f"account {sender} has already opted in to app {app_id}")
+            self._write(sender, touched)["local"][app_id] = {}
+        elif on_completion == CLOSE_OUT and not opted_in:
+            raise TransactionRejected(f"{sender} is not opted in to app {app_id}")
+
+        global_before = dict(app["global"])
+        evaluator = Evaluator(self, ctx, group, index, app_id, app["approval"], record, caller_app, depth)
+        if not evaluator.run():
+            raise TransactionRejected("transaction rejected by ApprovalProgram")
+        touched.add(address(app_address(app_id)))
+
+        if on_completion == CLOSE_OUT:
+            del self._write(sender, touched)["local"][app_id]
+        elif on_completion == UPDATE:
+            self._touch(self.apps, app_id)
+            app["approval"], app["clear"] = txn.get("ApprovalProgram", b""), txn.get("ClearStateProgram", b"")
+        elif on_completion == DELETE:
+            self._touch(self.apps, app_id)
+            del self.apps[app_id]
+            self._write(app["creator"], touched)["apps"].discard(app_id)
+            return
+        self._check_schema(app["global"], app["global_schema"])
+        record["global-delta"] = state_delta(global_before, app["global"])
+        record["local-delta"] = {addr: state_delta(before, self.account(addr)["local"].get(app_id, {}))
+                                 for addr, before in evaluator.local_before.items()}
+
+    def _check_schema(self, state, schema):
+        uints = sum(1 for value in state.values() if isinstance(value, int))
+        if uints > schema[0]:
+            raise TransactionRejected(f"store integer count {uints} exceeds schema integer count {schema[0]}")
+        if len(state) - uints > schema[1]:
+            raise TransactionRejected(f"store bytes count {len(state) - uints} exceeds schema bytes count {schema[1]}")
+
+    # The clear program's writes are kept or dropped on their own
+    def _begin_nested(self):
+        self._outer_undo = self._undo
+        self._undo = {}
+
+    def _end_nested(self, keep):
+        nested, self._undo = self._undo, self._outer_undo
+        if not keep:
+            for table, key, value in nested.values():
+                if value is _MISSING:
+                    table.pop(key, None)
+                else:
+                    table[key] = value
+            return
+        for undo_key, entry in nested.items():
+            self._undo.setdefault(undo_key, entry)
+
+    def apply_inner(self, ctx, group, caller_app, depth):
+        """Apply an inner group submitted by caller_app; returns its records"""
+        if depth >= MAX_INNER_DEPTH:
+            raise TransactionRejected(f"inner transaction depth exceeds {MAX_INNER_DEPTH}")
+        records = []
+        for index, txn in enumerate(group):
+            txn["GroupIndex"] = index
+            ctx.inner_count += 1
+            if ctx.inner_count > MAX_INNER_TXNS:
+                raise TransactionRejected(f"too many inner transactions {ctx.inner_count} > {MAX_INNER_TXNS}")
+            if "Fee" not in txn:
+                # Unset fees draw on the credit earlier transactions overpaid
+                txn["Fee"] = 0 if ctx.fee_credit >= MIN_TXN_FEE else MIN_TXN_FEE - max(ctx.fee_credit, 0)
+            ctx.fee_credit += txn["Fee"] - MIN_TXN_FEE
+            if ctx.fee_credit < 0:
+                raise TransactionRejected(f"fee too small {txn['Fee']} for inner transaction {index}")
+            if txn.get("Type") == b"appl":
+                # Inner app calls add their budget to the pool
+                ctx.budget += APP_CALL_BUDGET
+            records.append(self._apply(ctx, group, index, caller_app, depth + 1))
+        return records
+
+
+def _varuint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varuint")
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+OPS_BY_CODE = {opcode: (name, min_version, kinds) for name, (opcode, min_version, kinds) in teal_assembler.OPS.items()}
+_programs = {}
+
+
+def decode(program):
+    """(version, {pc: (name, immediates, next pc, cost)}) for program bytes; cached"""
+    if program in _programs:
+        return _programs[program]
+    if not program:
+        raise TransactionRejected("invalid program (empty)")
+    version, pc = _varuint(program, 0)
+    if not 1 <= version <= MAX_VERSION:
+        raise TransactionRejected(f"program version {version} is not supported")
+    instructions = {}
+    try:
+        while pc < len(program):
+            start = pc
+            if program[pc] not in OPS_BY_CODE:
+                raise ValueError(f"invalid opcode 0x{program[pc]:02x}")
+            name, min_version, kinds = OPS_BY_CODE[program[pc]]
+            if version < min_version:
+                raise ValueError(f"{name} opcode was introduced in v{min_version}")
+            pc += 1
+            immediates = []
+            for kind in kinds:
+                if kind in ("u8", "i8"):
+                    value = program[pc]
+                    immediates.append(value - 256 if kind == "i8" and value > 127 else value)
+                    pc += 1
+                elif kind == "label":
+                    immediates.append(pc + 2 + int.from_bytes(program[pc:pc + 2], "big", signed=True))
+                    pc += 2
+                elif kind == "labels":
+                    count = program[pc]
+                    offsets = [int.from_bytes(program[pc + 1 + 2 * i:pc + 3 + 2 * i], "big", signed=True)
+                               for i in range(count)]
+                    pc += 1 + 2 * count
+                    immediates.append([pc + offset for offset in offsets])
+                elif kind in ("varuint", "varuints", "bytes", "bytess"):
+                    count = 1
+                    if kind.endswith("s") and kind != "bytes":
+                        count, pc = _varuint(program, pc)
+                    values = []
+                    for _ in range(count):
+                        value, pc = _varuint(program, pc)
+                        if kind.startswith("bytes"):
+                            value, pc = bytes(program[pc:pc + value]), pc + value
+                        values.append(value)
+                    immediates.append(values if count != 1 or kind in ("varuints", "bytess") else values[0])
+                else:
+                    # A named field of an ENUMS table
+                    table = teal_assembler.ENUMS[kind]
+                    if program[pc] >= len(table):
+                        raise ValueError(f"invalid {kind} field {program[pc]}")
+                    immediates.append(table[program[pc]])
+                    pc += 1
+            if pc > len(program):
+                raise ValueError(f"{name} immediates run past the end of the program")
+            instructions[start] = (name, tuple(immediates), pc, opcode_cost(name))
+    except (ValueError, IndexError) as e:
+        raise TransactionRejected(f"invalid program: {e}") from None
+    _programs[program] = (version, instructions)
+    return version, instructions
+
+
+_HANDLERS = {}
+
+
+def _op(*names):
+    def register(fn):
+        for name in names:
+            _HANDLERS[name] = fn
+        return fn
+    return register
+
+
+class _Frame:
+    __slots__ = ("return_pc", "height", "args", "returns")
+
+    def __init__(self, return_pc, height):
+        self.return_pc = return_pc
+        self.height = height
+        self.args = None
+        self.returns = 0
+
+
+class Evaluator:
+    """Runs one approval or clear program for transaction group[index]"""
+
+    def __init__(self, ledger, ctx, group, index, app_id, program, record, caller_app=0, depth=0):
+        self.ledger = ledger
+        self.ctx = ctx
+        self.group = group
+        self.index = index
+        self.txn = group[index]
+        self.app_id = app_id
+        self.program = program
+        self.record = record
+        self.caller_app = caller_app
+        self.depth = depth
+        self.stack = []
+        self.scratch = [0] * 256
+        self.frames = []
+        self.intc = []
+        self.bytec = []
+        self.local_before = {}  # address -> its local state before the program first wrote it
+        self.building = None    # inner group being assembled
+        self.last_inner = []    # records of the last submitted inner group
+        self.pc = 0
+        self.op_name = None
+        self.next_pc = 0
+
+    def fail(self, message):
+        raise LogicEvalError(message, self.app_id, self.pc)
+
+    def run(self):
+        """Evaluate the program; True when it approves"""
+        version, instructions = decode(self.program)
+        self.version = version
+        _, self.pc = _varuint(self.program, 0)
+        end = len(self.program)
+        ctx = self.ctx
+        consumed = 0
+        try:
+            while self.pc != end:
+                instruction = instructions.get(self.pc)
+                if instruction is None:
+                    self.fail(f"branch target {self.pc} is not a valid instruction")
+                name, immediates, next_pc, cost = instruction
+                ctx.budget -= cost
+                consumed += cost
+                if ctx.budget < 0:
+                    self.fail(f"dynamic cost budget exceeded, executing {name}")
+                self.op_name, self.next_pc = name, next_pc
+                jump = _HANDLERS.get(name, _unsupported)(self, immediates)
+                if jump is _DONE:
+                    break
+                self.pc = next_pc if jump is None else jump
+                if len(self.stack) > MAX_STACK:
+                    self.fail(f"stack overflow: {len(self.stack)} > {MAX_STACK}")
+        finally:
+            self.record["budget"] += consumed
+        if len(self.stack) != 1:
+            self.fail(f"stack len is {len(self.stack)} instead of 1")
+        result = self.stack[0]
+        if not isinstance(result, int):
+            self.fail("stack finished with bytes not int")
+        if self.depth == 0:
+            ctx.scratch[self.index] = self.scratch
+        return result != 0
+
+    # Stack helpers
+
+    def pop(self):
+        if not self.stack:
+            self.fail("stack underflow")
+        return self.stack.pop()
+
+    def pop_int(self, name="op"):
+        value = self.pop()
+        if not isinstance(value, int):
+            self.fail(f"{name} arg wanted uint64 but got []byte")
+        return value
+
+    def pop_bytes(self, name="op"):
+        value = self.pop()
+        if not isinstance(value, bytes):
+            self.fail(f"{name} arg wanted []byte but got uint64")
+        return value
+
+    def push_int(self, value, name="op"):
+        if value < 0:
+            self.fail(f"{name} would result negative")
+        if value >= UINT64:
+            self.fail(f"{name} overflowed")
+        self.stack.append(value)
+
+    def push_bytes(self, value, name="op"):
+        if len(value) > MAX_BYTES:
+            self.fail(f"{name} produced a too big ({len(value)}) byte-array")
+        self.stack.append(bytes(value))
+
+    def peek(self, depth):
+        if depth >= len(self.stack):
+            self.fail("stack underflow")
+        return len(self.stack) - 1 - depth
+
+    # Transaction and global fields
+
+    def txn_field(self, txn, field, array_index=None):
+        if field in ARRAY_FIELDS:
+            values = txn.get(field, [])
+            if field == "Accounts":
+                values = [txn["Sender"]] + values
+            elif field == "Applications":
+                values = [txn.get("ApplicationID", 0)] + values
+            if array_index is None:
+                self.fail(f"{field} needs an array index")
+            if array_index >= len(values):
+                self.fail(f"invalid {field} index {array_index}")
+            return values[array_index]
+        if array_index is not None:
+            self.fail(f"{field} is not an array field")
+        if field == "TypeEnum":
+            return TYPE_ENUMS.get(txn.get("Type"), 0)
+        if field.startswith("Num"):
+            counted = {"NumAppArgs": "ApplicationArgs", "NumApprovalProgramPages": None,
+                       "NumClearStateProgramPages": None}.get(field, field[3:])
+            if counted is None:
+                program = txn.get("ApprovalProgram" if "Approval" in field else "ClearStateProgram", b"")
+                return -(-len(program) // 4096)
+            return len(txn.get(counted, []))
+        if field == "LastLog":
+            return (txn.get("Logs") or [b""])[-1]
+        if field in ("ApprovalProgramPages", "ClearStateProgramPages", "FirstValidTime", "StateProofPK",
+                     "Nonparticipation", "VotePK", "SelectionPK", "VoteFirst", "VoteLast", "VoteKeyDilution"):
+            self.fail(f"txn field {field} is not supported by the fake ledger")
+        return txn.get(field, field_default(field))
+
+    def global_field(self, field):
+        ledger = self.ledger
+        if field == "MinTxnFee":
+            return MIN_TXN_FEE
+        if field == "MinBalance":
+            return MIN_BALANCE
+        if field == "MaxTxnLife":
+            return MAX_TXN_LIFE
+        if field == "ZeroAddress":
+            return ZERO_ADDRESS
+        if field == "GroupSize":
+            return len(self.group)
+        if field == "LogicSigVersion":
+            return MAX_VERSION
+        if field == "Round":
+            return ledger.round + 1
+        if field == "LatestTimestamp":
+            return ledger.timestamp
+        if field == "CurrentApplicationID":
+            return self.app_id
+        if field == "CreatorAddress":
+            return encoding.decode_address(ledger.apps[self.app_id]["creator"])
+        if field == "CurrentApplicationAddress":
+            return app_address(self.app_id)
+        if field == "GroupID":
+            return self.txn.get("Group", ZERO_ADDRESS)
+        if field == "OpcodeBudget":
+            return self.ctx.budget
+        if field == "CallerApplicationID":
+            return self.caller_app
+        if field == "CallerApplicationAddress":
+            return app_address(self.caller_app) if self.caller_app else ZERO_ADDRESS
+        self.fail(f"global field {field} is not supported")
+
+    # References (v8 rules: only what the transaction names is available)
+
+    def account_ref(self, value):
+        """Address string of an account reference (an Accounts index or an address)"""
+        txn = self.txn
+        if isinstance(value, int):
+            accounts = [txn["Sender"]] + txn.get("Accounts", [])
+            if value >= len(accounts):
+                self.fail(f"invalid Account reference {value}")
+            return address(accounts[value])
+        if len(value) != 32:
+            self.fail(f"invalid Account reference {value.hex()}")
+        if (value == txn["Sender"] or value in txn.get("Accounts", []) or value == app_address(self.app_id)
+                or any(value == app_address(app_id) for app_id in txn.get("Applications", []))):
+            return address(value)
+        self.fail(f"invalid Account reference {address(value)}")
+
+    def asset_ref(self, value):
+        assets = self.txn.get("Assets", [])
+        if value in assets or value in self.ctx.created_assets:
+            return value
+        if value < len(assets):
+            return assets[value]
+        self.fail(f"invalid Asset reference {value}")
+
+    def app_ref(self, value):
+        apps = self.txn.get("Applications", [])
+        if value == 0:
+            return self.app_id
+        if value == self.app_id or value in apps or value in self.ctx.created_apps:
+            return value
+        if value <= len(apps):
+            return apps[value - 1]
+        self.fail(f"invalid App reference {value}")
+
+    def box_ref(self, name):
+        if not 1 <= len(name) <= MAX_KEY_SIZE:
+            self.fail(f"box names must be 1 to {MAX_KEY_SIZE} bytes, got {len(name)}")
+        key = (self.app_id, name)
+        # Boxes of an app created in this group are referenced with app id 0
+        if key not in self.ctx.box_refs and not (
+                self.app_id in self.ctx.created_apps and (0, name) in self.ctx.box_refs):
+            self.fail(f"invalid Box reference {name!r}")
+        if key not in self.ctx.box_reads:
+            self.ctx.box_reads[key] = len(self.ledger.boxes.get(key, b""))
+            if sum(self.ctx.box_reads.values()) > self.ctx.box_quota:
+                self.fail(f"box read budget ({self.ctx.box_quota}) exceeded")
+        return key
+
+    def local_state(self, addr, app_id, write=False):
+        ledger = self.ledger
+        local = ledger.account(addr)["local"].get(app_id)
+        if local is None:
+            self.fail(f"{addr} has not opted in to app {app_id}")
+        if write:
+            local = ledger._write(addr)["local"][app_id]
+            self.local_before.setdefault(addr, dict(local))
+        return local
+
+    def check_state_sizes(self, key, value):
+        if len(key) > MAX_KEY_SIZE:
+            self.fail(f"key too long: length was {len(key)}, maximum is {MAX_KEY_SIZE}")
+        if isinstance(value, bytes) and len(key) + len(value) > MAX_KEY_VALUE_SIZE:
+            self.fail(f"value too long for key 0x{key.hex()}: length was {len(value)}")
+
+
+_DONE = object()
+
+
+def _unsupported(ev, immediates):
+    ev.fail(f"{ev.op_name} is not supported by the fake ledger")
+
+
+# Arithmetic and logic
+
+def _binary(name, fn, check=None):
+    def handler(ev, immediates):
+        b = ev.pop_int(name)
+        a = ev.pop_int(name)
+        if check and not check(a, b):
+            ev.fail(f"{name} {'0' if b == 0 else 'invalid operand'}")
+        ev.push_int(fn(a, b), name)
+    _HANDLERS[name] = handler
+
+
+_binary("+", lambda a, b: a + b)
+_binary("-", lambda a, b: a - b)
+_binary("*", lambda a, b: a * b)
+_binary("/", lambda a, b: a // b, lambda a, b: b != 0)
+_binary("%", lambda a, b: a % b, lambda a, b: b != 0)
+_binary("<", lambda a, b: int(a < b))
+_binary(">", lambda a, b: int(a > b))
+_binary("<=", lambda a, b: int(a <= b))
+_binary(">=", lambda a, b: int(a >= b))
+_binary("&&", lambda a, b: int(bool(a and b)))
+_binary("||", lambda a, b: int(bool(a or b)))
+_binary("|", lambda a, b: a | b)
+_binary("&", lambda a, b: a & b)
+_binary("^", lambda a, b: a ^ b)
+_binary("shl", lambda a, b: (a << b) % UINT64, lambda a, b: b < 64)
+_binary("shr", lambda a, b: a >> b, lambda a, b: b < 64)
+_binary("exp", lambda a, b: a ** b, lambda a, b: a or b)
+
+
+@_op("==", "!=")
+def _equal(ev, immediates):
+    b, a = ev.pop(), ev.pop()
+    if type(a) is not type(b):
+        ev.fail(f"cannot compare ({type(a).__name__} to {type(b).__name__})")
+    ev.stack.append(int((a == b) == (ev.op_name == "==")))
+
+
+@_op("!")
+def _not(ev, immediates):
+    ev.stack.append(int(ev.pop_int("!") == 0))
+
+
+@_op("~")
+def _bitnot(ev, immediates):
+    ev.stack.append(ev.pop_int("~") ^ (UINT64 - 1))
+
+
+@_op("len")
+def _len(ev, immediates):
+    ev.stack.append(len(ev.pop_bytes("len")))
+
+
+@_op("itob")
+def _itob(ev, immediates):
+    ev.stack.append(ev.pop_int("itob").to_bytes(8, "big"))
+
+
+@_op("btoi")
+def _btoi(ev, immediates):
+    value = ev.pop_bytes("btoi")
+    if len(value) > 8:
+        ev.fail(f"btoi arg too long, got [{len(value)}]bytes")
+    ev.stack.append(int.from_bytes(value, "big"))
+
+
+@_op("mulw")
+def _mulw(ev, immediates):
+    b, a = ev.pop_int("mulw"), ev.pop_int("mulw")
+    ev.stack += [(a * b) >> 64, (a * b) % UINT64]
+
+
+@_op("addw")
+def _addw(ev, immediates):
+    b, a = ev.pop_int("addw"), ev.pop_int("addw")
+    ev.stack += [(a + b) >> 64, (a + b) % UINT64]
+
+
+@_op("divmodw")
+def _divmodw(ev, immediates):
+    b_lo, b_hi, a_lo, a_hi = (ev.pop_int("divmodw") for _ in range(4))
+    b = (b_hi << 64) | b_lo
+    if b == 0:
+        ev.fail("divmodw 0")
+    q, r = divmod((a_hi << 64) | a_lo, b)
+    ev.stack += [q >> 64, q % UINT64, r >> 64, r % UINT64]
+
+
+@_op("divw")
+def _divw(ev, immediates):
+    b, a_lo, a_hi = ev.pop_int("divw"), ev.pop_int("divw"), ev.pop_int("divw")
+    if b == 0:
+        ev.fail("divw 0")
+    ev.push_int(((a_hi << 64) | a_lo) // b, "divw")
+
+
+@_op("expw")
+def _expw(ev, immediates):
+    b, a = ev.pop_int("expw"), ev.pop_int("expw")
+    if a == 0 and b == 0:
+        ev.fail("expw 0^0")
+    result = a ** b
+    if result >= UINT64 * UINT64:
+        ev.fail("expw overflowed")
+    ev.stack += [result >> 64, result % UINT64]
+
+
+@_op("sqrt")
+def _sqrt(ev, immediates):
+    import math
+    ev.stack.append(math.isqrt(ev.pop_int("sqrt")))
+
+
+@_op("bitlen")
+def _bitlen(ev, immediates):
+    value = ev.pop()
+    ev.stack.append((value if isinstance(value, int) else int.from_bytes(value, "big")).bit_length())
+
+
+# Byte arrays
+
+@_op("concat")
+def _concat(ev, immediates):
+    b, a = ev.pop_bytes("concat"), ev.pop_bytes("concat")
+    ev.push_bytes(a + b, "concat")
+
+
+def _slice(ev, value, start, end, name):
+    if start > end:
+        ev.fail(f"{name} end ({end}) is before start ({start})")
+    if end > len(value):
+        ev.fail(f"{name} end {end} is beyond length {len(value)}")
+    return value[start:end]
+
+
+@_op("substring")
+def _substring(ev, immediates):
+    start, end = immediates
+    ev.stack.append(_slice(ev, ev.pop_bytes("substring"), start, end, "substring"))
+
+
+@_op("substring3")
+def _substring3(ev, immediates):
+    end, start = ev.pop_int("substring3"), ev.pop_int("substring3")
+    ev.stack.append(_slice(ev, ev.pop_bytes("substring3"), start, end, "substring3"))
+
+
+@_op("extract")
+def _extract(ev, immediates):
+    start, length = immediates
+    value = ev.pop_bytes("extract")
+    if length == 0:
+        if start > len(value):
+            ev.fail(f"extraction start {start} is beyond length: {len(value)}")
+        ev.stack.append(value[start:])
+        return
+    ev.stack.append(_slice(ev, value, start, start + length, "extraction"))
+
+
+@_op("extract3")
+def _extract3(ev, immediates):
+    length, start = ev.pop_int("extract3"), ev.pop_int("extract3")
+    ev.stack.append(_slice(ev, ev.pop_bytes("extract3"), start, start + length, "extraction"))
+
+
+def _extract_uint(size):
+    def handler(ev, immediates):
+        start = ev.pop_int("extract_uint")
+        value = ev.pop_bytes("extract_uint")
+        ev.stack.append(int.from_bytes(_slice(ev, value, start, start + size, "extraction"), "big"))
+    return handler
+
+
+_HANDLERS["extract_uint16"] = _extract_uint(2)
+_HANDLERS["extract_uint32"] = _extract_uint(4)
+_HANDLERS["extract_uint64"] = _extract_uint(8)
+
+
+def _replace(ev, value, start, replacement):
+    if start + len(replacement) > len(value):
+        ev.fail(f"replacement end {start + len(replacement)} beyond original length: {len(value)}")
+    ev.stack.append(value[:start] + replacement + value[start + len(replacement):])
+
+
+@_op("replace2")
+def _replace2(ev, immediates):
+    replacement = ev.pop_bytes("replace2")
+    _replace(ev, ev.pop_bytes("replace2"), immediates[0], replacement)
+
+
+@_op("replace3")
+def _replace3(ev, immediates):
+    replacement, start = ev.pop_bytes("replace3"), ev.pop_int("replace3")
+    _replace(ev, ev.pop_bytes("replace3"), start, replacement)
+
+
+@_op("getbyte")
+def _getbyte(ev, immediates):
+    index, value = ev.pop_int("getbyte"), ev.pop_bytes("getbyte")
+    if index >= len(value):
+        ev.fail(f"getbyte index {index} beyond length {len(value)}")
+    ev.stack.append(value[index])
+
+
+@_op("setbyte")
+def _setbyte(ev, immediates):
+    byte, index, value = ev.pop_int("setbyte"), ev.pop_int("setbyte"), ev.pop_bytes("setbyte")
+    if index >= len(value):
+        ev.fail(f"setbyte index {index} beyond length {len(value)}")
+    if byte > 255:
+        ev.fail(f"setbyte value {byte} > 255")
+    ev.stack.append(value[:index] + bytes([byte]) + value[index + 1:])
+
+
+@_op("getbit")
+def _getbit(ev, immediates):
+    index, value = ev.pop_int("getbit"), ev.pop()
+    if isinstance(value, int):
+        if index >= 64:
+            ev.fail(f"getbit index {index} beyond 64 bits")
+        ev.stack.append((value >> index) & 1)
+        return
+    if index >= 8 * len(value):
+        ev.fail(f"getbit index {index} beyond length {len(value)}")
+    ev.stack.append((value[index // 8] >> (7 - index % 8)) & 1)
+
+
+@_op("setbit")
+def _setbit(ev, immediates):
+    bit, index, value = ev.pop_int("setbit"), ev.pop_int("setbit"), ev.pop()
+    if bit > 1:
+        ev.fail("setbit value > 1")
+    if isinstance(value, int):
+        if index >= 64:
+            ev.fail(f"setbit index {index} beyond 64 bits")
+        ev.stack.append(value | (1 << index) if bit else value & ~(1 << index))
+        return
+    if index >= 8 * len(value):
+        ev.fail(f"setbit index {index} beyond length {len(value)}")
+    data = bytearray(value)
+    mask = 1 << (7 - index % 8)
+    data[index // 8] = data[index // 8] | mask if bit else data[index // 8] & ~mask
+    ev.stack.append(bytes(data))
+
+
+@_op("sha256")
+def _sha256(ev, immediates):
+    ev.stack.append(hashlib.sha256(ev.pop_bytes("sha256")).digest())
+
+
+@_op("sha512_256")
+def _sha512_256(ev, immediates):
+    ev.stack.append(SHA512.new(ev.pop_bytes("sha512_256"), truncate="256").digest())
+
+
+@_op("keccak256")
+def _keccak256(ev, immediates):
+    ev.stack.append(keccak.new(data=ev.pop_bytes("keccak256"), digest_bits=256).digest())
+
+
+@_op("sha3_256")
+def _sha3_256(ev, immediates):
+    ev.stack.append(hashlib.sha3_256(ev.pop_bytes("sha3_256")).digest())
+
+
+@_op("base64_decode")
+def _base64_decode(ev, immediates):
+    value = ev.pop_bytes("base64_decode")
+    value += b"=" * (-len(value) % 4)
+    try:
+        if immediates[0] == "URLEncoding":
+            ev.stack.append(base64.urlsafe_b64decode(value))
+        else:
+            ev.stack.append(base64.b64decode(value, validate=True))
+    except ValueError as e:
+        ev.fail(f"base64_decode: {e}")
+
+
+@_op("bzero")
+def _bzero(ev, immediates):
+    ev.push_bytes(bytes(ev.pop_int("bzero")), "bzero")
+
+
+# Byte-array math: big-endian unsigned numbers of up to 64 bytes
+
+def _bytes_math(name, fn, compare=False, check=None):
+    def handler(ev, immediates):
+        b, a = ev.pop_bytes(name), ev.pop_bytes(name)
+        if len(a) > 64 or len(b) > 64:
+            ev.fail(f"{name} arg too long")
+        x, y = int.from_bytes(a, "big"), int.from_bytes(b, "big")
+        if check and not check(x, y):
+            ev.fail(f"{name} {'0' if y == 0 else 'would result negative'}")
+        result = fn(x, y)
+        if compare:
+            ev.stack.append(int(result))
+        else:
+            ev.stack.append(result.to_bytes((result.bit_length() + 7) // 8, "big"))
+    _HANDLERS[name] = handler
+
+
+_bytes_math("b+", lambda x, y: x + y)
+_bytes_math("b-", lambda x, y: x - y, check=lambda x, y: x >= y)
+_bytes_math("b*", lambda x, y: x * y)
+_bytes_math("b/", lambda x, y: x // y, check=lambda x, y: y != 0)
+_bytes_math("b%", lambda x, y: x % y, check=lambda x, y: y != 0)
+_bytes_math("b<", lambda x, y: x < y, compare=True)
+_bytes_math("b>", lambda x, y: x > y, compare=True)
+_bytes_math("b<=", lambda x, y: x <= y, compare=True)
+_bytes_math("b>=", lambda x, y: x >= y, compare=True)
+_bytes_math("b==", lambda x, y: x == y, compare=True)
+_bytes_math("b!=", lambda x, y: x != y, compare=True)
+
+
+def _bytes_bitwise(name, fn):
+    def handler(ev, immediates):
+        b, a = ev.pop_bytes(name), ev.pop_bytes(name)
+        size = max(len(a), len(b))
+        a, b = a.rjust(size, b"\0"), b.rjust(size, b"\0")
+        ev.stack.append(bytes(fn(x, y) for x, y in zip(a, b)))
+    _HANDLERS[name] = handler
+
+
+_bytes_bitwise("b|", lambda x, y: x | y)
+_bytes_bitwise("b&", lambda x, y: x & y)
+_bytes_bitwise("b^", lambda x, y: x ^ y)
+
+
+@_op("b~")
+def _bytes_invert(ev, immediates):
+    ev.stack.append(bytes(255 - x for x in ev.pop_bytes("b~")))
+
+
+@_op("bsqrt")
+def _bsqrt(ev, immediates):
+    import math
+    result = math.isqrt(int.from_bytes(ev.pop_bytes("bsqrt"), "big"))
+    ev.stack.append(result.to_bytes((result.bit_length() + 7) // 8, "big"))
+
+
+# Constants
+
+@_op("intcblock")
+def _intcblock(ev, immediates):
+    ev.intc = immediates[0]
+
+
+@_op("bytecblock")
+def _bytecblock(ev, immediates):
+    ev.bytec = immediates[0]
+
+
+def _constant(kind, fixed=None):
+    def handler(ev, immediates):
+        index = fixed if fixed is not None else immediates[0]
+        block = ev.intc if kind == "intc" else ev.bytec
+        if index >= len(block):
+            ev.fail(f"{kind} {index} beyond {len(block)} constants")
+        ev.stack.append(block[index])
+    return handler
+
+
+_HANDLERS["intc"] = _constant("intc")
+_HANDLERS["bytec"] = _constant("bytec")
+for _i in range(4):
+    _HANDLERS[f"intc_{_i}"] = _constant("intc", _i)
+    _HANDLERS[f"bytec_{_i}"] = _constant("bytec", _i)
+
+
+@_op("pushint", "pushbytes")
+def _push(ev, immediates):
+    ev.stack.append(immediates[0])
+
+
+@_op("pushints", "pushbytess")
+def _pushn(ev, immediates):
+    ev.stack += immediates[0]
+
+
+# Stack manipulation
+
+@_op("pop")
+def _pop(ev, immediates):
+    ev.pop()
+
+
+@_op("dup")
+def _dup(ev, immediates):
+    ev.stack.append(ev.stack[ev.peek(0)])
+
+
+@_op("dup2")
+def _dup2(ev, immediates):
+    ev.stack += ev.stack[ev.peek(1):]
+
+
+@_op("dig")
+def _dig(ev, immediates):
+    ev.stack.append(ev.stack[ev.peek(immediates[0])])
+
+
+@_op("swap")
+def _swap(ev, immediates):
+    ev.peek(1)
+    ev.stack[-1], ev.stack[-2] = ev.stack[-2], ev.stack[-1]
+
+
+@_op("select")
+def _select(ev, immediates):
+    condition, b, a = ev.pop_int("select"), ev.pop(), ev.pop()
+    ev.stack.append(b if condition else a)
+
+
+@_op("cover")
+def _cover(ev, immediates):
+    position = ev.peek(immediates[0])
+    ev.stack.insert(position, ev.stack.pop())
+
+
+@_op("uncover")
+def _uncover(ev, immediates):
+    ev.stack.append(ev.stack.pop(ev.peek(immediates[0])))
+
+
+@_op("bury")
+def _bury(ev, immediates):
+    position = ev.peek(immediates[0])
+    if immediates[0] == 0:
+        ev.fail("bury 0 is not allowed")
+    ev.stack[position] = ev.stack.pop()
+
+
+@_op("popn")
+def _popn(ev, immediates):
+    if immediates[0]:
+        ev.peek(immediates[0] - 1)
+        del ev.stack[-immediates[0]:]
+
+
+@_op("dupn")
+def _dupn(ev, immediates):
+    ev.stack += [ev.stack[ev.peek(0)]] * immediates[0]
+
+
+# Flow control
+
+@_op("err")
+def _err(ev, immediates):
+    ev.fail("err opcode executed")
+
+
+@_op("bnz")
+def _bnz(ev, immediates):
+    if ev.pop_int("bnz"):
+        return immediates[0]
+
+
+@_op("bz")
+def _bz(ev, immediates):
+    if not ev.pop_int("bz"):
+        return immediates[0]
+
+
+@_op("b")
+def _b(ev, immediates):
+    return immediates[0]
+
+
+@_op("return")
+def _return(ev, immediates):
+    ev.stack = [ev.pop()]
+    return _DONE
+
+
+@_op("assert")
+def _assert(ev, immediates):
+    if not ev.pop_int("assert"):
+        ev.fail("assert failed")
+
+
+@_op("callsub")
+def _callsub(ev, immediates):
+    if len(ev.frames) >= 1024:
+        ev.fail("callsub stack overflow")
+    ev.frames.append(_Frame(ev.next_pc, len(ev.stack)))
+    return immediates[0]
+
+
+@_op("retsub")
+def _retsub(ev, immediates):
+    if not ev.frames:
+        ev.fail("retsub with empty callstack")
+    frame = ev.frames.pop()
+    if frame.args is not None:
+        if len(ev.stack) < frame.height + frame.returns:
+            ev.fail(f"retsub executed with stack below frame. Final stack height: {len(ev.stack)}")
+        # The return values are the first R slots of the frame, not the top of the stack
+        returns = ev.stack[frame.height:frame.height + frame.returns]
+        del ev.stack[frame.height - frame.args:]
+        ev.stack += returns
+    return frame.return_pc
+
+
+@_op("proto")
+def _proto(ev, immediates):
+    if not ev.frames:
+        ev.fail("proto with empty callstack")
+    frame = ev.frames[-1]
+    frame.args, frame.returns = immediates
+    if frame.height < frame.args:
+        ev.fail(f"callsub to proto that requires {frame.args} args with stack height {frame.height}")
+
+
+def _frame_position(ev, offset, name):
+    frame = next((frame for frame in reversed(ev.frames) if frame.args is not None), None)
+    if frame is None:
+        ev.fail(f"{name} with empty callstack")
+    position = frame.height + offset
+    if offset < 0 and -offset > frame.args:
+        ev.fail(f"{name} {offset} in sub with {frame.args} args")
+    if position >= len(ev.stack):
+        ev.fail(f"{name} above stack")
+    return position
+
+
+@_op("frame_dig")
+def _frame_dig(ev, immediates):
+    ev.stack.append(ev.stack[_frame_position(ev, immediates[0], "frame_dig")])
+
+
+@_op("frame_bury")
+def _frame_bury(ev, immediates):
+    value = ev.pop()
+    ev.stack[_frame_position(ev, immediates[0], "frame_bury")] = value
+
+
+@_op("switch")
+def _switch(ev, immediates):
+    index = ev.pop_int("switch")
+    if index < len(immediates[0]):
+        return immediates[0][index]
+
+
+@_op("match")
+def _match(ev, immediates):
+    targets = immediates[0]
+    value = ev.pop()
+    if len(ev.stack) < len(targets):
+        ev.fail("match stack underflow")
+    cases = ev.stack[len(ev.stack) - len(targets):]
+    del ev.stack[len(ev.stack) - len(targets):]
+    for case, target in zip(cases, targets):
+        if type(case) is type(value) and case == value:
+            return target
+
+
+# Scratch space
+
+@_op("load")
+def _load(ev, immediates):
+    ev.stack.append(ev.scratch[immediates[0]])
+
+
+@_op("store")
+def _store(ev, immediates):
+    ev.scratch[immediates[0]] = ev.pop()
+
+
+@_op("loads")
+def _loads(ev, immediates):
+    slot = ev.pop_int("loads")
+    if slot > 255:
+        ev.fail(f"invalid scratch space position {slot}")
+    ev.stack.append(ev.scratch[slot])
+
+
+@_op("stores")
+def _stores(ev, immediates):
+    value, slot = ev.pop(), ev.pop_int("stores")
+    if slot > 255:
+        ev.fail(f"invalid scratch space position {slot}")
+    ev.scratch[slot] = value
+
+
+def _group_scratch(ev, index, slot):
+    if index >= ev.index:
+        ev.fail(f"gload can't get future scratch space from txn with index {index}")
+    scratch = ev.ctx.scratch.get(index)
+    if scratch is None:
+        ev.fail(f"gload can't get scratch space from non-app call txn {index}")
+    if slot > 255:
+        ev.fail(f"invalid scratch space position {slot}")
+    return scratch[slot]
+
+
+@_op("gload")
+def _gload(ev, immediates):
+    ev.stack.append(_group_scratch(ev, immediates[0], immediates[1]))
+
+
+@_op("gloads")
+def _gloads(ev, immediates):
+    ev.stack.append(_group_scratch(ev, ev.pop_int("gloads"), immediates[0]))
+
+
+@_op("gloadss")
+def _gloadss(ev, immediates):
+    slot, index = ev.pop_int("gloadss"), ev.pop_int("gloadss")
+    ev.stack.append(_group_scratch(ev, index, slot))
+
+
+def _group_created_id(ev, index):
+    if index >= ev.index:
+        ev.fail(f"gaid can't get creatable ID of txn ahead of the current one (index {index})")
+    txn = ev.group[index]
+    created = txn.get("CreatedAssetID") or txn.get("CreatedApplicationID")
+    if not created:
+        ev.fail(f"gaid: txn {index} did not create an asset or app")
+    return created
+
+
+@_op("gaid")
+def _gaid(ev, immediates):
+    ev.stack.append(_group_created_id(ev, immediates[0]))
+
+
+@_op("gaids")
+def _gaids(ev, immediates):
+    ev.stack.append(_group_created_id(ev, ev.pop_int("gaids")))
+
+
+# Transaction fields
+
+def _group_txn(ev, index):
+    if index >= len(ev.group):
+        ev.fail(f"gtxn lookup TxnGroup[{index}] but it only has {len(ev.group)}")
+    return ev.group[index]
+
+
+@_op("txn")
+def _txn(ev, immediates):
+    ev.stack.append(ev.txn_field(ev.txn, immediates[0]))
+
+
+@_op("txna")
+def _txna(ev, immediates):
+    ev.stack.append(ev.txn_field(ev.txn, immediates[0], immediates[1]))
+
+
+@_op("txnas")
+def _txnas(ev, immediates):
+    ev.stack.append(ev.txn_field(ev.txn, immediates[0], ev.pop_int("txnas")))
+
+
+@_op("gtxn")
+def _gtxn(ev, immediates):
+    ev.stack.append(ev.txn_field(_group_txn(ev, immediates[0]), immediates[1]))
+
+
+@_op("gtxna")
+def _gtxna(ev, immediates):
+    ev.stack.append(ev.txn_field(_group_txn(ev, immediates[0]), immediates[1], immediates[2]))
+
+
+@_op("gtxnas")
+def _gtxnas(ev, immediates):
+    ev.stack.append(ev.txn_field(_group_txn(ev, immediates[0]), immediates[1], ev.pop_int("gtxnas")))
+
+
+@_op("gtxns")
+def _gtxns(ev, immediates):
+    ev.stack.append(ev.txn_field(_group_txn(ev, ev.pop_int("gtxns")), immediates[0]))
+
+
+@_op("gtxnsa")
+def _gtxnsa(ev, immediates):
+    ev.stack.append(ev.txn_field(_group_txn(ev, ev.pop_int("gtxnsa")), immediates[0], immediates[1]))
+
+
+@_op("gtxnsas")
+def _gtxnsas(ev, immediates):
+    array_index = ev.pop_int("gtxnsas")
+    ev.stack.append(ev.txn_field(_group_txn(ev, ev.pop_int("gtxnsas")), immediates[0], array_index))
+
+
+@_op("global")
+def _global(ev, immediates):
+    ev.stack.append(ev.global_field(immediates[0]))
+
+
+# Accounts, state and assets
+
+@_op("balance")
+def _balance(ev, immediates):
+    ev.stack.append(ev.ledger.account(ev.account_ref(ev.pop())).get("amount", 0))
+
+
+@_op("min_balance")
+def _min_balance(ev, immediates):
+    ev.stack.append(ev.ledger.min_balance(ev.account_ref(ev.pop())))
+
+
+@_op("app_opted_in")
+def _app_opted_in(ev, immediates):
+    app_id = ev.app_ref(ev.pop_int("app_opted_in"))
+    ev.stack.append(int(app_id in ev.ledger.account(ev.account_ref(ev.pop()))["local"]))
+
+
+@_op("app_local_get")
+def _app_local_get(ev, immediates):
+    key = ev.pop_bytes("app_local_get")
+    ev.stack.append(ev.local_state(ev.account_ref(ev.pop()), ev.app_id).get(key, 0))
+
+
+@_op("app_local_get_ex")
+def _app_local_get_ex(ev, immediates):
+    key, app_id = ev.pop_bytes("app_local_get_ex"), ev.app_ref(ev.pop_int("app_local_get_ex"))
+    local = ev.ledger.account(ev.account_ref(ev.pop()))["local"].get(app_id, {})
+    ev.stack += [local.get(key, 0), int(key in local)]
+
+
+@_op("app_global_get")
+def _app_global_get(ev, immediates):
+    ev.stack.append(ev.ledger.apps[ev.app_id]["global"].get(ev.pop_bytes("app_global_get"), 0))
+
+
+@_op("app_global_get_ex")
+def _app_global_get_ex(ev, immediates):
+    key, app_id = ev.pop_bytes("app_global_get_ex"), ev.app_ref(ev.pop_int("app_global_get_ex"))
+    state = ev.ledger.apps.get(app_id, {}).get("global", {})
+    ev.stack += [state.get(key, 0), int(key in state)]
+
+
+@_op("app_local_put")
+def _app_local_put(ev, immediates):
+    value, key = ev.pop(), ev.pop_bytes("app_local_put")
+    addr = ev.account_ref(ev.pop())
+    ev.check_state_sizes(key, value)
+    local = ev.local_state(addr, ev.app_id, write=True)
+    local[key] = value
+    try:
+        ev.ledger._check_schema(local, ev.ledger.apps[ev.app_id]["local_schema"])
+    except TransactionRejected as e:
+        ev.fail(str(e))
+
+
+@_op("app_global_put")
+def _app_global_put(ev, immediates):
+    value, key = ev.pop(), ev.pop_bytes("app_global_put")
+    ev.check_state_sizes(key, value)
+    ev.ledger._touch(ev.ledger.apps, ev.app_id)
+    ev.ledger.apps[ev.app_id]["global"][key] = value
+
+
+@_op("app_local_del")
+def _app_local_del(ev, immediates):
+    key = ev.pop_bytes("app_local_del")
+    ev.local_state(ev.account_ref(ev.pop()), ev.app_id, write=True).pop(key, None)
+
+
+@_op("app_global_del")
+def _app_global_del(ev, immediates):
+    ev.ledger._touch(ev.ledger.apps, ev.app_id)
+    ev.ledger.apps[ev.app_id]["global"].pop(ev.pop_bytes("app_global_del"), None)
+
+
+@_op("asset_holding_get")
+def _asset_holding_get(ev, immediates):
+    asset_id = ev.asset_ref(ev.pop_int("asset_holding_get"))
+    holding = ev.ledger.account(ev.account_ref(ev.pop()))["assets"].get(asset_id)
+    if holding is None:
+        ev.stack += [0, 0]
+    else:
+        ev.stack += [holding[0] if immediates[0] == "AssetBalance" else holding[1], 1]
+
+
+_ASSET_PARAMS = {
+    "AssetTotal": "total", "AssetDecimals": "decimals", "AssetDefaultFrozen": "default_frozen",
+    "AssetUnitName": "unit_name", "AssetName": "name", "AssetURL": "url", "AssetMetadataHash": "metadata_hash",
+    "AssetManager": "manager", "AssetReserve": "reserve", "AssetFreeze": "freeze", "AssetClawback": "clawback",
+    "AssetCreator": "creator",
+}
+
+
+@_op("asset_params_get")
+def _asset_params_get(ev, immediates):
+    params = ev.ledger.assets.get(ev.asset_ref(ev.pop_int("asset_params_get")))
+    if params is None:
+        ev.stack += [0, 0]
+    else:
+        ev.stack += [params[_ASSET_PARAMS[immediates[0]]], 1]
+
+
+@_op("app_params_get")
+def _app_params_get(ev, immediates):
+    app_id = ev.app_ref(ev.pop_int("app_params_get"))
+    app = ev.ledger.apps.get(app_id)
+    if app is None:
+        ev.stack += [0, 0]
+        return
+    value = {
+        "AppApprovalProgram": app["approval"], "AppClearStateProgram": app["clear"],
+        "AppGlobalNumUint": app["global_schema"][0], "AppGlobalNumByteSlice": app["global_schema"][1],
+        "AppLocalNumUint": app["local_schema"][0], "AppLocalNumByteSlice": app["local_schema"][1],
+        "AppExtraProgramPages": app["extra_pages"], "AppCreator": encoding.decode_address(app["creator"]),
+        "AppAddress": app_address(app_id),
+    }[immediates[0]]
+    ev.stack += [value, 1]
+
+
+@_op("acct_params_get")
+def _acct_params_get(ev, immediates):
+    addr = ev.account_ref(ev.pop())
+    ledger = ev.ledger
+    acct = ledger.account(addr)
+    field = immediates[0]
+    if field == "AcctBalance":
+        value = acct["amount"]
+    elif field == "AcctMinBalance":
+        value = ledger.min_balance(addr)
+    elif field == "AcctAuthAddr":
+        value = encoding.decode_address(acct["auth"]) if acct["auth"] else ZERO_ADDRESS
+    elif field == "AcctTotalAppsCreated":
+        value = len(acct["apps"])
+    elif field == "AcctTotalAppsOptedIn":
+        value = len(acct["local"])
+    elif field == "AcctTotalAssetsCreated":
+        value = len(acct["created_assets"])
+    elif field == "AcctTotalAssets":
+        value = len(acct["assets"])
+    elif field == "AcctTotalBoxes":
+        value = acct["boxes"]
+    elif field == "AcctTotalBoxBytes":
+        value = acct["box_bytes"]
+    elif field == "AcctTotalExtraAppPages":
+        value = sum(ledger.apps[app_id]["extra_pages"] for app_id in acct["apps"])
+    else:
+        value = sum(ledger.apps[app_id]["local_schema"][field == "AcctTotalNumByteSlice"] for app_id in acct["local"])
+        value += sum(ledger.apps[app_id]["global_schema"][field == "AcctTotalNumByteSlice"] for app_id in acct["apps"])
+    ev.stack += [value, int(addr in ledger.accounts)]
+
+
+@_op("log")
+def _log(ev, immediates):
+    value = ev.pop_bytes("log")
+    logs = ev.record["logs"]
+    if len(logs) >= MAX_LOGS:
+        ev.fail(f"too many log calls in program. up to {MAX_LOGS} is allowed")
+    if sum(map(len, logs)) + len(value) > MAX_LOG_SIZE:
+        ev.fail(f"program logs too large. {sum(map(len, logs)) + len(value)} bytes >  {MAX_LOG_SIZE} bytes limit")
+    logs.append(value)
+    ev.txn.setdefault("Logs", []).append(value)
+
+
+# Inner transactions
+
+def _new_inner(ev):
+    return {"Sender": app_address(ev.app_id), "FirstValid": ev.txn.get("FirstValid", 0),
+            "LastValid": ev.txn.get("LastValid", 0)}
+
+
+@_op("itxn_begin")
+def _itxn_begin(ev, immediates):
+    if ev.building is not None:
+        ev.fail("itxn_begin without itxn_submit")
+    ev.building = [_new_inner(ev)]
+
+
+@_op("itxn_next")
+def _itxn_next(ev, immediates):
+    if ev.building is None:
+        ev.fail("itxn_next without itxn_begin")
+    ev.building.append(_new_inner(ev))
+
+
+@_op("itxn_field")
+def _itxn_field(ev, immediates):
+    field = immediates[0]
+    if ev.building is None:
+        ev.fail("itxn_field without itxn_begin")
+    if field not in INNER_FIELDS:
+        ev.fail(f"{field} is not allowed in itxn_field")
+    value = ev.pop()
+    txn = ev.building[-1]
+    if field == "TypeEnum":
+        if value not in TYPE_NAMES:
+            ev.fail(f"{value} is not a valid transaction type")
+        field, value = "Type", TYPE_NAMES[value]
+    if field == "Type" and value not in TYPE_ENUMS:
+        ev.fail(f"{value!r} is not a valid transaction type")
+    wanted = bytes if field in BYTES_FIELDS or field == "ApplicationArgs" else int
+    if not isinstance(value, wanted):
+        ev.fail(f"itxn_field {field} wanted {'[]byte' if wanted is bytes else 'uint64'}")
+    if field in ADDRESS_FIELDS or field == "Accounts":
+        if len(value) != 32:
+            ev.fail(f"itxn_field {field} wanted an address, got {len(value)} bytes")
+    if field == "Sender" and value != app_address(ev.app_id):
+        ev.fail(f"unauthorized sender {address(value)}")
+    if field in ("XferAsset", "ConfigAsset") and value:
+        value = ev.asset_ref(value)
+    elif field == "ApplicationID" and value:
+        value = ev.app_ref(value)
+    if field in ARRAY_FIELDS:
+        txn.setdefault(field, []).append(value)
+    else:
+        txn[field] = value
+
+
+@_op("itxn_submit")
+def _itxn_submit(ev, immediates):
+    if ev.building is None:
+        ev.fail("itxn_submit without itxn_begin")
+    group, ev.building = ev.building, None
+    for txn in group:
+        if "Type" not in txn:
+            ev.fail("itxn_submit of a transaction without a type")
+        txn["TxID"] = encoding.checksum(ev.txn["TxID"] + len(ev.record["inner"]).to_bytes(2, "big"))
+    try:
+        records = ev.ledger.apply_inner(ev.ctx, group, ev.app_id, ev.depth)
+    except LogicEvalError:
+        raise
+    except TransactionRejected as e:
+        ev.fail(f"inner tx {len(ev.record['inner'])} failed: {e}")
+    ev.record["inner"] += records
+    ev.record["budget"] += sum(record["budget"] for record in records)
+    ev.last_inner = group
+
+
+def _inner_txn(ev, index=None):
+    if not ev.last_inner:
+        ev.fail("no inner transaction available")
+    if index is None:
+        return ev.last_inner[-1]
+    if index >= len(ev.last_inner):
+        ev.fail(f"gitxn {index} beyond the last inner group of {len(ev.last_inner)}")
+    return ev.last_inner[index]
+
+
+@_op("itxn")
+def _itxn(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev), immediates[0]))
+
+
+@_op("itxna")
+def _itxna(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev), immediates[0], immediates[1]))
+
+
+@_op("itxnas")
+def _itxnas(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev), immediates[0], ev.pop_int("itxnas")))
+
+
+@_op("gitxn")
+def _gitxn(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev, immediates[0]), immediates[1]))
+
+
+@_op("gitxna")
+def _gitxna(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev, immediates[0]), immediates[1], immediates[2]))
+
+
+@_op("gitxnas")
+def _gitxnas(ev, immediates):
+    ev.stack.append(ev.txn_field(_inner_txn(ev, immediates[0]), immediates[1], ev.pop_int("gitxnas")))
+
+
+# Boxes: the app account pays their minimum balance
+
+def _box_resize(ev, key, size):
+    """Create (size >= 0) or delete (size None) the box key and adjust the app account"""
+    ledger = ev.ledger
+    acct = ledger._write(address(app_address(ev.app_id)))
+    ledger._touch(ledger.boxes, key)
+    if size is None:
+        acct["boxes"] -= 1
+        acct["box_bytes"] -= len(key[1]) + len(ledger.boxes.pop(key))
+        return
+    ledger.boxes[key] = bytearray(size)
+    acct["boxes"] += 1
+    acct["box_bytes"] += len(key[1]) + size
+
+
+def _box(ev, key):
+    value = ev.ledger.boxes.get(key)
+    if value is None:
+        ev.fail(f"no such box {key[1]!r}")
+    return value
+
+
+@_op("box_create")
+def _box_create(ev, immediates):
+    size, name = ev.pop_int("box_create"), ev.pop_bytes("box_create")
+    key = ev.box_ref(name)
+    if size > MAX_BOX_SIZE:
+        ev.fail(f"box size too large: {size}, max is {MAX_BOX_SIZE}")
+    existing = ev.ledger.boxes.get(key)
+    if existing is not None:
+        if len(existing) != size:
+            ev.fail(f"box size mismatch {len(existing)} {size}")
+        ev.stack.append(0)
+        return
+    ev.ctx.box_reads[key] = size
+    if sum(ev.ctx.box_reads.values()) > ev.ctx.box_quota:
+        ev.fail(f"box write budget ({ev.ctx.box_quota}) exceeded")
+    _box_resize(ev, key, size)
+    ev.stack.append(1)
+
+
+@_op("box_extract")
+def _box_extract(ev, immediates):
+    length, start, name = ev.pop_int("box_extract"), ev.pop_int("box_extract"), ev.pop_bytes("box_extract")
+    value = _box(ev, ev.box_ref(name))
+    if start + length > len(value):
+        ev.fail(f"extraction end {start + length} is beyond length: {len(value)}")
+    ev.push_bytes(value[start:start + length], "box_extract")
+
+
+@_op("box_replace")
+def _box_replace(ev, immediates):
+    replacement, start, name = ev.pop_bytes("box_replace"), ev.pop_int("box_replace"), ev.pop_bytes("box_replace")
+    key = ev.box_ref(name)
+    value = _box(ev, key)
+    if start + len(replacement) > len(value):
+        ev.fail(f"replacement end {start + len(replacement)} beyond original length: {len(value)}")
+    ev.ledger._touch(ev.ledger.boxes, key)
+    value[start:start + len(replacement)] = replacement
+
+
+@_op("box_del")
+def _box_del(ev, immediates):
+    key = ev.box_ref(ev.pop_bytes("box_del"))
+    if key not in ev.ledger.boxes:
+        ev.stack.append(0)
+        return
+    _box_resize(ev, key, None)
+    ev.stack.append(1)
+
+
+@_op("box_len")
+def _box_len(ev, immediates):
+    value = ev.ledger.boxes.get(ev.box_ref(ev.pop_bytes("box_len")))
+    ev.stack += [0, 0] if value is None else [len(value), 1]
+
+
+@_op("box_get")
+def _box_get(ev, immediates):
+    value = ev.ledger.boxes.get(ev.box_ref(ev.pop_bytes("box_get")))
+    if value is None:
+        ev.stack += [b"", 0]
+    else:
+        ev.push_bytes(value, "box_get")
+        ev.stack.append(1)
+
+
+@_op("box_put")
+def _box_put(ev, immediates):
+    value, name = ev.pop_bytes("box_put"), ev.pop_bytes("box_put")
+    key = ev.box_ref(name)
+    existing = ev.ledger.boxes.get(key)
+    if existing is None:
+        ev.ctx.box_reads[key] = len(value)
+        _box_resize(ev, key, len(value))
+    elif len(existing) != len(value):
+        ev.fail(f"box_put wrong size {len(existing)} != {len(value)}")
+    ev.ledger._touch(ev.ledger.boxes, key)
+    ev.ledger.boxes[key][:] = value
+
+
+@_op("arg", "arg_0", "arg_1", "arg_2", "arg_3", "args")
+def _logicsig_only(ev, immediates):
+    ev.fail("arguments are only available to logic signatures")
@@ -0,0 +1,72 @@
+"""
+Batched contributions for the ABI contract.
+
+A backer funding several projects sends one atomic group instead of one
+payment + app call group per project: up to 15 payments to the app account,
+followed by a single contribute_many call whose project_ids[i] tags payment i.
+
+    app = CrowdfundingClient(client, private_key, app_id)
+    contribute_many(app, [(0, 1_000_000), (3, 2_000_000), (3, 500_000)])
+"""
+
+import math
+
+from algosdk import transaction
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer, TransactionWithSigner
+
+from project_layout import APP_CALL_BUDGET, CONTRIBUTION_BUDGET, MAX_BATCH, MAX_BOX_REFERENCES
+
+
+def box_references(app, project_ids):
+    """Boxes a batch references: each project, the sender's ledger box for it
+    and the totals box of every distinct category"""
+    projects = set(project_ids)
+    categories = {app.project(project_id)["category"] for project_id in projects}
+    return 2 * len(projects) + len(categories)
+
+
+def opup_calls(count):
+    """Op-up inner calls the contract may issue to credit count payments"""
+    return math.ceil(CONTRIBUTION_BUDGET * (count + 1) / APP_CALL_BUDGET)
+
+
+def build_contribute_many_group(app, contributions):
+    """
+    Compose the group for a list of (project_id, amount) contributions.
+
+    Returns the AtomicTransactionComposer, ready to execute.
+    """
+    if not 0 < len(contributions) <= MAX_BATCH:
+        raise ValueError(f"a batch holds between 1 and {MAX_BATCH} contributions, got {len(contributions)}")
+
+    project_ids = [project_id for project_id, _ in contributions]
+    if box_references(app, project_ids) > MAX_BOX_REFERENCES:
+        raise ValueError(f"a batch can reference at most {MAX_BOX_REFERENCES} boxes; split it with chunked()")
+
+    sp = app.suggested_params()
+    atc = AtomicTransactionComposer()
+    for _, amount in contributions:
+        payment = transaction.PaymentTxn(sender=app.sender, sp=sp, receiver=app.app_address, amt=amount)
+        atc.add_transaction(TransactionWithSigner(payment, app.signer))
+
+    return app.call("contribute_many", project_ids, atc=atc, inner_txns=opup_calls(len(contributions)))
+
+
+def contribute_many(app, contributions):
+    """Send the batched contribution group and wait for it to confirm"""
+    result = build_contribute_many_group(app, contributions).execute(app.client, 4)
+    print(f"Credited {len(contributions)} contributions in round {result.confirmed_round}")
+    return result.tx_ids
+
+
+def chunked(app, contributions, size=MAX_BATCH):
+    """Split a long list of contributions into batches that fit in one group"""
+    batch = []
+    for project_id, amount in contributions:
+        project_ids = [pid for pid, _ in batch] + [project_id]
+        if len(batch) == size or box_references(app, project_ids) > MAX_BOX_REFERENCES:
+            yield batch
+            batch = []
+        batch.append((project_id, amount))
+    if batch:
+        yield batch
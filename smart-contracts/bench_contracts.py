@@ -0,0 +1,537 @@
+"""
+Throughput, opcode cost and confirmation latency of every contract variant.
+
+    python bench_contracts.py                      # all variants, compared with the baseline
+    python bench_contracts.py crowdfunding --samples 8
+    python bench_contracts.py --update             # accept the results as the new baseline
+
+Each variant is deployed on a fresh in-process FakeAlgod (fake_algod.py).
+It is then driven through create_project, contribute, withdraw, refund and
+mint_nft, called the way its deploy script calls it. Every call is first run
+through simulate, which gives the opcode budget its app calls consume and
+the reason for any rejection. The call is then sent and followed to
+confirmation through the shared tracker. Per operation the report gives:
+
+    cost       mean / max opcode budget consumed per call
+    tps        transactions confirmed per second of send-to-confirm time
+    p50..p99   send-to-confirmation latency in milliseconds
+    rejected   calls the contract or the ledger refused
+
+Operations a variant does not implement are left out, and so are those its
+contract can never complete (listed with the reason). A run in which every
+call of an operation is rejected fails, and is never written as a baseline.
+
+bench_baseline.json keeps the accepted results. Opcode costs and rejection
+counts are deterministic, so any change to them is reported, and the run
+exits 1 if something got worse. Throughput depends on the machine, so it is
+only flagged when it drops by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from algosdk import account, transaction
+from algosdk.atomic_transaction_composer import (AccountTransactionSigner, AtomicTransactionComposer,
+                                               TransactionWithSigner)
+from algosdk.logic import get_application_address
+from algosdk.v2client.models import SimulateRequest, SimulateRequestTransactionGroup
+
+import build
+from algorand_client import compile_program, get_tracker
+from fake_algod import FakeAlgod, FakeAlgodClient
+from project_layout import (ACCOUNT_MIN_BALANCE, ASSET_MBR, GLOBAL_UINTS, LEDGER_BOX_MBR, category_box_mbr,
+                            project_box_mbr, project_box_name)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+OPERATIONS = ("create_project", "contribute", "withdraw", "refund", "mint_nft")
+
+NAME, DESC, CATEGORY = "Bench project", "Benchmark project", "Tech"
+CONTRIBUTION = 10_000_000   # the simple variants only reward backers of 10 ALGO or more
+THRESHOLD = 1_000_000
+UNREACHABLE = 10 ** 15      # target of the project that fails, so its backers can refund
+DURATION = 3600
+# The contract creates the reward asset and sends it in the same call, so the
+# backer cannot have opted in to it
+MINT_AND_SEND = "mint_nft sends the new asset before the backer can opt in to it"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0..100)"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class Variant:
+    """
+    A contract driven with raw app calls: the method name as the first
+    argument, project ids as 8-byte big-endian ints. Subclasses describe
+    how their contract differs.
+    """
+
+    module = None
+    operations = OPERATIONS
+    global_schema = transaction.StateSchema(0, 0)
+    local_schema = transaction.StateSchema(0, 0)
+    max_projects = None         # bounded by the global schema when projects live in global state
+    create_method = b"create_project"
+    create_threshold = True     # whether create takes the reward threshold as its last argument
+    create_args = None          # app args the app itself has to be created with
+    unsupported = {}            # operations the contract can never complete, with the reason
+
+    def __init__(self, node, client, creator_key):
+        self.node = node
+        self.client = client
+        self.creator_key = creator_key
+        self.creator = account.address_from_private_key(creator_key)
+        self.app_id = None
+
+    @property
+    def name(self):
+        return self.module
+
+    @property
+    def app_address(self):
+        return get_application_address(self.app_id)
+
+    @property
+    def opt_in(self):
+        return bool(self.local_schema.num_uints or self.local_schema.num_byte_slices)
+
+    def programs(self):
+        suffix = build.output_suffix(self.module)
+        compiled = []
+        for kind in ("approval", "clear"):
+            with open(os.path.join(HERE, f"{kind}{suffix}.teal")) as f:
+                compiled.append(compile_program(self.client, f.read()))
+        return compiled
+
+    def deploy(self, samples):
+        approval, clear = self.programs()
+        txn = transaction.ApplicationCreateTxn(
+            self.creator, self.client.suggested_params(), transaction.OnComplete.NoOpOC.real,
+            approval, clear, self.global_schema, self.local_schema, app_args=self.create_args,
+            extra_pages=(len(approval) + len(clear) - 1) // 2048,
+        )
+        composer = self.composer()
+        composer.add_transaction(self.with_signer(txn, self.creator_key))
+        self.app_id = submit(self.client, composer)["application-index"]
+        # Minimum balance and the fees of its inner transactions
+        self.node.fund(self.app_address, ACCOUNT_MIN_BALANCE + 1_000_000)
+
+    def join(self, key):
+        """Prepare a backer account; opts in when the contract keeps local state"""
+        if not self.opt_in:
+            return None
+        sender = account.address_from_private_key(key)
+        composer = self.composer()
+        composer.add_transaction(self.with_signer(
+            transaction.ApplicationOptInTxn(sender, self.client.suggested_params(), self.app_id), key))
+        return composer
+
+    # Composers for one call of each operation
+
+    @staticmethod
+    def composer():
+        return AtomicTransactionComposer()
+
+    @staticmethod
+    def with_signer(txn, key):
+        return TransactionWithSigner(txn, AccountTransactionSigner(key))
+
+    def call(self, key, args, payment=None, boxes=None):
+        sender = account.address_from_private_key(key)
+        sp = self.client.suggested_params()
+        composer = self.composer()
+        if payment is not None:
+            pay = transaction.PaymentTxn(sender, sp, self.app_address, payment)
+            composer.add_transaction(self.with_signer(pay, key))
+        composer.add_transaction(self.with_signer(
+            transaction.ApplicationNoOpTxn(sender, sp, self.app_id, app_args=args, boxes=boxes), key))
+        return composer
+
+    def create_project(self, project_id, target, deadline):
+        args = [self.create_method, NAME.encode(), DESC.encode(), target.to_bytes(8, "big"),
+                deadline.to_bytes(8, "big"), CATEGORY.encode()]
+        if self.create_threshold:
+            args.append(THRESHOLD.to_bytes(8, "big"))
+        return self.call(self.creator_key, args)
+
+    def contribute(self, key, project_id, amount):
+        return self.call(key, [b"contribute", project_id.to_bytes(8, "big")], payment=amount)
+
+    def withdraw(self, project_id):
+        return self.call(self.creator_key, [b"withdraw", project_id.to_bytes(8, "big")])
+
+    def refund(self, key, project_id):
+        return self.call(key, [b"refund", project_id.to_bytes(8, "big")])
+
+    def mint_nft(self, key, project_id):
+        return self.call(key, [b"mint_nft", project_id.to_bytes(8, "big")])
+
+
+class PackedGlobalVariant(Variant):
+    module = "crowdfunding"
+    # project_count and successor, then one packed record and three strings per project
+    global_schema = transaction.StateSchema(2, 62)
+    local_schema = transaction.StateSchema(16, 0)
+    max_projects = 15
+    unsupported = {"mint_nft": MINT_AND_SEND}
+
+
+class BoxVariant(Variant):
+    module = "crowdfunding_boxes"
+    global_schema = transaction.StateSchema(2, 0)
+    local_schema = transaction.StateSchema(16, 0)
+    unsupported = {"mint_nft": MINT_AND_SEND}
+
+    def call(self, key, args, payment=None, boxes=None):
+        project_id = int.from_bytes(args[1], "big")
+        return super().call(key, args, payment, boxes or [(0, project_box_name(project_id))])
+
+    def create_project(self, project_id, target, deadline):
+        args = [self.create_method, NAME.encode(), DESC.encode(), target.to_bytes(8, "big"),
+                deadline.to_bytes(8, "big"), CATEGORY.encode(), THRESHOLD.to_bytes(8, "big")]
+        return super().call(self.creator_key, args, payment=project_box_mbr(NAME, DESC, CATEGORY),
+                            boxes=[(0, project_box_name(project_id))])
+
+
+class SimpleVariant(Variant):
+    module = "crowdfunding_simple"
+    operations = ("create_project", "contribute", "withdraw", "mint_nft")
+    global_schema = transaction.StateSchema(16, 16)
+    local_schema = transaction.StateSchema(8, 8)
+    # Name, target, creator and collected per project
+    max_projects = 7
+    create_method = b"create"
+    create_threshold = False
+    unsupported = {"mint_nft": MINT_AND_SEND}
+
+
+class SimpleNftVariant(SimpleVariant):
+    module = "crowdfunding_simple_nft"
+    global_schema = transaction.StateSchema(64, 64)
+    local_schema = transaction.StateSchema(16, 16)
+    # Four uints and four strings per project
+    max_projects = 15
+
+
+class CreateOnlyVariant(Variant):
+    """Contracts that only record project creation"""
+
+    operations = ("create_project",)
+
+
+class V2Variant(CreateOnlyVariant):
+    module = "crowdfunding_v2"
+    global_schema = transaction.StateSchema(0, 2)
+    create_image = b"ipfs://bench-project-image"
+
+    @property
+    def create_args(self):
+        # Every call, including the one creating the app, has to be a valid create_project
+        return self._create_args(int(self.node.ledger.timestamp) + DURATION)
+
+    def _create_args(self, deadline):
+        return [self.create_method, NAME.encode(), DESC.encode(), (1).to_bytes(8, "big"),
+                deadline.to_bytes(8, "big"), CATEGORY.encode(), THRESHOLD.to_bytes(8, "big"), self.create_image]
+
+    def create_project(self, project_id, target, deadline):
+        args = self._create_args(deadline)
+        args[3] = target.to_bytes(8, "big")
+        return self.call(self.creator_key, args)
+
+
+class MinimalVariant(CreateOnlyVariant):
+    module = "crowdfunding_minimal"
+    global_schema = transaction.StateSchema(1, 0)
+    create_method = b"create"
+
+    def create_project(self, project_id, target, deadline):
+        return self.call(self.creator_key, [self.create_method])
+
+
+class AbiVariant(Variant):
+    """The ARC-4 router, called through its generated client"""
+
+    module = "crowdfunding_abi"
+    global_schema = transaction.StateSchema(len(GLOBAL_UINTS), 0)
+
+    def deploy(self, samples):
+        from crowdfunding_abi_client import CrowdfundingClient
+
+        approval, clear = self.programs()
+        self.app = CrowdfundingClient(self.client, self.creator_key)
+        self.app_id = self.app.create(approval, clear, self.global_schema, self.local_schema)
+        # Callers pool the fees and pay for the reward assets the app creates
+        self.node.fund(self.app_address, ACCOUNT_MIN_BALANCE)
+
+    def backer(self, key):
+        from crowdfunding_abi_client import CrowdfundingClient
+
+        return CrowdfundingClient(self.client, key, self.app_id)
+
+    def create_project(self, project_id, target, deadline):
+        payment = project_box_mbr(NAME, DESC, CATEGORY) + category_box_mbr(CATEGORY)
+        return self.app.create_project(payment, NAME, DESC, target, deadline, CATEGORY, THRESHOLD,
+                                       atc=self.composer())
+
+    def contribute(self, key, project_id, amount):
+        # The first contribution to a project pays for the backer's ledger box
+        return self.backer(key).contribute(amount + LEDGER_BOX_MBR, project_id, atc=self.composer())
+
+    def withdraw(self, project_id):
+        return self.app.withdraw(project_id, atc=self.composer())
+
+    def refund(self, key, project_id):
+        return self.backer(key).refund(project_id, atc=self.composer())
+
+    def mint_nft(self, key, project_id):
+        return self.backer(key).mint_nft(ASSET_MBR, project_id, atc=self.composer())
+
+
+VARIANTS = {variant.module: variant for variant in (
+    PackedGlobalVariant, BoxVariant, SimpleVariant, SimpleNftVariant, V2Variant, MinimalVariant, AbiVariant)}
+
+
+def submit(client, composer):
+    """Send a composed group and wait for it; returns the last transaction's pending info"""
+    signed = composer.gather_signatures()
+    txid = client.send_transactions(signed)
+    return get_tracker(client).track(txid, details=True).result()
+
+
+def opcode_cost(client, composer):
+    """(opcode budget consumed, failure message or None) of a composed group, from simulate"""
+    signed = composer.gather_signatures()
+    request = SimulateRequest(txn_groups=[SimulateRequestTransactionGroup(txns=signed)])
+    group = client.simulate_transactions(request)["txn-groups"][0]
+    if group.get("failure-message"):
+        return None, group["failure-message"]
+    return sum(result.get("app-budget-consumed", 0) for result in group["txn-results"]), None
+
+
+class Measurement:
+    """Costs, latencies and rejections of one operation"""
+
+    def __init__(self):
+        self.costs = []
+        self.latencies = []
+        self.txns = 0
+        self.rejected = 0
+        self.reason = None
+
+    def run(self, client, composer):
+        """Simulate then send one call; returns whether it was confirmed"""
+        cost, failure = opcode_cost(client, composer)
+        if failure:
+            self.rejected += 1
+            self.reason = self.reason or failure
+            return False
+        started = time.perf_counter()
+        submit(client, composer)
+        self.latencies.append(time.perf_counter() - started)
+        self.costs.append(cost)
+        self.txns += composer.get_tx_count()
+        return True
+
+    def summary(self):
+        result = {"calls": len(self.costs) + self.rejected, "rejected": self.rejected}
+        if self.reason:
+            result["reason"] = self.reason
+        if self.costs:
+            elapsed = sum(self.latencies)
+            result.update({
+                "txns": self.txns,
+                "tps": round(self.txns / elapsed, 1) if elapsed else None,
+                "opcode_cost": {"mean": round(sum(self.costs) / len(self.costs), 1), "max": max(self.costs)},
+                "latency_ms": {f"p{q}": round(percentile(self.latencies, q) * 1000, 2) for q in (50, 90, 99)},
+            })
+        return result
+
+
+def bench_variant(variant_class, samples):
+    """Drive one variant through every operation it has; returns {operation: summary}"""
+    node = FakeAlgod()
+    client = FakeAlgodClient(node)
+    creator_key, _ = node.create_account(10_000_000_000)
+    variant = variant_class(node, client, creator_key)
+    variant.deploy(samples)
+    ops = {operation: Measurement() for operation in variant.operations if operation not in variant.unsupported}
+
+    # Funded projects reach their target with a single contribution; the
+    # last project can never reach its target, so its backers get refunds
+    funded = samples if variant.max_projects is None else min(samples, variant.max_projects - 1)
+    deadline = int(node.ledger.timestamp) + DURATION
+    targets = [CONTRIBUTION] * funded
+    if "refund" in ops:
+        targets.append(UNREACHABLE)
+    created = [project_id for project_id, target in enumerate(targets)
+               if ops["create_project"].run(client, variant.create_project(project_id, target, deadline))]
+    if "contribute" not in ops:
+        return {operation: measurement.summary() for operation, measurement in ops.items()}
+
+    # Up to three contributions each, plus fees and minimum balances
+    backers = [node.create_account(4 * CONTRIBUTION)[0] for _ in range(samples)]
+    for key in backers:
+        composer = variant.join(key)
+        if composer is not None:
+            submit(client, composer)
+
+    # Every backer contributes to project 0 and to the failing project; the
+    # other funded projects get one contribution each
+    contributions = [(key, 0) for key in backers]
+    if "refund" in ops:
+        contributions += [(key, len(targets) - 1) for key in backers]
+    contributions += [(backers[project_id % samples], project_id) for project_id in range(1, funded)]
+    for key, project_id in contributions:
+        if project_id in created:
+            ops["contribute"].run(client, variant.contribute(key, project_id, CONTRIBUTION))
+
+    node.advance_time(2 * DURATION)
+    for project_id in range(funded):
+        ops["withdraw"].run(client, variant.withdraw(project_id))
+    if "refund" in ops:
+        for key in backers:
+            ops["refund"].run(client, variant.refund(key, len(targets) - 1))
+    if "mint_nft" in ops:
+        for key in backers:
+            ops["mint_nft"].run(client, variant.mint_nft(key, 0))
+    return {operation: measurement.summary() for operation, measurement in ops.items()}
+
+
+def throughput(operations):
+    """Transactions per second over every confirmed call of a variant"""
+    txns = sum(result.get("txns", 0) for result in operations.values())
+    elapsed = sum(result["txns"] / result["tps"] for result in operations.values() if result.get("tps"))
+    return txns / elapsed if elapsed else None
+
+
+def compare(results, baseline, tolerance):
+    """Differences from the baseline as (is_regression, message) pairs"""
+    changes = []
+    for name, operations in results.items():
+        for operation, result in operations.items():
+            before = baseline.get(name, {}).get(operation)
+            label = f"{name}.{operation}"
+            if before is None:
+                changes.append((False, f"{label}: new, no baseline"))
+                continue
+            cost, old_cost = result.get("opcode_cost"), before.get("opcode_cost")
+            if cost != old_cost:
+                worse = old_cost is not None and (cost is None or cost["max"] > old_cost["max"])
+                changes.append((worse, f"{label}: opcode cost {old_cost} -> {cost}"))
+            if result["rejected"] != before["rejected"]:
+                changes.append((result["rejected"] > before["rejected"],
+                                f"{label}: rejected {before['rejected']} -> {result['rejected']}"
+                                + (f" ({result['reason']})" if result.get("reason") else "")))
+        # A handful of calls per operation is too few to compare their
+        # throughput one by one; the variant as a whole is steadier
+        tps, old_tps = throughput(operations), throughput(baseline.get(name, {}))
+        if tps and old_tps and tps < old_tps * (1 - tolerance):
+            changes.append((True, f"{name}: throughput {old_tps:.0f} -> {tps:.0f} tps"))
+    return changes
+
+
+def print_results(results):
+    print(f"\n{'variant.operation':<40} {'calls':>5} {'rej':>4} {'cost':>13} {'tps':>8} "
+          f"{'p50':>7} {'p90':>7} {'p99':>7}")
+    for name, operations in results.items():
+        for operation, result in operations.items():
+            cost = result.get("opcode_cost")
+            cost = f"{cost['mean']}/{cost['max']}" if cost else "-"
+            latency = result.get("latency_ms", {})
+            print(f"{name + '.' + operation:<40} {result['calls']:>5} {result['rejected']:>4} {cost:>13} "
+                  f"{result.get('tps') or '-':>8} {latency.get('p50', '-'):>7} {latency.get('p90', '-'):>7} "
+                  f"{latency.get('p99', '-'):>7}")
+            if result.get("reason"):
+                print(f"    rejected: {result['reason']}")
+
+
+def unsupported(names):
+    """{variant.operation: reason} for the operations left out of the run"""
+    return {f"{name}.{operation}": reason
+            for name in names for operation, reason in VARIANTS[name].unsupported.items()}
+
+
+def always_rejected(results):
+    """variant.operation of every operation none of whose calls went through"""
+    return [f"{name}.{operation}" for name, operations in results.items()
+            for operation, result in operations.items() if result["calls"] and result["rejected"] == result["calls"]]
+
+
+def load_baseline(path=BASELINE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the contract variants on the in-process fake algod")
+    parser.add_argument("variants", nargs="*", help=f"variants to run (default: all of {', '.join(VARIANTS)})")
+    parser.add_argument("--samples", type=int, default=6, help="calls per operation (backers and projects)")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="throughput drop from the baseline tolerated, as a fraction (default 0.5)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("-o", "--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    # The benchmark runs the compiled TEAL, so make sure it matches the sources
+    build.build(args.variants or list(VARIANTS))
+    results = {}
+    for name in args.variants or VARIANTS:
+        started = time.perf_counter()
+        results[name] = bench_variant(VARIANTS[name], args.samples)
+        print(f"  {name}: {time.perf_counter() - started:.2f}s")
+    print_results(results)
+    left_out = unsupported(results)
+    for label, reason in left_out.items():
+        print(f"  left out: {label} ({reason})")
+
+    report = {"samples": args.samples, "variants": results, "unsupported": left_out}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    # A baseline of calls that all fail would never measure the operation
+    failed = always_rejected(results)
+    for label in failed:
+        print(f"  FAILED: every {label} call was rejected")
+    if failed:
+        return 1
+
+    baseline = load_baseline(args.baseline)
+    if args.update or baseline is None:
+        if baseline is not None:
+            # Keep the variants this run did not cover
+            results = {**baseline["variants"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump({"samples": args.samples, "variants": results, "unsupported": unsupported(results)}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {os.path.relpath(args.baseline)}")
+        return 0
+
+    if baseline.get("samples") != args.samples:
+        print(f"\nBaseline was recorded with --samples {baseline.get('samples')}; costs may differ")
+    changes = compare(results, baseline["variants"], args.tolerance)
+    for regression, message in changes:
+        print(f"  {'REGRESSION' if regression else 'changed'}: {message}")
+    if not changes:
+        print("\nNo changes from the baseline")
+    return 1 if any(regression for regression, _ in changes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Compare HTTP round trips of a plain AlgodClient and the shared PooledAlgodClient.
+
+Both clients run the same script workload through the algorand_client helpers:
+assemble the ABI programs (locally, see teal_assembler.py), then build and sign <txns> transactions the way the
+deploy scripts do (suggested params per transaction, plus a balance check).
+With a funded mnemonic the transactions are sent too, so the counts include
+the confirmation polling of create_app and call_app.
+
+    python bench_http.py [--txns 20] [--send]
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+
+from algosdk import account, mnemonic, transaction
+from algosdk.v2client import algod
+
+import algorand_client
+from algorand_client import PooledAlgodClient, call_app, check_balance, compile_program, create_app, endpoint, send
+
+
+class CountingAlgodClient(algod.AlgodClient):
+    """Stock AlgodClient (new connection per request) that counts its requests"""
+
+    def __init__(self, algod_token, algod_address, headers=None):
+        super().__init__(algod_token, algod_address, headers)
+        self.requests = Counter()
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    def algod_request(self, method, requrl, *args, **kwargs):
+        self.requests[f"{method} {endpoint(requrl)}"] += 1
+        return super().algod_request(method, requrl, *args, **kwargs)
+
+
+def workload(client, txns, private_key=None):
+    sender = account.address_from_private_key(private_key) if private_key else account.generate_account()[1]
+    with open("approval_abi.teal") as f:
+        approval_program = compile_program(client, f.read())
+    with open("clear_abi.teal") as f:
+        clear_program = compile_program(client, f.read())
+    check_balance(client, sender)
+
+    if private_key is None:
+        for _ in range(txns):
+            txn = transaction.PaymentTxn(sender=sender, sp=client.suggested_params(), receiver=sender, amt=0)
+            txn.get_txid()
+        return
+
+    app_id = create_app(client, private_key, approval_program, clear_program,
+                        transaction.StateSchema(0, 0), transaction.StateSchema(0, 0))
+    for i in range(txns):
+        call_app(client, private_key, app_id, [], note=i.to_bytes(8, "big"))
+    send(client, private_key, transaction.ApplicationDeleteTxn(sender, client.suggested_params(), app_id))
+
+
+def run(name, client, txns, private_key):
+    start = time.perf_counter()
+    workload(client, txns, private_key)
+    elapsed = time.perf_counter() - start
+    print(f"\n{name}: {client.request_count} requests in {elapsed:.2f}s")
+    for key, count in sorted(client.requests.items(), key=lambda kv: -kv[1]):
+        print(f"  {count:5d}  {key}")
+    if isinstance(client, PooledAlgodClient):
+        print("  cache: {hits} hits, {misses} misses, {joined} joined in flight".format(**client.cache.stats()))
+    return client.request_count, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txns", type=int, default=20)
+    parser.add_argument("--send", action="store_true", help="send the transactions (asks for a funded mnemonic)")
+    args = parser.parse_args(argv)
+
+    private_key = None
+    if args.send:
+        private_key = mnemonic.to_private_key(input("Enter a funded wallet mnemonic phrase: "))
+
+    address, token = algorand_client.algod_address, algorand_client.algod_token
+    plain = run("AlgodClient", CountingAlgodClient(token, address), args.txns, private_key)
+    pooled = run("PooledAlgodClient", PooledAlgodClient(token, address), args.txns, private_key)
+
+    print(f"\nround trips: {plain[0]} -> {pooled[0]} ({plain[0] - pooled[0]} saved), "
+          f"wall time: {plain[1]:.2f}s -> {pooled[1]:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
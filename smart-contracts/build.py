@@ -0,0 +1,245 @@
+"""
+Build every contract variant: PyTeal -> TEAL -> bytecode, incrementally and in parallel.
+
+    python build.py                     # rebuild what changed
+    python build.py crowdfunding_abi    # only these contracts
+    python build.py --force --jobs 8    # rebuild everything on 8 processes
+    python build.py --check             # exit 1 if anything is out of date
+
+A contract module is any module here that defines approval_program() and
+clear_state_program(), or an ABI `router`, next to its TEAL_VERSION. For
+crowdfunding_<name>.py the build writes approval_<name>.teal and
+clear_<name>.teal, their assembled bytecode (.teal.tok) and, for routers, the
+ARC-4 spec <module>.json plus its generated client <module>_client.py.
+
+build_manifest.json records, per contract, a hash of its inputs (the module,
+the local modules it imports, the PyTeal and assembler versions) and of every
+output. A contract is rebuilt only when its input hash changed or an output
+is missing or was edited; stale contracts compile across a process pool.
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import metadata
+
+import teal_assembler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = os.path.join(HERE, "build_manifest.json")
+# Bump when the build itself changes what it writes
+BUILD_VERSION = 1
+
+
+def pyteal_version():
+    try:
+        return metadata.version("pyteal")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def discover(directory=HERE):
+    """Names of the contract modules in directory, found without importing them"""
+    contracts = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            try:
+                tree = ast.parse(f.read(), filename)
+            except SyntaxError:
+                continue
+        functions = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+        assigned = {target.id for node in tree.body if isinstance(node, ast.Assign)
+                    for target in node.targets if isinstance(target, ast.Name)}
+        if "TEAL_VERSION" in assigned and (
+                {"approval_program", "clear_state_program"} <= functions or "router" in assigned):
+            contracts.append(filename[:-3])
+    return contracts
+
+
+def local_imports(module, directory=HERE, seen=None):
+    """The module and every module of directory it imports, transitively"""
+    seen = set() if seen is None else seen
+    if module in seen or not os.path.exists(os.path.join(directory, module + ".py")):
+        return seen
+    seen.add(module)
+    with open(os.path.join(directory, module + ".py")) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            local_imports(name.split(".")[0], directory, seen)
+    return seen
+
+
+def input_hash(module, directory=HERE):
+    digest = hashlib.sha256(f"{BUILD_VERSION} {teal_assembler.ASSEMBLER_VERSION} {pyteal_version()}".encode())
+    for name in sorted(local_imports(module, directory)):
+        with open(os.path.join(directory, name + ".py"), "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read() + b"\0")
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def output_suffix(module):
+    if module == "crowdfunding":
+        return ""
+    if module.startswith("crowdfunding_"):
+        return module[len("crowdfunding"):]
+    return "_" + module
+
+
+def build_contract(module, directory=HERE):
+    """Compile one contract module and write its outputs; returns its manifest entry"""
+    from pyteal import Mode, compileTeal
+
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    contract = importlib.import_module(module)
+    version = contract.TEAL_VERSION
+    suffix = output_suffix(module)
+    written = {}
+
+    def write(name, content):
+        path = os.path.join(directory, name)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+        written[name] = file_hash(path)
+
+    spec = None
+    if hasattr(contract, "router"):
+        approval, clear, abi_contract = contract.router.compile_program(version=version)
+        spec = {"contract": abi_contract.dictify(), "hints": getattr(contract, "HINTS", {})}
+    else:
+        approval = compileTeal(contract.approval_program(), Mode.Application, version=version)
+        clear = compileTeal(contract.clear_state_program(), Mode.Application, version=version)
+
+    hashes = {}
+    for kind, teal in (("approval", approval), ("clear", clear)):
+        name = f"{kind}{suffix}.teal"
+        write(name, teal)
+        program = teal_assembler.assemble(teal)
+        write(name + ".tok", program.bytecode)
+        hashes[kind] = program.hash
+
+    if spec is not None:
+        import generate_client
+
+        spec_name = f"{module}.json"
+        write(spec_name, json.dumps(spec, indent=4) + "\n")
+        write(f"{module}_client.py", generate_client.generate(spec, spec_name))
+
+    return {"inputs": input_hash(module, directory), "outputs": written, "program_hashes": hashes}
+
+
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"contracts": {}}
+
+
+def save_manifest(manifest, path=MANIFEST):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def stale_reason(module, entry, directory=HERE):
+    """Why module needs a rebuild, or None when its outputs are current"""
+    if entry is None:
+        return "never built"
+    if entry.get("inputs") != input_hash(module, directory):
+        return "source or toolchain changed"
+    for name, digest in entry.get("outputs", {}).items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            return f"{name} missing"
+        if file_hash(path) != digest:
+            return f"{name} modified"
+    return None
+
+
+def build(modules=None, force=False, jobs=None, directory=HERE, manifest_path=MANIFEST):
+    """Rebuild the stale contracts among modules (default: all); returns the rebuilt names"""
+    manifest = load_manifest(manifest_path)
+    modules = modules or discover(directory)
+    todo = {}
+    for module in modules:
+        reason = "forced" if force else stale_reason(module, manifest["contracts"].get(module), directory)
+        if reason:
+            todo[module] = reason
+        else:
+            print(f"  {module}: up to date")
+    if not todo:
+        return []
+
+    started = time.perf_counter()
+    failed = []
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(todo))) as pool:
+        futures = {pool.submit(build_contract, module, directory): module for module in todo}
+        for future in as_completed(futures):
+            module = futures[future]
+            try:
+                manifest["contracts"][module] = future.result()
+            except Exception as e:
+                failed.append(module)
+                print(f"  {module}: FAILED ({e})", file=sys.stderr)
+                continue
+            outputs = ", ".join(manifest["contracts"][module]["outputs"])
+            print(f"  {module}: rebuilt ({todo[module]}) -> {outputs}")
+
+    manifest["pyteal"] = pyteal_version()
+    save_manifest(manifest, manifest_path)
+    print(f"Built {len(todo) - len(failed)}/{len(todo)} contracts in {time.perf_counter() - started:.1f}s")
+    if failed:
+        raise RuntimeError(f"build failed for {', '.join(sorted(failed))}")
+    return sorted(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the contract variants incrementally")
+    parser.add_argument("contracts", nargs="*", help="contract modules to build (default: all discovered)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--jobs", "-j", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 if anything is stale")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        manifest = load_manifest()
+        stale = {module: stale_reason(module, manifest["contracts"].get(module))
+                 for module in args.contracts or discover()}
+        stale = {module: reason for module, reason in stale.items() if reason}
+        for module, reason in stale.items():
+            print(f"  {module}: {reason}")
+        return 1 if stale else 0
+
+    try:
+        build(args.contracts, force=args.force, jobs=args.jobs)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
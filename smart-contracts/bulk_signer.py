@@ -0,0 +1,195 @@
+"""
+Sign transaction groups in bulk across a process pool.
+
+    with BulkSigner([creator_key, *backer_keys]) as signer:
+        for group in signer.sign_groups(groups):       # lists of unsigned Transactions
+            client.send_raw_group(group.raw)             # the bytes go on the wire as they are
+            tracker.track(group.txids[0])
+
+Each SignedGroup.raw is the concatenated canonical msgpack of the group's
+signed transactions, which is the body POST /v2/transactions takes. Workers
+encode every transaction once and splice the ed25519 signature in front of
+that encoding, rather than building a SignedTransaction and encoding it
+again. Groups of more than one transaction without a group id get one
+assigned in the worker; the caller's transactions are not modified. A transaction is signed by the key of its sender;
+every sender's key has to be among the keys the signer was given.
+
+    python bulk_signer.py --txns 20000 --jobs 4    # signatures per second per core, against txn.sign()
+"""
+
+import argparse
+import base64
+import copy
+import hashlib
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from algosdk import account, constants, encoding, transaction
+from nacl.signing import SigningKey
+
+# Groups per task handed to a worker: large enough that pickling overhead is amortized
+CHUNK_SIZE = 64
+
+# Canonical msgpack of {"sig": <64 bytes>, "txn": <map>}: the keys are fixed, so
+# only the signature and the encoded transaction change
+_SIG_PREFIX = b"\x82\xa3sig\xc4\x40"
+_TXN_KEY = b"\xa3txn"
+
+SignedGroup = namedtuple("SignedGroup", "txids raw")
+
+# Per worker process: sender address -> SigningKey
+_signing_keys = {}
+
+
+def signing_keys(private_keys):
+    keys = {}
+    for private_key in private_keys:
+        seed = base64.b64decode(private_key)[:constants.key_len_bytes]
+        keys[account.address_from_private_key(private_key)] = SigningKey(seed)
+    return keys
+
+
+def _init_worker(private_keys):
+    _signing_keys.clear()
+    _signing_keys.update(signing_keys(private_keys))
+
+
+def txid(raw_txn):
+    """Transaction id of a transaction's canonical msgpack"""
+    digest = hashlib.new("sha512_256", constants.txid_prefix + raw_txn).digest()
+    return base64.b32encode(digest).decode().strip("=")
+
+
+def sign_group(txns, keys=None):
+    """SignedGroup of one group of unsigned transactions"""
+    keys = _signing_keys if keys is None else keys
+    if len(txns) > 1 and txns[0].group is None:
+        # On copies, so the caller's transactions are left as they were in either signing path
+        txns = transaction.assign_group_id([copy.copy(txn) for txn in txns])
+    txids, parts = [], []
+    for txn in txns:
+        raw_txn = base64.b64decode(encoding.msgpack_encode(txn))
+        signature = keys[txn.sender].sign(constants.txid_prefix + raw_txn).signature
+        txids.append(txid(raw_txn))
+        parts += (_SIG_PREFIX, signature, _TXN_KEY, raw_txn)
+    return SignedGroup(txids, b"".join(parts))
+
+
+def _sign_chunk(groups):
+    return [sign_group(txns) for txns in groups]
+
+
+class BulkSigner:
+    """A process pool that signs and encodes groups; every worker holds the keys"""
+
+    def __init__(self, private_keys, jobs=None, chunk_size=CHUNK_SIZE):
+        self.private_keys = list(private_keys)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                             initargs=(self.private_keys,))
+        return self._pool
+
+    def sign_groups(self, groups):
+        """SignedGroups for groups (lists of unsigned Transactions), in order"""
+        groups = [list(group) for group in groups]
+        if self.jobs == 1:
+            # No pool to feed: sign here and skip the pickling round trip
+            keys = signing_keys(self.private_keys)
+            return [sign_group(txns, keys) for txns in groups]
+        chunks = [groups[start:start + self.chunk_size] for start in range(0, len(groups), self.chunk_size)]
+        return [group for signed in self.pool.map(_sign_chunk, chunks) for group in signed]
+
+    def sign_transactions(self, txns):
+        """One SignedGroup per transaction, for transactions sent on their own"""
+        return self.sign_groups([txn] for txn in txns)
+
+
+def benchmark(txns, group_size, jobs, senders=16):
+    keys = [account.generate_account()[0] for _ in range(senders)]
+    addresses = [account.address_from_private_key(key) for key in keys]
+    genesis_hash = base64.b64encode(hashlib.sha256(b"bulk-signer-bench").digest()).decode()
+    sp = transaction.SuggestedParams(1000, 1, 1001, genesis_hash, "bench-v1", flat_fee=True)
+    payments = [transaction.PaymentTxn(addresses[i % senders], sp, addresses[(i + 1) % senders], 1000 + i)
+                for i in range(txns)]
+    groups = [payments[start:start + group_size] for start in range(0, txns, group_size)]
+    key_of = dict(zip(addresses, keys))
+
+    def fresh_groups():
+        # Every run starts from its own ungrouped transactions, copied outside the timing
+        return [[copy_txn(txn) for txn in group] for group in groups]
+
+    results = {}
+    unsigned = fresh_groups()
+    started = time.perf_counter()
+    for group in unsigned:
+        # What the scripts do today: group, sign one by one, encode for sending
+        if len(group) > 1:
+            transaction.assign_group_id(group)
+        b"".join(base64.b64decode(encoding.msgpack_encode(txn.sign(key_of[txn.sender]))) for txn in group)
+    results["txn.sign"] = time.perf_counter() - started
+
+    for workers in sorted({1, jobs}):
+        with BulkSigner(keys, jobs=workers) as signer:
+            signer.sign_groups(groups[:1])  # start the workers outside the timing
+            unsigned = fresh_groups()
+            started = time.perf_counter()
+            signed = signer.sign_groups(unsigned)
+            results[f"BulkSigner jobs={workers}"] = time.perf_counter() - started
+
+    # The spliced encoding is byte for byte what the SDK produces
+    check = [copy_txn(txn) for txn in groups[0]]
+    if len(check) > 1:
+        transaction.assign_group_id(check)
+    expected = b"".join(base64.b64decode(encoding.msgpack_encode(txn.sign(key_of[txn.sender]))) for txn in check)
+    assert signed[0].raw == expected, "bulk signer encoding differs from the SDK's"
+    return results
+
+
+def copy_txn(txn):
+    return transaction.Transaction.undictify(txn.dictify())
+
+
+def main(argv=None):
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Benchmark bulk signing against txn.sign()")
+    parser.add_argument("--txns", type=int, default=20000)
+    parser.add_argument("--group-size", type=int, default=2, help="transactions per group (default 2: payment + call)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    # txn.sign() is deprecated in the SDK but is what the scripts call
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    results = benchmark(args.txns, args.group_size, args.jobs)
+    baseline = results["txn.sign"]
+    print(f"{args.txns} transactions in groups of {args.group_size}, {os.cpu_count()} CPUs\n")
+    print(f"{'signer':<22} {'seconds':>8} {'sigs/s':>9} {'sigs/s/core':>12} {'speedup':>8}")
+    for name, elapsed in results.items():
+        cores = int(name.rsplit("=", 1)[1]) if "=" in name else 1
+        rate = args.txns / elapsed
+        print(f"{name:<22} {elapsed:8.2f} {rate:9.0f} {rate / cores:12.0f} {baseline / elapsed:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
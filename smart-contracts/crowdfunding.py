@@ -1,14 +1,23 @@
 from pyteal import *
+from project_layout import (
+    PACKED_RECORD_SIZE, TARGET_OFFSET, DEADLINE_OFFSET, COLLECTED_OFFSET,
+    THRESHOLD_OFFSET, ACTIVE_OFFSET, CREATOR_OFFSET, PACKED_BACKERS_OFFSET,
+    LEDGER_BOX_MBR, SUCCESSOR_KEY,
+)
+
+TEAL_VERSION = 8
 
 def approval_program():
     # Global state variables
     global_project_count = App.globalGet(Bytes("project_count"))
     project_id = ScratchVar(TealType.uint64)
+    project_prefix = ScratchVar(TealType.bytes)
+    project_record = ScratchVar(TealType.bytes)
+    contrib_key = ScratchVar(TealType.bytes)
+    nft_key = ScratchVar(TealType.bytes)
     contributor_amount = ScratchVar(TealType.uint64)
-    project_target = ScratchVar(TealType.uint64)
-    project_deadline = ScratchVar(TealType.uint64)
-    project_collected = ScratchVar(TealType.uint64)
-    reward_threshold = ScratchVar(TealType.uint64)
+    account_index = ScratchVar(TealType.uint64)
+    successor_address = AppParam.address(Txn.applications[1])
 
     @Subroutine(TealType.bytes)
     def project_key(id):
@@ -18,16 +27,36 @@ def approval_program():
     def contributor_key(project_id, contributor):
         return Concat(Bytes("contrib_"), Itob(project_id), Bytes("_"), contributor)
 
-    # Helper function to get project data
+    # Helper function to get project data: the fixed-width fields live in a
+    # single packed record under project_<id> (the fixed-width fields of the
+    # box record in project_layout.py, then backers), so one state read loads
+    # them all.
+    # The project id and key prefix are computed once here and reused by
+    # every branch.
     @Subroutine(TealType.none)
     def get_project_data():
         return Seq(
-            project_target.store(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_target")))),
-            project_deadline.store(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_deadline")))),
-            project_collected.store(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_collected")))),
-            reward_threshold.store(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_threshold"))))
+            project_id.store(Btoi(Txn.application_args[1])),
+            project_prefix.store(project_key(project_id.load())),
+            project_record.store(App.globalGet(project_prefix.load())),
+            Assert(Len(project_record.load()) == Int(PACKED_RECORD_SIZE))  # Project exists
         )
 
+    # Write one field of the packed record back in place
+    def update_project(offset, value):
+        return Seq(
+            project_record.store(Replace(project_record.load(), Int(offset), value)),
+            App.globalPut(project_prefix.load(), project_record.load())
+        )
+
+    project_target = ExtractUint64(project_record.load(), Int(TARGET_OFFSET))
+    project_deadline = ExtractUint64(project_record.load(), Int(DEADLINE_OFFSET))
+    project_collected = ExtractUint64(project_record.load(), Int(COLLECTED_OFFSET))
+    reward_threshold = ExtractUint64(project_record.load(), Int(THRESHOLD_OFFSET))
+    project_active = GetByte(project_record.load(), Int(ACTIVE_OFFSET))
+    project_creator = Extract(project_record.load(), Int(CREATOR_OFFSET), Int(32))
+    project_backers = ExtractUint64(project_record.load(), Int(PACKED_BACKERS_OFFSET))
+
     # Application creation
     handle_creation = Seq([
         App.globalPut(Bytes("project_count"), Int(0)),
@@ -51,23 +80,30 @@ def approval_program():
         # Create project
         [Txn.application_args[0] == Bytes("create_project"), Seq([
             Assert(Global.group_size() == Int(1)),
-            Assert(Txn.application_args.length() == Int(6)),  # name, desc, target, deadline, category, threshold
-            Assert(Btoi(Txn.application_args[3]) > Global.latest_timestamp()),  # deadline must be in future
-            Assert(Btoi(Txn.application_args[5]) > Int(0)),  # threshold must be positive
-
-            # Store project data
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_name")), Txn.application_args[1]),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_desc")), Txn.application_args[2]),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_creator")), Txn.sender()),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_target")), Btoi(Txn.application_args[3])),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_deadline")), Btoi(Txn.application_args[3])),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_collected")), Int(0)),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_category")), Txn.application_args[4]),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_threshold")), Btoi(Txn.application_args[5])),
-            App.globalPut(Concat(Bytes("project_"), Itob(global_project_count), Bytes("_active")), Int(1)),
+            Assert(Txn.application_args.length() == Int(7)),  # name, desc, target, deadline, category, threshold
+            Assert(Btoi(Txn.application_args[3]) > Int(0)),  # target must be positive
+            Assert(Btoi(Txn.application_args[4]) > Global.latest_timestamp()),  # deadline must be in future
+            Assert(Btoi(Txn.application_args[6]) > Int(0)),  # threshold must be positive
+
+            project_id.store(global_project_count),
+            project_prefix.store(project_key(project_id.load())),
+
+            # Store project data: packed record plus the free-form strings
+            App.globalPut(project_prefix.load(), Concat(
+                Itob(Btoi(Txn.application_args[3])),  # target
+                Itob(Btoi(Txn.application_args[4])),  # deadline
+                Itob(Int(0)),  # collected
+                Itob(Btoi(Txn.application_args[6])),  # threshold
+                Bytes(b"\x01"),  # active
+                Txn.sender(),  # creator
+                Itob(Int(0))  # backers
+            )),
+            App.globalPut(Concat(project_prefix.load(), Bytes("_name")), Txn.application_args[1]),
+            App.globalPut(Concat(project_prefix.load(), Bytes("_desc")), Txn.application_args[2]),
+            App.globalPut(Concat(project_prefix.load(), Bytes("_category")), Txn.application_args[5]),
 
             # Increment project count
-            App.globalPut(Bytes("project_count"), global_project_count + Int(1)),
+            App.globalPut(Bytes("project_count"), project_id.load() + Int(1)),
             Return(Int(1))
         ])],
 
@@ -80,20 +116,18 @@ def approval_program():
             Assert(Gtxn[0].sender() == Txn.sender()),
 
             get_project_data(),
+            contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
 
-            Assert(project_target.load() > Int(0)),  # Project exists
-            Assert(project_deadline.load() > Global.latest_timestamp()),  # Deadline not passed
-            Assert(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_active"))) == Int(1)),
+            Assert(project_deadline > Global.latest_timestamp()),  # Deadline not passed
+            Assert(project_active == Int(1)),
 
             # Update collected amount
-            App.globalPut(
-                Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_collected")),
-                project_collected.load() + Gtxn[0].amount()
-            ),
+            update_project(COLLECTED_OFFSET, Itob(project_collected + Gtxn[0].amount())),
 
-            # Update contributor amount
-            contributor_amount.store(App.localGet(Txn.sender(), contributor_key(Btoi(Txn.application_args[1]), Txn.sender())) + Gtxn[0].amount()),
-            App.localPut(Txn.sender(), contributor_key(Btoi(Txn.application_args[1]), Txn.sender()), contributor_amount.load()),
+            # Update contributor amount; a first contribution adds a backer
+            contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
+            If(contributor_amount.load() == Int(0), update_project(PACKED_BACKERS_OFFSET, Itob(project_backers + Int(1)))),
+            App.localPut(Txn.sender(), contrib_key.load(), contributor_amount.load() + Gtxn[0].amount()),
 
             Return(Int(1))
         ])],
@@ -104,20 +138,19 @@ def approval_program():
 
             get_project_data(),
 
-            Assert(project_target.load() > Int(0)),  # Project exists
-            Assert(project_collected.load() >= project_target.load()),  # Target reached
-            Assert(project_deadline.load() <= Global.latest_timestamp()),  # Deadline passed
-            Assert(Txn.sender() == App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_creator")))),
+            Assert(project_collected >= project_target),  # Target reached
+            Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+            Assert(Txn.sender() == project_creator),
 
             # Mark project as inactive
-            App.globalPut(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_active")), Int(0)),
+            update_project(ACTIVE_OFFSET, Bytes(b"\x00")),
 
             # Send funds to creator
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: project_collected.load(),
+                TxnField.amount: project_collected,
                 TxnField.fee: Int(1000)
             }),
             InnerTxnBuilder.Submit(),
@@ -130,14 +163,14 @@ def approval_program():
             Assert(Txn.application_args.length() == Int(2)),
 
             get_project_data(),
+            contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
 
-            Assert(project_target.load() > Int(0)),  # Project exists
-            Assert(project_collected.load() < project_target.load()),  # Target not reached
-            Assert(project_deadline.load() <= Global.latest_timestamp()),  # Deadline passed
-            Assert(App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_active"))) == Int(1)),
+            Assert(project_collected < project_target),  # Target not reached
+            Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+            Assert(project_active == Int(1)),
 
             # Check if user has contributed
-            contributor_amount.store(App.localGet(Txn.sender(), contributor_key(Btoi(Txn.application_args[1]), Txn.sender()))),
+            contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
             Assert(contributor_amount.load() > Int(0)),
 
             # Send refund to contributor
@@ -151,7 +184,44 @@ def approval_program():
             InnerTxnBuilder.Submit(),
 
             # Clear contributor's local state
-            App.localPut(Txn.sender(), contributor_key(Btoi(Txn.application_args[1]), Txn.sender()), Int(0)),
+            App.localPut(Txn.sender(), contrib_key.load(), Int(0)),
+            update_project(PACKED_BACKERS_OFFSET, Itob(project_backers - Int(1))),
+
+            Return(Int(1))
+        ])],
+
+        # Keeper settlement: refund every contributor passed in Txn.accounts.
+        # Payments carry no fee of their own; the caller pools them into the
+        # app call fee. Accounts already refunded are skipped, so a page can
+        # be resubmitted safely.
+        [Txn.application_args[0] == Bytes("settle_refunds"), Seq([
+            Assert(Txn.application_args.length() == Int(2)),
+            Assert(Txn.accounts.length() > Int(0)),
+
+            get_project_data(),
+
+            Assert(project_collected < project_target),  # Target not reached
+            Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+            Assert(project_active == Int(1)),
+
+            For(account_index.store(Int(1)),
+                account_index.load() <= Txn.accounts.length(),
+                account_index.store(account_index.load() + Int(1))).Do(Seq([
+                contrib_key.store(contributor_key(project_id.load(), Txn.accounts[account_index.load()])),
+                contributor_amount.store(App.localGet(Txn.accounts[account_index.load()], contrib_key.load())),
+                If(contributor_amount.load() > Int(0), Seq([
+                    InnerTxnBuilder.Begin(),
+                    InnerTxnBuilder.SetFields({
+                        TxnField.type_enum: TxnType.Payment,
+                        TxnField.receiver: Txn.accounts[account_index.load()],
+                        TxnField.amount: contributor_amount.load(),
+                        TxnField.fee: Int(0)
+                    }),
+                    InnerTxnBuilder.Submit(),
+                    App.localPut(Txn.accounts[account_index.load()], contrib_key.load(), Int(0)),
+                    update_project(PACKED_BACKERS_OFFSET, Itob(project_backers - Int(1))),
+                ]))
+            ])),
 
             Return(Int(1))
         ])],
@@ -161,17 +231,17 @@ def approval_program():
             Assert(Txn.application_args.length() == Int(2)),
 
             get_project_data(),
+            nft_key.store(Concat(Bytes("nft_"), Itob(project_id.load()))),
 
-            Assert(project_target.load() > Int(0)),  # Project exists
-            Assert(project_collected.load() >= project_target.load()),  # Target reached
-            Assert(project_deadline.load() <= Global.latest_timestamp()),  # Deadline passed
+            Assert(project_collected >= project_target),  # Target reached
+            Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
 
             # Check if contributor meets threshold
-            contributor_amount.store(App.localGet(Txn.sender(), contributor_key(Btoi(Txn.application_args[1]), Txn.sender()))),
-            Assert(contributor_amount.load() >= reward_threshold.load()),
+            contributor_amount.store(App.localGet(Txn.sender(), contributor_key(project_id.load(), Txn.sender()))),
+            Assert(contributor_amount.load() >= reward_threshold),
 
             # Check if NFT already minted
-            Assert(App.localGet(Txn.sender(), Concat(Bytes("nft_"), Itob(Btoi(Txn.application_args[1])))) == Int(0)),
+            Assert(App.localGet(Txn.sender(), nft_key.load()) == Int(0)),
 
             # Create NFT asset
             InnerTxnBuilder.Begin(),
@@ -183,11 +253,11 @@ def approval_program():
                 TxnField.config_asset_unit_name: Bytes("RWDNFT"),
                 TxnField.config_asset_name: Concat(
                     Bytes("Reward NFT - "),
-                    App.globalGet(Concat(Bytes("project_"), Itob(Btoi(Txn.application_args[1])), Bytes("_name")))
+                    App.globalGet(Concat(project_prefix.load(), Bytes("_name")))
                 ),
                 TxnField.config_asset_url: Concat(
                     Bytes("ipfs://"),
-                    Sha256(Concat(Bytes("metadata"), Itob(Btoi(Txn.application_args[1])), Txn.sender()))
+                    Sha256(Concat(Bytes("metadata"), Itob(project_id.load()), Txn.sender()))
                 ),
                 TxnField.fee: Int(1000)
             }),
@@ -205,7 +275,65 @@ def approval_program():
             InnerTxnBuilder.Submit(),
 
             # Mark NFT as minted
-            App.localPut(Txn.sender(), Concat(Bytes("nft_"), Itob(Btoi(Txn.application_args[1]))), Int(1)),
+            App.localPut(Txn.sender(), nft_key.load(), Int(1)),
+
+            Return(Int(1))
+        ])],
+
+        # Name the app running campaigns move to (app creator, once): an ABI
+        # app (crowdfunding_abi.py) that keeps contributions in ledger boxes.
+        # Passed as the first foreign app.
+        [Txn.application_args[0] == Bytes("set_successor"), Seq([
+            Assert(Txn.application_args.length() == Int(1)),
+            Assert(Txn.sender() == Global.creator_address()),
+            Assert(App.globalGet(Bytes(SUCCESSOR_KEY)) == Int(0)),
+            App.globalPut(Bytes(SUCCESSOR_KEY), Txn.applications[1]),
+            Return(Int(1))
+        ])],
+
+        # Move the caller's contribution into the successor's ledger while the
+        # campaign runs. The funds only leave together with their
+        # re-contribution: the next two transactions of the group must be the
+        # caller's payment of the contribution plus the ledger box deposit to
+        # the successor, and the successor's contribute call. The backer leaves
+        # this project.
+        [Txn.application_args[0] == Bytes("move_contribution"), Seq([
+            Assert(Txn.application_args.length() == Int(2)),
+            Assert(App.globalGet(Bytes(SUCCESSOR_KEY)) != Int(0)),
+            Assert(Txn.applications[1] == App.globalGet(Bytes(SUCCESSOR_KEY))),
+
+            get_project_data(),
+            contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
+
+            Assert(project_deadline > Global.latest_timestamp()),  # Campaign still running
+            Assert(project_active == Int(1)),
+
+            contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
+            Assert(contributor_amount.load() > Int(0)),
+
+            successor_address,
+            Assert(Global.group_size() > Txn.group_index() + Int(2)),
+            Assert(Gtxn[Txn.group_index() + Int(1)].type_enum() == TxnType.Payment),
+            Assert(Gtxn[Txn.group_index() + Int(1)].sender() == Txn.sender()),
+            Assert(Gtxn[Txn.group_index() + Int(1)].receiver() == successor_address.value()),
+            Assert(Gtxn[Txn.group_index() + Int(1)].amount() >= contributor_amount.load() + Int(LEDGER_BOX_MBR)),
+            Assert(Gtxn[Txn.group_index() + Int(2)].type_enum() == TxnType.ApplicationCall),
+            Assert(Gtxn[Txn.group_index() + Int(2)].application_id() == Txn.applications[1]),
+            Assert(Gtxn[Txn.group_index() + Int(2)].sender() == Txn.sender()),
+            Assert(Gtxn[Txn.group_index() + Int(2)].application_args[0] == MethodSignature("contribute(pay,uint64)void")),
+
+            update_project(COLLECTED_OFFSET, Itob(project_collected - contributor_amount.load())),
+            update_project(PACKED_BACKERS_OFFSET, Itob(project_backers - Int(1))),
+            App.localPut(Txn.sender(), contrib_key.load(), Int(0)),
+
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: Txn.sender(),
+                TxnField.amount: contributor_amount.load(),
+                TxnField.fee: Int(1000)
+            }),
+            InnerTxnBuilder.Submit(),
 
             Return(Int(1))
         ])]
@@ -225,16 +353,7 @@ def approval_program():
 def clear_state_program():
     return Return(Int(1))
 
-# Compile the programs
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
 if __name__ == "__main__":
-    approval_compiled = compileTeal(approval_program(), Mode.Application, version=8)
-    clear_compiled = compileTeal(clear_state_program(), Mode.Application, version=8)
-
-    with open("approval.teal", "w") as f:
-        f.write(approval_compiled)
-
-    with open("clear.teal", "w") as f:
-        f.write(clear_compiled)
-
-    print("Smart contract compiled successfully!")
-    print("Files created: approval.teal, clear.teal")
+    import build
+    build.main(["crowdfunding", "--force"])
@@ -0,0 +1,563 @@
+from pyteal import *
+from project_layout import *
+
+TEAL_VERSION = 8
+
+# ARC-4 crowdfunding contract. Projects are stored in boxes (see
+# project_layout.py), methods are dispatched on 4-byte selectors and every
+# argument is typed, so callers no longer hand-encode app_args.
+#
+# Inner transactions carry a zero fee; the caller pays for them through fee
+# pooling (see "inner_txns" in the hints written next to the ARC-4 spec).
+
+@Subroutine(TealType.bytes)
+def project_box(project_id):
+    return Concat(Bytes(PROJECT_BOX_PREFIX), Itob(project_id))
+
+@Subroutine(TealType.bytes)
+def uint16(value):
+    return Extract(Itob(value), Int(6), Int(2))
+
+# Each backer's contribution and reward NFT live in a ledger box per
+# (project, backer), so backing a project needs no opt-in and one account can
+# back any number of projects. The box minimum balance comes out of the first
+# contribution and is paid back with the refund.
+@Subroutine(TealType.bytes)
+def ledger_box(project_id, backer):
+    return Concat(Bytes(LEDGER_BOX_PREFIX), Itob(project_id), backer)
+
+def box_uint(box, offset):
+    return Btoi(App.box_extract(box, Int(offset), Int(8)))
+
+# Running totals: uint64 counters patched in place in a box or global state
+def box_add(box, offset, amount):
+    return App.box_replace(box, Int(offset), Itob(box_uint(box, offset) + amount))
+
+def box_sub(box, offset, amount):
+    return App.box_replace(box, Int(offset), Itob(box_uint(box, offset) - amount))
+
+def global_add(key, amount):
+    return App.globalPut(Bytes(key), App.globalGet(Bytes(key)) + amount)
+
+def global_sub(key, amount):
+    return App.globalPut(Bytes(key), App.globalGet(Bytes(key)) - amount)
+
+# The totals box of a project's category; the category is the last string
+# in the project box
+@Subroutine(TealType.bytes)
+def project_category_box(box):
+    start = ScratchVar(TealType.uint64)
+    return Seq(
+        start.store(Btoi(App.box_extract(box, Int(CATEGORY_HEAD_OFFSET), Int(2)))),
+        Concat(
+            Bytes(CATEGORY_BOX_PREFIX),
+            App.box_extract(box, start.load() + Int(2), Btoi(App.box_extract(box, start.load(), Int(2))))
+        )
+    )
+
+def record_uint(record, offset):
+    return ExtractUint64(record, Int(offset))
+
+def record_active(record):
+    return GetByte(record, Int(ACTIVE_OFFSET))
+
+def record_creator(record):
+    return Extract(record, Int(CREATOR_OFFSET), Int(32))
+
+# The box value of a project, as an ARC-4 type (see PROJECT_TYPE)
+class Project(abi.NamedTuple):
+    target: abi.Field[abi.Uint64]
+    deadline: abi.Field[abi.Uint64]
+    collected: abi.Field[abi.Uint64]
+    threshold: abi.Field[abi.Uint64]
+    active: abi.Field[abi.Uint8]
+    creator: abi.Field[abi.Address]
+    name: abi.Field[abi.String]
+    desc: abi.Field[abi.String]
+    category: abi.Field[abi.String]
+    backers: abi.Field[abi.Uint64]
+
+def pay(receiver, amount):
+    return Seq(
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: receiver,
+            TxnField.amount: amount,
+            TxnField.fee: Int(0)
+        }),
+        InnerTxnBuilder.Submit()
+    )
+
+router = Router(
+    "crowdfunding",
+    BareCallActions(
+        no_op=OnCompleteAction.create_only(Seq(
+            *[App.globalPut(Bytes(key), Int(0)) for key in GLOBAL_UINTS],
+            Approve()
+        )),
+        opt_in=OnCompleteAction.call_only(Approve()),
+        close_out=OnCompleteAction.call_only(Approve()),
+        # UpdateApplication and DeleteApplication are rejected: the program
+        # holds backers' funds, so it never changes. A new release is a new
+        # app that backers move to with move_contribution.
+    ),
+)
+
+# Methods are registered hottest first: the router compares selectors in
+# registration order, so contribute pays for a single comparison.
+
+# Credit one payment to a project, the caller's ledger box and the running
+# totals. The first payment to a project also creates the ledger box, pays
+# for it and counts the caller as a new backer.
+@Subroutine(TealType.none)
+def credit_contribution(project_id, amount):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    ledger = ScratchVar(TealType.bytes)
+    category = ScratchVar(TealType.bytes)
+    credited = ScratchVar(TealType.uint64)
+    return Seq(
+        box.store(project_box(project_id)),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) > Global.latest_timestamp()),  # Deadline not passed
+        Assert(record_active(record.load()) == Int(1)),
+
+        ledger.store(ledger_box(project_id, Txn.sender())),
+        category.store(project_category_box(box.load())),
+        If(App.box_create(ledger.load(), Int(LEDGER_SIZE))).Then(Seq(
+            Assert(amount > Int(LEDGER_BOX_MBR)),
+            credited.store(amount - Int(LEDGER_BOX_MBR)),
+            App.box_replace(box.load(), Int(BACKERS_OFFSET), Itob(record_uint(record.load(), BACKERS_OFFSET) + Int(1))),
+            box_add(category.load(), CATEGORY_BACKERS_OFFSET, Int(1)),
+            global_add("total_backers", Int(1))
+        )).Else(
+            credited.store(amount)
+        ),
+
+        App.box_replace(box.load(), Int(COLLECTED_OFFSET), Itob(record_uint(record.load(), COLLECTED_OFFSET) + credited.load())),
+        box_add(ledger.load(), LEDGER_AMOUNT_OFFSET, credited.load()),
+        box_add(category.load(), CATEGORY_RAISED_OFFSET, credited.load()),
+        global_add("total_raised", credited.load())
+    )
+
+@router.method
+def contribute(payment: abi.PaymentTransaction, project_id: abi.Uint64):
+    return Seq(
+        Assert(payment.get().receiver() == Global.current_application_address()),
+        Assert(payment.get().sender() == Txn.sender()),
+        credit_contribution(project_id.get(), payment.get().amount())
+    )
+
+# Fund several projects in one app call: the group is up to MAX_BATCH
+# payments followed by this call, and project_ids[i] tags payment i. Batches
+# that need more than one app call's budget top it up with op-up inner calls
+# paid through fee pooling.
+@router.method
+def contribute_many(project_ids: abi.DynamicArray[abi.Uint64]):
+    i = ScratchVar(TealType.uint64)
+    project_id = abi.Uint64()
+    return Seq(
+        Assert(project_ids.length() <= Int(MAX_BATCH)),
+        Assert(project_ids.length() == Txn.group_index()),
+        OpUp(OpUpMode.OnCall).ensure_budget(
+            Int(CONTRIBUTION_BUDGET) * (project_ids.length() + Int(1)),
+            OpUpFeeSource.GroupCredit
+        ),
+
+        For(i.store(Int(0)), i.load() < project_ids.length(), i.store(i.load() + Int(1))).Do(Seq(
+            Assert(Gtxn[i.load()].type_enum() == TxnType.Payment),
+            Assert(Gtxn[i.load()].receiver() == Global.current_application_address()),
+            Assert(Gtxn[i.load()].sender() == Txn.sender()),
+            project_ids[i.load()].store_into(project_id),
+            credit_contribution(project_id.get(), Gtxn[i.load()].amount())
+        ))
+    )
+
+@router.method
+def create_project(
+    payment: abi.PaymentTransaction,
+    name: abi.String,
+    desc: abi.String,
+    target: abi.Uint64,
+    deadline: abi.Uint64,
+    category: abi.String,
+    threshold: abi.Uint64,
+    *,
+    output: abi.Uint64
+):
+    project_id = ScratchVar(TealType.uint64)
+    box = ScratchVar(TealType.bytes)
+    value = ScratchVar(TealType.bytes)
+    category_box = ScratchVar(TealType.bytes)
+    storage_cost = ScratchVar(TealType.uint64)
+    return Seq(
+        Assert(payment.get().receiver() == Global.current_application_address()),
+        Assert(target.get() > Int(0)),
+        Assert(deadline.get() > Global.latest_timestamp()),
+        Assert(threshold.get() > Int(0)),
+        Assert(category.length() <= Int(MAX_CATEGORY_LENGTH)),
+
+        project_id.store(App.globalGet(Bytes("project_count"))),
+        box.store(project_box(project_id.load())),
+        # Strings arrive ABI-encoded (length-prefixed), so they are copied as is
+        value.store(Concat(
+            target.encode(),
+            deadline.encode(),
+            Itob(Int(0)),
+            threshold.encode(),
+            Bytes(b"\x01"),
+            Txn.sender(),
+            uint16(Int(RECORD_HEAD_SIZE)),
+            uint16(Int(RECORD_HEAD_SIZE) + Len(name.encode())),
+            uint16(Int(RECORD_HEAD_SIZE) + Len(name.encode()) + Len(desc.encode())),
+            Itob(Int(0)),
+            name.encode(),
+            desc.encode(),
+            category.encode()
+        )),
+
+        # The creator pays for the storage the project occupies, including the
+        # totals box of a category that did not exist yet
+        storage_cost.store(Int(BOX_FLAT_MBR) + Int(BOX_BYTE_MBR) * (Len(box.load()) + Len(value.load()))),
+        category_box.store(Concat(Bytes(CATEGORY_BOX_PREFIX), category.get())),
+        If(App.box_create(category_box.load(), Int(CATEGORY_STATS_SIZE))).Then(
+            storage_cost.store(storage_cost.load() + Int(BOX_FLAT_MBR) + Int(BOX_BYTE_MBR) * (Len(category_box.load()) + Int(CATEGORY_STATS_SIZE)))
+        ),
+        Assert(payment.get().amount() >= storage_cost.load()),
+        Assert(App.box_create(box.load(), Len(value.load()))),
+        App.box_replace(box.load(), Int(0), value.load()),
+
+        box_add(category_box.load(), CATEGORY_PROJECTS_OFFSET, Int(1)),
+        App.globalPut(Bytes("project_count"), project_id.load() + Int(1)),
+        output.set(project_id.load())
+    )
+
+@router.method
+def withdraw(project_id: abi.Uint64):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    return Seq(
+        box.store(project_box(project_id.get())),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+
+        Assert(record_uint(record.load(), COLLECTED_OFFSET) >= record_uint(record.load(), TARGET_OFFSET)),  # Target reached
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) <= Global.latest_timestamp()),  # Deadline passed
+        Assert(record_active(record.load()) == Int(1)),
+        Assert(Txn.sender() == record_creator(record.load())),
+
+        App.box_replace(box.load(), Int(ACTIVE_OFFSET), Bytes(b"\x00")),
+        global_add("funded_projects", Int(1)),
+        global_add("total_withdrawn", record_uint(record.load(), COLLECTED_OFFSET)),
+        pay(Txn.sender(), record_uint(record.load(), COLLECTED_OFFSET))
+    )
+
+@router.method
+def refund(project_id: abi.Uint64):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    ledger = ScratchVar(TealType.bytes)
+    category = ScratchVar(TealType.bytes)
+    amount = ScratchVar(TealType.uint64)
+    return Seq(
+        box.store(project_box(project_id.get())),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+
+        Assert(record_uint(record.load(), COLLECTED_OFFSET) < record_uint(record.load(), TARGET_OFFSET)),  # Target not reached
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) <= Global.latest_timestamp()),  # Deadline passed
+        Assert(record_active(record.load()) == Int(1)),
+
+        ledger.store(ledger_box(project_id.get(), Txn.sender())),
+        amount.store(box_uint(ledger.load(), LEDGER_AMOUNT_OFFSET)),
+        Assert(amount.load() > Int(0)),
+
+        # The backer leaves the project and the totals
+        App.box_replace(box.load(), Int(BACKERS_OFFSET), Itob(record_uint(record.load(), BACKERS_OFFSET) - Int(1))),
+        category.store(project_category_box(box.load())),
+        box_sub(category.load(), CATEGORY_RAISED_OFFSET, amount.load()),
+        box_sub(category.load(), CATEGORY_BACKERS_OFFSET, Int(1)),
+        global_sub("total_raised", amount.load()),
+        global_sub("total_backers", Int(1)),
+
+        # Deleting the ledger box frees its minimum balance, which goes back too
+        Pop(App.box_delete(ledger.load())),
+        pay(Txn.sender(), amount.load() + Int(LEDGER_BOX_MBR))
+    )
+
+# Read a project's name: the first string in the tail, right after the head
+def record_name(box):
+    return App.box_extract(
+        box,
+        Int(RECORD_HEAD_SIZE + 2),
+        Btoi(App.box_extract(box, Int(RECORD_HEAD_SIZE), Int(2)))
+    )
+
+# Create the reward NFT for one backer and remember it in their ledger box.
+# The app keeps the NFT until the backer opts in and calls claim_nft: an
+# account cannot receive an asset that did not exist when it opted in.
+# Each asset the app creates raises its minimum balance by ASSET_MBR, which
+# the minting call's grouped payment covers.
+@Subroutine(TealType.uint64)
+def mint_reward(project_id, asset_name, backer, ledger):
+    return Seq(
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetConfig,
+            TxnField.config_asset_total: Int(1),
+            TxnField.config_asset_decimals: Int(0),
+            TxnField.config_asset_default_frozen: Int(0),
+            TxnField.config_asset_unit_name: Bytes("RWDNFT"),
+            TxnField.config_asset_name: asset_name,
+            TxnField.config_asset_url: Concat(
+                Bytes("ipfs://"),
+                Sha256(Concat(Bytes("metadata"), Itob(project_id), backer))
+            ),
+            TxnField.fee: Int(0)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        App.box_replace(ledger, Int(LEDGER_NFT_OFFSET), Itob(InnerTxn.created_asset_id())),
+        InnerTxn.created_asset_id()
+    )
+
+@router.method
+def mint_nft(payment: abi.PaymentTransaction, project_id: abi.Uint64, *, output: abi.Uint64):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    ledger = ScratchVar(TealType.bytes)
+    return Seq(
+        Assert(payment.get().receiver() == Global.current_application_address()),
+        Assert(payment.get().amount() >= Int(ASSET_MBR)),
+
+        box.store(project_box(project_id.get())),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+
+        Assert(record_uint(record.load(), COLLECTED_OFFSET) >= record_uint(record.load(), TARGET_OFFSET)),  # Target reached
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) <= Global.latest_timestamp()),  # Deadline passed
+
+        ledger.store(ledger_box(project_id.get(), Txn.sender())),
+        Assert(box_uint(ledger.load(), LEDGER_AMOUNT_OFFSET) >= record_uint(record.load(), THRESHOLD_OFFSET)),
+        Assert(box_uint(ledger.load(), LEDGER_NFT_OFFSET) == Int(0)),
+
+        output.set(mint_reward(
+            project_id.get(),
+            Concat(Bytes("Reward NFT - "), record_name(box.load())),
+            Txn.sender(),
+            ledger.load()
+        ))
+    )
+
+# Keeper pass: mint the reward for every backer in the list. The caller pays
+# one inner transaction per backer through fee pooling (plus any op-up calls)
+# and ASSET_MBR per minted NFT with the grouped payment. Backers without a
+# ledger box, below the threshold or already rewarded are skipped, so a page
+# computed off-chain from slightly stale state is still safe to submit.
+@router.method
+def mint_nfts(payment: abi.PaymentTransaction, project_id: abi.Uint64, backers: abi.DynamicArray[abi.Address], *,
+              output: abi.Uint64):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    asset_name = ScratchVar(TealType.bytes)
+    ledger = ScratchVar(TealType.bytes)
+    i = ScratchVar(TealType.uint64)
+    minted = ScratchVar(TealType.uint64)
+    backer = abi.Address()
+    ledger_value = App.box_get(ledger.load())
+    return Seq(
+        Assert(payment.get().receiver() == Global.current_application_address()),
+        Assert(backers.length() < Int(MAX_BOX_REFERENCES)),
+        OpUp(OpUpMode.OnCall).ensure_budget(
+            Int(MINT_BUDGET) * (backers.length() + Int(1)),
+            OpUpFeeSource.GroupCredit
+        ),
+
+        box.store(project_box(project_id.get())),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+
+        Assert(record_uint(record.load(), COLLECTED_OFFSET) >= record_uint(record.load(), TARGET_OFFSET)),  # Target reached
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) <= Global.latest_timestamp()),  # Deadline passed
+
+        asset_name.store(Concat(Bytes("Reward NFT - "), record_name(box.load()))),
+        minted.store(Int(0)),
+        For(i.store(Int(0)), i.load() < backers.length(), i.store(i.load() + Int(1))).Do(Seq(
+            backers[i.load()].store_into(backer),
+            ledger.store(ledger_box(project_id.get(), backer.get())),
+            ledger_value,
+            If(And(
+                ledger_value.hasValue(),
+                ExtractUint64(ledger_value.value(), Int(LEDGER_AMOUNT_OFFSET)) >= record_uint(record.load(), THRESHOLD_OFFSET),
+                ExtractUint64(ledger_value.value(), Int(LEDGER_NFT_OFFSET)) == Int(0)
+            )).Then(Seq(
+                Pop(mint_reward(project_id.get(), asset_name.load(), backer.get(), ledger.load())),
+                minted.store(minted.load() + Int(1))
+            ))
+        )),
+
+        Assert(payment.get().amount() >= Int(ASSET_MBR) * minted.load()),
+        # Number of NFTs minted by this call
+        output.set(minted.load())
+    )
+
+@router.method
+def claim_nft(project_id: abi.Uint64, asset: abi.Asset):
+    balance = AssetHolding.balance(Global.current_application_address(), asset.asset_id())
+    return Seq(
+        Assert(box_uint(ledger_box(project_id.get(), Txn.sender()), LEDGER_NFT_OFFSET) == asset.asset_id()),
+        balance,
+        Assert(balance.value() == Int(1)),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: asset.asset_id(),
+            TxnField.asset_receiver: Txn.sender(),
+            TxnField.asset_amount: Int(1),
+            TxnField.fee: Int(0)
+        }),
+        InnerTxnBuilder.Submit()
+    )
+
+# Read-only views, meant to be called through algod's simulate endpoint. Box
+# values already are ARC-4 encoded Project tuples, so they are returned as is.
+@router.method
+def get_project(project_id: abi.Uint64, *, output: Project):
+    contents = App.box_get(project_box(project_id.get()))
+    return Seq(
+        contents,
+        Assert(contents.hasValue()),
+        output.decode(contents.value())
+    )
+
+# Return projects start, start + 1, ... (at most count, and no more than fit
+# in the 1 KB return log); callers continue from start + len(result).
+@router.method
+def list_projects(start: abi.Uint64, count: abi.Uint64, *, output: abi.DynamicArray[Project]):
+    end = ScratchVar(TealType.uint64)
+    i = ScratchVar(TealType.uint64)
+    n = ScratchVar(TealType.uint64)
+    value = ScratchVar(TealType.bytes)
+    offsets = ScratchVar(TealType.bytes)
+    heads = ScratchVar(TealType.bytes)
+    tails = ScratchVar(TealType.bytes)
+    contents = App.box_get(project_box(i.load()))
+    return Seq(
+        Assert(count.get() <= Int(MAX_BOX_REFERENCES)),
+        end.store(start.get() + count.get()),
+        If(end.load() > App.globalGet(Bytes("project_count")), end.store(App.globalGet(Bytes("project_count")))),
+
+        n.store(Int(0)),
+        offsets.store(Bytes("")),
+        tails.store(Bytes("")),
+        For(i.store(start.get()), i.load() < end.load(), i.store(i.load() + Int(1))).Do(Seq(
+            contents,
+            value.store(contents.value()),
+            # Length prefix, one uint16 head per element, then the records
+            If(Int(2) + Int(2) * (n.load() + Int(1)) + Len(tails.load()) + Len(value.load()) > Int(MAX_RETURN_SIZE),
+               Break()),
+            offsets.store(Concat(offsets.load(), uint16(Len(tails.load())))),
+            tails.store(Concat(tails.load(), value.load())),
+            n.store(n.load() + Int(1))
+        )),
+
+        # Element offsets are relative to the end of the length prefix
+        heads.store(Bytes("")),
+        For(i.store(Int(0)), i.load() < n.load(), i.store(i.load() + Int(1))).Do(
+            heads.store(Concat(heads.load(), uint16(Int(2) * n.load() + ExtractUint16(offsets.load(), Int(2) * i.load()))))
+        ),
+        output.decode(Concat(uint16(n.load()), heads.load(), tails.load()))
+    )
+
+# Name the app that succeeds this one (a later release). Creator only, and
+# only once, so backers can check the successor's program before they move.
+@router.method
+def set_successor(successor: abi.Application):
+    return Seq(
+        Assert(Txn.sender() == Global.creator_address()),
+        Assert(App.globalGet(Bytes(SUCCESSOR_KEY)) == Int(0)),
+        App.globalPut(Bytes(SUCCESSOR_KEY), successor.application_id())
+    )
+
+# Move the caller's contribution to a project into the successor app while the
+# campaign runs. The funds only leave together with their re-contribution:
+# the next two transactions of the group must be the caller's payment of all
+# of it to the successor and the successor's contribute call. The backer
+# leaves this project and the totals as with a refund.
+@router.method
+def move_contribution(project_id: abi.Uint64, successor: abi.Application):
+    box = ScratchVar(TealType.bytes)
+    record = ScratchVar(TealType.bytes)
+    ledger = ScratchVar(TealType.bytes)
+    category = ScratchVar(TealType.bytes)
+    amount = ScratchVar(TealType.uint64)
+    payment = Txn.group_index() + Int(1)
+    call = Txn.group_index() + Int(2)
+    successor_address = AppParam.address(successor.application_id())
+    return Seq(
+        Assert(successor.application_id() == App.globalGet(Bytes(SUCCESSOR_KEY))),
+        Assert(successor.application_id() != Int(0)),
+
+        box.store(project_box(project_id.get())),
+        record.store(App.box_extract(box.load(), Int(0), Int(RECORD_SIZE))),
+        Assert(record_uint(record.load(), DEADLINE_OFFSET) > Global.latest_timestamp()),  # Campaign still running
+        Assert(record_active(record.load()) == Int(1)),
+
+        ledger.store(ledger_box(project_id.get(), Txn.sender())),
+        amount.store(box_uint(ledger.load(), LEDGER_AMOUNT_OFFSET)),
+        Assert(amount.load() > Int(0)),
+
+        successor_address,
+        Assert(Global.group_size() > call),
+        Assert(Gtxn[payment].type_enum() == TxnType.Payment),
+        Assert(Gtxn[payment].sender() == Txn.sender()),
+        Assert(Gtxn[payment].receiver() == successor_address.value()),
+        Assert(Gtxn[payment].amount() >= amount.load() + Int(LEDGER_BOX_MBR)),
+        Assert(Gtxn[call].type_enum() == TxnType.ApplicationCall),
+        Assert(Gtxn[call].application_id() == successor.application_id()),
+        Assert(Gtxn[call].sender() == Txn.sender()),
+        Assert(Gtxn[call].application_args[0] == MethodSignature("contribute(pay,uint64)void")),
+
+        App.box_replace(box.load(), Int(COLLECTED_OFFSET), Itob(record_uint(record.load(), COLLECTED_OFFSET) - amount.load())),
+        App.box_replace(box.load(), Int(BACKERS_OFFSET), Itob(record_uint(record.load(), BACKERS_OFFSET) - Int(1))),
+        category.store(project_category_box(box.load())),
+        box_sub(category.load(), CATEGORY_RAISED_OFFSET, amount.load()),
+        box_sub(category.load(), CATEGORY_BACKERS_OFFSET, Int(1)),
+        global_sub("total_raised", amount.load()),
+        global_sub("total_backers", Int(1)),
+
+        Pop(App.box_delete(ledger.load())),
+        pay(Txn.sender(), amount.load() + Int(LEDGER_BOX_MBR))
+    )
+
+# Call hints for the generated client: which boxes each method touches and
+# how many inner transactions its fee has to cover. Read-only methods are
+# simulated rather than sent.
+HINTS = {
+    "contribute": {"boxes": [{"prefix": "p", "arg": "project_id"},
+                             {"prefix": "c", "arg": "project_id", "sender": True},
+                             {"prefix": "g", "arg": "project_id", "record_field": "category"}]},
+    "contribute_many": {"boxes": [{"prefix": "p", "arg": "project_ids"},
+                                  {"prefix": "c", "arg": "project_ids", "sender": True},
+                                  {"prefix": "g", "arg": "project_ids", "record_field": "category"}]},
+    "create_project": {"boxes": [{"prefix": "p", "global": "project_count"},
+                                 {"prefix": "g", "str_arg": "category"}]},
+    "withdraw": {"boxes": [{"prefix": "p", "arg": "project_id"}], "inner_txns": 1},
+    "refund": {"boxes": [{"prefix": "p", "arg": "project_id"},
+                         {"prefix": "c", "arg": "project_id", "sender": True},
+                         {"prefix": "g", "arg": "project_id", "record_field": "category"}], "inner_txns": 1},
+    "mint_nft": {"boxes": [{"prefix": "p", "arg": "project_id"},
+                           {"prefix": "c", "arg": "project_id", "sender": True}], "inner_txns": 1},
+    "mint_nfts": {"boxes": [{"prefix": "p", "arg": "project_id"},
+                            {"prefix": "c", "arg": "project_id", "address_arg": "backers"}]},
+    "claim_nft": {"boxes": [{"prefix": "c", "arg": "project_id", "sender": True}], "inner_txns": 1},
+    "move_contribution": {"boxes": [{"prefix": "p", "arg": "project_id"},
+                                    {"prefix": "c", "arg": "project_id", "sender": True},
+                                    {"prefix": "g", "arg": "project_id", "record_field": "category"}], "inner_txns": 1},
+    "get_project": {"boxes": [{"prefix": "p", "arg": "project_id"}], "readonly": True},
+    "list_projects": {"boxes": [{"prefix": "p", "arg": "start", "count_arg": "count"}], "readonly": True},
+}
+
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
+if __name__ == "__main__":
+    import build
+    build.main(["crowdfunding_abi", "--force"])
@@ -0,0 +1,109 @@
+"""
+Client for the "crowdfunding" contract.
+
+Generated by generate_client.py from crowdfunding_abi.json - do not edit by hand.
+"""
+
+from algosdk import abi
+
+from app_client import ApplicationClient
+
+CONTRACT = abi.Contract.from_json('{"name": "crowdfunding", "methods": [{"name": "contribute", "args": [{"type": "pay", "name": "payment"}, {"type": "uint64", "name": "project_id"}], "returns": {"type": "void"}}, {"name": "contribute_many", "args": [{"type": "uint64[]", "name": "project_ids"}], "returns": {"type": "void"}}, {"name": "create_project", "args": [{"type": "pay", "name": "payment"}, {"type": "string", "name": "name"}, {"type": "string", "name": "desc"}, {"type": "uint64", "name": "target"}, {"type": "uint64", "name": "deadline"}, {"type": "string", "name": "category"}, {"type": "uint64", "name": "threshold"}], "returns": {"type": "uint64"}}, {"name": "withdraw", "args": [{"type": "uint64", "name": "project_id"}], "returns": {"type": "void"}}, {"name": "refund", "args": [{"type": "uint64", "name": "project_id"}], "returns": {"type": "void"}}, {"name": "mint_nft", "args": [{"type": "pay", "name": "payment"}, {"type": "uint64", "name": "project_id"}], "returns": {"type": "uint64"}}, {"name": "mint_nfts", "args": [{"type": "pay", "name": "payment"}, {"type": "uint64", "name": "project_id"}, {"type": "address[]", "name": "backers"}], "returns": {"type": "uint64"}}, {"name": "claim_nft", "args": [{"type": "uint64", "name": "project_id"}, {"type": "asset", "name": "asset"}], "returns": {"type": "void"}}, {"name": "get_project", "args": [{"type": "uint64", "name": "project_id"}], "returns": {"type": "(uint64,uint64,uint64,uint64,uint8,address,string,string,string,uint64)"}}, {"name": "list_projects", "args": [{"type": "uint64", "name": "start"}, {"type": "uint64", "name": "count"}], "returns": {"type": "(uint64,uint64,uint64,uint64,uint8,address,string,string,string,uint64)[]"}}, {"name": "set_successor", "args": [{"type": "application", "name": "successor"}], "returns": {"type": "void"}}, {"name": "move_contribution", "args": [{"type": "uint64", "name": "project_id"}, {"type": "application", "name": "successor"}], "returns": {"type": "void"}}], "networks": {}}')
+
+HINTS = {'contribute': {'boxes': [{'prefix': 'p', 'arg': 'project_id'},
+                          {'prefix': 'c', 'arg': 'project_id', 'sender': True},
+                          {'prefix': 'g',
+                           'arg': 'project_id',
+                           'record_field': 'category'}]},
+ 'contribute_many': {'boxes': [{'prefix': 'p', 'arg': 'project_ids'},
+                               {'prefix': 'c',
+                                'arg': 'project_ids',
+                                'sender': True},
+                               {'prefix': 'g',
+                                'arg': 'project_ids',
+                                'record_field': 'category'}]},
+ 'create_project': {'boxes': [{'prefix': 'p', 'global': 'project_count'},
+                              {'prefix': 'g', 'str_arg': 'category'}]},
+ 'withdraw': {'boxes': [{'prefix': 'p', 'arg': 'project_id'}], 'inner_txns': 1},
+ 'refund': {'boxes': [{'prefix': 'p', 'arg': 'project_id'},
+                      {'prefix': 'c', 'arg': 'project_id', 'sender': True},
+                      {'prefix': 'g',
+                       'arg': 'project_id',
+                       'record_field': 'category'}],
+            'inner_txns': 1},
+ 'mint_nft': {'boxes': [{'prefix': 'p', 'arg': 'project_id'},
+                        {'prefix': 'c', 'arg': 'project_id', 'sender': True}],
+              'inner_txns': 1},
+ 'mint_nfts': {'boxes': [{'prefix': 'p', 'arg': 'project_id'},
+                         {'prefix': 'c',
+                          'arg': 'project_id',
+                          'address_arg': 'backers'}]},
+ 'claim_nft': {'boxes': [{'prefix': 'c', 'arg': 'project_id', 'sender': True}],
+               'inner_txns': 1},
+ 'move_contribution': {'boxes': [{'prefix': 'p', 'arg': 'project_id'},
+                                 {'prefix': 'c',
+                                  'arg': 'project_id',
+                                  'sender': True},
+                                 {'prefix': 'g',
+                                  'arg': 'project_id',
+                                  'record_field': 'category'}],
+                       'inner_txns': 1},
+ 'get_project': {'boxes': [{'prefix': 'p', 'arg': 'project_id'}],
+                 'readonly': True},
+ 'list_projects': {'boxes': [{'prefix': 'p',
+                              'arg': 'start',
+                              'count_arg': 'count'}],
+                   'readonly': True}}
+
+
+class CrowdfundingClient(ApplicationClient):
+    contract = CONTRACT
+    hints = HINTS
+
+    def contribute(self, payment, project_id, **kwargs):
+        """contribute(pay,uint64)void"""
+        return self.call("contribute", payment, project_id, **kwargs)
+
+    def contribute_many(self, project_ids, **kwargs):
+        """contribute_many(uint64[])void"""
+        return self.call("contribute_many", project_ids, **kwargs)
+
+    def create_project(self, payment, name, desc, target, deadline, category, threshold, **kwargs):
+        """create_project(pay,string,string,uint64,uint64,string,uint64)uint64"""
+        return self.call("create_project", payment, name, desc, target, deadline, category, threshold, **kwargs)
+
+    def withdraw(self, project_id, **kwargs):
+        """withdraw(uint64)void"""
+        return self.call("withdraw", project_id, **kwargs)
+
+    def refund(self, project_id, **kwargs):
+        """refund(uint64)void"""
+        return self.call("refund", project_id, **kwargs)
+
+    def mint_nft(self, payment, project_id, **kwargs):
+        """mint_nft(pay,uint64)uint64"""
+        return self.call("mint_nft", payment, project_id, **kwargs)
+
+    def mint_nfts(self, payment, project_id, backers, **kwargs):
+        """mint_nfts(pay,uint64,address[])uint64"""
+        return self.call("mint_nfts", payment, project_id, backers, **kwargs)
+
+    def claim_nft(self, project_id, asset, **kwargs):
+        """claim_nft(uint64,asset)void"""
+        return self.call("claim_nft", project_id, asset, **kwargs)
+
+    def get_project(self, project_id, **kwargs):
+        """get_project(uint64)(uint64,uint64,uint64,uint64,uint8,address,string,string,string,uint64)"""
+        return self.call("get_project", project_id, **kwargs)
+
+    def list_projects(self, start, count, **kwargs):
+        """list_projects(uint64,uint64)(uint64,uint64,uint64,uint64,uint8,address,string,string,string,uint64)[]"""
+        return self.call("list_projects", start, count, **kwargs)
+
+    def set_successor(self, successor, **kwargs):
+        """set_successor(application)void"""
+        return self.call("set_successor", successor, **kwargs)
+
+    def move_contribution(self, project_id, successor, **kwargs):
+        """move_contribution(uint64,application)void"""
+        return self.call("move_contribution", project_id, successor, **kwargs)
@@ -0,0 +1,320 @@
+from pyteal import *
+from project_layout import *
+
+TEAL_VERSION = 8
+
+def approval_program():
+    # Crowdfunding contract that keeps every project in its own box so the
+    # number of projects is bounded by the app balance, not the global schema
+    project_id = ScratchVar(TealType.uint64)
+    project_box_key = ScratchVar(TealType.bytes)
+    project_record = ScratchVar(TealType.bytes)
+    project_value = ScratchVar(TealType.bytes)
+    contrib_key = ScratchVar(TealType.bytes)
+    nft_key = ScratchVar(TealType.bytes)
+    contributor_amount = ScratchVar(TealType.uint64)
+    successor_address = AppParam.address(Txn.applications[1])
+
+    @Subroutine(TealType.bytes)
+    def project_box(id):
+        return Concat(Bytes(PROJECT_BOX_PREFIX), Itob(id))
+
+    @Subroutine(TealType.bytes)
+    def contributor_key(project_id, contributor):
+        return Concat(Bytes("contrib_"), Itob(project_id), Bytes("_"), contributor)
+
+    @Subroutine(TealType.bytes)
+    def uint16(value):
+        return Extract(Itob(value), Int(6), Int(2))
+
+    # Load the fixed-width part of the project record with a single box read;
+    # the project id and box name are computed once and reused by every branch
+    @Subroutine(TealType.none)
+    def load_project():
+        return Seq(
+            project_id.store(Btoi(Txn.application_args[1])),
+            project_box_key.store(project_box(project_id.load())),
+            project_record.store(App.box_extract(project_box_key.load(), Int(0), Int(RECORD_SIZE)))
+        )
+
+    project_target = ExtractUint64(project_record.load(), Int(TARGET_OFFSET))
+    project_deadline = ExtractUint64(project_record.load(), Int(DEADLINE_OFFSET))
+    project_collected = ExtractUint64(project_record.load(), Int(COLLECTED_OFFSET))
+    reward_threshold = ExtractUint64(project_record.load(), Int(THRESHOLD_OFFSET))
+    project_active = GetByte(project_record.load(), Int(ACTIVE_OFFSET))
+    project_creator = Extract(project_record.load(), Int(CREATOR_OFFSET), Int(32))
+    project_backers = ExtractUint64(project_record.load(), Int(BACKERS_OFFSET))
+
+    # Application creation
+    handle_creation = Seq([
+        App.globalPut(Bytes("project_count"), Int(0)),
+        Return(Int(1))
+    ])
+
+    handle_optin = Return(Int(1))
+    handle_closeout = Return(Int(1))
+    handle_updateapp = Return(Int(0))
+    handle_deleteapp = Return(Int(0))
+
+    name = Txn.application_args[1]
+    desc = Txn.application_args[2]
+    category = Txn.application_args[5]
+
+    # Create project: [payment covering the box MBR, app call]
+    create_project = Seq([
+        Assert(Global.group_size() == Int(2)),
+        Assert(Txn.group_index() == Int(1)),
+        Assert(Txn.application_args.length() == Int(7)),  # name, desc, target, deadline, category, threshold
+        Assert(Gtxn[0].type_enum() == TxnType.Payment),
+        Assert(Gtxn[0].receiver() == Global.current_application_address()),
+        Assert(Btoi(Txn.application_args[3]) > Int(0)),  # target must be positive
+        Assert(Btoi(Txn.application_args[4]) > Global.latest_timestamp()),  # deadline must be in future
+        Assert(Btoi(Txn.application_args[6]) > Int(0)),  # threshold must be positive
+
+        project_id.store(App.globalGet(Bytes("project_count"))),
+        project_box_key.store(project_box(project_id.load())),
+        project_value.store(Concat(
+            Itob(Btoi(Txn.application_args[3])),
+            Itob(Btoi(Txn.application_args[4])),
+            Itob(Int(0)),
+            Itob(Btoi(Txn.application_args[6])),
+            Bytes(b"\x01"),
+            Txn.sender(),
+            uint16(Int(RECORD_HEAD_SIZE)),
+            uint16(Int(RECORD_HEAD_SIZE + 2) + Len(name)),
+            uint16(Int(RECORD_HEAD_SIZE + 4) + Len(name) + Len(desc)),
+            Itob(Int(0)),
+            uint16(Len(name)), name,
+            uint16(Len(desc)), desc,
+            uint16(Len(category)), category
+        )),
+
+        # The creator pays for the storage the project occupies
+        Assert(Gtxn[0].amount() >= Int(BOX_FLAT_MBR) + Int(BOX_BYTE_MBR) * (Len(project_box_key.load()) + Len(project_value.load()))),
+
+        Assert(App.box_create(project_box_key.load(), Len(project_value.load()))),
+        App.box_replace(project_box_key.load(), Int(0), project_value.load()),
+
+        App.globalPut(Bytes("project_count"), project_id.load() + Int(1)),
+        Return(Int(1))
+    ])
+
+    # Contribute to project
+    contribute = Seq([
+        Assert(Global.group_size() == Int(2)),
+        Assert(Txn.group_index() == Int(1)),
+        Assert(Gtxn[0].type_enum() == TxnType.Payment),
+        Assert(Gtxn[0].receiver() == Global.current_application_address()),
+        Assert(Gtxn[0].sender() == Txn.sender()),
+
+        load_project(),
+        contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
+
+        Assert(project_deadline > Global.latest_timestamp()),  # Deadline not passed
+        Assert(project_active == Int(1)),
+
+        # Update collected amount in place
+        App.box_replace(project_box_key.load(), Int(COLLECTED_OFFSET), Itob(project_collected + Gtxn[0].amount())),
+
+        # Update contributor amount; a first contribution adds a backer
+        contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
+        If(contributor_amount.load() == Int(0),
+           App.box_replace(project_box_key.load(), Int(BACKERS_OFFSET), Itob(project_backers + Int(1)))),
+        App.localPut(Txn.sender(), contrib_key.load(), contributor_amount.load() + Gtxn[0].amount()),
+
+        Return(Int(1))
+    ])
+
+    # Withdraw funds (creator only)
+    withdraw = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+
+        load_project(),
+
+        Assert(project_collected >= project_target),  # Target reached
+        Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+        Assert(project_active == Int(1)),
+        Assert(Txn.sender() == project_creator),
+
+        # Mark project as inactive
+        App.box_replace(project_box_key.load(), Int(ACTIVE_OFFSET), Bytes(b"\x00")),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: Txn.sender(),
+            TxnField.amount: project_collected,
+            TxnField.fee: Int(1000)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        Return(Int(1))
+    ])
+
+    # Claim refund
+    refund = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+
+        load_project(),
+        contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
+
+        Assert(project_collected < project_target),  # Target not reached
+        Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+        Assert(project_active == Int(1)),
+
+        contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
+        Assert(contributor_amount.load() > Int(0)),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: Txn.sender(),
+            TxnField.amount: contributor_amount.load(),
+            TxnField.fee: Int(1000)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        App.localPut(Txn.sender(), contrib_key.load(), Int(0)),
+        App.box_replace(project_box_key.load(), Int(BACKERS_OFFSET), Itob(project_backers - Int(1))),
+
+        Return(Int(1))
+    ])
+
+    # Mint reward NFT
+    mint_nft = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+
+        load_project(),
+        nft_key.store(Concat(Bytes("nft_"), Itob(project_id.load()))),
+
+        Assert(project_collected >= project_target),  # Target reached
+        Assert(project_deadline <= Global.latest_timestamp()),  # Deadline passed
+
+        contributor_amount.store(App.localGet(Txn.sender(), contributor_key(project_id.load(), Txn.sender()))),
+        Assert(contributor_amount.load() >= reward_threshold),
+
+        Assert(App.localGet(Txn.sender(), nft_key.load()) == Int(0)),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetConfig,
+            TxnField.config_asset_total: Int(1),
+            TxnField.config_asset_decimals: Int(0),
+            TxnField.config_asset_default_frozen: Int(0),
+            TxnField.config_asset_unit_name: Bytes("RWDNFT"),
+            TxnField.config_asset_name: Concat(
+                Bytes("Reward NFT - "),
+                # The name is the first string in the tail, right after the head
+                App.box_extract(
+                    project_box_key.load(),
+                    Int(RECORD_HEAD_SIZE + 2),
+                    Btoi(App.box_extract(project_box_key.load(), Int(RECORD_HEAD_SIZE), Int(2)))
+                )
+            ),
+            TxnField.config_asset_url: Concat(
+                Bytes("ipfs://"),
+                Sha256(Concat(Bytes("metadata"), Itob(project_id.load()), Txn.sender()))
+            ),
+            TxnField.fee: Int(1000)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: InnerTxn.created_asset_id(),
+            TxnField.asset_receiver: Txn.sender(),
+            TxnField.asset_amount: Int(1),
+            TxnField.fee: Int(1000)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        App.localPut(Txn.sender(), nft_key.load(), Int(1)),
+
+        Return(Int(1))
+    ])
+
+    # Name the app running campaigns move to (app creator, once): an ABI app
+    # (crowdfunding_abi.py) that keeps contributions in ledger boxes. Passed
+    # as the first foreign app.
+    set_successor = Seq([
+        Assert(Txn.application_args.length() == Int(1)),
+        Assert(Txn.sender() == Global.creator_address()),
+        Assert(App.globalGet(Bytes(SUCCESSOR_KEY)) == Int(0)),
+        App.globalPut(Bytes(SUCCESSOR_KEY), Txn.applications[1]),
+        Return(Int(1))
+    ])
+
+    # Move the caller's contribution into the successor's ledger while the
+    # campaign runs: the next two transactions of the group must be the
+    # caller's payment of the contribution plus the ledger box deposit to the
+    # successor, and the successor's contribute call
+    move_contribution = Seq([
+        Assert(Txn.application_args.length() == Int(2)),
+        Assert(App.globalGet(Bytes(SUCCESSOR_KEY)) != Int(0)),
+        Assert(Txn.applications[1] == App.globalGet(Bytes(SUCCESSOR_KEY))),
+
+        load_project(),
+        contrib_key.store(contributor_key(project_id.load(), Txn.sender())),
+
+        Assert(project_deadline > Global.latest_timestamp()),  # Campaign still running
+        Assert(project_active == Int(1)),
+
+        contributor_amount.store(App.localGet(Txn.sender(), contrib_key.load())),
+        Assert(contributor_amount.load() > Int(0)),
+
+        successor_address,
+        Assert(Global.group_size() > Txn.group_index() + Int(2)),
+        Assert(Gtxn[Txn.group_index() + Int(1)].type_enum() == TxnType.Payment),
+        Assert(Gtxn[Txn.group_index() + Int(1)].sender() == Txn.sender()),
+        Assert(Gtxn[Txn.group_index() + Int(1)].receiver() == successor_address.value()),
+        Assert(Gtxn[Txn.group_index() + Int(1)].amount() >= contributor_amount.load() + Int(LEDGER_BOX_MBR)),
+        Assert(Gtxn[Txn.group_index() + Int(2)].type_enum() == TxnType.ApplicationCall),
+        Assert(Gtxn[Txn.group_index() + Int(2)].application_id() == Txn.applications[1]),
+        Assert(Gtxn[Txn.group_index() + Int(2)].sender() == Txn.sender()),
+        Assert(Gtxn[Txn.group_index() + Int(2)].application_args[0] == MethodSignature("contribute(pay,uint64)void")),
+
+        App.box_replace(project_box_key.load(), Int(COLLECTED_OFFSET), Itob(project_collected - contributor_amount.load())),
+        App.box_replace(project_box_key.load(), Int(BACKERS_OFFSET), Itob(project_backers - Int(1))),
+        App.localPut(Txn.sender(), contrib_key.load(), Int(0)),
+
+        InnerTxnBuilder.Begin(),
+        InnerTxnBuilder.SetFields({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: Txn.sender(),
+            TxnField.amount: contributor_amount.load(),
+            TxnField.fee: Int(1000)
+        }),
+        InnerTxnBuilder.Submit(),
+
+        Return(Int(1))
+    ])
+
+    handle_noop = Cond(
+        [Txn.application_args[0] == Bytes("create_project"), create_project],
+        [Txn.application_args[0] == Bytes("contribute"), contribute],
+        [Txn.application_args[0] == Bytes("withdraw"), withdraw],
+        [Txn.application_args[0] == Bytes("refund"), refund],
+        [Txn.application_args[0] == Bytes("mint_nft"), mint_nft],
+        [Txn.application_args[0] == Bytes("set_successor"), set_successor],
+        [Txn.application_args[0] == Bytes("move_contribution"), move_contribution]
+    )
+
+    program = Cond(
+        [Txn.application_id() == Int(0), handle_creation],
+        [Txn.on_completion() == OnComplete.OptIn, handle_optin],
+        [Txn.on_completion() == OnComplete.CloseOut, handle_closeout],
+        [Txn.on_completion() == OnComplete.UpdateApplication, handle_updateapp],
+        [Txn.on_completion() == OnComplete.DeleteApplication, handle_deleteapp],
+        [Txn.on_completion() == OnComplete.NoOp, handle_noop]
+    )
+
+    return program
+
+def clear_state_program():
+    return Return(Int(1))
+
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
+if __name__ == "__main__":
+    import build
+    build.main(["crowdfunding_boxes", "--force"])
@@ -1,5 +1,7 @@
 from pyteal import *
 
+TEAL_VERSION = 4
+
 def approval_program():
     handle_creation = Seq([
         App.globalPut(Bytes("count"), Int(0)),
@@ -35,16 +37,7 @@ def approval_program():
 def clear_state_program():
     return Return(Int(1))
 
-# Compile the programs
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
 if __name__ == "__main__":
-    approval_compiled = compileTeal(approval_program(), Mode.Application, version=4)
-    clear_compiled = compileTeal(clear_state_program(), Mode.Application, version=4)
-
-    with open("approval_minimal.teal", "w") as f:
-        f.write(approval_compiled)
-
-    with open("clear_minimal.teal", "w") as f:
-        f.write(clear_compiled)
-
-    print("Minimal smart contract compiled successfully!")
-    print("Files created: approval_minimal.teal, clear_minimal.teal")
+    import build
+    build.main(["crowdfunding_minimal", "--force"])
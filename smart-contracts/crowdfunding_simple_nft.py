@@ -1,7 +1,20 @@
 from pyteal import *
 
+TEAL_VERSION = 8
+
 def approval_program():
     # Simple crowdfunding contract with NFT functionality
+    # The project id and the keys derived from it are computed once per call
+    project_id = ScratchVar(TealType.uint64)
+    project_prefix = ScratchVar(TealType.bytes)
+    contrib_key = ScratchVar(TealType.bytes)
+    nft_key = ScratchVar(TealType.bytes)
+
+    load_project_id = project_id.store(Btoi(Txn.application_args[1]))
+    load_project_prefix = project_prefix.store(Concat(Bytes("p_"), Itob(project_id.load())))
+    load_contrib_key = contrib_key.store(Concat(Bytes("contrib_"), Itob(project_id.load())))
+    load_nft_key = nft_key.store(Concat(Bytes("nft_"), Itob(project_id.load())))
+
     handle_creation = Seq([
         App.globalPut(Bytes("project_count"), Int(0)),
         Return(Int(1))
@@ -16,18 +29,21 @@ def approval_program():
     create_project = Seq([
         Assert(Txn.application_args.length() == Int(6)),
         
+        project_id.store(App.globalGet(Bytes("project_count"))),
+        project_prefix.store(Concat(Bytes("p_"), Itob(project_id.load()))),
+
         # Store basic project data
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_name")), Txn.application_args[1]),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_desc")), Txn.application_args[2]),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_target")), Btoi(Txn.application_args[3])),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_deadline")), Btoi(Txn.application_args[4])),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_category")), Txn.application_args[5]),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_creator")), Txn.sender()),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_collected")), Int(0)),
-        App.globalPut(Concat(Bytes("p_"), Itob(App.globalGet(Bytes("project_count"))), Bytes("_active")), Int(1)),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_name")), Txn.application_args[1]),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_desc")), Txn.application_args[2]),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_target")), Btoi(Txn.application_args[3])),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_deadline")), Btoi(Txn.application_args[4])),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_category")), Txn.application_args[5]),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_creator")), Txn.sender()),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_collected")), Int(0)),
+        App.globalPut(Concat(project_prefix.load(), Bytes("_active")), Int(1)),
         
         # Increment project count
-        App.globalPut(Bytes("project_count"), App.globalGet(Bytes("project_count")) + Int(1)),
+        App.globalPut(Bytes("project_count"), project_id.load() + Int(1)),
         Return(Int(1))
     ])
 
@@ -36,18 +52,22 @@ def approval_program():
         Assert(Global.group_size() == Int(2)),
         Assert(Gtxn[0].type_enum() == TxnType.Payment),
         Assert(Gtxn[0].receiver() == Global.current_application_address()),
+
+        load_project_id,
+        load_project_prefix,
+        load_contrib_key,
         
         # Update collected amount
         App.globalPut(
-            Concat(Bytes("p_"), Itob(Btoi(Txn.application_args[1])), Bytes("_collected")),
-            App.globalGet(Concat(Bytes("p_"), Itob(Btoi(Txn.application_args[1])), Bytes("_collected"))) + Gtxn[0].amount()
+            Concat(project_prefix.load(), Bytes("_collected")),
+            App.globalGet(Concat(project_prefix.load(), Bytes("_collected"))) + Gtxn[0].amount()
         ),
         
         # Store contributor amount for NFT eligibility
         App.localPut(
             Txn.sender(), 
-            Concat(Bytes("contrib_"), Itob(Btoi(Txn.application_args[1]))),
-            App.localGet(Txn.sender(), Concat(Bytes("contrib_"), Itob(Btoi(Txn.application_args[1])))) + Gtxn[0].amount()
+            contrib_key.load(),
+            App.localGet(Txn.sender(), contrib_key.load()) + Gtxn[0].amount()
         ),
         
         Return(Int(1))
@@ -55,14 +75,17 @@ def approval_program():
 
     # Withdraw funds (creator only)
     withdraw = Seq([
-        Assert(Txn.sender() == App.globalGet(Concat(Bytes("p_"), Itob(Btoi(Txn.application_args[1])), Bytes("_creator")))),
+        load_project_id,
+        load_project_prefix,
+
+        Assert(Txn.sender() == App.globalGet(Concat(project_prefix.load(), Bytes("_creator")))),
         
         # Send funds to creator
         InnerTxnBuilder.Begin(),
         InnerTxnBuilder.SetFields({
             TxnField.type_enum: TxnType.Payment,
             TxnField.receiver: Txn.sender(),
-            TxnField.amount: App.globalGet(Concat(Bytes("p_"), Itob(Btoi(Txn.application_args[1])), Bytes("_collected"))),
+            TxnField.amount: App.globalGet(Concat(project_prefix.load(), Bytes("_collected"))),
             TxnField.fee: Int(1000)
         }),
         InnerTxnBuilder.Submit(),
@@ -73,12 +96,15 @@ def approval_program():
     # Mint NFT reward for contributors
     mint_nft = Seq([
         Assert(Txn.application_args.length() == Int(2)),
+
+        load_project_id,
+        load_nft_key,
         
         # Check if user has contributed at least 10 ALGO (10,000,000 microAlgos)
-        Assert(App.localGet(Txn.sender(), Concat(Bytes("contrib_"), Itob(Btoi(Txn.application_args[1])))) >= Int(10000000)),
+        Assert(App.localGet(Txn.sender(), Concat(Bytes("contrib_"), Itob(project_id.load()))) >= Int(10000000)),
         
         # Check if NFT already minted for this project
-        Assert(App.localGet(Txn.sender(), Concat(Bytes("nft_"), Itob(Btoi(Txn.application_args[1])))) == Int(0)),
+        Assert(App.localGet(Txn.sender(), nft_key.load()) == Int(0)),
         
         # Create NFT asset
         InnerTxnBuilder.Begin(),
@@ -90,11 +116,11 @@ def approval_program():
             TxnField.config_asset_unit_name: Bytes("RWDNFT"),
             TxnField.config_asset_name: Concat(
                 Bytes("Reward NFT - "),
-                App.globalGet(Concat(Bytes("p_"), Itob(Btoi(Txn.application_args[1])), Bytes("_name")))
+                App.globalGet(Concat(Bytes("p_"), Itob(project_id.load()), Bytes("_name")))
             ),
             TxnField.config_asset_url: Concat(
                 Bytes("ipfs://Qm"),
-                Substring(Sha256(Concat(Bytes("reward"), Itob(Btoi(Txn.application_args[1])), Txn.sender())), Int(0), Int(40))
+                Substring(Sha256(Concat(Bytes("reward"), Itob(project_id.load()), Txn.sender())), Int(0), Int(32))
             ),
             TxnField.fee: Int(1000)
         }),
@@ -112,7 +138,7 @@ def approval_program():
         InnerTxnBuilder.Submit(),
         
         # Mark NFT as minted for this user/project
-        App.localPut(Txn.sender(), Concat(Bytes("nft_"), Itob(Btoi(Txn.application_args[1]))), InnerTxn.created_asset_id()),
+        App.localPut(Txn.sender(), nft_key.load(), InnerTxn.created_asset_id()),
         
         Return(Int(1))
     ])
@@ -138,16 +164,7 @@ def approval_program():
 def clear_state_program():
     return Return(Int(1))
 
-# Compile the programs
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
 if __name__ == "__main__":
-    approval_compiled = compileTeal(approval_program(), Mode.Application, version=8)
-    clear_compiled = compileTeal(clear_state_program(), Mode.Application, version=8)
-
-    with open("approval_simple_nft.teal", "w") as f:
-        f.write(approval_compiled)
-
-    with open("clear_simple_nft.teal", "w") as f:
-        f.write(clear_compiled)
-
-    print("NFT-enabled smart contract compiled successfully!")
-    print("Files created: approval_simple_nft.teal, clear_simple_nft.teal")
\ No newline at end of file
+    import build
+    build.main(["crowdfunding_simple_nft", "--force"])
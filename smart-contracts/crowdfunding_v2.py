@@ -1,5 +1,7 @@
 from pyteal import *
 
+TEAL_VERSION = 6
+
 # Crowdfunding v2: Proper create_project logic
 
 CREATE_PROJECT = Bytes("create_project")
@@ -20,13 +22,20 @@ def create_project():
         # Store project info in global state
         App.globalPut(Bytes("last_project_name"), Txn.application_args[1]),
         App.globalPut(Bytes("last_project_image"), Txn.application_args[7]),
-        Approve()
     ])
 
 program = Cond(
-    [Txn.application_args[0] == CREATE_PROJECT, create_project()],
+    [Txn.application_args[0] == CREATE_PROJECT, Seq(create_project(), Approve())],
     [Int(1), Reject()]
 )
 
+def approval_program():
+    return program
+
+def clear_state_program():
+    return Approve()
+
+# Compile the programs (build.py writes the TEAL, bytecode and manifest)
 if __name__ == "__main__":
-    print(compileTeal(program, mode=Mode.Application, version=6))
+    import build
+    build.main(["crowdfunding_v2", "--force"])
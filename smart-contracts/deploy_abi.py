@@ -0,0 +1,73 @@
+from algosdk import account, mnemonic
+from algosdk.transaction import StateSchema
+import time
+
+from crowdfunding_abi_client import CrowdfundingClient
+from project_layout import ACCOUNT_MIN_BALANCE, GLOBAL_UINTS, LEDGER_BOX_MBR, category_box_mbr, project_box_mbr
+from algorand_client import compile_program, get_algod_client
+
+
+def main():
+    creator_mnemonic = input("Enter your wallet mnemonic phrase: ")
+    creator_private_key = mnemonic.to_private_key(creator_mnemonic)
+    creator_address = account.address_from_private_key(creator_private_key)
+
+    print(f"Deploying from address: {creator_address}")
+
+    client = get_algod_client()
+
+    with open("approval_abi.teal", "r") as f:
+        approval_program = compile_program(client, f.read())
+
+    with open("clear_abi.teal", "r") as f:
+        clear_program = compile_program(client, f.read())
+
+    # Projects and contributor ledgers live in boxes, so backers never opt in
+    global_schema = StateSchema(num_uints=len(GLOBAL_UINTS), num_byte_slices=0)
+    local_schema = StateSchema(num_uints=0, num_byte_slices=0)
+
+    app = CrowdfundingClient(client, creator_private_key)
+    app_id = app.create(approval_program, clear_program, global_schema, local_schema)
+    print(f"Created ABI app with id: {app_id}")
+
+    # The app account needs its own minimum balance before it can hold boxes
+    app.fund(ACCOUNT_MIN_BALANCE)
+
+    name = "Test Crowdfunding Project"
+    desc = "This is a test project for crowdfunding"
+    category = "Technology"
+    project_id = app.create_project(
+        # Payment covering the project box and the new category's totals box
+        project_box_mbr(name, desc, category) + category_box_mbr(category),
+        name,
+        desc,
+        1000000,  # 1 Algo target
+        int(time.time()) + 86400,  # 24 hours from now
+        category,
+        500000  # 0.5 Algo for NFT reward
+    )
+    print(f"Created project {project_id}")
+
+    # The first contribution to a project also pays for the backer's ledger box
+    app.contribute(1000000 + LEDGER_BOX_MBR, project_id)
+    print(f"Contributed 1 ALGO to project {project_id}")
+
+    print(f"""
+    🎉 ABI Crowdfunding Smart Contract deployed successfully!
+
+    App ID: {app_id}
+    App Address: {app.app_address}
+    Creator: {creator_address}
+    Network: Algorand Testnet
+
+    Interface: crowdfunding_abi.json (ARC-4)
+    Client: crowdfunding_abi_client.CrowdfundingClient
+    """)
+
+    with open("app_id.txt", "w") as f:
+        f.write(str(app_id))
+
+    return app_id
+
+if __name__ == "__main__":
+    main()
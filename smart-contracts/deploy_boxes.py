@@ -0,0 +1,117 @@
+import base64
+from algosdk import account, mnemonic
+from algosdk.transaction import *
+from algosdk.logic import get_application_address
+import time
+
+from project_layout import ACCOUNT_MIN_BALANCE, project_box_name, project_box_mbr
+from algorand_client import check_balance, compile_program, create_app, get_algod_client, send, send_group
+
+
+def fund_app_account(client, private_key, app_id, amount=ACCOUNT_MIN_BALANCE):
+    """Bring the app account up to its own minimum balance so it can hold boxes"""
+    sender = account.address_from_private_key(private_key)
+    app_address = get_application_address(app_id)
+
+    balance = check_balance(client, app_address)
+    if balance >= amount:
+        return None
+
+    txn = PaymentTxn(sender=sender, sp=client.suggested_params(), receiver=app_address, amt=amount - balance)
+    send(client, private_key, txn)
+    tx_id = txn.get_txid()
+
+    print(f"Funded app account {app_address} with {(amount - balance) / 1000000} ALGO")
+    return tx_id
+
+def create_project(client, private_key, app_id, name, desc, target, deadline, category, threshold):
+    """Create a project, paying the box minimum balance in the same group"""
+    sender = account.address_from_private_key(private_key)
+    params = client.suggested_params()
+
+    project_id = next(
+        kv["value"]["uint"]
+        for kv in client.application_info(app_id)["params"]["global-state"]
+        if base64.b64decode(kv["key"]) == b"project_count"
+    )
+
+    pay_txn = PaymentTxn(
+        sender=sender,
+        sp=params,
+        receiver=get_application_address(app_id),
+        amt=project_box_mbr(name, desc, category)
+    )
+
+    app_txn = ApplicationNoOpTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        app_args=[
+            "create_project".encode(),
+            name.encode(),
+            desc.encode(),
+            target.to_bytes(8, "big"),
+            deadline.to_bytes(8, "big"),
+            category.encode(),
+            threshold.to_bytes(8, "big")
+        ],
+        boxes=[(0, project_box_name(project_id))]
+    )
+
+    send_group(client, private_key, [pay_txn, app_txn])
+
+    print(f"Created project {project_id} (box MBR {pay_txn.amt / 1000000} ALGO)")
+    return project_id
+
+def main():
+    creator_mnemonic = input("Enter your wallet mnemonic phrase: ")
+    creator_private_key = mnemonic.to_private_key(creator_mnemonic)
+    creator_address = account.address_from_private_key(creator_private_key)
+
+    print(f"Deploying from address: {creator_address}")
+
+    client = get_algod_client()
+
+    with open("approval_boxes.teal", "r") as f:
+        approval_program_source = f.read()
+
+    with open("clear_boxes.teal", "r") as f:
+        clear_program_source = f.read()
+
+    approval_program = compile_program(client, approval_program_source)
+    clear_program = compile_program(client, clear_program_source)
+
+    # Projects live in boxes, so global state only holds the counter and the successor app
+    global_schema = StateSchema(num_uints=2, num_byte_slices=0)
+    local_schema = StateSchema(num_uints=16, num_byte_slices=0)
+
+    app_id = create_app(client, creator_private_key, approval_program, clear_program, global_schema, local_schema)
+    fund_app_account(client, creator_private_key, app_id)
+
+    create_project(
+        client, creator_private_key, app_id,
+        "Test Crowdfunding Project",
+        "This is a test project for crowdfunding",
+        1000000,
+        int(time.time()) + 86400,
+        "Technology",
+        500000
+    )
+
+    print(f"""
+    🎉 Box-storage Crowdfunding Smart Contract deployed successfully!
+
+    App ID: {app_id}
+    App Address: {get_application_address(app_id)}
+    Creator: {creator_address}
+    Network: Algorand Testnet
+
+    Every project is stored in its own box, so the app can hold any number
+    of projects without redeploying. Each create_project call pays the box
+    minimum balance in the same group.
+    """)
+
+    return app_id
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,15 @@
-import algosdk
-from algosdk.v2client import algod
 from algosdk import transaction
 from algosdk import mnemonic
-import base64
-
-# Network configuration
-ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
-ALGOD_TOKEN = ""
+from algorand_client import check_balance, compile_program, create_app, get_algod_client
 
 # Your wallet mnemonic - REPLACE THIS!
 CREATOR_MNEMONIC = "put your 25 word mnemonic phrase here separated by spaces"
 
-def compile_program(client, source_code):
-    """Compile TEAL source code"""
-    compile_response = client.compile(source_code)
-    return base64.b64decode(compile_response['result'])
-
 def deploy_contract():
     """Deploy the crowdfunding v2 contract"""
     try:
         # Initialize client
-        client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+        client = get_algod_client()
         
         # Get account from mnemonic
         creator_sk = mnemonic.to_private_key(CREATOR_MNEMONIC)
@@ -29,8 +18,7 @@ def deploy_contract():
         print(f"Deploying from account: {creator_addr}")
         
         # Get account balance
-        account_info = client.account_info(creator_addr)
-        balance = account_info['amount'] / 1000000  # Convert microAlgos to Algos
+        balance = check_balance(client, creator_addr) / 1000000  # Convert microAlgos to Algos
         print(f"Account balance: {balance} ALGO")
         
         if balance < 0.1:
@@ -101,32 +89,9 @@ int 1
         global_schema = transaction.StateSchema(num_uints=0, num_byte_slices=3)
         local_schema = transaction.StateSchema(num_uints=0, num_byte_slices=0)
         
-        # Create application create transaction
-        params = client.suggested_params()
-        
-        txn = transaction.ApplicationCreateTxn(
-            sender=creator_addr,
-            sp=params,
-            on_complete=transaction.OnComplete.NoOpOC,
-            approval_program=approval_program,
-            clear_program=clear_program,
-            global_schema=global_schema,
-            local_schema=local_schema,
-        )
-        
-        # Sign transaction
-        signed_txn = txn.sign(creator_sk)
-        
-        # Submit transaction
-        txid = client.send_transaction(signed_txn)
-        print(f"🚀 Deploy transaction sent: {txid}")
-        
-        # Wait for confirmation
-        print("⏳ Waiting for confirmation...")
-        result = transaction.wait_for_confirmation(client, txid, 4)
-        
-        # Get app ID
-        app_id = result['application-index']
+        # Create the application
+        print("🚀 Sending deploy transaction...")
+        app_id = create_app(client, creator_sk, approval_program, clear_program, global_schema, local_schema)
         print(f"✅ SUCCESS! New App ID: {app_id}")
         print(f"🌐 AlgoExplorer: https://testnet.algoexplorer.io/application/{app_id}")
         
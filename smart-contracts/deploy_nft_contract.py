@@ -1,64 +1,7 @@
-import base64
 from algosdk import account, mnemonic
-from algosdk.v2client import algod
 from algosdk.transaction import *
-import algosdk.transaction as transaction
-import json
-import time
+from algorand_client import compile_program, create_app, get_algod_client
 
-# Algorand Testnet configuration
-algod_address = "https://testnet-api.algonode.cloud"
-algod_token = ""
-
-def get_algod_client():
-    return algod.AlgodClient(algod_token, algod_address)
-
-def compile_program(client, source_code):
-    compile_response = client.compile(source_code)
-    return base64.b64decode(compile_response["result"])
-
-def wait_for_confirmation(client, txid):
-    status = client.status()
-    last_round = status.get("last-round") or status.get("lastRound")
-    txinfo = client.pending_transaction_info(txid)
-    
-    while not (txinfo.get("confirmed-round") or txinfo.get("confirmedRound")):
-        print("Waiting for confirmation...")
-        last_round += 1
-        client.status_after_block(last_round)
-        txinfo = client.pending_transaction_info(txid)
-    
-    print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round') or txinfo.get('confirmedRound')}")
-    return txinfo
-
-def create_app(client, private_key, approval_program, clear_program, global_schema, local_schema):
-    sender = account.address_from_private_key(private_key)
-    
-    # Create transaction
-    txn = ApplicationCreateTxn(
-        sender=sender,
-        sp=client.suggested_params(),
-        on_complete=OnComplete.NoOpOC.real,
-        approval_program=approval_program,
-        clear_program=clear_program,
-        global_schema=global_schema,
-        local_schema=local_schema,
-        app_args=[]
-    )
-    
-    # Sign and send transaction
-    signed_txn = txn.sign(private_key)
-    tx_id = client.send_transaction(signed_txn)
-    
-    # Wait for confirmation
-    wait_for_confirmation(client, tx_id)
-    
-    # Get transaction response
-    tx_response = client.pending_transaction_info(tx_id)
-    app_id = tx_response["application-index"]
-    
-    print(f"Created NFT-enabled app with id: {app_id}")
-    return app_id
 
 def main():
     # Get testnet credentials - CHANGE THESE TO YOUR CREDENTIALS
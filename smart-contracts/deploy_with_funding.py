@@ -1,70 +1,7 @@
-import base64
 from algosdk import account, mnemonic
-from algosdk.v2client import algod
 from algosdk.transaction import *
-import algosdk.transaction as transaction
-import json
-import time
+from algorand_client import check_balance, compile_program, create_app, get_algod_client
 
-# Algorand Testnet configuration
-algod_address = "https://testnet-api.algonode.cloud"
-algod_token = ""
-
-def get_algod_client():
-    return algod.AlgodClient(algod_token, algod_address)
-
-def create_app(client, private_key, approval_program, clear_program, global_schema, local_schema):
-    sender = account.address_from_private_key(private_key)
-
-    # Create transaction
-    txn = ApplicationCreateTxn(
-        sender=sender,
-        sp=client.suggested_params(),
-        on_complete=OnComplete.NoOpOC.real,
-        approval_program=approval_program,
-        clear_program=clear_program,
-        global_schema=global_schema,
-        local_schema=local_schema,
-        app_args=[]
-    )
-
-    # Sign and send transaction
-    signed_txn = txn.sign(private_key)
-    tx_id = client.send_transaction(signed_txn)
-
-    # Wait for confirmation
-    wait_for_confirmation(client, tx_id)
-
-    # Get transaction response
-    tx_response = client.pending_transaction_info(tx_id)
-    app_id = tx_response["application-index"]
-
-    print(f"✅ Created app with id: {app_id}")
-    return app_id
-
-def wait_for_confirmation(client, txid, timeout=10):
-    last_round = client.status().get('last-round')
-    while True:
-        try:
-            pending_txn = client.pending_transaction_info(txid)
-            if pending_txn.get('confirmed-round', 0) > 0:
-                print(f"✅ Transaction {txid} confirmed in round {pending_txn.get('confirmed-round')}.")
-                return pending_txn
-        except Exception as e:
-            print(f"⏳ Waiting for confirmation... {e}")
-
-        last_round += 1
-        client.status_after_block(last_round)
-
-def check_balance(client, address):
-    """Check account balance"""
-    try:
-        account_info = client.account_info(address)
-        balance = account_info.get('amount', 0)
-        return balance
-    except Exception as e:
-        print(f"❌ Error checking balance: {e}")
-        return 0
 
 def main():
     print("🚀 ALGORAND CROWDFUNDING DEPLOYMENT")
@@ -121,17 +58,17 @@ def main():
             print("❌ Still insufficient funds. Please try again later.")
             return
 
-    # Read compiled programs
+    # Assemble the TEAL programs into bytecode
     try:
-        with open("approval_minimal.teal", "rb") as f:
-            approval_program = f.read()
+        with open("approval_minimal.teal", "r") as f:
+            approval_program = compile_program(client, f.read())
     except FileNotFoundError:
         print("❌ approval_minimal.teal not found. Please compile the contract first.")
         return
 
     try:
-        with open("clear_minimal.teal", "rb") as f:
-            clear_program = f.read()
+        with open("clear_minimal.teal", "r") as f:
+            clear_program = compile_program(client, f.read())
     except FileNotFoundError:
         print("❌ clear_minimal.teal not found. Please compile the contract first.")
         return
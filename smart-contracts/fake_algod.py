@@ -0,0 +1,708 @@
+"""
+In-process algod stand-in for fast offline runs of the scripts and contracts.
+
+FakeAlgod answers the algod REST endpoints the scripts use from an in-memory
+ledger (avm.py): every accepted group is evaluated by the AVM evaluator and
+committed in a block of its own at once, so nothing waits for block times.
+With round_time set, accepted groups instead collect in an open block that
+closes every round_time seconds, the way a real network confirms them.
+FakeAlgodClient and AsyncFakeAlgodClient are the regular PooledAlgodClient
+and AsyncAlgodClient wired to it instead of the network, so the helpers of
+algorand_client.py / async_client.py and the generated ABI clients run
+unchanged:
+
+    node = FakeAlgod()
+    creator_key, creator = node.create_account(100_000_000)
+    client = FakeAlgodClient(node)
+    app_id = create_app(client, creator_key, approval, clear, global_schema, local_schema)
+    node.advance_time(86400)        # let a deadline pass
+
+Endpoints: transaction params, status and wait-for-block-after, sending and
+simulating transactions, pending transaction info, blocks (msgpack, with
+each transaction's apply data: state deltas, logs, inner transactions) and
+block txids, account (and account asset / application) info, application
+info and boxes, asset info and TEAL compile. Signatures are verified; rejected groups fail with
+the 400 response algod gives, "TransactionPool.Remember: ...".
+
+    python fake_algod.py    # create -> contribute -> withdraw -> refund -> mint, offline
+"""
+
+import asyncio
+import base64
+import copy
+import hashlib
+import io
+import json
+import re
+import sys
+import threading
+import time
+from urllib import parse
+
+import msgpack
+from algosdk import account, encoding, transaction
+from algosdk.logic import get_application_address
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+import avm
+import teal_assembler
+from algorand_client import SUGGESTED_PARAMS_TTL, PooledAlgodClient
+from async_client import AsyncAlgodClient
+
+FAKE_ADDRESS = "http://fake-algod"
+GENESIS_ID = "fake-v1"
+WAIT_FOR_BLOCK = r"/v2/status/wait-for-block-after/(\d+)"
+CONSENSUS_VERSION = "future"
+
+# TEAL field name -> msgpack key, for rendering transactions as algod JSON
+_FIELD_KEYS = {name: key for key, name in avm.MSGPACK_FIELDS.items()}
+_PARAM_KEYS = {name: key for key, name in avm.ASSET_PARAM_FIELDS.items()}
+_ADDRESS_KEYS = {key for key, name in avm.MSGPACK_FIELDS.items() if name in avm.ADDRESS_FIELDS}
+_ADDRESS_PARAMS = {key for key, name in avm.ASSET_PARAM_FIELDS.items() if name in avm.ADDRESS_FIELDS}
+
+
+def _b64(value):
+    return base64.b64encode(value).decode()
+
+
+def txn_msgpack(fields):
+    """A transaction (TEAL-named fields) as its msgpack map, the form blocks carry"""
+    encoded, params, schemas = {}, {}, {}
+    for name, value in fields.items():
+        if name == "Type":
+            value = value.decode()
+        if name in _PARAM_KEYS:
+            params[_PARAM_KEYS[name]] = value
+        elif name in _FIELD_KEYS:
+            encoded[_FIELD_KEYS[name]] = value
+        elif name in ("GlobalNumUint", "GlobalNumByteSlice", "LocalNumUint", "LocalNumByteSlice"):
+            schemas.setdefault("apgs" if name.startswith("Global") else "apls", {})[
+                "nui" if name.endswith("Uint") else "nbs"] = value
+        elif name == "Boxes":
+            encoded["apbx"] = [{"i": index, "n": box} for index, box in value]
+        elif name == "Group":
+            encoded["grp"] = value
+    if params:
+        encoded["apar"] = params
+    encoded.update(schemas)
+    return encoded
+
+
+def txn_json(fields):
+    """A transaction (TEAL-named fields) as algod renders it in JSON"""
+    rendered = {}
+    for key, value in txn_msgpack(fields).items():
+        if key in _ADDRESS_KEYS:
+            value = encoding.encode_address(value)
+        elif key == "apat":
+            value = [encoding.encode_address(v) for v in value]
+        elif key == "apaa":
+            value = [_b64(v) for v in value]
+        elif key == "apar":
+            value = {param: encoding.encode_address(v) if param in _ADDRESS_PARAMS else
+                     _b64(v) if isinstance(v, bytes) else v for param, v in value.items()}
+        elif key == "apbx":
+            value = [{"i": box["i"], "n": _b64(box["n"])} for box in value]
+        elif isinstance(value, bytes):
+            value = _b64(value)
+        rendered[key] = value
+    return rendered
+
+
+def _canonical(value):
+    """Maps sorted by key and without empty values, recursively: how algod encodes msgpack"""
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in sorted(value.items()) if item or item is False}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _value_delta(value):
+    """A state change as algod's msgpack ValueDelta: set bytes (1), set uint (2) or delete (3)"""
+    if value is None:
+        return {"at": 3}
+    return {"at": 2, "ui": value} if isinstance(value, int) else {"at": 1, "bs": bytes(value)}
+
+
+def _delta_json(delta):
+    rendered = []
+    for key, value in delta.items():
+        change = {"action": _value_delta(value)["at"]}
+        if isinstance(value, int):
+            change["uint"] = value
+        elif value is not None:
+            change["bytes"] = _b64(value)
+        rendered.append({"key": _b64(key), "value": change})
+    return rendered
+
+
+def apply_data(record):
+    """What applying a transaction did, as a block's msgpack ApplyData"""
+    data, delta = {}, {}
+    if record["global-delta"]:
+        delta["gd"] = {key: _value_delta(value) for key, value in record["global-delta"].items()}
+    if record["local-delta"]:
+        # Local deltas are keyed by account index: 0 the sender, then Accounts, then shared accounts
+        fields = record["fields"]
+        accounts = [fields["Sender"], *fields.get("Accounts", [])]
+        shared = []
+        delta["ld"] = {}
+        for addr, changes in record["local-delta"].items():
+            raw = encoding.decode_address(addr)
+            if raw not in accounts:
+                shared.append(raw)
+                accounts.append(raw)
+            delta["ld"][accounts.index(raw)] = {key: _value_delta(value) for key, value in changes.items()}
+        if shared:
+            delta["sa"] = shared
+    if record["logs"]:
+        delta["lg"] = list(record["logs"])
+    if record["inner"]:
+        delta["itx"] = [{"txn": txn_msgpack(inner["fields"]), **apply_data(inner)} for inner in record["inner"]]
+    if delta:
+        data["dt"] = delta
+    if record["application-index"]:
+        data["apid"] = record["application-index"]
+    if record["asset-index"]:
+        data["caid"] = record["asset-index"]
+    return data
+
+
+def _signed_txn(decoded):
+    """A signed transaction from its msgpack dict; simulate may send it without a signature"""
+    if set(decoded) <= {"txn", "sgnr"}:
+        stxn = transaction.SignedTransaction(transaction.Transaction.undictify(decoded["txn"]), None)
+        stxn.authorizing_address = encoding.encode_address(decoded["sgnr"]) if "sgnr" in decoded else None
+        return stxn
+    return encoding.msgpack_decode(decoded)
+
+
+def _state_json(state):
+    return [{"key": _b64(key), "value": {"type": 2, "uint": value, "bytes": ""} if isinstance(value, int)
+             else {"type": 1, "uint": 0, "bytes": _b64(value)}} for key, value in state.items()]
+
+
+class FakeAlgod:
+    """The node: an avm.Ledger plus the blocks, pending infos and REST surface around it"""
+
+    def __init__(self, verify_signatures=True, genesis_id=GENESIS_ID, round_time=None):
+        self.ledger = avm.Ledger(timestamp=int(time.time()))
+        self.verify_signatures = verify_signatures
+        self.genesis_id = genesis_id
+        self.genesis_hash = _b64(hashlib.sha256(genesis_id.encode()).digest())
+        self.blocks = {0: {"timestamp": self.ledger.timestamp, "txids": [], "txns": []}}
+        self.pending = {}     # txid -> pending transaction info of confirmed transactions
+        self.time_offset = 0
+        self.round_time = round_time
+        self._open_block = []     # txids accepted since the last block, with round_time
+        self._applied = {}        # txid -> (signed transaction, ledger record) until its block is committed
+        self._block_started = time.monotonic()
+        self._lock = threading.RLock()
+        self._routes = [
+            ("GET", r"/v2/transactions/params", self._params),
+            ("GET", r"/v2/status", self._status),
+            ("GET", WAIT_FOR_BLOCK, self._wait_for_block),
+            ("POST", r"/v2/transactions", self._send),
+            ("POST", r"/v2/transactions/simulate", self._simulate),
+            ("GET", r"/v2/transactions/pending/(\w+)", self._pending_info),
+            ("GET", r"/v2/blocks/(\d+)", self._block),
+            ("GET", r"/v2/blocks/(\d+)/txids", self._block_txids),
+            ("GET", r"/v2/accounts/(\w+)", self._account_info),
+            ("GET", r"/v2/accounts/(\w+)/assets/(\d+)", self._account_asset_info),
+            ("GET", r"/v2/accounts/(\w+)/applications/(\d+)", self._account_application_info),
+            ("GET", r"/v2/applications/(\d+)", self._application_info),
+            ("GET", r"/v2/applications/(\d+)/box", self._box),
+            ("GET", r"/v2/applications/(\d+)/boxes", self._boxes),
+            ("GET", r"/v2/assets/(\d+)", self._asset_info),
+            ("POST", r"/v2/teal/compile", self._compile),
+            ("GET", r"/health", lambda query, data: {}),
+        ]
+
+    @property
+    def round(self):
+        return self.ledger.round
+
+    # Test helpers
+
+    def fund(self, address, amount):
+        with self._lock:
+            self.ledger.fund(address, amount)
+
+    def create_account(self, amount=0):
+        """A new (private key, address), funded with amount microAlgos"""
+        private_key, address = account.generate_account()
+        if amount:
+            self.fund(address, amount)
+        return private_key, address
+
+    def advance_time(self, seconds):
+        """Move the clock forward (e.g. past a deadline) and close an empty block at the new time"""
+        with self._lock:
+            self.time_offset += seconds
+            self._commit_block([])
+
+    def _commit_block(self, txids):
+        ledger = self.ledger
+        ledger.round += 1
+        ledger.timestamp = max(ledger.timestamp, int(time.time()) + self.time_offset)
+        self.blocks[ledger.round] = {"timestamp": ledger.timestamp, "txids": txids,
+                                     "txns": [self._applied.pop(txid) for txid in txids]}
+        self._block_started = time.monotonic()
+        return ledger.round
+
+    # Block times (round_time)
+
+    def _close_open_block(self):
+        txids, self._open_block = self._open_block, []
+        confirmed = self._commit_block(txids)
+        for txid in txids:
+            self.pending[txid]["confirmed-round"] = confirmed
+
+    def _tick(self):
+        """Close the blocks whose round time has passed; idle rounds close empty"""
+        if self.round_time is None:
+            return
+        elapsed = int((time.monotonic() - self._block_started) // self.round_time)
+        for _ in range(elapsed):
+            self._close_open_block()
+
+    def wait_time(self, method, url):
+        """Seconds a request has to be held before it can be answered: wait-for-block-after waits for a block"""
+        match = re.fullmatch(WAIT_FOR_BLOCK, parse.urlsplit(url).path)
+        if self.round_time is None or method != "GET" or not match:
+            return 0
+        with self._lock:
+            self._tick()
+            if self.round > int(match.group(1)):
+                return 0
+            return max(0.0, self._block_started + self.round_time - time.monotonic())
+
+    # Transactions
+
+    def submit(self, signed_txns):
+        """Evaluate and commit a signed group in a new block; returns the first txid"""
+        with self._lock:
+            txids = [stxn.get_txid() for stxn in signed_txns]
+            for txid in txids:
+                if txid in self.pending:
+                    raise avm.TransactionRejected(f"transaction already in ledger: {txid}")
+            group = self._prepare(signed_txns, verify=self.verify_signatures)
+            try:
+                records = self.ledger.apply_group(group)
+            except avm.TransactionRejected as e:
+                txid = txids[getattr(e, "group_index", 0)]
+                raise avm.TransactionRejected(f"TransactionPool.Remember: transaction {txid}: {e}") from None
+            self._applied.update(zip(txids, zip(signed_txns, records)))
+            if self.round_time is None:
+                confirmed = self._commit_block(txids)
+            else:
+                # Confirmed when the open block closes; until then the info is a pool entry
+                self._open_block += txids
+                confirmed = 0
+            for stxn, txid, record in zip(signed_txns, txids, records):
+                info = self._record_json(record)
+                info["txn"] = {"sig": stxn.signature, "txn": info["txn"]["txn"]} if stxn.signature else info["txn"]
+                info["confirmed-round"] = confirmed
+                self.pending[txid] = info
+            return txids[0]
+
+    def _prepare(self, signed_txns, verify):
+        txns = [stxn.transaction for stxn in signed_txns]
+        if len(txns) > 1 or txns[0].group:
+            # The group id hashes the txids the members had before it was assigned
+            unassigned = [copy.copy(txn) for txn in txns]
+            for txn in unassigned:
+                txn.group = None
+            group_id = transaction.calculate_group_id(unassigned)
+            if any(txn.group != group_id for txn in txns):
+                raise avm.TransactionRejected("transactionGroup: incomplete group: group ids do not match")
+        group = []
+        for stxn in signed_txns:
+            txn = stxn.transaction
+            if txn.genesis_hash != self.genesis_hash:
+                raise avm.TransactionRejected(f"txn {stxn.get_txid()} genesis hash mismatch")
+            if verify:
+                self._check_signature(stxn)
+            group.append(avm.txn_fields(txn))
+        return group
+
+    def _check_signature(self, stxn):
+        if not isinstance(stxn, transaction.SignedTransaction):
+            raise avm.TransactionRejected("only single-signature transactions are supported by the fake algod")
+        sender = stxn.transaction.sender
+        signer = stxn.authorizing_address or sender
+        expected = self.ledger.account(sender)["auth"] or sender
+        if signer != expected:
+            raise avm.TransactionRejected(f"should have been authorized by {expected} but was actually "
+                                          f"authorized by {signer}")
+        if not stxn.signature:
+            raise avm.TransactionRejected(f"transaction {stxn.get_txid()} is not signed")
+        message = b"TX" + base64.b64decode(encoding.msgpack_encode(stxn.transaction))
+        try:
+            VerifyKey(encoding.decode_address(signer)).verify(message, base64.b64decode(stxn.signature))
+        except BadSignatureError:
+            raise avm.TransactionRejected("At least one signature didn't pass verification") from None
+
+    def _record_json(self, record):
+        info = {"txn": {"txn": txn_json(record["fields"])}, "pool-error": ""}
+        if record["logs"]:
+            info["logs"] = [_b64(log) for log in record["logs"]]
+        if record["inner"]:
+            info["inner-txns"] = [self._record_json(inner) for inner in record["inner"]]
+        if record["global-delta"]:
+            info["global-state-delta"] = _delta_json(record["global-delta"])
+        if record["local-delta"]:
+            info["local-state-delta"] = [{"address": addr, "delta": _delta_json(delta)}
+                                         for addr, delta in record["local-delta"].items()]
+        if record["application-index"]:
+            info["application-index"] = record["application-index"]
+        if record["asset-index"]:
+            info["asset-index"] = record["asset-index"]
+        return info
+
+    # REST surface
+
+    def handle(self, method, url, data=None, params=None):
+        """Serve one request; returns (HTTP status, JSON body bytes)"""
+        parsed = parse.urlsplit(url)
+        query = dict(parse.parse_qsl(parsed.query))
+        query.update({key: str(value) for key, value in (params or {}).items()})
+        with self._lock:
+            self._tick()
+            for route_method, pattern, handler in self._routes:
+                match = re.fullmatch(pattern, parsed.path)
+                if route_method == method and match:
+                    try:
+                        body = handler(query, data, *match.groups())
+                        return 200, body if isinstance(body, bytes) else json.dumps(body).encode()
+                    except avm.TransactionRejected as e:
+                        return 400, json.dumps({"message": str(e)}).encode()
+                    except LookupError as e:
+                        return 404, json.dumps({"message": e.args[0]}).encode()
+        return 404, json.dumps({"message": f"no route for {method} {parsed.path}"}).encode()
+
+    def _params(self, query, data):
+        return {"consensus-version": CONSENSUS_VERSION, "fee": 0, "genesis-hash": self.genesis_hash,
+                "genesis-id": self.genesis_id, "last-round": self.round, "min-fee": avm.MIN_TXN_FEE}
+
+    def _status(self, query, data):
+        return {"last-round": self.round, "last-version": CONSENSUS_VERSION, "next-version": CONSENSUS_VERSION,
+                "next-version-round": self.round + 1, "next-version-supported": True, "time-since-last-round": 0,
+                "catchup-time": 0, "stopped-at-unsupported-round": False}
+
+    def _wait_for_block(self, query, data, round_num):
+        # Blocks are closed on demand: a waiter never has to wait. With a
+        # round time the session held the request until the block was due
+        if self.round <= int(round_num):
+            if self.round_time is None:
+                self._commit_block([])
+            else:
+                self._close_open_block()
+        return self._status(query, data)
+
+    def _send(self, query, data):
+        signed = [_signed_txn(item) for item in msgpack.Unpacker(io.BytesIO(data), raw=False)]
+        return {"txId": self.submit(signed)}
+
+    def _simulate(self, query, data):
+        request = msgpack.unpackb(data, raw=False)
+        allow_empty = request.get("allow-empty-signatures", False)
+        extra_budget = request.get("extra-opcode-budget", 0)
+        results = []
+        for txn_group in request.get("txn-groups", []):
+            signed = [_signed_txn(item) for item in txn_group["txns"]]
+            results.append(self._simulate_group(signed, allow_empty, extra_budget))
+        response = {"version": 2, "last-round": self.round, "txn-groups": results}
+        if allow_empty or extra_budget:
+            response["eval-overrides"] = {key: value for key, value in (
+                ("allow-empty-signatures", allow_empty), ("extra-opcode-budget", extra_budget)) if value}
+        return response
+
+    def _simulate_group(self, signed, allow_empty, extra_budget):
+        placeholders = [{"txn-result": {"txn": {"txn": txn_json(avm.txn_fields(stxn.transaction))},
+                                        "pool-error": ""}} for stxn in signed]
+        app_calls = sum(1 for stxn in signed if stxn.transaction.type == "appl")
+        try:
+            verify = self.verify_signatures and not (allow_empty and not any(stxn.signature for stxn in signed))
+            group = self._prepare(signed, verify=verify)
+            ledger = self.ledger
+            saved = ledger.round
+            # Evaluated as the next block would, then undone
+            records = ledger.apply_group(group, extra_budget=extra_budget, rollback=True)
+            ledger.round = saved
+        except avm.TransactionRejected as e:
+            return {"txn-results": placeholders, "failure-message": str(e),
+                    "failed-at": [getattr(e, "group_index", 0)]}
+        results = [{"txn-result": self._record_json(record), "app-budget-consumed": record["budget"]}
+                   for record in records]
+        return {"txn-results": results, "app-budget-added": avm.APP_CALL_BUDGET * app_calls + extra_budget,
+                "app-budget-consumed": sum(record["budget"] for record in records)}
+
+    def _pending_info(self, query, data, txid):
+        if txid not in self.pending:
+            raise LookupError(f"txn {txid} not found")
+        return self.pending[txid]
+
+    def _block(self, query, data, round_num):
+        block = self.blocks.get(int(round_num))
+        if block is None:
+            raise LookupError(f"failed to retrieve information from the ledger: round {round_num} not available")
+        if query.get("format") != "msgpack":
+            raise LookupError("the fake algod serves blocks as msgpack only")
+        header = {"rnd": int(round_num), "ts": block["timestamp"], "gen": self.genesis_id,
+                  "gh": base64.b64decode(self.genesis_hash)}
+        txns = []
+        for stxn, record in block["txns"]:
+            # Block transactions leave out the genesis id and hash the block already carries
+            entry = stxn.dictify()
+            entry["txn"] = {key: value for key, value in entry["txn"].items() if key not in ("gen", "gh")}
+            entry.update(hgi=True, hgh=True, **apply_data(record))
+            txns.append(entry)
+        if txns:
+            header["txns"] = txns
+        return msgpack.packb({"block": _canonical(header)}, use_bin_type=True)
+
+    def _block_txids(self, query, data, round_num):
+        block = self.blocks.get(int(round_num))
+        if block is None:
+            raise LookupError(f"failed to retrieve information from the ledger: round {round_num} not available")
+        return {"blockTxids": block["txids"]}
+
+    def _account_info(self, query, data, address):
+        ledger = self.ledger
+        acct = ledger.account(address)
+        info = {
+            "address": address, "amount": acct["amount"], "amount-without-pending-rewards": acct["amount"],
+            "min-balance": ledger.min_balance(address), "pending-rewards": 0, "rewards": 0, "reward-base": 0,
+            "round": self.round, "status": "Offline",
+            "total-apps-opted-in": len(acct["local"]), "total-assets-opted-in": len(acct["assets"]),
+            "total-created-apps": len(acct["apps"]), "total-created-assets": len(acct["created_assets"]),
+            "total-boxes": acct["boxes"], "total-box-bytes": acct["box_bytes"],
+        }
+        if acct["auth"]:
+            info["auth-addr"] = acct["auth"]
+        if query.get("exclude") != "all":
+            info["assets"] = [{"asset-id": asset_id, "amount": amount, "is-frozen": bool(frozen)}
+                              for asset_id, (amount, frozen) in sorted(acct["assets"].items())]
+            info["apps-local-state"] = [self._local_state_json(app_id, state)
+                                        for app_id, state in sorted(acct["local"].items())]
+            info["created-apps"] = [self._application_info(query, data, app_id) for app_id in sorted(acct["apps"])]
+            info["created-assets"] = [self._asset_info(query, data, asset_id)
+                                      for asset_id in sorted(acct["created_assets"])]
+        return info
+
+    def _local_state_json(self, app_id, state):
+        uints, byte_slices = self.ledger.apps[app_id]["local_schema"]
+        return {"id": app_id, "key-value": _state_json(state),
+                "schema": {"num-uint": uints, "num-byte-slice": byte_slices}}
+
+    def _account_asset_info(self, query, data, address, asset_id):
+        holding = self.ledger.account(address)["assets"].get(int(asset_id))
+        if holding is None:
+            raise LookupError("account asset info not found")
+        return {"round": self.round,
+                "asset-holding": {"asset-id": int(asset_id), "amount": holding[0], "is-frozen": bool(holding[1])}}
+
+    def _account_application_info(self, query, data, address, app_id):
+        acct = self.ledger.account(address)
+        app_id = int(app_id)
+        if app_id not in acct["local"] and app_id not in acct["apps"]:
+            raise LookupError("account application info not found")
+        info = {"round": self.round}
+        if app_id in acct["local"]:
+            info["app-local-state"] = self._local_state_json(app_id, acct["local"][app_id])
+        if app_id in acct["apps"]:
+            info["created-app"] = self._application_info(query, data, app_id)["params"]
+        return info
+
+    def _application_info(self, query, data, app_id):
+        app = self.ledger.apps.get(int(app_id))
+        if app is None:
+            raise LookupError("application does not exist")
+        (global_uints, global_bytes), (local_uints, local_bytes) = app["global_schema"], app["local_schema"]
+        return {"id": int(app_id), "params": {
+            "creator": app["creator"],
+            "approval-program": _b64(app["approval"]),
+            "clear-state-program": _b64(app["clear"]),
+            "global-state": _state_json(app["global"]),
+            "global-state-schema": {"num-uint": global_uints, "num-byte-slice": global_bytes},
+            "local-state-schema": {"num-uint": local_uints, "num-byte-slice": local_bytes},
+            "extra-program-pages": app["extra_pages"],
+        }}
+
+    def _box(self, query, data, app_id):
+        encoding_name, _, value = query.get("name", "").partition(":")
+        name = base64.b64decode(value) if encoding_name == "b64" else value.encode()
+        box = self.ledger.boxes.get((int(app_id), name))
+        if box is None:
+            raise LookupError("box not found")
+        return {"round": self.round, "name": _b64(name), "value": _b64(bytes(box))}
+
+    def _boxes(self, query, data, app_id):
+        names = [name for box_app, name in self.ledger.boxes if box_app == int(app_id)]
+        limit = int(query.get("max", 0)) or len(names)
+        return {"boxes": [{"name": _b64(name)} for name in sorted(names)[:limit]]}
+
+    def _asset_info(self, query, data, asset_id):
+        params = self.ledger.assets.get(int(asset_id))
+        if params is None:
+            raise LookupError("asset does not exist")
+        rendered = {"creator": encoding.encode_address(params["creator"]), "total": params["total"],
+                    "decimals": params["decimals"], "default-frozen": bool(params["default_frozen"]),
+                    "unit-name": params["unit_name"].decode(errors="replace"),
+                    "name": params["name"].decode(errors="replace"), "url": params["url"].decode(errors="replace")}
+        for key in ("manager", "reserve", "freeze", "clawback"):
+            if params[key] != avm.ZERO_ADDRESS:
+                rendered[key] = encoding.encode_address(params[key])
+        return {"index": int(asset_id), "params": rendered}
+
+    def _compile(self, query, data):
+        try:
+            program = teal_assembler.assemble(data.decode())
+        except teal_assembler.TealAssemblyError as e:
+            raise avm.TransactionRejected(str(e)) from None
+        result = {"hash": program.hash, "result": _b64(program.bytecode)}
+        if query.get("sourcemap") in ("true", "True"):
+            result["sourcemap"] = program.source_map()
+        return result
+
+
+class _Response:
+    """The slice of requests.Response PooledAlgodClient reads"""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    """requests.Session stand-in that hands every request to a FakeAlgod"""
+
+    def __init__(self, node):
+        self.node = node
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        time.sleep(self.node.wait_time(method, url))
+        return _Response(*self.node.handle(method, url, data, params))
+
+
+class _AsyncResponse:
+    """The slice of aiohttp.ClientResponse AsyncAlgodClient reads"""
+
+    def __init__(self, node, method, url, data, params):
+        self._request = (node, method, url, data, params)
+        self.status = None
+        self._body = None
+
+    async def __aenter__(self):
+        node, method, url, data, params = self._request
+        # Held without blocking the loop, unlike FakeSession
+        await asyncio.sleep(node.wait_time(method, url))
+        self.status, self._body = node.handle(method, url, data, params)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def read(self):
+        return self._body
+
+    async def json(self, content_type=None):
+        return json.loads(self._body)
+
+
+class FakeAsyncSession:
+    """aiohttp.ClientSession stand-in that hands every request to a FakeAlgod"""
+
+    def __init__(self, node):
+        self.node = node
+
+    def request(self, method, url, params=None, data=None, headers=None):
+        return _AsyncResponse(self.node, method, url, data, params)
+
+    async def close(self):
+        pass
+
+
+class FakeAlgodClient(PooledAlgodClient):
+    """PooledAlgodClient talking to an in-process FakeAlgod"""
+
+    def __init__(self, node=None, params_ttl=SUGGESTED_PARAMS_TTL):
+        self.node = node or FakeAlgod()
+        super().__init__("", FAKE_ADDRESS, session=FakeSession(self.node), params_ttl=params_ttl)
+
+
+class AsyncFakeAlgodClient(AsyncAlgodClient):
+    """AsyncAlgodClient talking to an in-process FakeAlgod"""
+
+    def __init__(self, node=None, params_ttl=SUGGESTED_PARAMS_TTL):
+        self.node = node or FakeAlgod()
+        super().__init__("", FAKE_ADDRESS, session=FakeAsyncSession(self.node), params_ttl=params_ttl)
+
+
+def run_scenario(node=None):
+    """The ABI contract's whole lifecycle on a fresh fake node; returns the node"""
+    from algorand_client import compile_program, send
+    from crowdfunding_abi_client import CrowdfundingClient
+    from project_layout import (ACCOUNT_MIN_BALANCE, ASSET_MBR, GLOBAL_UINTS, LEDGER_BOX_MBR,
+                                category_box_mbr, decode_ledger, ledger_box_name, project_box_mbr)
+
+    node = node or FakeAlgod()
+    client = FakeAlgodClient(node)
+    creator_key, creator = node.create_account(100_000_000)
+    backer_key, backer = node.create_account(100_000_000)
+
+    with open("approval_abi.teal") as f:
+        approval = compile_program(client, f.read())
+    with open("clear_abi.teal") as f:
+        clear = compile_program(client, f.read())
+    app = CrowdfundingClient(client, creator_key)
+    app.create(approval, clear, transaction.StateSchema(len(GLOBAL_UINTS), 0), transaction.StateSchema(0, 0))
+    app.fund(ACCOUNT_MIN_BALANCE)
+
+    # Project 0 reaches its target, project 1 does not
+    deadline = node.ledger.timestamp + 3600
+    funded = app.create_project(project_box_mbr("Funded", "reaches its target", "Tech") + category_box_mbr("Tech"),
+                                "Funded", "reaches its target", 5_000_000, deadline, "Tech", 1_000_000)
+    failed = app.create_project(project_box_mbr("Failed", "falls short", "Tech"),
+                                "Failed", "falls short", 50_000_000, deadline, "Tech", 1_000_000)
+
+    backing = CrowdfundingClient(client, backer_key, app.app_id)
+    backing.contribute(6_000_000 + LEDGER_BOX_MBR, funded)
+    backing.contribute(2_000_000 + LEDGER_BOX_MBR, failed)
+
+    node.advance_time(7200)
+    app.withdraw(funded)
+    backing.refund(failed)
+    # The backer pays for the minimum balance the reward NFT adds to the app
+    asset_id = backing.mint_nft(ASSET_MBR, funded)
+    send(client, backer_key, transaction.AssetOptInTxn(backer, client.suggested_params(), asset_id))
+    backing.claim_nft(funded, asset_id)
+
+    ledger_box = client.application_box_by_name(app.app_id, ledger_box_name(funded, backer))
+    assert decode_ledger(base64.b64decode(ledger_box["value"]))["nft"] == asset_id
+    assert client.account_asset_info(backer, asset_id)["asset-holding"]["amount"] == 1
+    assert app.get_project(funded)[4] == 0  # withdrawn projects are inactive
+    assert get_application_address(app.app_id) in node.ledger.accounts
+    return node
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    node = run_scenario()
+    elapsed = time.perf_counter() - started
+    print(f"\nScenario passed: {node.round} blocks, {len(node.pending)} transactions in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
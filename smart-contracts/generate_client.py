@@ -0,0 +1,88 @@
+"""
+Generate a typed Python client from an ARC-4 contract spec.
+
+    python generate_client.py crowdfunding_abi.json crowdfunding_abi_client.py
+
+The spec file is the one written by crowdfunding_abi.py: {"contract": ARC-4
+contract, "hints": per-method call hints}. The generated module defines one
+ApplicationClient subclass with a method per ABI method.
+"""
+
+import json
+import keyword
+import pprint
+import sys
+
+from algosdk import abi
+
+TEMPLATE_HEADER = '''"""
+Client for the "{name}" contract.
+
+Generated by generate_client.py from {source} - do not edit by hand.
+"""
+
+from algosdk import abi
+
+from app_client import ApplicationClient
+
+CONTRACT = abi.Contract.from_json({contract!r})
+
+HINTS = {hints}
+
+
+class {class_name}(ApplicationClient):
+    contract = CONTRACT
+    hints = HINTS
+'''
+
+TEMPLATE_METHOD = '''
+    def {name}(self, {params}**kwargs):
+        """{signature}"""
+        return self.call("{name}", {args}**kwargs)
+'''
+
+
+def class_name_for(contract_name):
+    return "".join(part.capitalize() for part in contract_name.split("_")) + "Client"
+
+
+def safe_name(name):
+    return name + "_" if keyword.iskeyword(name) else name
+
+
+def generate(spec, source):
+    contract = abi.Contract.undictify(spec["contract"])
+    parts = [TEMPLATE_HEADER.format(
+        name=contract.name,
+        source=source,
+        contract=json.dumps(spec["contract"]),
+        hints=pprint.pformat(spec.get("hints", {}), sort_dicts=False),
+        class_name=class_name_for(contract.name),
+    )]
+    for method in contract.methods:
+        names = [safe_name(arg.name) for arg in method.args]
+        parts.append(TEMPLATE_METHOD.format(
+            name=method.name,
+            params="".join(f"{name}, " for name in names),
+            args="".join(f"{name}, " for name in names),
+            signature=method.get_signature(),
+        ))
+    return "".join(parts)
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    source = argv[0] if argv else "crowdfunding_abi.json"
+    target = argv[1] if len(argv) > 1 else source.replace(".json", "_client.py")
+
+    with open(source, "r") as f:
+        spec = json.load(f)
+
+    with open(target, "w") as f:
+        f.write(generate(spec, source))
+
+    print(f"Client generated: {target}")
+
+
+if __name__ == "__main__":
+    main()
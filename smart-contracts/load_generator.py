@@ -0,0 +1,293 @@
+"""
+Load generator: thousands of backers contributing to a few projects at once.
+
+    python load_generator.py                                   # 1000 backers, 5 projects, 200 groups/s for 10s
+    python load_generator.py --backers 5000 --rate 500 --duration 30 -o load.json
+    python load_generator.py --algod http://localhost:4001 --token $TOKEN   # a real (e.g. sandbox) node
+
+Every contribution is the group test_contract.py sends to the simple
+contract: a payment to the app followed by the "contribute" call. The
+generator deploys the contract, creates the projects, then creates, funds and
+opts in the backers. Groups then arrive open-loop, as a Poisson process at
+--rate per second: arrivals keep coming whether or not earlier groups have
+confirmed, the way a popular campaign's backers would. Each group picks a
+random backer and project, is sent through AsyncAlgodClient and is followed
+to confirmation by its shared tracker.
+
+The report gives:
+- offered and achieved throughput;
+- the peak number of groups in flight;
+- rejected groups, counted per reason;
+- a histogram and percentiles of end-to-end latency, from building the group
+  to seeing it confirmed.
+
+By default the node is the in-process FakeAlgod (fake_algod.py). Setup runs
+on it at full speed. During the load the fake closes a block every
+--round-time seconds, so latency includes waiting for the block, as it
+would on a real network. With --round-time 0 every group gets a block of its
+own at once, which leaves only the cost of the tooling and of evaluating the
+contract. Against a real node (--algod) the backers are funded from a
+mnemonic you are asked for.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+from algosdk import account, error, mnemonic, transaction
+from algosdk.logic import get_application_address
+
+from async_client import AsyncAlgodClient, compile_program, create_app, project_arg
+from bulk_signer import sign_group, signing_keys
+
+# The simple contract keeps four values per project in a 16 + 16 global schema
+GLOBAL_SCHEMA = transaction.StateSchema(num_uints=16, num_byte_slices=16)
+LOCAL_SCHEMA = transaction.StateSchema(num_uints=8, num_byte_slices=8)
+MAX_PROJECTS = 7
+MAX_GROUP_SIZE = 16
+SETUP_CONCURRENCY = 256     # funding and opt-in groups in flight at once
+
+ACCOUNT_MIN_BALANCE = 100_000
+OPT_IN_MIN_BALANCE = 100_000 + 28_500 * LOCAL_SCHEMA.num_uints + 50_000 * LOCAL_SCHEMA.num_byte_slices
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+ADDRESS_OR_TXID = re.compile(r"\b[A-Z2-7]{52}(?:[A-Z2-7]{6})?\b")
+
+
+def reason(e):
+    """A rejection message with addresses and txids masked, so equal failures count together"""
+    return ADDRESS_OR_TXID.sub("…", str(e).splitlines()[0])
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0..100)"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class LoadStats:
+    """What happened to every group the generator sent"""
+
+    def __init__(self):
+        self.offered = 0
+        self.latencies = []
+        self.rejected = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.max_lag = 0.0        # how late the generator dispatched an arrival
+        self.started = None
+        self.finished = None
+
+    def histogram(self):
+        """[(upper bound in ms or None for the overflow bucket, count)]"""
+        counts = Counter()
+        for latency in self.latencies:
+            ms = latency * 1000
+            counts[next((bound for bound in LATENCY_BUCKETS_MS if ms <= bound), None)] += 1
+        return [(bound, counts[bound]) for bound in LATENCY_BUCKETS_MS + (None,)]
+
+    def summary(self):
+        elapsed = self.finished - self.started
+        result = {
+            "offered": self.offered,
+            "confirmed": len(self.latencies),
+            "rejected": sum(self.rejected.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_gps": round(len(self.latencies) / elapsed, 1) if elapsed else None,
+            "peak_in_flight": self.peak_in_flight,
+            "max_arrival_lag_ms": round(self.max_lag * 1000, 1),
+            "rejections": dict(self.rejected.most_common()),
+            "latency_histogram_ms": {f"<={bound}" if bound else f">{LATENCY_BUCKETS_MS[-1]}": count
+                                     for bound, count in self.histogram()},
+        }
+        if self.latencies:
+            result["latency_ms"] = {f"p{q}": round(percentile(self.latencies, q) * 1000, 2)
+                                    for q in (50, 90, 99, 100)}
+        return result
+
+
+async def send_quietly(client, txns, private_key):
+    """Sign, send and wait for a group from one sender, without the per-transaction log lines of send()"""
+    # Signed as bulk_signer does, rather than with the deprecated txn.sign, which warns on every call
+    group = sign_group(txns, signing_keys([private_key]))
+    await client.send_raw_group(group.raw)
+    return await client.tracker.track(group.txids[0])
+
+
+async def setup(client, creator_key, projects, backers, amount, funder_key=None, node=None):
+    """Deploy the simple contract, create the projects and bring the backers in; returns the app id"""
+    with open("approval_simple.teal") as f:
+        approval_teal = f.read()
+    with open("clear_simple.teal") as f:
+        clear_teal = f.read()
+    approval, clear = await asyncio.gather(compile_program(client, approval_teal), compile_program(client, clear_teal))
+    app_id = await create_app(client, creator_key, approval, clear, GLOBAL_SCHEMA, LOCAL_SCHEMA)
+
+    creator = account.address_from_private_key(creator_key)
+    deadline = int(time.time()) + 86400
+    # Projects are numbered in creation order, so they go out one after another
+    for i in range(projects):
+        txn = transaction.ApplicationNoOpTxn(creator, await client.suggested_params(), app_id, app_args=[
+            b"create", f"Load project {i}".encode(), b"Load test project", (10 ** 12).to_bytes(8, "big"),
+            deadline.to_bytes(8, "big"), b"Load"])
+        await send_quietly(client, [txn], creator_key)
+    print(f"Created app {app_id} with {projects} projects")
+
+    funding = [(key, account.address_from_private_key(key)) for key in backers]
+    # Bounded, so parameters are fetched close to sending: thousands of
+    # groups can take longer to land than one validity window
+    slots = asyncio.Semaphore(SETUP_CONCURRENCY)
+    if node is None:
+        # Fund from the funder in groups of 16 payments, all groups in flight at once
+        funder = account.address_from_private_key(funder_key)
+
+        async def fund(batch):
+            async with slots:
+                sp = await client.suggested_params()
+                txns = [transaction.PaymentTxn(funder, sp, address, amount) for _, address in batch]
+                await send_quietly(client, txns, funder_key)
+
+        await asyncio.gather(*(fund(funding[start:start + MAX_GROUP_SIZE])
+                               for start in range(0, len(funding), MAX_GROUP_SIZE)))
+    else:
+        for _, address in funding:
+            node.fund(address, amount)
+
+    async def opt_in(key, address):
+        async with slots:
+            txn = transaction.ApplicationOptInTxn(address, await client.suggested_params(), app_id)
+            await send_quietly(client, [txn], key)
+
+    await asyncio.gather(*(opt_in(key, address) for key, address in funding))
+    print(f"Funded and opted in {len(backers)} backers")
+    return app_id
+
+
+async def contribute(client, stats, app_id, key, project_id, amount, sequence):
+    """One grouped payment + "contribute" call, from build to confirmation"""
+    started = time.perf_counter()
+    stats.in_flight += 1
+    stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+    try:
+        sender = account.address_from_private_key(key)
+        sp = await client.suggested_params()
+        # Without a note, two equal contributions in one validity window would share a txid
+        note = sequence.to_bytes(8, "big")
+        pay = transaction.PaymentTxn(sender, sp, get_application_address(app_id), amount, note=note)
+        call = transaction.ApplicationNoOpTxn(sender, sp, app_id, app_args=[b"contribute", project_arg(project_id)])
+        await send_quietly(client, [pay, call], key)
+    except (error.AlgodHTTPError, error.AlgodResponseError, error.ConfirmationTimeoutError) as e:
+        stats.rejected[reason(e)] += 1
+    else:
+        stats.latencies.append(time.perf_counter() - started)
+    finally:
+        stats.in_flight -= 1
+
+
+async def generate(client, app_id, backers, projects, rate, duration, amount, seed=None):
+    """Fire contributions as a Poisson process at rate groups/s for duration seconds"""
+    rng = random.Random(seed)
+    stats = LoadStats()
+    loop = asyncio.get_running_loop()
+    tasks = []
+    stats.started = time.perf_counter()
+    start = next_arrival = loop.time()
+    while next_arrival - start < duration:
+        delay = next_arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        stats.max_lag = max(stats.max_lag, loop.time() - next_arrival)
+        stats.offered += 1
+        tasks.append(asyncio.ensure_future(contribute(
+            client, stats, app_id, rng.choice(backers), rng.randrange(projects), amount, stats.offered)))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    stats.finished = time.perf_counter()
+    return stats
+
+
+def print_report(stats, rate, duration):
+    summary = stats.summary()
+    print(f"\nOffered:    {summary['offered']} groups ({rate:g}/s for {duration:g}s)")
+    print(f"Confirmed:  {summary['confirmed']} groups in {summary['elapsed_s']}s "
+          f"= {summary['throughput_gps']} groups/s")
+    print(f"Rejected:   {summary['rejected']}")
+    for message, count in stats.rejected.most_common():
+        print(f"  {count:6d}  {message}")
+    print(f"In flight:  peak {summary['peak_in_flight']}")
+    # Arrivals dispatched late mean the generator itself, not the node, was the limit
+    print(f"Arrival lag: max {summary['max_arrival_lag_ms']} ms")
+    if stats.latencies:
+        print("Latency:    " + ", ".join(f"{q} {ms} ms" for q, ms in summary["latency_ms"].items()))
+        histogram = stats.histogram()
+        widest = max(count for _, count in histogram)
+        for bound, count in histogram:
+            label = f"<= {bound} ms" if bound else f"> {LATENCY_BUCKETS_MS[-1]} ms"
+            print(f"  {label:>11} {count:7d} {'#' * round(40 * count / widest)}")
+    return summary
+
+
+async def run(args, funder_key=None):
+    if args.algod:
+        client = AsyncAlgodClient(args.token, args.algod)
+        node = None
+        creator_key = funder_key
+    else:
+        from fake_algod import AsyncFakeAlgodClient, FakeAlgod
+
+        node = FakeAlgod()
+        client = AsyncFakeAlgodClient(node)
+        creator_key, _ = node.create_account(10_000_000)
+
+    # Backers are drawn at random, so fund well past the contributions one
+    # should expect; running dry would show up as rejections
+    expected = args.rate * args.duration / args.backers
+    funding = ACCOUNT_MIN_BALANCE + OPT_IN_MIN_BALANCE + int((4 * expected + 10) * (args.amount + 2000))
+    backers = [account.generate_account()[0] for _ in range(args.backers)]
+    async with client:
+        app_id = await setup(client, creator_key, args.projects, backers, funding, funder_key, node)
+        if node is not None:
+            node.round_time = args.round_time or None
+        print(f"Generating load: {args.rate:g} groups/s for {args.duration:g}s across {args.projects} projects")
+        return await generate(client, app_id, backers, args.projects, args.rate, args.duration, args.amount,
+                              args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backers", type=int, default=1000, help="accounts to create and opt in (default 1000)")
+    parser.add_argument("--projects", type=int, default=5, help=f"projects to spread contributions over (max {MAX_PROJECTS})")
+    parser.add_argument("--rate", type=float, default=200, help="mean arrivals per second (default 200)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to generate load for (default 10)")
+    parser.add_argument("--amount", type=int, default=100_000, help="microAlgos per contribution")
+    parser.add_argument("--round-time", type=float, default=2.8,
+                        help="seconds between blocks of the fake node during the load; 0 for a block per group")
+    parser.add_argument("--seed", type=int, help="seed the arrival process and the backer/project choice")
+    parser.add_argument("--algod", help="address of a real node to load instead of the in-process fake")
+    parser.add_argument("--token", default="", help="API token of --algod")
+    parser.add_argument("-o", "--output", help="write the summary as JSON")
+    args = parser.parse_args(argv)
+    if not 1 <= args.projects <= MAX_PROJECTS:
+        parser.error(f"--projects must be between 1 and {MAX_PROJECTS}")
+
+    funder_key = None
+    if args.algod:
+        funder_key = mnemonic.to_private_key(input("Enter a funded wallet mnemonic phrase: "))
+
+    stats = asyncio.run(run(args, funder_key))
+    summary = print_report(stats, args.rate, args.duration)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"parameters": {key: value for key, value in vars(args).items() if key != "token"},
+                       **summary}, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
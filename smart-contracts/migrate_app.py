@@ -0,0 +1,104 @@
+"""
+Move an ABI contract app's campaigns to a newer release (crowdfunding_abi.py).
+
+The app never changes its program, so a new release is deployed as a new app
+and its running campaigns move over in three steps:
+
+    python migrate_app.py successor <old_app_id> <new_app_id>    # app creator: name the new app, once
+    python migrate_app.py projects <old_app_id> <new_app_id>     # project creators: recreate their running projects
+    python migrate_app.py move <old_app_id> <project_id> <new_app_id> <new_project_id>   # each backer
+
+"projects" prints which new project each old one became, so withdrawals
+still go to the project's own creator. A backer's move is
+one atomic group: move_contribution pays their whole contribution out of the
+old app, and the same group pays it into the new project with contribute.
+Projects whose deadline has passed stay where they are and finish there
+(withdraw, refund, mint_nft).
+"""
+
+import base64
+import sys
+import time
+
+from algosdk import account, error, mnemonic
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+
+from crowdfunding_abi_client import CrowdfundingClient
+from project_layout import LEDGER_BOX_MBR, category_box_mbr, category_box_name, decode_ledger, ledger_box_name, project_box_mbr
+from project_views import iter_projects
+from algorand_client import get_algod_client
+
+
+def set_successor(client, private_key, app_id, successor_id):
+    CrowdfundingClient(client, private_key, app_id).set_successor(successor_id)
+    print(f"App {app_id} names app {successor_id} as its successor")
+
+
+def _box_exists(client, app_id, name):
+    try:
+        client.application_box_by_name(app_id, name)
+    except error.AlgodHTTPError:
+        return False
+    return True
+
+
+def recreate_projects(client, private_key, app_id, successor_id):
+    """Create the key's running projects of app_id in the successor; returns {old id: new id}"""
+    return recreate(client, private_key, successor_id, iter_projects(CrowdfundingClient(client, private_key, app_id)))
+
+
+def recreate(client, private_key, successor_id, projects):
+    """Create the key's running projects among project dicts (with their "id") in the successor"""
+    new_app = CrowdfundingClient(client, private_key, successor_id)
+    creator = account.address_from_private_key(private_key)
+    now = int(time.time())
+    moved = {}
+    for project in projects:
+        if project["creator"] != creator or not project["active"] or project["deadline"] <= now:
+            continue
+        payment = project_box_mbr(project["name"], project["desc"], project["category"])
+        if not _box_exists(client, successor_id, category_box_name(project["category"])):
+            payment += category_box_mbr(project["category"])
+        moved[project["id"]] = new_app.create_project(
+            payment, project["name"], project["desc"], project["target"], project["deadline"],
+            project["category"], project["threshold"],
+        )
+        print(f"Project {project['id']} -> {moved[project['id']]}")
+    return moved
+
+
+def move_contribution(client, private_key, app_id, project_id, successor_id, new_project_id):
+    """Move the key's contribution to project_id into new_project_id of the successor"""
+    backer = account.address_from_private_key(private_key)
+    ledger = client.application_box_by_name(app_id, ledger_box_name(project_id, backer))
+    amount = decode_ledger(base64.b64decode(ledger["value"]))["amount"]
+
+    # The old app refunds amount plus the ledger box deposit; the same group
+    # pays all of it to the successor, which takes its own box deposit out of it
+    atc = AtomicTransactionComposer()
+    CrowdfundingClient(client, private_key, app_id).move_contribution(project_id, successor_id, atc=atc)
+    CrowdfundingClient(client, private_key, successor_id).contribute(
+        amount + LEDGER_BOX_MBR, new_project_id, atc=atc)
+    atc.execute(client, 4)
+    print(f"Moved {amount} microAlgos from project {project_id} of app {app_id} "
+          f"to project {new_project_id} of app {successor_id}")
+    return amount
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    commands = {"successor": (set_successor, 2), "projects": (recreate_projects, 2), "move": (move_contribution, 4)}
+    if not argv or argv[0] not in commands or len(argv) != commands[argv[0]][1] + 1:
+        print(__doc__)
+        return 1
+    command, _ = commands[argv[0]]
+
+    wallet_mnemonic = input("Enter your wallet mnemonic phrase: ")
+    private_key = mnemonic.to_private_key(wallet_mnemonic)
+
+    command(get_algod_client(), private_key, *map(int, argv[1:]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Move the running campaigns of a local-state app into an ABI app's ledger boxes.
+
+crowdfunding.py and crowdfunding_boxes.py keep each backer's contribution
+under the contrib_<itob(id)>_<address> local key, and its reward NFT flag
+under nft_<itob(id)>. Their programs cannot be updated, so the campaigns move
+to a new ABI app (crowdfunding_abi.py), which records contributions in a
+ledger box per (project, backer). There are three steps:
+
+    python migrate_ledger.py successor <old_app_id> <new_app_id>    # app creator: name the ABI app, once
+    python migrate_ledger.py projects <old_app_id> <new_app_id>     # project creators: recreate their running projects
+    python migrate_ledger.py move <old_app_id> <project_id> <new_app_id> <new_project_id>   # each backer
+
+A backer's move is one atomic group. move_contribution pays the local balance
+out of the old app and clears it; the same group contributes it to the new
+project, together with the ledger box deposit the backer adds. Projects whose
+deadline has passed, and balances whose reward NFT was minted, stay where
+they are and finish in the old app.
+"""
+
+import base64
+import sys
+
+from algosdk import account, mnemonic
+from algosdk.atomic_transaction_composer import (AccountTransactionSigner, AtomicTransactionComposer,
+                                                 TransactionWithSigner)
+from algosdk.encoding import decode_address
+from algosdk.transaction import ApplicationNoOpTxn
+
+from crowdfunding_abi_client import CrowdfundingClient
+from migrate_app import recreate
+from project_layout import LEDGER_BOX_MBR, decode_project, project_box_name
+from project_state import CONTRIBUTION_PREFIX, NFT_PREFIX, ProjectState, local_state
+from algorand_client import call_app, get_algod_client
+
+
+def set_successor(client, private_key, app_id, successor_id):
+    call_app(client, private_key, app_id, [b"set_successor"], foreign_apps=[successor_id])
+    print(f"App {app_id} names app {successor_id} as its successor")
+
+
+def iter_local_projects(client, app_id):
+    """Project dicts of a crowdfunding.py app (global state) or a crowdfunding_boxes.py app (one box each)"""
+    state = ProjectState.from_global_state(client.application_info(app_id)["params"].get("global-state", []))
+    if state.projects():
+        for project in state.projects().values():
+            yield project._asdict()
+        return
+    for project_id in range(state.project_count):
+        box = client.application_box_by_name(app_id, project_box_name(project_id))
+        yield dict(decode_project(base64.b64decode(box["value"])), id=project_id)
+
+
+def recreate_projects(client, private_key, app_id, successor_id):
+    """Create the key's running projects of app_id in the successor; returns {old id: new id}"""
+    return recreate(client, private_key, successor_id, iter_local_projects(client, app_id))
+
+
+def local_balance(client, app_id, project_id, address):
+    """(contribution, NFT flag) of an account for one project, from its local state in app_id"""
+    local = local_state(client.account_info(address), app_id)
+    project = project_id.to_bytes(8, "big")
+    return (local.get(CONTRIBUTION_PREFIX + project + b"_" + decode_address(address), 0),
+            local.get(NFT_PREFIX + project, 0))
+
+
+def move_contribution(client, private_key, app_id, project_id, successor_id, new_project_id):
+    """Move the key's local balance for project_id into new_project_id of the successor"""
+    backer = account.address_from_private_key(private_key)
+    amount, nft = local_balance(client, app_id, project_id, backer)
+    if not amount or nft:
+        print(f"Nothing to move from project {project_id} of app {app_id}"
+              + (" (its reward NFT was minted)" if nft else ""))
+        return 0
+
+    # The old app pays out the balance; the backer adds the successor's ledger box deposit
+    atc = AtomicTransactionComposer()
+    call = ApplicationNoOpTxn(backer, client.suggested_params(), app_id,
+                              app_args=[b"move_contribution", project_id.to_bytes(8, "big")],
+                              foreign_apps=[successor_id], boxes=[(0, project_box_name(project_id))])
+    atc.add_transaction(TransactionWithSigner(call, AccountTransactionSigner(private_key)))
+    CrowdfundingClient(client, private_key, successor_id).contribute(amount + LEDGER_BOX_MBR, new_project_id, atc=atc)
+    atc.execute(client, 4)
+    print(f"Moved {amount} microAlgos from project {project_id} of app {app_id} "
+          f"to project {new_project_id} of app {successor_id}")
+    return amount
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    commands = {"successor": (set_successor, 2), "projects": (recreate_projects, 2), "move": (move_contribution, 4)}
+    if not argv or argv[0] not in commands or len(argv) != commands[argv[0]][1] + 1:
+        print(__doc__)
+        return 1
+    command, _ = commands[argv[0]]
+
+    wallet_mnemonic = input("Enter your wallet mnemonic phrase: ")
+    private_key = mnemonic.to_private_key(wallet_mnemonic)
+
+    command(get_algod_client(), private_key, *map(int, argv[1:]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
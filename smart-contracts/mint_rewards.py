@@ -0,0 +1,131 @@
+"""
+Keeper that mints the reward NFT of every eligible backer (crowdfunding_abi.py).
+
+Eligibility is computed off-chain from the indexer: a backer whose ledger box
+for the project holds at least the threshold and no NFT yet. Eligible backers
+are minted with mint_nfts calls, 7 backers per call (the project box plus one
+ledger box each fill the 8 box references) and 16 calls per atomic group;
+groups are independent, so they are submitted in parallel. The keeper pays
+the minimum balance each reward asset adds to the app (0.1 ALGO per NFT).
+Backers then collect their NFT with claim_nft.
+
+    python mint_rewards.py <app_id> <project_id>
+"""
+
+import base64
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from algosdk import encoding, mnemonic
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+
+from crowdfunding_abi_client import CrowdfundingClient
+from project_layout import (
+    APP_CALL_BUDGET, ASSET_MBR, LEDGER_BOX_PREFIX, MAX_BOX_REFERENCES, MAX_GROUP_SIZE, MINT_BUDGET,
+    decode_ledger, decode_project, project_box_name,
+)
+from algorand_client import get_algod_client, get_indexer_client
+
+
+INDEXER_PAGE_SIZE = 1000
+MAX_PARALLEL_GROUPS = 4
+BACKERS_PER_CALL = MAX_BOX_REFERENCES - 1
+
+
+def load_project(client, app_id, project_id):
+    box = client.application_box_by_name(app_id, project_box_name(project_id))
+    return decode_project(base64.b64decode(box["value"]))
+
+
+def iter_ledger_boxes(indexer_client, app_id, project_id):
+    """Yield the name of every ledger box of the project"""
+    prefix = LEDGER_BOX_PREFIX + project_id.to_bytes(8, "big")
+    next_page = None
+    while True:
+        response = indexer_client.application_boxes(app_id, limit=INDEXER_PAGE_SIZE, next_page=next_page)
+        for box in response.get("boxes", []):
+            name = base64.b64decode(box["name"])
+            if name.startswith(prefix):
+                yield name
+        next_page = response.get("next-token")
+        if not next_page:
+            return
+
+
+def iter_eligible(indexer_client, app_id, project_id, threshold, max_workers=MAX_PARALLEL_GROUPS):
+    """Yield the address of every backer owed a reward NFT"""
+    def read(name):
+        value = base64.b64decode(indexer_client.application_box_by_name(app_id, name)["value"])
+        return name, decode_ledger(value)
+
+    names = list(iter_ledger_boxes(indexer_client, app_id, project_id))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for name, ledger in pool.map(read, names):
+            if ledger["amount"] >= threshold and ledger["nft"] == 0:
+                yield encoding.encode_address(name[-32:])
+
+
+def pages(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def mint_group(app, project_id, backers):
+    """Mint for up to MAX_GROUP_SIZE * BACKERS_PER_CALL backers in one atomic group"""
+    atc = AtomicTransactionComposer()
+    for page in pages(backers, BACKERS_PER_CALL):
+        # One asset creation per backer plus the op-up calls the budget may need
+        opup_calls = math.ceil(MINT_BUDGET * (len(page) + 1) / APP_CALL_BUDGET)
+        # Each reward asset raises the app's minimum balance, paid for up front
+        app.mint_nfts(len(page) * ASSET_MBR, project_id, page, atc=atc, inner_txns=len(page) + opup_calls)
+    result = atc.execute(app.client, 4)
+    return sum(r.return_value for r in result.abi_results)
+
+
+def mint_rewards(client, indexer_client, private_key, app_id, project_id, max_workers=MAX_PARALLEL_GROUPS,
+                 max_passes=5):
+    """Drive minting until every eligible backer of the project has their NFT"""
+    app = CrowdfundingClient(client, private_key, app_id)
+    project = load_project(client, app_id, project_id)
+    if project["collected"] < project["target"]:
+        raise ValueError(f"project {project_id} did not reach its target")
+
+    submitted = set()
+    minted = 0
+    for _ in range(max_passes):
+        # The indexer trails algod by a few rounds, so backers handled in an
+        # earlier pass are remembered rather than resubmitted
+        backers = [addr for addr in iter_eligible(indexer_client, app_id, project_id, project["threshold"])
+                   if addr not in submitted]
+        if not backers:
+            break
+
+        groups = list(pages(backers, MAX_GROUP_SIZE * BACKERS_PER_CALL))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(mint_group, app, project_id, group): group for group in groups}
+            for future in as_completed(futures):
+                minted += future.result()
+                submitted.update(futures[future])
+                print(f"Minted {minted} reward NFTs")
+
+    print(f"Project {project_id}: {minted} reward NFTs minted, claimable with claim_nft")
+    return minted
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__)
+        return 1
+    app_id, project_id = int(argv[0]), int(argv[1])
+
+    keeper_mnemonic = input("Enter the keeper wallet mnemonic phrase: ")
+    private_key = mnemonic.to_private_key(keeper_mnemonic)
+
+    mint_rewards(get_algod_client(), get_indexer_client(), private_key, app_id, project_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Resolve the reward NFTs of many accounts at once.
+
+    async with AsyncAlgodClient() as client:
+        async for holding in lookup_reward_nfts(client, app_id, addresses):
+            print(holding.address, holding.nfts)    # reward_nfts() dicts, or holding.error
+
+An account's NFTs are what project_state.reward_nfts finds: the assets its
+nft_<itob(id)> local keys name plus the RWDNFT assets the app created that it
+holds. The app account's created assets are read once per lookup. After
+that, accounts are read with at most `concurrency` requests in flight. Each
+result is yielded as soon as it arrives, so results come in arrival order,
+not the order given. A repeated address is looked up once.
+Reads go through the client's round cache, so an address already read in the
+current round costs no request. An address that is invalid or that algod
+cannot read is yielded with an error rather than ending the lookup.
+
+    python nft_holdings.py <app_id> backers.txt    # one JSON line per address, as it resolves
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import namedtuple
+
+import aiohttp
+from algosdk import encoding, error
+from algosdk.logic import get_application_address
+
+from async_client import AsyncAlgodClient
+from project_state import reward_assets, reward_nfts
+
+LOOKUP_CONCURRENCY = 32     # account_info requests in flight per lookup
+LOOKUP_CACHE_SIZE = 16384   # client cache entries, enough to keep a campaign's backers for the round
+
+Holding = namedtuple("Holding", "address nfts error", defaults=(None,))
+
+
+async def lookup_reward_nfts(client, app_id, addresses, concurrency=LOOKUP_CONCURRENCY):
+    """Yield a Holding per distinct address, in the order the lookups finish"""
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return
+    app_account = await client.account_info(get_application_address(app_id))
+    rewards = reward_assets(app_account.get("created-assets", []))
+    pending = iter(addresses)
+    # Bounded, so workers wait for a slow consumer instead of reading ahead of it
+    results = asyncio.Queue(maxsize=concurrency)
+
+    async def worker():
+        # The iterator is shared: each address is taken by exactly one worker
+        for address in pending:
+            if not encoding.is_valid_address(address):
+                await results.put(Holding(address, [], "invalid address"))
+                continue
+            try:
+                account = await client.account_info(address)
+            except (error.AlgodHTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                await results.put(Holding(address, [], str(e) or type(e).__name__))
+            except Exception as e:
+                await results.put(e)
+                return
+            else:
+                await results.put(Holding(address, reward_nfts(account, app_id, rewards)))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(addresses)))]
+    try:
+        for _ in addresses:
+            result = await results.get()
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+def read_addresses(lines):
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+async def run(args, addresses):
+    started = time.perf_counter()
+    found = failed = 0
+    async with AsyncAlgodClient(args.token, args.algod, cache_size=LOOKUP_CACHE_SIZE) as client:
+        async for holding in lookup_reward_nfts(client, args.app_id, addresses, args.concurrency):
+            found += bool(holding.nfts)
+            failed += holding.error is not None
+            print(json.dumps(holding._asdict()), flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"{len(set(addresses))} addresses, {found} with reward NFTs, {failed} failed "
+          f"in {elapsed:.2f} s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up the reward NFTs of many accounts")
+    parser.add_argument("app_id", type=int)
+    parser.add_argument("addresses", nargs="?", type=argparse.FileType(), default=sys.stdin,
+                        help="file with one address per line (default: stdin)")
+    parser.add_argument("--concurrency", "-c", type=int, default=LOOKUP_CONCURRENCY,
+                        help=f"account reads in flight (default {LOOKUP_CONCURRENCY})")
+    parser.add_argument("--algod", help="algod address (default: the shared testnet node)")
+    parser.add_argument("--token", help="algod API token")
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args, read_addresses(args.addresses)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
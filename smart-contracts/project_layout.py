@@ -0,0 +1,173 @@
+# Project record layout shared by the box-backed contracts and off-chain tools.
+#
+# Every project lives in its own box named b"p" + itob(project_id). The box
+# value is the ARC-4 encoding of PROJECT_TYPE, so the fixed-width head can be
+# read and patched in place with box_extract/box_replace and the whole value
+# decodes with any ABI library.
+
+from algosdk.abi import ABIType, AddressType
+from algosdk.encoding import decode_address
+
+PROJECT_TYPE = "(uint64,uint64,uint64,uint64,uint8,address,string,string,string,uint64)"
+PROJECT_FIELDS = [
+    "target", "deadline", "collected", "threshold", "active", "creator", "name", "desc", "category", "backers",
+]
+# Boxes written before the backers count was added
+LEGACY_PROJECT_TYPE = "(uint64,uint64,uint64,uint64,uint8,address,string,string,string)"
+
+PROJECT_BOX_PREFIX = b"p"
+
+# Byte offsets inside the box value
+TARGET_OFFSET = 0
+DEADLINE_OFFSET = 8
+COLLECTED_OFFSET = 16
+THRESHOLD_OFFSET = 24
+ACTIVE_OFFSET = 32
+CREATOR_OFFSET = 33
+NAME_HEAD_OFFSET = 65
+DESC_HEAD_OFFSET = 67
+CATEGORY_HEAD_OFFSET = 69
+BACKERS_OFFSET = 71    # last in the head, so every field before it keeps its offset
+
+RECORD_SIZE = 79       # the part of the head the contracts read: all of it
+RECORD_HEAD_SIZE = 79  # fixed-width fields, the three string offsets and backers
+LEGACY_HEAD_SIZE = 71  # head of boxes written before backers was added
+
+# crowdfunding.py packs the fixed-width fields into one global value instead,
+# with backers appended after the creator
+PACKED_BACKERS_OFFSET = 65
+PACKED_RECORD_SIZE = 73
+LEGACY_PACKED_RECORD_SIZE = 65
+
+# Contributor ledger: one box per (project, backer) named
+# b"c" + itob(project_id) + address, holding uint64 amount + uint64 NFT asset id
+LEDGER_BOX_PREFIX = b"c"
+LEDGER_AMOUNT_OFFSET = 0
+LEDGER_NFT_OFFSET = 8
+LEDGER_SIZE = 16
+
+# Running totals per category: one box named b"g" + category holding
+# uint64 projects + uint64 raised + uint64 backers
+CATEGORY_BOX_PREFIX = b"g"
+CATEGORY_PROJECTS_OFFSET = 0
+CATEGORY_RAISED_OFFSET = 8
+CATEGORY_BACKERS_OFFSET = 16
+CATEGORY_STATS_SIZE = 24
+MAX_CATEGORY_LENGTH = 63   # box names are at most 64 bytes
+
+# Platform-wide running totals kept in global state
+PLATFORM_TOTALS = ["project_count", "total_raised", "total_backers", "funded_projects", "total_withdrawn"]
+
+# App id of the release backers may move their contributions to (0 until set)
+SUCCESSOR_KEY = "successor"
+GLOBAL_UINTS = PLATFORM_TOTALS + [SUCCESSOR_KEY]
+
+# Minimum balance rules (microAlgos)
+ACCOUNT_MIN_BALANCE = 100000
+ASSET_MBR = 100000          # per asset an account creates or holds
+BOX_FLAT_MBR = 2500
+BOX_BYTE_MBR = 400
+LEDGER_BOX_MBR = BOX_FLAT_MBR + BOX_BYTE_MBR * (len(LEDGER_BOX_PREFIX) + 8 + 32 + LEDGER_SIZE)
+
+# Batch limits
+MAX_GROUP_SIZE = 16         # transactions in one atomic group
+MAX_BATCH = 15              # a group holds 16 transactions: 15 payments + the app call
+MAX_FOREIGN_ACCOUNTS = 4    # accounts one app call may reference
+MAX_BOX_REFERENCES = 8      # references (boxes included) one app call may carry
+APP_CALL_BUDGET = 700       # opcode budget per app call, and per op-up inner call
+CONTRIBUTION_BUDGET = 200   # opcode budget reserved per credited payment
+MINT_BUDGET = 170           # opcode budget reserved per backer in a batch mint
+MAX_RETURN_SIZE = 1020      # a method's return value: one 1 KB log minus the 4-byte return prefix
+
+_project_codec = ABIType.from_string(PROJECT_TYPE)
+_legacy_project_codec = ABIType.from_string(LEGACY_PROJECT_TYPE)
+
+
+def project_box_name(project_id):
+    return PROJECT_BOX_PREFIX + project_id.to_bytes(8, "big")
+
+
+def ledger_box_name(project_id, address):
+    return LEDGER_BOX_PREFIX + project_id.to_bytes(8, "big") + decode_address(address)
+
+
+def category_box_name(category):
+    return CATEGORY_BOX_PREFIX + _as_bytes(category)
+
+
+def category_box_mbr(category):
+    return box_mbr(len(category_box_name(category)), CATEGORY_STATS_SIZE)
+
+
+def decode_category_stats(value):
+    """Decode a category totals box into {"projects", "raised", "backers"}"""
+    return {
+        "projects": int.from_bytes(value[CATEGORY_PROJECTS_OFFSET:CATEGORY_PROJECTS_OFFSET + 8], "big"),
+        "raised": int.from_bytes(value[CATEGORY_RAISED_OFFSET:CATEGORY_RAISED_OFFSET + 8], "big"),
+        "backers": int.from_bytes(value[CATEGORY_BACKERS_OFFSET:CATEGORY_BACKERS_OFFSET + 8], "big"),
+    }
+
+
+def decode_ledger(value):
+    """Decode a contributor ledger box into {"amount", "nft"}"""
+    return {
+        "amount": int.from_bytes(value[LEDGER_AMOUNT_OFFSET:LEDGER_AMOUNT_OFFSET + 8], "big"),
+        "nft": int.from_bytes(value[LEDGER_NFT_OFFSET:LEDGER_NFT_OFFSET + 8], "big"),
+    }
+
+
+def box_mbr(name_length, value_length):
+    """Minimum balance a box of the given size locks in the app account"""
+    return BOX_FLAT_MBR + BOX_BYTE_MBR * (name_length + value_length)
+
+
+def project_box_size(name, desc, category):
+    return RECORD_HEAD_SIZE + 6 + len(_as_bytes(name)) + len(_as_bytes(desc)) + len(_as_bytes(category))
+
+
+def project_box_mbr(name, desc, category):
+    return box_mbr(len(project_box_name(0)), project_box_size(name, desc, category))
+
+
+def encode_project(project):
+    """Encode a project dict into the box value layout"""
+    values = [project[field] for field in PROJECT_FIELDS]
+    values[6:9] = [_as_bytes(v).decode() for v in values[6:9]]
+    return _project_codec.encode(values)
+
+
+def decode_project(value):
+    """Decode a box value (or just its head) into a project dict; backers is None in legacy boxes"""
+    # A head's first string offset is its size, which tells the two layouts apart
+    if int.from_bytes(value[NAME_HEAD_OFFSET:NAME_HEAD_OFFSET + 2], "big") == LEGACY_HEAD_SIZE:
+        return dict(zip(PROJECT_FIELDS, _legacy_project_codec.decode(value)), backers=None)
+    if len(value) == RECORD_HEAD_SIZE:
+        return dict(_decode_fixed(value), backers=_uint64(value, BACKERS_OFFSET))
+    return dict(zip(PROJECT_FIELDS, _project_codec.decode(value)))
+
+
+def decode_record(value):
+    """Decode a packed record (crowdfunding.py); legacy records have no backers"""
+    record = _decode_fixed(value)
+    if len(value) >= PACKED_RECORD_SIZE:
+        record["backers"] = _uint64(value, PACKED_BACKERS_OFFSET)
+    return record
+
+
+def _decode_fixed(value):
+    return {
+        "target": _uint64(value, TARGET_OFFSET),
+        "deadline": _uint64(value, DEADLINE_OFFSET),
+        "collected": _uint64(value, COLLECTED_OFFSET),
+        "threshold": _uint64(value, THRESHOLD_OFFSET),
+        "active": value[ACTIVE_OFFSET],
+        "creator": AddressType().decode(value[CREATOR_OFFSET:CREATOR_OFFSET + 32]),
+    }
+
+
+def _uint64(value, offset):
+    return int.from_bytes(value[offset:offset + 8], "big")
+
+
+def _as_bytes(value):
+    return value.encode() if isinstance(value, str) else bytes(value)
@@ -0,0 +1,295 @@
+"""
+Decode an app's global state into projects in one pass.
+
+    reader = ProjectStateReader(client, app_id)
+    reader.projects()             # {project_id: Project}
+    reader.project(3).collected
+    reader.value(3, "collected")  # one field, straight from the key index
+
+The global-state key list is walked once and every key is parsed into
+(project_id, field). Two layouts are understood:
+- p_<itob(id)>_<field>: the simple variants and the frontend's contract;
+- project_<itob(id)>_<field>, plus the packed record under
+  project_<itob(id)>: crowdfunding.py. The record is expanded into its fields.
+Other keys (project_count, platform totals) are kept as they are. Lookups
+after that are dict reads instead of a search of the key list per field per
+project.
+
+A decoded state is remembered for the round it was read at: the round of
+the client's cache entry (algorand_client.PooledAlgodClient) that served
+application_info, so the data and its round always come from the same read.
+The cache asks status only once its round_check has elapsed, so reads in the
+same round reuse the decoded state without an application_info or a status
+request.
+
+An account's side is decoded from its account_info response:
+account_contributions (contrib_<itob(id)> local keys, with or without the
+_<address> suffix crowdfunding.py adds) and reward_nfts (the nft_<itob(id)>
+local keys plus held RWDNFT assets the app created).
+
+    python project_state.py --keys 4000    # one-pass index against a per-field search
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+from algosdk import encoding
+
+from project_layout import LEGACY_PACKED_RECORD_SIZE, PACKED_RECORD_SIZE, decode_record
+
+PROJECT_PREFIXES = (b"project_", b"p_")
+TEXT_FIELDS = {"name", "desc", "category"}
+CONTRIBUTION_PREFIX = b"contrib_"
+NFT_PREFIX = b"nft_"
+REWARD_UNIT_NAME = "RWDNFT"  # unit name of the reward NFTs every variant mints
+
+# Fields a variant does not store are None
+Project = namedtuple("Project", "id name desc category creator target deadline collected threshold active backers",
+                     defaults=(None,) * 10)
+PROJECT_FIELDS = Project._fields[1:]
+
+
+def parse_project_key(key):
+    """(project_id, field) for a project key, field None for the packed record; None for other keys"""
+    for prefix in PROJECT_PREFIXES:
+        end = len(prefix) + 8
+        if key.startswith(prefix) and len(key) >= end:
+            rest = key[end:]
+            if not rest:
+                return int.from_bytes(key[len(prefix):end], "big"), None
+            if rest[:1] == b"_":
+                return int.from_bytes(key[len(prefix):end], "big"), rest[1:].decode(errors="replace")
+    return None
+
+
+def project_fields(field, value):
+    """{field: typed value} for one state entry of a project; the packed record (field None) gives several"""
+    if field is None:
+        if not isinstance(value, bytes) or len(value) not in (PACKED_RECORD_SIZE, LEGACY_PACKED_RECORD_SIZE):
+            return {}
+        return decode_record(value)
+    if value is None:
+        return {field: None}
+    if field in TEXT_FIELDS:
+        value = value.decode(errors="replace")
+    elif field == "creator" and isinstance(value, bytes) and len(value) == 32:
+        value = encoding.encode_address(value)
+    return {field: value}
+
+
+def decode_global_state(entries):
+    """algod's global-state list as {key bytes: int or bytes}"""
+    return {base64.b64decode(kv["key"]): kv["value"]["uint"] if kv["value"]["type"] == 2
+            else base64.b64decode(kv["value"]["bytes"]) for kv in entries}
+
+
+def local_state(account, app_id):
+    """{key bytes: value} of the app's local state in an account_info response; empty if not opted in"""
+    for app in account.get("apps-local-state", []):
+        if app["id"] == app_id:
+            return decode_global_state(app.get("key-value", []))
+    return {}
+
+
+def _local_project_id(key, prefix):
+    if key.startswith(prefix) and len(key) >= len(prefix) + 8:
+        rest = key[len(prefix) + 8:]
+        if not rest or rest[:1] == b"_":
+            return int.from_bytes(key[len(prefix):len(prefix) + 8], "big")
+    return None
+
+
+def account_contributions(local):
+    """{project_id: microAlgos} an account has contributed, from its local state; refunded (zero) entries left out"""
+    contributions = {}
+    for key, value in local.items():
+        project_id = _local_project_id(key, CONTRIBUTION_PREFIX)
+        if project_id is not None and isinstance(value, int) and value:
+            contributions[project_id] = contributions.get(project_id, 0) + value
+    return dict(sorted(contributions.items()))
+
+
+def reward_assets(created_assets):
+    """{asset_id: params} of the reward NFTs among an account's created-assets"""
+    return {asset["index"]: asset["params"] for asset in created_assets
+            if asset["params"].get("unit-name") == REWARD_UNIT_NAME}
+
+
+def reward_nfts(account, app_id, rewards):
+    """
+    An account's reward NFTs, in asset id order: the assets its nft_<itob(id)>
+    local keys name and the ones it holds among rewards (reward_assets of the
+    app account). crowdfunding.py stores 1 under nft_ rather than the asset id,
+    so its NFTs are only found through the holdings, without a project id.
+    """
+    minted = {}
+    for key, value in local_state(account, app_id).items():
+        project_id = _local_project_id(key, NFT_PREFIX)
+        if project_id is not None and isinstance(value, int) and value > 1:
+            minted[value] = project_id
+    held = {holding["asset-id"]: holding["amount"] for holding in account.get("assets", [])
+            if holding["asset-id"] in rewards and holding["amount"]}
+    nfts = []
+    for asset_id in sorted(minted.keys() | held.keys()):
+        params = rewards.get(asset_id, {})
+        nfts.append({"asset_id": asset_id, "project_id": minted.get(asset_id), "amount": held.get(asset_id, 0),
+                     "name": params.get("name"), "url": params.get("url")})
+    return nfts
+
+
+class ProjectState:
+    """Global state indexed by (project_id, field), as of one round"""
+
+    def __init__(self, state, round_num=None):
+        self.round = round_num
+        self.fields = {}   # (project_id, field) -> typed value
+        self.other = {}    # key bytes -> value, for keys outside the project layout
+        for key, value in state.items():
+            parsed = parse_project_key(key)
+            if parsed is None:
+                self.other[key] = value
+                continue
+            project_id, field = parsed
+            for name, typed in project_fields(field, value).items():
+                self.fields[project_id, name] = typed
+        self._projects = None
+
+    @classmethod
+    def from_global_state(cls, entries, round_num=None):
+        return cls(decode_global_state(entries), round_num)
+
+    def value(self, project_id, field, default=None):
+        return self.fields.get((project_id, field), default)
+
+    def projects(self):
+        """{project_id: Project}, in project id order"""
+        if self._projects is None:
+            grouped = {}
+            for (project_id, field), value in self.fields.items():
+                if field in PROJECT_FIELDS:
+                    grouped.setdefault(project_id, {})[field] = value
+            self._projects = {project_id: Project(project_id, **grouped[project_id]) for project_id in sorted(grouped)}
+        return self._projects
+
+    def project(self, project_id):
+        project = self.projects().get(project_id)
+        if project is None:
+            raise KeyError(f"project {project_id} does not exist")
+        return project
+
+    @property
+    def project_count(self):
+        return self.other.get(b"project_count", 0)
+
+
+class ProjectStateReader:
+    """Reads one app's global state through a PooledAlgodClient, decoding it at most once per round"""
+
+    def __init__(self, client, app_id):
+        self.client = client
+        self.app_id = app_id
+        self._state = None
+
+    def state(self):
+        """ProjectState as of the client's current round; reused while the round is unchanged"""
+        round_num, info = self.client.application_info_at(self.app_id)
+        if self._state is None or self._state.round != round_num:
+            self._state = ProjectState.from_global_state(info["params"].get("global-state", []), round_num)
+        return self._state
+
+    def projects(self):
+        return self.state().projects()
+
+    def project(self, project_id):
+        return self.state().project(project_id)
+
+    def value(self, project_id, field):
+        return self.state().value(project_id, field)
+
+
+def synthetic_state(keys):
+    """A global-state list of about `keys` entries in the p_<id>_<field> layout, as algod returns it"""
+    creator = bytes(range(32))
+    fields = [("name", b"Project"), ("desc", b"A description"), ("target", 5_000_000), ("deadline", 1_900_000_000),
+              ("category", b"Tech"), ("creator", creator), ("collected", 1_000_000), ("active", 1)]
+    entries = [{"key": base64.b64encode(b"project_count").decode(), "value": {"type": 2, "uint": 0, "bytes": ""}}]
+    for project_id in range(keys // len(fields)):
+        prefix = b"p_" + project_id.to_bytes(8, "big") + b"_"
+        for field, value in fields:
+            entries.append({"key": base64.b64encode(prefix + field.encode()).decode(),
+                            "value": {"type": 2, "uint": value, "bytes": ""} if isinstance(value, int)
+                            else {"type": 1, "uint": 0, "bytes": base64.b64encode(value).decode()}})
+    entries[0]["value"]["uint"] = keys // len(fields)
+    return entries
+
+
+def search_projects(entries):
+    """The per-field search readers do today: scan the key list for each field of each project"""
+    def find(key):
+        for kv in entries:
+            if base64.b64decode(kv["key"]) == key:
+                return kv["value"]
+        return None
+
+    count = find(b"project_count")["uint"]
+    projects = {}
+    for project_id in range(count):
+        prefix = b"p_" + project_id.to_bytes(8, "big") + b"_"
+        values = {}
+        for field in PROJECT_FIELDS:
+            value = find(prefix + field.encode())
+            if value is not None:
+                raw = value["uint"] if value["type"] == 2 else base64.b64decode(value["bytes"])
+                values.update(project_fields(field, raw))
+        projects[project_id] = Project(project_id, **values)
+    return projects
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the one-pass global-state index")
+    parser.add_argument("--keys", type=int, default=4000, help="global-state entries to decode (default 4000)")
+    parser.add_argument("--repeat", type=int, default=100, help="reads within one round (default 100)")
+    args = parser.parse_args(argv)
+
+    entries = synthetic_state(args.keys)
+    started = time.perf_counter()
+    searched = search_projects(entries)
+    search_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = ProjectState.from_global_state(entries).projects()
+    index_time = time.perf_counter() - started
+    assert indexed == searched, "one-pass index and per-field search disagree"
+
+    from algorand_client import PooledAlgodClient
+
+    class OneRoundSession:
+        """requests.Session stand-in serving the synthetic state at a fixed round"""
+
+        def request(self, method, url, **kwargs):
+            body = {"last-round": 1} if url.endswith("/status") else {"params": {"global-state": entries}}
+            return SimpleNamespace(status_code=200, content=json.dumps(body).encode(), json=lambda: body)
+
+    client = PooledAlgodClient("", "http://bench", session=OneRoundSession())
+    reader = ProjectStateReader(client, 0)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        reader.projects()
+    memo_time = (time.perf_counter() - started) / args.repeat
+
+    print(f"{len(entries)} keys, {len(indexed)} projects\n")
+    print(f"per-field search       {search_time * 1000:10.2f} ms")
+    print(f"one-pass index         {index_time * 1000:10.2f} ms   {search_time / index_time:8.0f}x")
+    print(f"same-round read        {memo_time * 1000:10.4f} ms   "
+          f"({client.requests['GET /applications/{}']} application_info, "
+          f"{client.requests['GET /status']} status for {args.repeat} reads)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Page through the projects of the ABI contract with its read-only views.
+
+get_project and list_projects are simulated, not sent: no fee is paid and
+nothing is signed, so any funded address can read (the creator's is used by
+default). One simulate request carries up to 16 list_projects calls, i.e. up
+to 128 projects per HTTP round trip.
+
+    python project_views.py <app_id>
+"""
+
+import base64
+import sys
+
+from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+
+from crowdfunding_abi_client import CrowdfundingClient
+from project_layout import (
+    MAX_BOX_REFERENCES, MAX_GROUP_SIZE, PLATFORM_TOTALS, PROJECT_FIELDS,
+    category_box_name, decode_category_stats,
+)
+from algorand_client import get_algod_client
+
+
+def reader(client, app_id, sender=None):
+    """Read-only client for the app; reads are simulated as sender"""
+    if sender is None:
+        sender = client.application_info(app_id)["params"]["creator"]
+    return CrowdfundingClient(client, app_id=app_id, sender=sender)
+
+
+def as_dict(project_id, values):
+    project = dict(zip(PROJECT_FIELDS, values))
+    project["id"] = project_id
+    return project
+
+
+def platform_totals(app):
+    """Platform-wide running totals, read from global state in one request"""
+    state = app.global_state()
+    return {key: state.get(key.encode(), 0) for key in PLATFORM_TOTALS}
+
+
+def category_totals(app, category):
+    """Running totals of one category, read from its box in one request"""
+    box = app.client.application_box_by_name(app.app_id, category_box_name(category))
+    return decode_category_stats(base64.b64decode(box["value"]))
+
+
+def get_project(app, project_id):
+    return as_dict(project_id, app.get_project(project_id))
+
+
+def iter_projects(app, start=0, page_size=MAX_BOX_REFERENCES, calls_per_request=MAX_GROUP_SIZE):
+    """Yield every project from start on as a dict, in id order"""
+    project_count = app.global_state().get(b"project_count", 0)
+    while start < project_count:
+        # Fan one simulate request out over consecutive pages
+        atc = AtomicTransactionComposer()
+        starts = range(start, min(project_count, start + page_size * calls_per_request), page_size)
+        for page_start in starts:
+            app.list_projects(page_start, min(page_size, project_count - page_start), atc=atc)
+        results = app.simulate(atc).abi_results
+
+        for page_start, result in zip(starts, results):
+            records = result.return_value
+            for offset, values in enumerate(records):
+                yield as_dict(page_start + offset, values)
+            if len(records) < min(page_size, project_count - page_start):
+                # The page was cut short by the return size limit; resume
+                # right after its last record
+                if not records and page_start == start:
+                    raise ValueError(f"project {start} does not fit in a single return value")
+                start = page_start + len(records)
+                break
+        else:
+            start = starts[-1] + page_size
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 1:
+        print(__doc__)
+        return 1
+
+    app = reader(get_algod_client(), int(argv[0]))
+    for project in iter_projects(app):
+        print(f"#{project['id']} {project['name']} ({project['category']}): "
+              f"{project['collected']}/{project['target']} microAlgos from {project['backers']} backers")
+    print(", ".join(f"{key}: {value}" for key, value in platform_totals(app).items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
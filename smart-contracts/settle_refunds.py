@@ -0,0 +1,141 @@
+"""
+Keeper that refunds every backer of a failed project (crowdfunding.py).
+
+Instead of waiting for each contributor to send their own "refund" call, the
+keeper pages through the app's opted-in accounts on the indexer, keeps the
+ones holding a contrib_<id>_<address> balance, and settles them with
+"settle_refunds" calls: 4 contributors per call (the foreign account limit)
+and 16 calls per atomic group, so one group refunds up to 64 backers. Each
+call pays the fees of its inner payments.
+
+    python settle_refunds.py <app_id> <project_id>
+"""
+
+import base64
+import sys
+import time
+
+from algosdk import encoding, mnemonic
+from algosdk import account as algo_account
+from algosdk.transaction import ApplicationNoOpTxn, assign_group_id
+
+from project_layout import MAX_FOREIGN_ACCOUNTS, MAX_GROUP_SIZE
+from project_state import ProjectState
+from algorand_client import get_algod_client, get_indexer_client, wait_for_all, wait_for_confirmation
+
+
+INDEXER_PAGE_SIZE = 1000
+
+
+def contributor_key(project_id, address):
+    return b"contrib_" + project_id.to_bytes(8, "big") + b"_" + encoding.decode_address(address)
+
+
+def load_project(client, app_id, project_id):
+    """The project's packed record, from global state decoded in one pass"""
+    state = ProjectState.from_global_state(client.application_info(app_id)["params"].get("global-state", []))
+    try:
+        return state.project(project_id)
+    except KeyError:
+        raise ValueError(f"project {project_id} does not exist in app {app_id}") from None
+
+
+def iter_contributors(indexer_client, app_id, project_id):
+    """Yield (address, amount) for every account still owed a refund"""
+    next_page = None
+    while True:
+        response = indexer_client.accounts(
+            application_id=app_id, limit=INDEXER_PAGE_SIZE, next_page=next_page, exclude="assets,created-assets,created-apps"
+        )
+        for acct in response.get("accounts", []):
+            key = base64.b64encode(contributor_key(project_id, acct["address"])).decode()
+            for app_state in acct.get("apps-local-state", []):
+                if app_state["id"] != app_id:
+                    continue
+                for kv in app_state.get("key-value", []):
+                    if kv["key"] == key and kv["value"].get("uint", 0) > 0:
+                        yield acct["address"], kv["value"]["uint"]
+        next_page = response.get("next-token")
+        if not next_page:
+            return
+
+
+def pages(addresses, size):
+    for start in range(0, len(addresses), size):
+        yield addresses[start:start + size]
+
+
+def settle_group(client, private_key, app_id, project_id, addresses, sp=None, wait=True):
+    """Refund up to MAX_GROUP_SIZE * MAX_FOREIGN_ACCOUNTS contributors in one atomic group"""
+    sender = algo_account.address_from_private_key(private_key)
+    sp = sp or client.suggested_params()
+
+    txns = []
+    for page in pages(addresses, MAX_FOREIGN_ACCOUNTS):
+        txn = ApplicationNoOpTxn(
+            sender=sender,
+            sp=sp,
+            index=app_id,
+            app_args=[b"settle_refunds", project_id.to_bytes(8, "big")],
+            accounts=page,
+        )
+        # Fee pooling: the call covers one inner payment per contributor
+        txn.fee = max(sp.min_fee, 1000) * (1 + len(page))
+        txns.append(txn)
+
+    if len(txns) > 1:
+        assign_group_id(txns)
+    tx_id = client.send_transactions([txn.sign(private_key) for txn in txns])
+    if wait:
+        wait_for_confirmation(client, tx_id, 4)
+    return tx_id
+
+
+def settle_project(client, indexer_client, private_key, app_id, project_id, max_passes=5):
+    """Drive settlement until no contributor of the project is owed a refund"""
+    project = load_project(client, app_id, project_id)
+    if project.collected >= project.target or project.deadline > time.time() or not project.active:
+        raise ValueError(f"project {project_id} is not refundable")
+
+    group_capacity = MAX_GROUP_SIZE * MAX_FOREIGN_ACCOUNTS
+    settled = set()
+    refunded = 0
+    for _ in range(max_passes):
+        # The indexer trails algod by a few rounds, so accounts settled in an
+        # earlier pass are remembered rather than resubmitted
+        owed = [(addr, amount) for addr, amount in iter_contributors(indexer_client, app_id, project_id)
+                if addr not in settled]
+        if not owed:
+            break
+
+        sp = client.suggested_params()
+        addresses = [addr for addr, _ in owed]
+        # Groups are independent: submit them all, then wait for them together
+        groups = {settle_group(client, private_key, app_id, project_id, group, sp, wait=False): group
+                  for group in pages(addresses, group_capacity)}
+        for info in wait_for_all(client, list(groups), 4):
+            group = groups[info["txid"]]
+            settled.update(group)
+            print(f"Refunded {len(group)} contributors in group {info['txid']} (round {info['confirmed-round']})")
+        refunded += sum(amount for _, amount in owed)
+
+    print(f"Project {project_id}: {len(settled)} contributors refunded, {refunded} microAlgos returned")
+    return settled
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__)
+        return 1
+    app_id, project_id = int(argv[0]), int(argv[1])
+
+    keeper_mnemonic = input("Enter the keeper wallet mnemonic phrase: ")
+    private_key = mnemonic.to_private_key(keeper_mnemonic)
+
+    settle_project(get_algod_client(), get_indexer_client(), private_key, app_id, project_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+"""
+Offline TEAL assembler (AVM v1-v8) with a content-addressed bytecode cache.
+
+Turns TEAL source into the program bytes algod's /teal/compile would return,
+so deploys and tests never need a network round trip to compile:
+
+    program = assemble(source).bytecode
+    program = compile_cached(source)        # cached under .teal_cache/<sha256>
+    python teal_assembler.py approval*.teal clear*.teal
+
+The command line writes <name>.teal.tok (bytecode) and <name>.teal.map (a
+source map in algod's format, plus the pc -> line table). Like algod, `int`
+and `byte` constants used more than once are pooled into intcblock /
+bytecblock, most used first so they get the one-byte intc_N / bytec_N forms;
+from v3 on, constants used once become pushint / pushbytes.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+
+from algosdk import encoding
+
+from teal_cost import parse_program
+
+# Bump whenever the encoding changes, so cached bytecode is not reused
+ASSEMBLER_VERSION = 1
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".teal_cache")
+
+TXN_FIELDS = [
+    "Sender", "Fee", "FirstValid", "FirstValidTime", "LastValid", "Note", "Lease", "Receiver", "Amount",
+    "CloseRemainderTo", "VotePK", "SelectionPK", "VoteFirst", "VoteLast", "VoteKeyDilution", "Type", "TypeEnum",
+    "XferAsset", "AssetAmount", "AssetSender", "AssetReceiver", "AssetCloseTo", "GroupIndex", "TxID",
+    "ApplicationID", "OnCompletion", "ApplicationArgs", "NumAppArgs", "Accounts", "NumAccounts",
+    "ApprovalProgram", "ClearStateProgram", "RekeyTo", "ConfigAsset", "ConfigAssetTotal", "ConfigAssetDecimals",
+    "ConfigAssetDefaultFrozen", "ConfigAssetUnitName", "ConfigAssetName", "ConfigAssetURL",
+    "ConfigAssetMetadataHash", "ConfigAssetManager", "ConfigAssetReserve", "ConfigAssetFreeze",
+    "ConfigAssetClawback", "FreezeAsset", "FreezeAssetAccount", "FreezeAssetFrozen", "Assets", "NumAssets",
+    "Applications", "NumApplications", "GlobalNumUint", "GlobalNumByteSlice", "LocalNumUint",
+    "LocalNumByteSlice", "ExtraProgramPages", "Nonparticipation", "Logs", "NumLogs", "CreatedAssetID",
+    "CreatedApplicationID", "LastLog", "StateProofPK", "ApprovalProgramPages", "NumApprovalProgramPages",
+    "ClearStateProgramPages", "NumClearStateProgramPages",
+]
+GLOBAL_FIELDS = [
+    "MinTxnFee", "MinBalance", "MaxTxnLife", "ZeroAddress", "GroupSize", "LogicSigVersion", "Round",
+    "LatestTimestamp", "CurrentApplicationID", "CreatorAddress", "CurrentApplicationAddress", "GroupID",
+    "OpcodeBudget", "CallerApplicationID", "CallerApplicationAddress",
+]
+ASSET_HOLDING_FIELDS = ["AssetBalance", "AssetFrozen"]
+ASSET_PARAMS_FIELDS = [
+    "AssetTotal", "AssetDecimals", "AssetDefaultFrozen", "AssetUnitName", "AssetName", "AssetURL",
+    "AssetMetadataHash", "AssetManager", "AssetReserve", "AssetFreeze", "AssetClawback", "AssetCreator",
+]
+APP_PARAMS_FIELDS = [
+    "AppApprovalProgram", "AppClearStateProgram", "AppGlobalNumUint", "AppGlobalNumByteSlice", "AppLocalNumUint",
+    "AppLocalNumByteSlice", "AppExtraProgramPages", "AppCreator", "AppAddress",
+]
+ACCT_PARAMS_FIELDS = [
+    "AcctBalance", "AcctMinBalance", "AcctAuthAddr", "AcctTotalNumUint", "AcctTotalNumByteSlice",
+    "AcctTotalExtraAppPages", "AcctTotalAppsCreated", "AcctTotalAppsOptedIn", "AcctTotalAssetsCreated",
+    "AcctTotalAssets", "AcctTotalBoxes", "AcctTotalBoxBytes",
+]
+ENUMS = {
+    "txn": TXN_FIELDS,
+    "global": GLOBAL_FIELDS,
+    "asset_holding": ASSET_HOLDING_FIELDS,
+    "asset_params": ASSET_PARAMS_FIELDS,
+    "app_params": APP_PARAMS_FIELDS,
+    "acct_params": ACCT_PARAMS_FIELDS,
+    "ecdsa": ["Secp256k1", "Secp256r1"],
+    "base64": ["URLEncoding", "StdEncoding"],
+    "json": ["JSONString", "JSONUint64", "JSONObject"],
+    "vrf": ["VrfAlgorand"],
+    "block": ["BlkSeed", "BlkTimestamp"],
+}
+
+# Named integer constants accepted by `int`
+INT_CONSTANTS = {
+    "NoOp": 0, "OptIn": 1, "CloseOut": 2, "ClearState": 3, "UpdateApplication": 4, "DeleteApplication": 5,
+    "unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6,
+}
+
+# name: (opcode, minimum version, immediates)
+# Immediate kinds: u8 / i8 (one byte), label (int16 offset), labels (count + offsets),
+# varuint, bytes, varuints / bytess (count + values), and an ENUMS key for a field.
+OPS = {
+    "err": (0x00, 1, ()), "sha256": (0x01, 1, ()), "keccak256": (0x02, 1, ()), "sha512_256": (0x03, 1, ()),
+    "ed25519verify": (0x04, 1, ()), "ecdsa_verify": (0x05, 5, ("ecdsa",)),
+    "ecdsa_pk_decompress": (0x06, 5, ("ecdsa",)), "ecdsa_pk_recover": (0x07, 5, ("ecdsa",)),
+    "+": (0x08, 1, ()), "-": (0x09, 1, ()), "/": (0x0a, 1, ()), "*": (0x0b, 1, ()), "<": (0x0c, 1, ()),
+    ">": (0x0d, 1, ()), "<=": (0x0e, 1, ()), ">=": (0x0f, 1, ()), "&&": (0x10, 1, ()), "||": (0x11, 1, ()),
+    "==": (0x12, 1, ()), "!=": (0x13, 1, ()), "!": (0x14, 1, ()), "len": (0x15, 1, ()), "itob": (0x16, 1, ()),
+    "btoi": (0x17, 1, ()), "%": (0x18, 1, ()), "|": (0x19, 1, ()), "&": (0x1a, 1, ()), "^": (0x1b, 1, ()),
+    "~": (0x1c, 1, ()), "mulw": (0x1d, 1, ()), "addw": (0x1e, 2, ()), "divmodw": (0x1f, 4, ()),
+    "intcblock": (0x20, 1, ("varuints",)), "intc": (0x21, 1, ("u8",)), "intc_0": (0x22, 1, ()),
+    "intc_1": (0x23, 1, ()), "intc_2": (0x24, 1, ()), "intc_3": (0x25, 1, ()),
+    "bytecblock": (0x26, 1, ("bytess",)), "bytec": (0x27, 1, ("u8",)), "bytec_0": (0x28, 1, ()),
+    "bytec_1": (0x29, 1, ()), "bytec_2": (0x2a, 1, ()), "bytec_3": (0x2b, 1, ()),
+    "arg": (0x2c, 1, ("u8",)), "arg_0": (0x2d, 1, ()), "arg_1": (0x2e, 1, ()), "arg_2": (0x2f, 1, ()),
+    "arg_3": (0x30, 1, ()),
+    "txn": (0x31, 1, ("txn",)), "global": (0x32, 1, ("global",)), "gtxn": (0x33, 1, ("u8", "txn")),
+    "load": (0x34, 1, ("u8",)), "store": (0x35, 1, ("u8",)), "txna": (0x36, 2, ("txn", "u8")),
+    "gtxna": (0x37, 2, ("u8", "txn", "u8")), "gtxns": (0x38, 3, ("txn",)), "gtxnsa": (0x39, 3, ("txn", "u8")),
+    "gload": (0x3a, 4, ("u8", "u8")), "gloads": (0x3b, 4, ("u8",)), "gaid": (0x3c, 4, ("u8",)),
+    "gaids": (0x3d, 4, ()), "loads": (0x3e, 5, ()), "stores": (0x3f, 5, ()),
+    "bnz": (0x40, 1, ("label",)), "bz": (0x41, 2, ("label",)), "b": (0x42, 2, ("label",)),
+    "return": (0x43, 2, ()), "assert": (0x44, 3, ()), "bury": (0x45, 8, ("u8",)), "popn": (0x46, 8, ("u8",)),
+    "dupn": (0x47, 8, ("u8",)), "pop": (0x48, 1, ()), "dup": (0x49, 1, ()), "dup2": (0x4a, 2, ()),
+    "dig": (0x4b, 3, ("u8",)), "swap": (0x4c, 3, ()), "select": (0x4d, 3, ()), "cover": (0x4e, 5, ("u8",)),
+    "uncover": (0x4f, 5, ("u8",)), "concat": (0x50, 2, ()), "substring": (0x51, 2, ("u8", "u8")),
+    "substring3": (0x52, 2, ()), "getbit": (0x53, 3, ()), "setbit": (0x54, 3, ()), "getbyte": (0x55, 3, ()),
+    "setbyte": (0x56, 3, ()), "extract": (0x57, 5, ("u8", "u8")), "extract3": (0x58, 5, ()),
+    "extract_uint16": (0x59, 5, ()), "extract_uint32": (0x5a, 5, ()), "extract_uint64": (0x5b, 5, ()),
+    "replace2": (0x5c, 7, ("u8",)), "replace3": (0x5d, 7, ()), "base64_decode": (0x5e, 7, ("base64",)),
+    "json_ref": (0x5f, 7, ("json",)),
+    "balance": (0x60, 2, ()), "app_opted_in": (0x61, 2, ()), "app_local_get": (0x62, 2, ()),
+    "app_local_get_ex": (0x63, 2, ()), "app_global_get": (0x64, 2, ()), "app_global_get_ex": (0x65, 2, ()),
+    "app_local_put": (0x66, 2, ()), "app_global_put": (0x67, 2, ()), "app_local_del": (0x68, 2, ()),
+    "app_global_del": (0x69, 2, ()), "asset_holding_get": (0x70, 2, ("asset_holding",)),
+    "asset_params_get": (0x71, 2, ("asset_params",)), "app_params_get": (0x72, 5, ("app_params",)),
+    "acct_params_get": (0x73, 6, ("acct_params",)), "min_balance": (0x78, 3, ()),
+    "pushbytes": (0x80, 3, ("bytes",)), "pushint": (0x81, 3, ("varuint",)),
+    "pushbytess": (0x82, 8, ("bytess",)), "pushints": (0x83, 8, ("varuints",)),
+    "ed25519verify_bare": (0x84, 7, ()), "callsub": (0x88, 4, ("label",)), "retsub": (0x89, 4, ()),
+    "proto": (0x8a, 8, ("u8", "u8")), "frame_dig": (0x8b, 8, ("i8",)), "frame_bury": (0x8c, 8, ("i8",)),
+    "switch": (0x8d, 8, ("labels",)), "match": (0x8e, 8, ("labels",)),
+    "shl": (0x90, 4, ()), "shr": (0x91, 4, ()), "sqrt": (0x92, 4, ()), "bitlen": (0x93, 4, ()),
+    "exp": (0x94, 4, ()), "expw": (0x95, 4, ()), "bsqrt": (0x96, 6, ()), "divw": (0x97, 6, ()),
+    "sha3_256": (0x98, 7, ()),
+    "b+": (0xa0, 4, ()), "b-": (0xa1, 4, ()), "b/": (0xa2, 4, ()), "b*": (0xa3, 4, ()), "b<": (0xa4, 4, ()),
+    "b>": (0xa5, 4, ()), "b<=": (0xa6, 4, ()), "b>=": (0xa7, 4, ()), "b==": (0xa8, 4, ()),
+    "b!=": (0xa9, 4, ()), "b%": (0xaa, 4, ()), "b|": (0xab, 4, ()), "b&": (0xac, 4, ()), "b^": (0xad, 4, ()),
+    "b~": (0xae, 4, ()), "bzero": (0xaf, 4, ()),
+    "log": (0xb0, 5, ()), "itxn_begin": (0xb1, 5, ()), "itxn_field": (0xb2, 5, ("txn",)),
+    "itxn_submit": (0xb3, 5, ()), "itxn": (0xb4, 5, ("txn",)), "itxna": (0xb5, 5, ("txn", "u8")),
+    "itxn_next": (0xb6, 6, ()), "gitxn": (0xb7, 6, ("u8", "txn")), "gitxna": (0xb8, 6, ("u8", "txn", "u8")),
+    "box_create": (0xb9, 8, ()), "box_extract": (0xba, 8, ()), "box_replace": (0xbb, 8, ()),
+    "box_del": (0xbc, 8, ()), "box_len": (0xbd, 8, ()), "box_get": (0xbe, 8, ()), "box_put": (0xbf, 8, ()),
+    "txnas": (0xc0, 5, ("txn",)), "gtxnas": (0xc1, 5, ("u8", "txn")), "gtxnsas": (0xc2, 5, ("txn",)),
+    "args": (0xc3, 5, ()), "gloadss": (0xc4, 6, ()), "itxnas": (0xc5, 6, ("txn",)),
+    "gitxnas": (0xc6, 6, ("u8", "txn")), "vrf_verify": (0xd0, 7, ("vrf",)), "block": (0xd1, 7, ("block",)),
+}
+
+# Field ops written with a trailing array index assemble to their "a" form:
+# txn ApplicationArgs 0 -> txna ApplicationArgs 0
+INDEXED_FORMS = {"txn": "txna", "gtxn": "gtxna", "gtxns": "gtxnsa", "itxn": "itxna", "gitxn": "gitxna"}
+
+
+class TealAssemblyError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+class UnsupportedVersionError(TealAssemblyError):
+    pass
+
+
+class Program:
+    def __init__(self, version, bytecode, pc_lines):
+        self.version = version
+        self.bytecode = bytecode
+        self.pc_lines = pc_lines  # source line of the instruction at every pc
+
+    @property
+    def hash(self):
+        """Escrow address of the program, as algod's /teal/compile reports it"""
+        return encoding.encode_address(encoding.checksum(b"Program" + self.bytecode))
+
+    def source_map(self):
+        """Source map in the format algod returns with ?sourcemap=true"""
+        segments, previous = [], 0
+        for line in self.pc_lines:
+            # One segment per pc; only the source line is tracked (0-based)
+            segments.append(_vlq(0) + _vlq(0) + _vlq(line - 1 - previous) + _vlq(0))
+            previous = line - 1
+        return {"version": 3, "sources": [], "names": [], "mappings": ";".join(segments)}
+
+
+def assemble(source):
+    """Assemble TEAL source into a Program; raises TealAssemblyError on bad input"""
+    version = 1
+    for number, raw in enumerate(source.splitlines(), 1):
+        text = raw.strip()
+        if text.startswith("#pragma version"):
+            version = int(text.split()[2])
+        elif text.startswith("#pragma"):
+            raise TealAssemblyError(number, f"unknown pragma {text}")
+    if version > 8:
+        raise UnsupportedVersionError(1, f"version {version} is not supported by this assembler (max 8)")
+
+    lines = [_normalize(number, op, args) if op else (number, label, None, args)
+             for number, label, op, args in parse_program(source)]
+    ints, byte_values = _pool_constants(lines, version)
+    if (ints or byte_values) and any(op in ("intcblock", "bytecblock") for _, _, op, _ in lines):
+        raise TealAssemblyError(1, "int/byte pseudo-ops cannot be mixed with an explicit intcblock/bytecblock")
+
+    instructions = []  # (line, label or None, opcode byte(s) builder)
+    if ints:
+        instructions.append((1, None, "intcblock", [str(value) for value in ints]))
+    if byte_values:
+        instructions.append((1, None, "bytecblock", ["0x" + value.hex() for value in byte_values]))
+    int_index = {value: i for i, value in enumerate(ints)}
+    byte_index = {value: i for i, value in enumerate(byte_values)}
+
+    for number, label, op, args in lines:
+        if op == "int":
+            value = _parse_int(number, args[0])
+            op, args = _constant_ref("intc", int_index[value]) if value in int_index else ("pushint", [str(value)])
+        elif op in ("byte", "addr", "method"):
+            value = _parse_bytes_op(number, op, args)
+            op, args = _constant_ref("bytec", byte_index[value]) if value in byte_index else \
+                ("pushbytes", ["0x" + value.hex()])
+        instructions.append((number, label, op, args))
+
+    return _encode(instructions, version)
+
+
+def _normalize(number, op, args):
+    if op in INDEXED_FORMS and args:
+        field_position = 1 if op in ("gtxn", "gitxn") else 0
+        if len(args) == field_position + 2:
+            op = INDEXED_FORMS[op]
+    if op not in OPS and op not in ("int", "byte", "addr", "method"):
+        raise TealAssemblyError(number, f"unknown opcode {op}")
+    return number, None, op, args
+
+
+def _pool_constants(lines, version):
+    """intcblock / bytecblock contents, most referenced first"""
+    # Before v3 there is no pushint / pushbytes, so every constant is pooled
+    min_uses = 1 if version < 3 else 2
+    int_counts, byte_counts = Counter(), Counter()
+    for number, _, op, args in lines:
+        if op == "int":
+            if len(args) != 1:
+                raise TealAssemblyError(number, "int expects one immediate")
+            int_counts[_parse_int(number, args[0])] += 1
+        elif op in ("byte", "addr", "method"):
+            byte_counts[_parse_bytes_op(number, op, args)] += 1
+    # Counter keeps first-seen order for ties, so the layout is deterministic
+    return ([value for value, count in int_counts.most_common() if count >= min_uses],
+            [value for value, count in byte_counts.most_common() if count >= min_uses])
+
+
+def _constant_ref(kind, index):
+    if index < 4:
+        return f"{kind}_{index}", []
+    return kind, [str(index)]
+
+
+def _encode(instructions, version):
+    labels = {}
+    out = bytearray(_varuint(version))
+    pc_lines = [1] * len(out)
+    fixups = []  # (position of the offset, pc the offset is relative to, label, line)
+
+    for number, label, op, args in instructions:
+        if label is not None:
+            if label in labels:
+                raise TealAssemblyError(number, f"duplicate label {label}")
+            labels[label] = len(out)
+            continue
+        opcode, min_version, kinds = OPS[op]
+        if version < min_version:
+            raise TealAssemblyError(number, f"{op} needs version {min_version}, program is version {version}")
+        variadic = bool(kinds) and kinds[-1] in ("labels", "varuints", "bytess")
+        if not variadic and len(args) != len(kinds):
+            raise TealAssemblyError(number, f"{op} expects {len(kinds)} immediates, got {len(args)}")
+
+        start = len(out)
+        encoded = bytearray([opcode])
+        pending = []
+        for position, kind in enumerate(kinds):
+            if kind == "labels":
+                encoded.append(_u8(number, len(args) - position))
+                for target in args[position:]:
+                    pending.append((len(encoded), target))
+                    encoded += b"\x00\x00"
+            elif kind == "varuints":
+                values = args[position:]
+                encoded += _varuint(len(values))
+                for value in values:
+                    encoded += _varuint(_parse_int(number, value))
+            elif kind == "bytess":
+                values = args[position:]
+                encoded += _varuint(len(values))
+                for value in values:
+                    data = _parse_bytes(number, [value])
+                    encoded += _varuint(len(data)) + data
+            else:
+                encoded += _immediate(number, op, kind, args[position], pending, len(encoded))
+        out += encoded
+        pc_lines += [number] * len(encoded)
+        for offset, target in pending:
+            fixups.append((start + offset, len(out), target, number))
+
+    for position, base, target, number in fixups:
+        if target not in labels:
+            raise TealAssemblyError(number, f"reference to undefined label {target}")
+        offset = labels[target] - base
+        if offset < 0 and version < 4:
+            raise TealAssemblyError(number, f"backward branch to {target} needs version 4")
+        if not -0x8000 <= offset <= 0x7fff:
+            raise TealAssemblyError(number, f"branch to {target} is too far")
+        out[position:position + 2] = offset.to_bytes(2, "big", signed=True)
+
+    return Program(version, bytes(out), pc_lines)
+
+
+def _immediate(number, op, kind, arg, pending, position):
+    if kind == "u8":
+        return bytes([_u8(number, _parse_int(number, arg))])
+    if kind == "i8":
+        value = _parse_int(number, arg, signed=True)
+        if not -128 <= value <= 127:
+            raise TealAssemblyError(number, f"{op} immediate {value} out of range")
+        return value.to_bytes(1, "big", signed=True)
+    if kind == "label":
+        pending.append((position, arg))
+        return b"\x00\x00"
+    if kind == "varuint":
+        return _varuint(_parse_int(number, arg))
+    if kind == "bytes":
+        data = _parse_bytes(number, [arg])
+        return _varuint(len(data)) + data
+    fields = ENUMS[kind]
+    if arg in fields:
+        return bytes([fields.index(arg)])
+    if arg.isdigit() and kind != "txn":
+        return bytes([_u8(number, int(arg))])
+    raise TealAssemblyError(number, f"unknown {op} field {arg}")
+
+
+def _u8(number, value):
+    if not 0 <= value <= 255:
+        raise TealAssemblyError(number, f"immediate {value} does not fit in a byte")
+    return value
+
+
+def _varuint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _parse_int(number, text, signed=False):
+    if text in INT_CONSTANTS:
+        return INT_CONSTANTS[text]
+    try:
+        if text.lower().startswith(("0x", "-0x")):
+            value = int(text, 16)
+        elif len(text) > 1 and text.startswith("0"):
+            value = int(text, 8)
+        else:
+            value = int(text)
+    except ValueError:
+        raise TealAssemblyError(number, f"invalid integer {text}") from None
+    if value < 0 and not signed or value >= 1 << 64:
+        raise TealAssemblyError(number, f"integer {text} out of range")
+    return value
+
+
+def _parse_bytes_op(number, op, args):
+    if op == "addr":
+        if len(args) != 1:
+            raise TealAssemblyError(number, "addr expects one address")
+        try:
+            return encoding.decode_address(args[0])
+        except Exception:
+            raise TealAssemblyError(number, f"invalid address {args[0]}") from None
+    if op == "method":
+        if len(args) != 1 or not args[0].startswith('"'):
+            raise TealAssemblyError(number, "method expects a quoted signature")
+        signature = _parse_string(number, args[0])
+        return encoding.checksum(signature)[:4]
+    return _parse_bytes(number, args)
+
+
+def _parse_bytes(number, args):
+    """Decode a byte constant: "string", 0xHEX, base64 X, b64(X), base32 X, b32(X)"""
+    text = args[0]
+    if len(args) == 2 and text in ("base64", "b64"):
+        return _b64(number, args[1])
+    if len(args) == 2 and text in ("base32", "b32"):
+        return _b32(number, args[1])
+    if len(args) != 1:
+        raise TealAssemblyError(number, f"invalid byte constant {' '.join(args)}")
+    if text.startswith('"'):
+        return _parse_string(number, text)
+    if text.startswith("0x"):
+        try:
+            return bytes.fromhex(text[2:])
+        except ValueError:
+            raise TealAssemblyError(number, f"invalid hex constant {text}") from None
+    for prefix, decode in (("base64(", _b64), ("b64(", _b64), ("base32(", _b32), ("b32(", _b32)):
+        if text.startswith(prefix) and text.endswith(")"):
+            return decode(number, text[len(prefix):-1])
+    raise TealAssemblyError(number, f"invalid byte constant {text}")
+
+
+def _b64(number, text):
+    try:
+        return base64.b64decode(text, validate=True)
+    except ValueError:
+        return _urlsafe_b64(number, text)
+
+
+def _urlsafe_b64(number, text):
+    try:
+        return base64.urlsafe_b64decode(text)
+    except ValueError:
+        raise TealAssemblyError(number, f"invalid base64 constant {text}") from None
+
+
+def _b32(number, text):
+    try:
+        return base64.b32decode(text + "=" * (-len(text) % 8))
+    except ValueError:
+        raise TealAssemblyError(number, f"invalid base32 constant {text}") from None
+
+
+def _parse_string(number, text):
+    if len(text) < 2 or not text.endswith('"'):
+        raise TealAssemblyError(number, f"unterminated string {text}")
+    body, out, i = text[1:-1], bytearray(), 0
+    escapes = {"n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", '"': b'"'}
+    while i < len(body):
+        char = body[i]
+        if char != "\\":
+            out += char.encode()
+            i += 1
+            continue
+        escape = body[i + 1:i + 2]
+        if escape in escapes:
+            out += escapes[escape]
+            i += 2
+        elif escape == "x" and i + 4 <= len(body):
+            out.append(int(body[i + 2:i + 4], 16))
+            i += 4
+        else:
+            raise TealAssemblyError(number, f"invalid escape in {text}")
+    return bytes(out)
+
+
+_VLQ_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _vlq(value):
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    out = ""
+    while True:
+        digit, value = value & 0x1f, value >> 5
+        out += _VLQ_CHARS[digit | (0x20 if value else 0)]
+        if not value:
+            return out
+
+
+def source_hash(source):
+    return hashlib.sha256(f"{ASSEMBLER_VERSION}\n{source}".encode()).hexdigest()
+
+
+def compile_cached(source, cache_dir=CACHE_DIR):
+    """Bytecode for source, assembled once per distinct source text"""
+    path = os.path.join(cache_dir, source_hash(source) + ".tok")
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    program = assemble(source)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write then rename, so a concurrent reader never sees a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(program.bytecode)
+    os.replace(tmp, path)
+    return program.bytecode
+
+
+def assemble_file(path, cache_dir=CACHE_DIR):
+    with open(path) as f:
+        return compile_cached(f.read(), cache_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble TEAL programs into bytecode without algod")
+    parser.add_argument("programs", nargs="+", help="TEAL source files")
+    parser.add_argument("--no-map", action="store_true", help="skip writing the .map source map")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for path in args.programs:
+        with open(path) as f:
+            source = f.read()
+        try:
+            program = assemble(source)
+        except TealAssemblyError as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        with open(path + ".tok", "wb") as f:
+            f.write(program.bytecode)
+        if not args.no_map:
+            with open(path + ".map", "w") as f:
+                json.dump(dict(program.source_map(), pc_lines=program.pc_lines), f)
+        print(f"{path}: {len(program.bytecode)} bytes, hash {program.hash}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+"""
+Static opcode-cost analyzer for compiled TEAL approval programs.
+
+Splits a program into basic blocks, finds the method branches of the NoOp
+dispatcher (both the string-compare Cond chains and ABI method selectors)
+and reports, for every method, the worst-case opcode cost, how many inner
+transactions it can submit and which blocks dominate its cost.
+
+Loops are assumed to run as often as the contract lets them: each looping
+method is bounded by the batch limit its arguments are checked against
+(LOOP_BOUNDS), any other loop by MAX_BATCH. Op-up inner calls raise a
+method's budget by one app call each, so its limit is APP_CALL_BUDGET times
+(1 + op-up calls). Methods an ARC-4 spec's hints mark read-only (--spec) are
+run through simulate, which adds SIMULATE_EXTRA_BUDGET. They are matched by
+ABI signature, so only the program the spec describes gets the extra budget.
+The budget in the report is the one the check applies.
+
+    python teal_cost.py approval.teal approval_boxes.teal
+    python teal_cost.py approval.teal --max contribute=300 --max mint_nft=400 -o cost.json
+    python teal_cost.py approval_abi.teal --spec crowdfunding_abi.json
+
+Exits with status 1 when a method exceeds its threshold (or its app call
+budget when no threshold is given), so it can gate a build.
+"""
+
+import argparse
+import json
+import re
+import sys
+
+from algosdk import abi
+
+from app_client import SIMULATE_EXTRA_BUDGET
+from project_layout import MAX_BATCH, MAX_BOX_REFERENCES, MAX_FOREIGN_ACCOUNTS
+
+APP_CALL_BUDGET = 700
+
+# Iterations a method's loops can run: the batch limit the contract checks its arguments against
+LOOP_BOUNDS = {
+    "contribute_many": MAX_BATCH,            # one payment per project id
+    "mint_nfts": MAX_BOX_REFERENCES - 1,     # one ledger box per backer, plus the project box
+    "list_projects": MAX_BOX_REFERENCES,     # one project box per record
+    "settle_refunds": MAX_FOREIGN_ACCOUNTS,  # one referenced account per refund
+}
+DEFAULT_LOOP_BOUND = MAX_BATCH  # loops of other methods: the largest batch any method takes
+
+# Approval program of PyTeal's op-up inner calls
+OPUP_PROGRAM = "0x068101"
+
+# Opcodes that cost more than 1 (AVM v8 cost table)
+OPCODE_COSTS = {
+    "sha256": 35,
+    "keccak256": 130,
+    "sha512_256": 45,
+    "sha3_256": 130,
+    "ed25519verify": 1900,
+    "ed25519verify_bare": 1900,
+    "ecdsa_verify": 1700,
+    "ecdsa_pk_decompress": 650,
+    "ecdsa_pk_recover": 2000,
+    "vrf_verify": 5700,
+    "sqrt": 4,
+    "divmodw": 20,
+    "expw": 10,
+    "b+": 10,
+    "b-": 10,
+    "b*": 20,
+    "b/": 20,
+    "b%": 20,
+    "b|": 6,
+    "b&": 6,
+    "b^": 6,
+    "b~": 4,
+    "bsqrt": 40,
+}
+
+BRANCH_OPS = {"bnz", "bz"}
+TERMINAL_OPS = {"return", "err", "retsub"}
+MULTI_BRANCH_OPS = {"switch", "match"}
+INNER_START_OPS = {"itxn_begin", "itxn_next"}
+
+
+def opcode_cost(op):
+    return OPCODE_COSTS.get(op, 1)
+
+
+class Block:
+    def __init__(self, index, label, line):
+        self.index = index
+        self.label = label
+        self.line = line
+        self.instructions = []  # (line number, opcode, immediates)
+        self.successors = []
+        self.calls = []
+        self.cost = 0
+        self.inner_txns = 0
+        self.inner_cost = 0
+        self.opup_txns = 0
+
+    def name(self):
+        return self.label or f"line {self.line}"
+
+
+def parse_program(source):
+    """Return a list of (line number, label or None, opcode, immediates)"""
+    lines = []
+    for number, raw in enumerate(source.splitlines(), 1):
+        text = _strip_comment(raw).strip()
+        if not text or text.startswith("#pragma"):
+            continue
+        if text.endswith(":") and " " not in text:
+            lines.append((number, text[:-1], None, []))
+            continue
+        parts = _split_immediates(text)
+        lines.append((number, None, parts[0], parts[1:]))
+    return lines
+
+
+def _strip_comment(line):
+    in_string = False
+    for i, char in enumerate(line):
+        if char == '"' and (i == 0 or line[i - 1] != "\\"):
+            in_string = not in_string
+        elif not in_string and line.startswith("//", i):
+            return line[:i]
+    return line
+
+
+def _split_immediates(text):
+    return re.findall(r'"(?:\\.|[^"\\])*"|\S+', text)
+
+
+def build_blocks(lines):
+    blocks = []
+    labels = {}
+    current = None
+    in_inner = False
+    previous = (None, [])
+
+    def start(label, line):
+        block = Block(len(blocks), label, line)
+        blocks.append(block)
+        if label:
+            labels[label] = block.index
+        return block
+
+    for number, label, op, args in lines:
+        if label is not None:
+            if current is not None and not current.instructions and current.label is None:
+                current.label = label
+                labels[label] = current.index
+            else:
+                current = start(label, number)
+            continue
+        if current is None:
+            current = start(None, number)
+
+        current.instructions.append((number, op, args))
+        cost = opcode_cost(op)
+        current.cost += cost
+        if op in INNER_START_OPS:
+            current.inner_txns += 1
+            in_inner = True
+        if in_inner:
+            current.inner_cost += cost
+        if op == "itxn_submit":
+            in_inner = False
+        if op == "itxn_field" and args == ["ApprovalProgram"] and previous == ("byte", [OPUP_PROGRAM]):
+            current.opup_txns += 1
+        previous = (op, args)
+
+        if op in BRANCH_OPS or op in MULTI_BRANCH_OPS or op in TERMINAL_OPS or op == "b":
+            current = None
+
+    for position, block in enumerate(blocks):
+        last_op, last_args = (block.instructions[-1][1], block.instructions[-1][2]) if block.instructions else (None, [])
+        falls_through = position + 1 < len(blocks)
+        if last_op == "b":
+            block.successors = [labels[last_args[0]]]
+        elif last_op in BRANCH_OPS:
+            block.successors = [labels[last_args[0]]] + ([position + 1] if falls_through else [])
+        elif last_op in MULTI_BRANCH_OPS:
+            block.successors = [labels[target] for target in last_args] + ([position + 1] if falls_through else [])
+        elif last_op in TERMINAL_OPS:
+            block.successors = []
+        elif falls_through:
+            block.successors = [position + 1]
+        block.calls = [labels[args[0]] for _, op, args in block.instructions if op == "callsub"]
+
+    return blocks, labels
+
+
+def strongly_connected(blocks):
+    """Tarjan's algorithm; returns the component index of every block"""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    component = {}
+    counter = [0, 0]
+
+    def visit(root):
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = low[node] = counter[0]
+                counter[0] += 1
+                stack.append(node)
+                on_stack.add(node)
+            successors = blocks[node].successors
+            if child < len(successors):
+                work.append((node, child + 1))
+                nxt = successors[child]
+                if nxt not in index:
+                    work.append((nxt, 0))
+                elif nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            for nxt in successors:
+                if nxt in on_stack:
+                    low[node] = min(low[node], low[nxt])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = counter[1]
+                    if member == node:
+                        break
+                counter[1] += 1
+
+    for block in blocks:
+        if block.index not in index:
+            visit(block.index)
+    return component
+
+
+class CostModel:
+    """Worst-case path costs over the block graph"""
+
+    def __init__(self, source, loop_bound=DEFAULT_LOOP_BOUND):
+        self.blocks, self.labels = build_blocks(parse_program(source))
+        self.loop_bound = loop_bound
+        self.component = strongly_connected(self.blocks)
+        self.members = {}
+        for block, comp in self.component.items():
+            self.members.setdefault(comp, []).append(block)
+        self.has_loops = any(self._is_loop(comp) for comp in self.members)
+        self._subroutine_memo = {}
+        self._path_memo = {}
+        self._calling = set()
+        self.recursive = False
+
+    def _is_loop(self, comp):
+        members = self.members[comp]
+        return len(members) > 1 or members[0] in self.blocks[members[0]].successors
+
+    def block_weight(self, block, metric):
+        weight = getattr(self.blocks[block], metric)
+        for callee in self.blocks[block].calls:
+            weight += self.subroutine(callee, metric)[0]
+        return weight
+
+    def component_weight(self, comp, metric):
+        weight = sum(self.block_weight(block, metric) for block in self.members[comp])
+        return weight * self.loop_bound if self._is_loop(comp) else weight
+
+    def subroutine(self, label_index, metric):
+        key = (label_index, metric)
+        if key in self._subroutine_memo:
+            return self._subroutine_memo[key]
+        if key in self._calling:
+            self.recursive = True
+            return 0, []
+        self._calling.add(key)
+        result = self.longest_from(label_index, metric)
+        self._calling.discard(key)
+        self._subroutine_memo[key] = result
+        return result
+
+    def longest_from(self, start, metric):
+        """(weight, component path) of the heaviest path from a block to any exit"""
+        key = (self.component[start], metric)
+        if key in self._path_memo:
+            return self._path_memo[key]
+        comp = self.component[start]
+        best_weight, best_path = 0, []
+        for block in self.members[comp]:
+            for nxt in self.blocks[block].successors:
+                if self.component[nxt] == comp:
+                    continue
+                weight, path = self.longest_from(nxt, metric)
+                if weight > best_weight or not best_path:
+                    best_weight, best_path = weight, path
+        result = (self.component_weight(comp, metric) + best_weight, [comp] + best_path)
+        self._path_memo[key] = result
+        return result
+
+    def longest_to(self, target, metric):
+        """Heaviest path weight from the program entry up to (excluding) a block"""
+        order = self._topological_components()
+        target_comp = self.component[target]
+        reach = {self.component[0]: 0}
+        for comp in order:
+            if comp not in reach or comp == target_comp:
+                continue
+            weight = reach[comp] + self.component_weight(comp, metric)
+            for block in self.members[comp]:
+                for nxt in self.blocks[block].successors:
+                    nxt_comp = self.component[nxt]
+                    if nxt_comp != comp and reach.get(nxt_comp, -1) < weight:
+                        reach[nxt_comp] = weight
+        return reach.get(target_comp)
+
+    def _topological_components(self):
+        # Tarjan numbers components in reverse topological order
+        return sorted(self.members, reverse=True)
+
+    def loops(self, path):
+        """Whether a component path (or a subroutine it calls) runs a loop"""
+        return any(self._is_loop(self.component[block]) for block in self.expand(path))
+
+    def expand(self, path):
+        """Flatten a component path into blocks, inlining the worst path of each callee"""
+        blocks = []
+        for comp in path:
+            for block in sorted(self.members[comp]):
+                blocks.append(block)
+                for callee in self.blocks[block].calls:
+                    blocks.extend(self.expand(self.subroutine(callee, "cost")[1]))
+        return blocks
+
+
+def find_methods(lines):
+    """Map method name -> entry label for string and ABI selector dispatch"""
+    methods = {}
+    for i in range(len(lines) - 3):
+        ops = [lines[i + k][2] for k in range(4)]
+        args = [lines[i + k][3] for k in range(4)]
+        if ops[0] not in ("txna", "txn") or args[0] != ["ApplicationArgs", "0"]:
+            continue
+        if ops[1] == "byte" and args[1][0].startswith('"'):
+            name = args[1][0].strip('"')
+        elif ops[1] == "method":
+            name = args[1][0].strip('"').split("(")[0]
+        else:
+            continue
+        if ops[2] == "==" and ops[3] == "bnz":
+            methods[name] = args[3][0]
+    # ABI routers may compare all selectors at once with match
+    for i, (_, _, op, args) in enumerate(lines):
+        if op != "match":
+            continue
+        selectors = []
+        j = i - 1
+        while j >= 0 and lines[j][2] == "method":
+            selectors.insert(0, lines[j][3][0].strip('"').split("(")[0])
+            j -= 1
+        for name, target in zip(selectors, args):
+            methods[name] = target
+    return methods
+
+
+def method_signatures(lines):
+    """Map method name -> ABI signature for the methods a program dispatches by selector"""
+    return {args[0].strip('"').split("(")[0]: args[0].strip('"') for _, _, op, args in lines if op == "method"}
+
+
+def read_only_signatures(spec):
+    """ABI signatures of the methods an ARC-4 spec's hints mark read-only"""
+    hints = spec.get("hints", {})
+    return {abi.Method.undictify(method).get_signature() for method in spec["contract"]["methods"]
+            if hints.get(method["name"], {}).get("readonly")}
+
+
+def analyze(source, loop_bound=None, top=5, read_only=(), app_call_budget=APP_CALL_BUDGET):
+    """Cost report of a program; loop_bound overrides the per-method LOOP_BOUNDS for every loop
+
+    read_only holds the ABI signatures of methods run through simulate."""
+    models = {}
+
+    def model_for(bound):
+        if bound not in models:
+            models[bound] = CostModel(source, bound)
+        return models[bound]
+
+    model = model_for(loop_bound or DEFAULT_LOOP_BOUND)
+    lines = parse_program(source)
+    methods = find_methods(lines)
+    signatures = method_signatures(lines)
+
+    program_cost, _ = model.longest_from(0, "cost")
+    report = {
+        "program_cost": program_cost,
+        "blocks": len(model.blocks),
+        "has_loops": model.has_loops,
+        "recursive": model.recursive,
+        "methods": {},
+    }
+
+    for name, label in methods.items():
+        bound = loop_bound or LOOP_BOUNDS.get(name, DEFAULT_LOOP_BOUND)
+        model = model_for(bound)
+        entry = model.labels[label]
+        dispatch = model.longest_to(entry, "cost") or 0
+        cost, path = model.longest_from(entry, "cost")
+        inner_txns = (model.longest_to(entry, "inner_txns") or 0) + model.longest_from(entry, "inner_txns")[0]
+        inner_cost = model.longest_from(entry, "inner_cost")[0]
+        opup_txns = (model.longest_to(entry, "opup_txns") or 0) + model.longest_from(entry, "opup_txns")[0]
+        budget = app_call_budget * (1 + opup_txns)
+        simulated = signatures.get(name) in read_only
+        if simulated:
+            budget += SIMULATE_EXTRA_BUDGET
+
+        path_blocks = model.expand(path)
+        dominant = sorted(
+            ({"block": model.blocks[b].name(), "line": model.blocks[b].line, "cost": model.blocks[b].cost} for b in set(path_blocks)),
+            key=lambda item: item["cost"],
+            reverse=True,
+        )[:top]
+        total = dispatch + cost
+        report["methods"][name] = {
+            "cost": total,
+            "dispatch_cost": dispatch,
+            "body_cost": cost,
+            "loop_bound": bound if model.loops(path) else None,
+            "inner_txns": inner_txns,
+            "inner_txn_cost": inner_cost,
+            "opup_txns": opup_txns,
+            "read_only": simulated,
+            "budget": budget,
+            "budget_used": round(total / budget, 3),
+            "dominant_blocks": dominant,
+        }
+    return report
+
+
+def check_thresholds(reports, thresholds, check_budget=True):
+    """Methods over their --max, or over their reported budget when they have none"""
+    failures = []
+    for path, report in reports.items():
+        for name, method in report["methods"].items():
+            limit = thresholds.get(name, method["budget"] if check_budget else None)
+            if limit is not None and method["cost"] > limit:
+                failures.append(f"{path}: {name} costs {method['cost']} opcodes (limit {limit})")
+    return failures
+
+
+def parse_threshold(value):
+    name, _, limit = value.partition("=")
+    if not limit:
+        raise argparse.ArgumentTypeError("thresholds look like method=cost")
+    return name, int(limit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report worst-case opcode cost per method of TEAL approval programs")
+    parser.add_argument("programs", nargs="+", help="approval*.teal files")
+    parser.add_argument("--max", dest="thresholds", action="append", type=parse_threshold, default=[],
+                        metavar="METHOD=COST", help="fail when a method's worst-case cost exceeds COST")
+    parser.add_argument("--budget", type=int, default=APP_CALL_BUDGET,
+                        help="limit per app call for methods without an explicit --max (0 disables)")
+    parser.add_argument("--loop-bound", type=int,
+                        help="iterations assumed for every loop (default: each method's batch limit)")
+    parser.add_argument("--spec", help="contract spec JSON whose hints mark read-only (simulated) methods")
+    parser.add_argument("--top", type=int, default=5, help="dominant blocks to list per method")
+    parser.add_argument("-o", "--output", help="write the JSON report to a file instead of stdout")
+    args = parser.parse_args(argv)
+
+    read_only = set()
+    if args.spec:
+        with open(args.spec) as f:
+            read_only = read_only_signatures(json.load(f))
+
+    reports = {}
+    for path in args.programs:
+        with open(path, "r") as f:
+            reports[path] = analyze(f.read(), args.loop_bound, args.top, read_only, args.budget or APP_CALL_BUDGET)
+
+    failures = check_thresholds(reports, dict(args.thresholds), bool(args.budget))
+    output = json.dumps({"programs": reports, "failures": failures}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())